@@ -1,4 +1,5 @@
 import asyncio
+import logging
 import sys
 import os
 
@@ -12,10 +13,23 @@ if sys.platform == "win32":
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipMiddleware
 from fastapi.responses import JSONResponse
 import traceback
 
+from core.metrics import RequestTimingMiddleware
+
+def configure_logging() -> None:
+    """
+    アプリのログ設定。各モジュールは logging.getLogger(__name__) を使い、ここでまとめて出力先を決める。
+    services 配下（価格改定の前処理診断など）は INFO 以上を出す。
+    """
+    logging.basicConfig(level=logging.WARNING, format="[%(levelname)s %(name)s] %(message)s")
+    logging.getLogger("services").setLevel(logging.INFO)
+
+
 def create_app() -> FastAPI:
+    configure_logging()
     app = FastAPI(title="HIRIO Sedori API", version="0.1.0")
 
     app.add_middleware(
@@ -25,6 +39,17 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # Accept-Encoding: gzip のクライアントには大きなレスポンスを圧縮して返す
+    # （NDJSON ストリームは逐次届くよう圧縮しない）
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=1024,
+        compresslevel=5,
+        exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/x-ndjson",),
+    )
+    # ルートごとの処理時間・サイズを記録（GET /metrics）。最後に追加して一番外側に置き、
+    # 圧縮後のレスポンスサイズとストリーミング送信完了までの時間を計測する
+    app.add_middleware(RequestTimingMiddleware)
     
     # グローバルエラーハンドラーを追加
     @app.exception_handler(Exception)
@@ -51,11 +76,15 @@ def create_app() -> FastAPI:
     from routers.ssot_rules import router as ssot_router
     from routers.repricer import router as repricer_router
     from routers.inventory import router as inventory_router
+    from routers.jobs import router as jobs_router
+    from routers.metrics import router as metrics_router
 
     app.include_router(csv_router)
     app.include_router(ssot_router)
     app.include_router(repricer_router)  # プレフィックスはルーター内で既に設定済み
     app.include_router(inventory_router)
+    app.include_router(jobs_router)
+    app.include_router(metrics_router)
 
     # キャッシュ問題対策
     app.openapi_schema = None
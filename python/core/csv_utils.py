@@ -1,131 +1,458 @@
 import pandas as pd
+import numpy as np
 from io import BytesIO
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
 from fastapi import HTTPException
+import codecs
+import csv
+import io
 import unicodedata
 import re
+import warnings
 
-def read_csv_with_fallback(content: bytes) -> pd.DataFrame:
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
+CSV_FALLBACK_ENCODINGS = ["cp932", "utf-8", "latin1"]
+
+# エンコーディング判定に使う先頭バイト数
+CSV_SNIFF_BYTES = 64 * 1024
+
+# BOM → エンコーディング（BOM があれば判定を省略する）
+_CSV_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# pandas（C エンジン）が欠損とみなす文字列（pandas._libs.parsers.STR_NA_VALUES と同じ。pyarrow でも同じ扱いにする）
+_PANDAS_NA_VALUES = (
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+)
+
+# C エンジンの ParserWarning（on_bad_lines='warn'）の1行分
+_SKIPPED_LINE_PATTERN = re.compile(r"Skipping line (\d+): expected (\d+) fields, saw (\d+)")
+
+
+class CsvBadLine(NamedTuple):
+    """読み飛ばした行（line は1始まりの行番号。pyarrow エンジンで不明な場合は None）。"""
+    line: Optional[int]
+    expected_fields: Optional[int]
+    actual_fields: Optional[int]
+    text: str
+
+
+class _ShortRowError(ValueError):
+    """列数の足りない行がある（C エンジンは欠損で埋めて残すため、pyarrow では読まずに C エンジンで読み直す）。"""
+
+
+class CsvIngestResult(NamedTuple):
+    """CSV 取り込み結果。"""
+    df: pd.DataFrame
+    encoding: str
+    bom: bool
+    engine: str
+    bad_lines: List[CsvBadLine]
+
+
+def sniff_csv_encoding(content: bytes, sample_size: int = CSV_SNIFF_BYTES) -> Tuple[str, bool]:
     """
-    Reads CSV content with multiple encoding fallbacks.
-    Tries cp932, then utf-8, then latin1.
+    先頭 sample_size バイトからエンコーディングを判定する。Returns: (encoding, BOMの有無)
+    BOM があればそれに従い、無ければ CSV_FALLBACK_ENCODINGS の順で最初にデコードできるものを返す
+    （サンプル末尾で途切れたマルチバイト文字はエラーにしない）。
+    """
+    for bom, encoding in _CSV_BOMS:
+        if content.startswith(bom):
+            return encoding, True
+    sample = content[:sample_size]
+    for encoding in CSV_FALLBACK_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            decoder.decode(sample, final=len(content) <= sample_size)
+        except UnicodeDecodeError:
+            continue
+        return encoding, False
+    return CSV_FALLBACK_ENCODINGS[-1], False
+
+
+def _encoding_candidates(encoding: str, bom: bool) -> List[str]:
+    """判定したエンコーディングから、デコードに失敗したときに試す順の候補。"""
+    if bom:
+        return [encoding] + [e for e in CSV_FALLBACK_ENCODINGS if e != encoding]
+    return CSV_FALLBACK_ENCODINGS[CSV_FALLBACK_ENCODINGS.index(encoding):]
+
+
+def _decode_sample(content: bytes, encoding: str, bom: bool) -> str:
+    """先頭 CSV_SNIFF_BYTES バイトを decode する（BOM は除く。末尾で途切れたマルチバイト文字は捨てる）。"""
+    if bom and encoding == "utf-8":
+        encoding = "utf-8-sig"
+    decoder = codecs.getincrementaldecoder(encoding)()
+    return decoder.decode(content[:CSV_SNIFF_BYTES], final=len(content) <= CSV_SNIFF_BYTES)
+
+
+def _read_header(content: bytes, encoding: str, bom: bool) -> List[str]:
+    """
+    ヘッダー行の列名を返す。先頭サンプル内で終わらないヘッダーや、空・重複した列名
+    （pandas は "Unnamed: 0" や "a.1" に読み替える）は C エンジンに任せるため ValueError にする。
     """
-    encodings = ["cp932", "utf-8", "latin1"]
+    sample = _decode_sample(content, encoding, bom)
+    reader = csv.reader(io.StringIO(sample))
+    header = next(reader, [])
+    if len(content) > CSV_SNIFF_BYTES and next(reader, None) is None:
+        raise ValueError("CSV header does not fit in the sniff sample")
+    if not header or "" in header or len(set(header)) != len(header):
+        raise ValueError("CSV header has blank or duplicate column names")
+    return header
 
-    for encoding in encodings:
+
+def _locate_bad_lines(content: bytes, encoding: str, bom: bool, expected: int, texts: List[str]) -> List[CsvBadLine]:
+    """
+    pyarrow が読み飛ばした行（texts、出現順）の行番号と列数を求める。
+    pyarrow の並列解析では行番号が分からないため、列数の合わない行を csv モジュールで数え直す。
+    line は行の始まる物理行（引用符内の改行も1行と数える）。数え直した行数が合わなければ line は None。
+    """
+    if bom and encoding == "utf-8":
+        encoding = "utf-8-sig"
+    reader = csv.reader(io.StringIO(content.decode(encoding, errors="replace")))
+    located: List[CsvBadLine] = []
+    start_line = 1
+    for row in reader:
+        if row and len(row) != expected:
+            located.append(CsvBadLine(start_line, expected, len(row), texts[len(located)]))
+            if len(located) == len(texts):
+                return located
+        start_line = reader.line_num + 1
+    return [CsvBadLine(None, expected, None, text) for text in texts]
+
+
+def _parse_csv_pyarrow(
+    content: bytes, encoding: str, arrow_strings: bool, bom: bool = False
+) -> Tuple[pd.DataFrame, List[CsvBadLine]]:
+    """
+    pyarrow.csv で全列を文字列として読む。pd.read_csv(engine="pyarrow", dtype=str) は型推論の後で
+    文字列に戻すため、先頭ゼロ（SKU "0012"・JAN）が落ち、空欄を含む数値列が "490….0" や "nan" になる。
+    空欄や "NA"・"None" などは C エンジンと同じく欠損（NaN、arrow_strings=True なら <NA>）にする。
+    列の多い行は読み飛ばす。列の足りない行があれば _ShortRowError（C エンジンはその行を欠損で埋めて残す）。
+    """
+    header = _read_header(content, encoding, bom)
+    bad_texts: List[str] = []
+    short_rows: List[str] = []
+
+    def on_bad_line(row) -> str:
+        if row.actual_columns < row.expected_columns:
+            short_rows.append(row.text)
+            return "error"
+        bad_texts.append(row.text)
+        return "skip"
+
+    try:
+        table = pa_csv.read_csv(
+            BytesIO(content),
+            read_options=pa_csv.ReadOptions(encoding=encoding),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True, invalid_row_handler=on_bad_line),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in header},
+                null_values=list(_PANDAS_NA_VALUES),
+                strings_can_be_null=True,
+            ),
+        )
+    except pa.ArrowInvalid as e:
+        if short_rows:
+            raise _ShortRowError(f"CSV has a row with fewer fields than the header: {short_rows[0]!r}") from e
+        raise
+    if table.column_names != header:
+        raise ValueError("pyarrow read different CSV column names than the header")
+
+    if arrow_strings:
+        df = table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+    else:
+        df = table.to_pandas()
+        df = df.where(df.notna(), np.nan)
+
+    bad_lines = _locate_bad_lines(content, encoding, bom, len(header), bad_texts) if bad_texts else []
+    return df, bad_lines
+
+
+def _parse_csv_c(content: bytes, encoding: str) -> Tuple[pd.DataFrame, List[CsvBadLine]]:
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", pd.errors.ParserWarning)
+        # on_bad_lines='warn' は問題を警告しつつも処理を継続させる
+        df = pd.read_csv(BytesIO(content), encoding=encoding, dtype=str, on_bad_lines='warn')
+    bad_lines: List[CsvBadLine] = []
+    for warning in caught:
+        if not issubclass(warning.category, pd.errors.ParserWarning):
+            warnings.warn_explicit(warning.message, warning.category, warning.filename, warning.lineno)
+            continue
+        message = str(warning.message)
+        matches = list(_SKIPPED_LINE_PATTERN.finditer(message))
+        if not matches:
+            bad_lines.append(CsvBadLine(None, None, None, message.strip()))
+        for m in matches:
+            bad_lines.append(CsvBadLine(int(m.group(1)), int(m.group(2)), int(m.group(3)), m.group(0)))
+    return df, bad_lines
+
+
+def ingest_csv_bytes(content: bytes, arrow_strings: bool = False) -> CsvIngestResult:
+    """
+    アップロードされた CSV を1回の解析で DataFrame にする。
+
+    - エンコーディングと BOM は先頭 CSV_SNIFF_BYTES バイトで判定する。サンプルより後ろで
+      デコードに失敗した場合のみ、優先順で次のエンコーディングを試す
+    - pyarrow があれば pyarrow エンジン、無ければ C エンジンで解析する（pyarrow での解析に失敗した場合と、
+      列の足りない行がある場合も C エンジン）。どちらのエンジンでも、また iter_csv_chunks とも同じ DataFrame になる
+    - 列の多い行は読み飛ばし、bad_lines に行番号・列数とともに返す。列の足りない行は欠損で埋めて残す
+    - arrow_strings=True（pyarrow がある場合のみ有効）なら Arrow 文字列型の列で返す。
+      既定は従来どおり object 型（欠損は NaN）で、価格改定の行処理はこの前提で動く
+    """
+    encoding, bom = sniff_csv_encoding(content)
+    for candidate in _encoding_candidates(encoding, bom):
+        if _HAS_PYARROW:
+            try:
+                df, bad_lines = _parse_csv_pyarrow(content, candidate, arrow_strings, bom)
+                return CsvIngestResult(df, candidate, bom, "pyarrow", bad_lines)
+            except _ShortRowError:
+                pass
+            except Exception as e:
+                print(f"[WARNING] pyarrow での CSV 解析に失敗したため C エンジンで再解析します ({candidate}): {str(e)}")
         try:
-            # on_bad_lines='warn' は問題を警告しつつも処理を継続させる
-            df = pd.read_csv(BytesIO(content), encoding=encoding, dtype=str, on_bad_lines='warn')
-            return df
-        except (UnicodeDecodeError, pd.errors.ParserError) as e:
+            df, bad_lines = _parse_csv_c(content, candidate)
+        except (UnicodeDecodeError, pd.errors.ParserError):
             continue
+        if arrow_strings and _HAS_PYARROW:
+            df = df.astype(pd.StringDtype("pyarrow"))
+        return CsvIngestResult(df, candidate, bom, "c", bad_lines)
 
     raise HTTPException(
         status_code=400,
         detail="Failed to decode CSV with cp932, utf-8, and latin1 encodings."
     )
 
+
+def read_csv_with_fallback(content: bytes) -> pd.DataFrame:
+    """
+    Reads CSV content with multiple encoding fallbacks.
+    エンコーディングは先頭サンプルで判定し、1回の解析で読み込む（ingest_csv_bytes）。
+    """
+    result = ingest_csv_bytes(content)
+    if result.bad_lines:
+        print(f"[WARNING] CSV: 列数の合わない {len(result.bad_lines)}行を読み飛ばしました ({result.encoding})")
+    return result.df
+
+def detect_csv_encoding(source: BinaryIO, sample_size: int = CSV_SNIFF_BYTES) -> Tuple[str, bool]:
+    """
+    先頭 sample_size バイトだけを読み、sniff_csv_encoding で判定する（ingest_csv_bytes と同じ判定）。
+    Returns: (encoding, BOMの有無)。ファイル全体はデコードしない。読込位置は先頭に戻す。
+    """
+    source.seek(0)
+    # 1バイト多く読み、サンプルがファイル末尾まで届いているかを判定に渡す
+    sample = source.read(sample_size + 1)
+    source.seek(0)
+    return sniff_csv_encoding(sample, sample_size)
+
+
+def _iter_records(lines: Iterator[str]) -> Iterator[List[str]]:
+    """
+    テキスト行（改行付き）を CSV の1レコード分ずつまとめて返す。引用符の中の改行ではレコードを区切らない
+    （「"」の数の偶奇で判定する。"" のエスケープは偶数なので影響しない）。
+    """
+    record: List[str] = []
+    in_quotes = False
+    for line in lines:
+        record.append(line)
+        if line.count('"') % 2:
+            in_quotes = not in_quotes
+        if not in_quotes:
+            yield record
+            record = []
+    if record:
+        yield record
+
+
+def _parse_csv_block(header: List[str], block: List[str], first: bool) -> pd.DataFrame:
+    """
+    ヘッダーと chunk 分のレコードを C エンジンで一度に解析する（ingest_csv_bytes と同じ規則）。
+    2つ目以降のブロックは、ヘッダーの写しを1行目のデータとして挟んで解析し、その行を除く。
+    pandas は1行目のデータの列数で先頭列を index にするかを決めるため、ファイル先頭以外ではそれが起きないようにする。
+    """
+    lines = header + block if first else header + header + block
+    df, bad_lines = _parse_csv_c("".join(lines).encode("utf-8"), "utf-8")
+    if bad_lines:
+        print(f"[WARNING] CSV: 列数の合わない {len(bad_lines)}行を読み飛ばしました")
+    return df if first else df.iloc[1:]
+
+
+def iter_csv_chunks(source: BinaryIO, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    CSV を chunk_size 行ずつの DataFrame（全列 str、index は通し番号）として順に返す
+    （読み飛ばした行の分だけ chunk_size より少ないチャンクもある）。
+    各チャンクは ingest_csv_bytes と同じ規則で解析するため、連結すると一括読込と同じ DataFrame になる
+    （列の多い行は読み飛ばし、足りない行は欠損で埋める。pd.read_csv(chunksize=...) はチャンク先頭の
+    列の多い行を読み飛ばさずに切り詰めるため使わない）。ヘッダーのみの CSV は空の DataFrame を1つ返す。
+    エンコーディングは先頭サンプルで判定する（detect_csv_encoding）。最初のチャンクを返す前に
+    デコードに失敗した場合は次の候補で読み直し、返した後で失敗した場合は 400 エラーにする。
+    """
+    encoding, bom = detect_csv_encoding(source)
+    for candidate in _encoding_candidates(encoding, bom):
+        source.seek(0)
+        yielded = False
+        # utf-8-sig は BOM があれば除き、無ければ utf-8 と同じ（pandas の encoding="utf-8" と同じ扱い）
+        text = io.TextIOWrapper(source, encoding="utf-8-sig" if candidate == "utf-8" else candidate, newline="")
+        try:
+            records = _iter_records(iter(text))
+            header = next(records, [])
+            block: List[str] = []
+            rows = 0
+            offset = 0
+            for record in records:
+                block.extend(record)
+                # 空行（空白のみの行を含む）は pandas が読み飛ばすため行数に数えない
+                if "".join(record).strip():
+                    rows += 1
+                if rows >= chunk_size:
+                    df = _parse_csv_block(header, block, first=not yielded)
+                    block, rows = [], 0
+                    if df.empty:
+                        # 読み飛ばした行だけのチャンクは返さない
+                        continue
+                    df.index = pd.RangeIndex(offset, offset + len(df))
+                    offset += len(df)
+                    yielded = True
+                    yield df
+            if block or not yielded:
+                df = _parse_csv_block(header, block, first=not yielded)
+                df.index = pd.RangeIndex(offset, offset + len(df))
+                yielded = True
+                yield df
+            return
+        except UnicodeDecodeError as e:
+            if yielded:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Failed to decode CSV as {candidate} after the first chunk: {e}"
+                )
+            print(f"[WARNING] CSV を {candidate} でデコードできないため、次のエンコーディングで読み直します")
+        finally:
+            # TextIOWrapper が source を閉じないよう切り離す
+            text.detach()
+    raise HTTPException(
+        status_code=400,
+        detail="Failed to decode CSV with cp932, utf-8, and latin1 encodings."
+    )
+
+
+# cp932 出力用の文字置換表（NFKC 正規化の後に適用）
+# 旧実装の置換 dict を str.translate 用の1文字→文字列の表にしたもの。
+# 置換後の文字列はすべて ASCII で、別の置換対象を生まないため、順次 str.replace した結果と同じになる。
+# 曲がった引用符（‘’“”）は旧実装でも置換されておらず（cp932 で出力可能）、そのまま残す。
+_CP932_CHAR_REPLACEMENTS = {
+    # ダッシュ系
+    '—': '-',  # emダッシュ
+    '–': '-',  # enダッシュ
+    '―': '-',  # ホリゾンタルバー
+    '‐': '-',  # ハイフン
+    '−': '-',  # マイナス記号
+    'ー': '-',  # 全角長音（カタカナ）→半角ハイフンに統一
+
+    # クォート系
+    '‛': "'",  # 反転シングルクォート
+    '‟': '"',  # 反転ダブルクォート
+    '′': "'",  # プライム
+    '″': '"',  # ダブルプライム
+
+    # 三点リーダー
+    '…': '...',  # 三点リーダー → ドット3つ
+    '⋯': '...',  # 中点三点リーダー
+
+    # チルダ・波ダッシュ系
+    '～': '~',  # 全角チルダ
+    '∼': '~',  # 波ダッシュ
+    '〜': '~',  # 全角チルダ（別）
+    '⁓': '~',  # 反転チルダ
+
+    # その他の記号
+    '•': '*',  # 黒丸
+    '·': '*',  # 中点
+    '※': '*',  # 米印
+    '°': 'deg',  # 度記号
+    '℃': 'C',  # 摂氏
+    '℉': 'F',  # 華氏
+    '×': 'x',  # 乗算記号
+    '÷': '/',  # 除算記号
+    '±': '+/-',  # プラスマイナス
+    '≒': '=',  # 約等号
+    '≠': '!=',  # 不等号
+    '≦': '<=',  # 以下
+    '≧': '>=',  # 以上
+    '∞': 'inf',  # 無限大
+    '♪': '(music)',  # 音符
+    '♡': '(heart)',  # ハート
+    '★': '*',  # 星
+    '☆': '*',  # 星（白抜き）
+    '→': '->',  # 右矢印
+    '←': '<-',  # 左矢印
+    '↑': '^',  # 上矢印
+    '↓': 'v',  # 下矢印
+    '【': '[',  # 墨付きかっこ
+    '】': ']',  # 墨付きかっこ
+    '《': '<<',  # 二重山かっこ
+    '》': '>>',  # 二重山かっこ
+    '〈': '<',  # 山かっこ
+    '〉': '>',  # 山かっこ
+
+    # 改行・タブは空白に置換（列崩れ防止）
+    '\r': ' ',
+    '\n': ' ',
+    '\t': ' ',
+}
+_CP932_TRANSLATION = str.maketrans(_CP932_CHAR_REPLACEMENTS)
+
+# Excel数式表記 ="..." の除去パターン
+_EXCEL_FORMULA_FULL = re.compile(r'^="(.*)"$')
+_EXCEL_FORMULA_HEAD = re.compile(r'^="')
+_EXCEL_FORMULA_TAIL = re.compile(r'"$')
+
+# cp932 正規化で文字列化せず数値に戻す列
+_CP932_NUMERIC_COLUMNS = ['price', 'akaji', 'priceTrace', 'leadtime']
+
+
+def _replace_cp932_unencodable(s: str) -> str:
+    """cp932 で出力できない文字を1文字ずつ ? に置換する。"""
+    safe_chars = []
+    for char in s:
+        try:
+            char.encode('cp932')
+            safe_chars.append(char)
+        except UnicodeEncodeError:
+            safe_chars.append('?')
+    return ''.join(safe_chars)
+
+
 def normalize_string_for_cp932(s: str) -> str:
     """
     Shift_JIS (cp932) で安全に出力できるように文字列を正規化
     1. NFKC正規化
-    2. Shift_JISで変換できない文字を除去/置換
-    3. 改行・タブを空白に置換
+    2. 危険な記号の置換・改行/タブ→空白（_CP932_TRANSLATION で一括置換）
+    3. Shift_JISで変換できない文字を ? に置換
     """
     if not isinstance(s, str):
         return str(s) if s is not None else ""
 
-    # 元の文字列を保存（デバッグ用）
-    original = s
+    if s.isascii():
+        # ASCII は NFKC で変わらず cp932 でも出力できる（置換対象は改行・タブのみ）
+        return s.translate(_CP932_TRANSLATION)
 
     # NFKC正規化（全角→半角、合字展開など）
-    s = unicodedata.normalize('NFKC', s)
-
-    # 【強化版】危険な記号を安全な文字に置換
-    # GPT決定版の置換ルールを完全実装
-    replacements = {
-        # ダッシュ系（最優先で処理）
-        '—': '-',  # emダッシュ
-        '–': '-',  # enダッシュ
-        '―': '-',  # ホリゾンタルバー
-        '‐': '-',  # ハイフン
-        '−': '-',  # マイナス記号
-        'ー': '-',  # 全角長音（カタカナ）→半角ハイフンに統一
-
-        # クォート系
-        ''': "'",  # 左シングルクォート
-        ''': "'",  # 右シングルクォート
-        '"': '"',  # 左ダブルクォート
-        '"': '"',  # 右ダブルクォート
-        '‛': "'",  # 反転シングルクォート
-        '‟': '"',  # 反転ダブルクォート
-        '′': "'",  # プライム
-        '″': '"',  # ダブルプライム
-
-        # 三点リーダー
-        '…': '...',  # 三点リーダー → ドット3つ
-        '⋯': '...',  # 中点三点リーダー
-
-        # チルダ・波ダッシュ系
-        '～': '~',  # 全角チルダ
-        '∼': '~',  # 波ダッシュ
-        '〜': '~',  # 全角チルダ（別）
-        '⁓': '~',  # 反転チルダ
-
-        # その他の記号
-        '•': '*',  # 黒丸
-        '·': '*',  # 中点
-        '※': '*',  # 米印
-        '°': 'deg',  # 度記号
-        '℃': 'C',  # 摂氏
-        '℉': 'F',  # 華氏
-        '×': 'x',  # 乗算記号
-        '÷': '/',  # 除算記号
-        '±': '+/-',  # プラスマイナス
-        '≒': '=',  # 約等号
-        '≠': '!=',  # 不等号
-        '≦': '<=',  # 以下
-        '≧': '>=',  # 以上
-        '∞': 'inf',  # 無限大
-        '♪': '(music)',  # 音符
-        '♡': '(heart)',  # ハート
-        '★': '*',  # 星
-        '☆': '*',  # 星（白抜き）
-        '→': '->',  # 右矢印
-        '←': '<-',  # 左矢印
-        '↑': '^',  # 上矢印
-        '↓': 'v',  # 下矢印
-        '【': '[',  # 墨付きかっこ
-        '】': ']',  # 墨付きかっこ
-        '《': '<<',  # 二重山かっこ
-        '》': '>>',  # 二重山かっこ
-        '〈': '<',  # 山かっこ
-        '〉': '>',  # 山かっこ
-    }
-
-    for old, new in replacements.items():
-        if old in s:
-            s = s.replace(old, new)
-
-    # 改行・タブを空白に置換（列崩れ防止）
-    s = re.sub(r'[\r\n\t]', ' ', s)
-
-    # Shift_JISで変換できない文字を1文字ずつチェック
+    s = unicodedata.normalize('NFKC', s).translate(_CP932_TRANSLATION)
+
     try:
         s.encode('cp932')
-        # エンコード成功 → そのまま返す
     except UnicodeEncodeError:
-        # エンコード失敗 → 1文字ずつチェックして置換
-        safe_chars = []
-        for i, char in enumerate(s):
-            try:
-                char.encode('cp932')
-                safe_chars.append(char)
-            except UnicodeEncodeError:
-                # 変換できない文字は ? に置換
-                safe_chars.append('?')
-        s = ''.join(safe_chars)
-
-
+        s = _replace_cp932_unencodable(s)
     return s
 
 def remove_excel_formula_prefix(s: str) -> str:
@@ -135,40 +462,89 @@ def remove_excel_formula_prefix(s: str) -> str:
     """
     if not isinstance(s, str):
         return str(s) if s is not None else ""
+    if '"' not in s:
+        # いずれのパターンも " を含む
+        return s
+    if '\n' not in s:
+        # 改行を含まなければ下の正規表現3段と同じ結果を文字列操作で得る
+        if len(s) >= 3 and s.startswith('="') and s.endswith('"'):
+            s = s[2:-1]
+        if s.startswith('="'):
+            s = s[2:]
+        if s.endswith('"'):
+            s = s[:-1]
+        return s
 
     # ="..." パターンを除去
-    s = re.sub(r'^="(.*)"$', r'\1', s)
+    s = _EXCEL_FORMULA_FULL.sub(r'\1', s)
     # =" で始まる場合も除去
-    s = re.sub(r'^="', '', s)
+    s = _EXCEL_FORMULA_HEAD.sub('', s)
     # " で終わる場合も除去
-    s = re.sub(r'"$', '', s)
+    s = _EXCEL_FORMULA_TAIL.sub('', s)
 
     return s
 
+
+def _normalize_cell_for_cp932(value) -> str:
+    """1セル分: Excel数式表記の除去 → cp932 正規化。"""
+    return normalize_string_for_cp932(remove_excel_formula_prefix(value))
+
+
+def _map_cells_cached(values, func) -> list:
+    """
+    列の値に func を適用する。文字列はユニーク値ごとに1回だけ評価する（商品名などは重複が多い）。
+    文字列以外（数値等）は 1 と 1.0 を区別するためキャッシュしない。
+    """
+    if pd.api.types.infer_dtype(values, skipna=False) == "string":
+        codes, uniques = pd.factorize(values)
+        mapped = [func(v) for v in uniques]
+        return [mapped[c] for c in codes.tolist()]
+    cache = {}
+    out = []
+    for v in values:
+        if type(v) is str:
+            result = cache.get(v)
+            if result is None:
+                result = cache[v] = func(v)
+            out.append(result)
+        else:
+            out.append(func(v))
+    return out
+
+
+def _normalize_columns_cellwise(df: pd.DataFrame) -> pd.DataFrame:
+    """セルごとに apply する従来の手順（空の DataFrame・列名重複時に使う）。"""
+    for col in df.columns:
+        df[col] = df[col].apply(remove_excel_formula_prefix)
+    for col in df.columns:
+        if col not in _CP932_NUMERIC_COLUMNS:
+            df[col] = df[col].astype(str)
+        df[col] = df[col].apply(normalize_string_for_cp932)
+    return df
+
+
 def normalize_dataframe_for_cp932(df: pd.DataFrame) -> pd.DataFrame:
     """
     DataFrame全体をShift_JIS (cp932) 出力用に正規化
     1. NaN → 空文字列
-    2. SKU列の Excel数式表記除去
+    2. 全列の Excel数式表記除去
     3. 全文字列列をNFKC正規化 + 危険文字除去
+    4. 数値列（price 等）を数値型に戻す
+    2・3 は列ごとにユニーク値単位でまとめて評価する（結果はセルごとの apply と同じ）。
     """
     # 1. NaN → 空文字列（"nan"文字列化を防ぐ）
     df = df.fillna("")
-    
-    # 2. 全列の Excel数式表記除去（="..." → 純粋な値）
-    for col in df.columns:
-        df[col] = df[col].apply(remove_excel_formula_prefix)
 
-    # 3. 全列を明示的に文字列化してから正規化
-    for col in df.columns:
-        # 数値列以外は明示的に文字列化
-        if col not in ['price', 'akaji', 'priceTrace', 'leadtime']:
-            df[col] = df[col].astype(str)
-        df[col] = df[col].apply(normalize_string_for_cp932)
+    if df.empty or not df.columns.is_unique:
+        df = _normalize_columns_cellwise(df)
+    else:
+        # 2・3. 除去後の値はすべて文字列になるため、列ごとの文字列化は不要
+        for col in df.columns:
+            values = df[col].to_numpy(dtype=object)
+            df[col] = pd.Series(_map_cells_cached(values, _normalize_cell_for_cp932), index=df.index, dtype=object)
 
     # 4. 数値列を数値型に戻す（price, akaji, priceTrace, leadtime等）
-    numeric_cols = ['price', 'akaji', 'priceTrace', 'leadtime']
-    for col in numeric_cols:
+    for col in _CP932_NUMERIC_COLUMNS:
         if col in df.columns:
             # 空文字列の場合は0にする
             df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
@@ -0,0 +1,169 @@
+"""
+大きな API レスポンス向けの JSON 出力。
+
+- FastJSONResponse: orjson があれば orjson、無ければ標準 json で直接バイト列にする。
+  エンドポイントから Response として返すため、FastAPI の jsonable_encoder による全体の走査を通らない。
+  NaN / Infinity は null になる（orjson と同じ扱い）
+- JsonFragment: JSON 化済みのバイト列。レスポンス内の任意の位置にそのまま埋め込む
+- dataframe_records_json: DataFrame を to_dict(orient="records") → JSON と同じ内容で、
+  行ごとの dict を作らずに列単位で JSON 化する
+"""
+
+import json
+import math
+import re
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, List
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
+# JsonFragment の埋め込み位置（\x00 は JSON 文字列内で必ず \u0000 にエスケープされる）
+_FRAGMENT_MARK = "\x00json-fragment:{}\x00"
+_FRAGMENT_PLACEHOLDER = re.compile(rb'"\\u0000json-fragment:(\d+)\\u0000"')
+
+
+class JsonFragment:
+    """JSON 化済みの値（dumps_json / FastJSONResponse がそのまま埋め込む）。"""
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def _replace_non_finite(value: Any, replacement: Any) -> Any:
+    """dict / list / tuple 内の NaN・Infinity を replacement に置き換える。"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else replacement
+    if isinstance(value, dict):
+        return {k: _replace_non_finite(v, replacement) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_non_finite(v, replacement) for v in value]
+    return value
+
+
+def _json_default(fragments: List[bytes]) -> Callable[[Any], Any]:
+    def default(obj: Any) -> Any:
+        if isinstance(obj, JsonFragment):
+            fragments.append(obj.data)
+            return _FRAGMENT_MARK.format(len(fragments) - 1)
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        if isinstance(obj, Path):
+            return str(obj)
+        return jsonable_encoder(obj)
+    return default
+
+
+def _splice_fragments(body: bytes, fragments: List[bytes]) -> bytes:
+    if not fragments:
+        return body
+    return _FRAGMENT_PLACEHOLDER.sub(lambda m: fragments[int(m.group(1))], body)
+
+
+def dumps_json(content: Any) -> bytes:
+    """content を UTF-8 の JSON バイト列にする（NaN / Infinity は null、JsonFragment はそのまま埋め込む）。"""
+    fragments: List[bytes] = []
+    if _HAS_ORJSON:
+        body = orjson.dumps(
+            content,
+            default=_json_default(fragments),
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+        return _splice_fragments(body, fragments)
+    try:
+        body = json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+            default=_json_default(fragments),
+        ).encode("utf-8")
+    except ValueError:
+        # NaN / Infinity を含む場合のみ全体を走査して null に置き換える
+        fragments = []
+        body = json.dumps(
+            _replace_non_finite(content, None), ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+            default=_json_default(fragments),
+        ).encode("utf-8")
+    return _splice_fragments(body, fragments)
+
+
+class FastJSONResponse(Response):
+    """dumps_json で出力する JSONResponse。"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+def _encode_scalar(value: Any, non_finite: str) -> str:
+    """to_dict(records) の1セルを、従来のレスポンス（jsonable_encoder → json.dumps）と同じ JSON にする。"""
+    if value is None:
+        return "null"
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return int.__repr__(value)
+    if isinstance(value, float):
+        return float.__repr__(value) if math.isfinite(value) else non_finite
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    cleaned = _replace_non_finite(value, json.loads(non_finite))
+    return json.dumps(jsonable_encoder(cleaned), ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def _encode_column(series: pd.Series, non_finite: str) -> List[str]:
+    values = series.to_numpy()
+    kind = values.dtype.kind
+    if kind == "f":
+        return [float.__repr__(v) if math.isfinite(v) else non_finite for v in values.tolist()]
+    if kind in "iu":
+        return [int.__repr__(v) for v in values.tolist()]
+    if kind == "b":
+        return ["true" if v else "false" for v in values.tolist()]
+    # object など: 同じ文字列は1回だけ JSON 化する
+    cache = {}
+    out = []
+    for v in series.tolist():
+        if type(v) is str:
+            encoded = cache.get(v)
+            if encoded is None:
+                encoded = cache[v] = json.dumps(v, ensure_ascii=False)
+            out.append(encoded)
+        else:
+            out.append(_encode_scalar(v, non_finite))
+    return out
+
+
+def dataframe_records_json(df: pd.DataFrame, non_finite: Any = None) -> JsonFragment:
+    """
+    df.to_dict(orient="records") の JSON（キーは列名、区切りは "," ":"）を列単位で作る。
+    NaN / Infinity は non_finite に置き換える（価格改定の items は従来どおり 0）。
+    """
+    non_finite_json = json.dumps(non_finite)
+    n = len(df)
+    if n == 0:
+        return JsonFragment(b"[]")
+    if not df.columns.is_unique:
+        records = _replace_non_finite(df.to_dict(orient="records"), non_finite)
+        return JsonFragment(dumps_json(records))
+    keys = [json.dumps(str(col), ensure_ascii=False) + ":" for col in df.columns]
+    columns = [_encode_column(df.iloc[:, j], non_finite_json) for j in range(len(keys))]
+    rows = (
+        "{" + ",".join(key + cell for key, cell in zip(keys, cells)) + "}"
+        for cells in zip(*columns)
+    ) if keys else ("{}" for _ in range(n))
+    return JsonFragment(("[" + ",".join(rows) + "]").encode("utf-8"))
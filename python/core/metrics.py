@@ -0,0 +1,254 @@
+"""
+API サーバーの計測（処理時間・リクエスト/レスポンスサイズ・処理段階ごとの時間）。
+
+- RequestTimingMiddleware: ルート（パステンプレート）ごとの処理時間とリクエスト/レスポンスの
+  バイト数をヒストグラムに記録する。ASGI ミドルウェアとして body を数えるため、
+  ストリーミング応答も送信完了までを計測する
+- stage_span: 処理段階（CSV読込・前処理・ルール評価・DB参照・JSON化など）の時間を記録する
+  （with 文・デコレータのどちらでも使える）
+- MetricsRegistry.render_prometheus: /metrics 用の Prometheus テキスト形式
+- MetricsRegistry.summary: デスクトップの設定タブ向けの JSON（件数・平均・パーセンタイル）
+
+計測値はプロセス内のメモリにのみ保持し、再起動または reset() で消える。
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 処理時間（秒）・サイズ（バイト）のバケット上限
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+SIZE_BUCKETS: Tuple[float, ...] = tuple(float(1024 * 4 ** i) for i in range(9))  # 1KiB〜64MiB
+
+HTTP_DURATION = "hirio_http_request_duration_seconds"
+HTTP_REQUEST_SIZE = "hirio_http_request_size_bytes"
+HTTP_RESPONSE_SIZE = "hirio_http_response_size_bytes"
+HTTP_REQUESTS = "hirio_http_requests_total"
+STAGE_DURATION = "hirio_stage_duration_seconds"
+
+_HELP = {
+    HTTP_DURATION: "API リクエストの処理時間（レスポンス送信完了まで）",
+    HTTP_REQUEST_SIZE: "リクエストボディのサイズ",
+    HTTP_RESPONSE_SIZE: "レスポンスボディのサイズ（圧縮後）",
+    HTTP_REQUESTS: "API リクエスト数（ステータスコード別）",
+    STAGE_DURATION: "処理段階ごとの時間",
+}
+
+# ルートに一致しなかったリクエストのラベル（404 のパスでラベルが増え続けないようにまとめる）
+UNMATCHED_ROUTE = "<unmatched>"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """累積しないバケット別の件数・合計・最大値。"""
+
+    __slots__ = ("buckets", "counts", "total", "count", "max")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最後は +Inf
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """バケット内を線形補間した分位点の推定値（+Inf バケットは最大値で打ち切る）。"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+
+def _format_number(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """ヒストグラムとカウンタの置き場（スレッドセーフ）。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self.started_at = time.time()
+
+    def observe(self, name: str, value: float, labels: Dict[str, str], buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, labels: Dict[str, str], amount: float = 1) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+    def render_prometheus(self) -> str:
+        """Prometheus テキスト形式（version 0.0.4）。"""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+            for name in sorted(self._histograms):
+                lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, h in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for upper, n in zip(h.buckets + (math.inf,), h.counts):
+                        cumulative += n
+                        le = ("le", _format_number(float(upper)))
+                        lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(h.total)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def _histogram_rows(self, name: str, scale: float = 1.0) -> List[Dict[str, Any]]:
+        rows = []
+        for labels, h in self._histograms.get(name, {}).items():
+            row: Dict[str, Any] = dict(labels)
+            row.update({
+                "count": h.count,
+                "avg": round(h.total / h.count * scale, 3) if h.count else None,
+                "p50": None if h.count == 0 else round(h.quantile(0.5) * scale, 3),
+                "p95": None if h.count == 0 else round(h.quantile(0.95) * scale, 3),
+                "p99": None if h.count == 0 else round(h.quantile(0.99) * scale, 3),
+                "max": round(h.max * scale, 3),
+                "total": round(h.total * scale, 3),
+            })
+            rows.append(row)
+        return sorted(rows, key=lambda r: r["total"], reverse=True)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        設定タブ表示用の要約。時間はミリ秒、サイズはバイト。
+        routes / stages は合計時間の大きい順。
+        """
+        with self._lock:
+            routes = self._histogram_rows(HTTP_DURATION, scale=1000.0)
+            request_sizes = {(r["method"], r["route"]): r for r in self._histogram_rows(HTTP_REQUEST_SIZE)}
+            response_sizes = {(r["method"], r["route"]): r for r in self._histogram_rows(HTTP_RESPONSE_SIZE)}
+            statuses: Dict[Tuple[str, str], Dict[str, float]] = {}
+            for labels, value in self._counters.get(HTTP_REQUESTS, {}).items():
+                label_map = dict(labels)
+                by_status = statuses.setdefault((label_map["method"], label_map["route"]), {})
+                by_status[label_map["status"]] = int(value)
+            stages = self._histogram_rows(STAGE_DURATION, scale=1000.0)
+        for row in routes:
+            key = (row["method"], row["route"])
+            row["statuses"] = statuses.get(key, {})
+            row["request_bytes_avg"] = request_sizes.get(key, {}).get("avg")
+            row["response_bytes_avg"] = response_sizes.get(key, {}).get("avg")
+            row["response_bytes_max"] = response_sizes.get(key, {}).get("max")
+        return {
+            "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "uptime_sec": round(time.time() - self.started_at, 1),
+            "routes": routes,
+            "stages": stages,
+        }
+
+
+# API 全体で共有する計測値
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def stage_span(stage: str, registry: Optional[MetricsRegistry] = None) -> Iterator[None]:
+    """with の中（またはデコレートした関数）の処理時間を処理段階 stage として記録する（例外時も記録）。"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        (registry or metrics).observe(STAGE_DURATION, time.perf_counter() - started, {"stage": stage})
+
+
+class RequestTimingMiddleware:
+    """ルートごとの処理時間・リクエスト/レスポンスサイズを記録する ASGI ミドルウェア。"""
+
+    def __init__(self, app, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request_bytes = 0
+        response_bytes = 0
+        status = 500
+
+        async def counting_receive():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal response_bytes, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            registry = self.registry or metrics
+            route = scope.get("route")
+            labels = {
+                "method": scope.get("method", ""),
+                "route": getattr(route, "path", None) or UNMATCHED_ROUTE,
+            }
+            registry.observe(HTTP_DURATION, time.perf_counter() - started, labels)
+            registry.observe(HTTP_REQUEST_SIZE, request_bytes, labels, SIZE_BUCKETS)
+            registry.observe(HTTP_RESPONSE_SIZE, response_bytes, labels, SIZE_BUCKETS)
+            registry.inc(HTTP_REQUESTS, {**labels, "status": str(status)})
@@ -13,9 +13,14 @@ import requests
 import json
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 import logging
 import math
+import time
+
+
+class RepricerJobCancelled(Exception):
+    """価格改定ジョブがキャンセルされた"""
 
 
 class APIClient:
@@ -142,6 +147,128 @@ class APIClient:
                 )
             raise Exception(f"価格改定実行に失敗しました: {msg}")
     
+    # 価格改定ジョブAPI（サーバー側で実行し、進捗を SSE / ポーリングで受け取る）
+    REPRICER_JOB_EVENT_READ_TIMEOUT = 30
+    REPRICER_JOB_POLL_INTERVAL = 1.0
+
+    def repricer_run_job(
+        self,
+        csv_file_path: str,
+        kind: str = "preview",
+        mode: str = "standard",
+        progress_callback: Optional[Callable[[int, str], None]] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+    ) -> Dict[str, Any]:
+        """
+        価格改定（kind="preview" / "apply"）をサーバー側ジョブとして実行し、結果を返す。
+        progress_callback(進捗率, メッセージ) で実際の進捗を通知する。
+        is_cancelled() が True になるとジョブをキャンセルし RepricerJobCancelled を送出する。
+        ジョブAPIが無いサーバー（旧版）では従来の一括呼び出しにフォールバックする。
+        """
+        import os
+        label = "価格改定プレビュー" if kind == "preview" else "価格改定実行"
+        filename = os.path.basename(csv_file_path)
+        try:
+            with open(csv_file_path, 'rb') as f:
+                response = self.session.post(
+                    f"{self.base_url}/repricer/jobs",
+                    files={'file': (filename, f, 'text/csv')},
+                    params={"kind": kind, "mode": mode},
+                    timeout=self._http_timeout(),
+                )
+        except Exception as e:
+            self.logger.error(f"{label}ジョブ開始失敗: {e}")
+            raise Exception(f"{label}に失敗しました: {e}")
+
+        if response.status_code in (404, 405):
+            self.logger.info("価格改定ジョブAPIが無いため一括呼び出しで実行します")
+            if kind == "preview":
+                return self.repricer_preview(csv_file_path, mode=mode)
+            return self.repricer_apply(csv_file_path, mode=mode)
+        if response.status_code != 202:
+            self.logger.error(f"{label}ジョブ開始APIエラー: {response.status_code} - {response.text}")
+            raise Exception(f"{label}に失敗しました: APIエラー: {response.status_code} - {response.text}")
+
+        job_id = response.json()["job_id"]
+        try:
+            snapshot = self._wait_repricer_job(job_id, progress_callback, is_cancelled)
+        except Exception as e:
+            self.repricer_cancel_job(job_id)
+            self.logger.error(f"{label}ジョブ監視失敗: {e}")
+            raise Exception(f"{label}に失敗しました: {e}")
+
+        if snapshot["status"] == "cancelled":
+            raise RepricerJobCancelled(f"{label}をキャンセルしました")
+        if snapshot["status"] == "error":
+            raise Exception(f"{label}に失敗しました: {snapshot.get('error')}")
+
+        result = self.session.get(
+            f"{self.base_url}/repricer/jobs/{job_id}/result", timeout=self._http_timeout(repricer=True)
+        )
+        if result.status_code != 200:
+            self.logger.error(f"{label}ジョブ結果取得エラー: {result.status_code} - {result.text}")
+            raise Exception(f"{label}に失敗しました: APIエラー: {result.status_code} - {result.text}")
+        return result.json()
+
+    def repricer_cancel_job(self, job_id: str) -> bool:
+        """価格改定ジョブのキャンセルを要求する"""
+        try:
+            response = self.session.delete(f"{self.base_url}/repricer/jobs/{job_id}", timeout=self._http_timeout())
+            return response.status_code == 200
+        except Exception as e:
+            self.logger.warning(f"価格改定ジョブのキャンセル要求に失敗: {e}")
+            return False
+
+    def _wait_repricer_job(
+        self,
+        job_id: str,
+        progress_callback: Optional[Callable[[int, str], None]],
+        is_cancelled: Optional[Callable[[], bool]],
+    ) -> Dict[str, Any]:
+        """SSE で終了まで待つ。SSE が切れた・使えない場合はポーリングで待つ。終了時のスナップショットを返す。"""
+        cancel_sent = False
+
+        def _handle(snapshot: Dict[str, Any]) -> None:
+            nonlocal cancel_sent
+            if progress_callback is not None:
+                progress_callback(int(snapshot.get("progress") or 0), str(snapshot.get("message") or ""))
+            if is_cancelled is not None and is_cancelled() and not cancel_sent:
+                cancel_sent = self.repricer_cancel_job(job_id)
+
+        try:
+            with self.session.get(
+                f"{self.base_url}/repricer/jobs/{job_id}/events",
+                stream=True,
+                headers={"Accept": "text/event-stream"},
+                timeout=(5, self.REPRICER_JOB_EVENT_READ_TIMEOUT),
+            ) as response:
+                if response.status_code == 200:
+                    event = "message"
+                    for line in response.iter_lines(decode_unicode=True):
+                        if is_cancelled is not None and is_cancelled() and not cancel_sent:
+                            cancel_sent = self.repricer_cancel_job(job_id)
+                        if not line or line.startswith(":"):
+                            continue
+                        if line.startswith("event:"):
+                            event = line[len("event:"):].strip()
+                        elif line.startswith("data:"):
+                            snapshot = json.loads(line[len("data:"):].strip())
+                            _handle(snapshot)
+                            if event in ("done", "error", "cancelled"):
+                                return snapshot
+        except Exception as e:
+            self.logger.warning(f"価格改定ジョブの進捗ストリームが切断されました。ポーリングに切り替えます: {e}")
+
+        while True:
+            response = self.session.get(f"{self.base_url}/repricer/jobs/{job_id}", timeout=self._http_timeout())
+            if response.status_code != 200:
+                raise Exception(f"APIエラー: {response.status_code} - {response.text}")
+            snapshot = response.json()
+            _handle(snapshot)
+            if snapshot.get("status") in ("done", "error", "cancelled"):
+                return snapshot
+            time.sleep(self.REPRICER_JOB_POLL_INTERVAL)
+
     def _simulate_repricer_preview(self, csv_data: pd.DataFrame) -> Dict[str, Any]:
         """価格改定プレビューのシミュレーション"""
         import random
@@ -436,6 +563,27 @@ class APIClient:
             self.logger.error(f"inventory_update_sku_template error: {e}")
             return False
     
+    # ===== サーバー計測 =====
+    def get_server_metrics(self) -> Optional[Dict[str, Any]]:
+        """APIサーバーの計測値（ルート別処理時間・処理段階別時間）。取得できなければ None"""
+        try:
+            resp = self.session.get(f"{self.base_url}/metrics/summary", timeout=10)
+            if resp.status_code == 200:
+                return resp.json()
+            raise Exception(f"GET metrics/summary failed: {resp.status_code} {resp.text}")
+        except Exception as e:
+            self.logger.error(f"get_server_metrics error: {e}")
+            return None
+
+    def reset_server_metrics(self) -> bool:
+        """APIサーバーの計測値をリセット"""
+        try:
+            resp = self.session.delete(f"{self.base_url}/metrics", timeout=10)
+            return resp.status_code == 200
+        except Exception as e:
+            self.logger.error(f"reset_server_metrics error: {e}")
+            return False
+
     def _determine_q_tag(self, item: Dict[str, Any]) -> str:
         """Qタグの判定（ダミー実装）"""
         # 実際の実装では、商品名やカテゴリからQタグを判定
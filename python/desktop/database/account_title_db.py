@@ -7,6 +7,13 @@ import sqlite3
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+try:
+    from database.connection_manager import get_connection
+    from database.migrations import apply_migrations
+except ImportError:
+    from desktop.database.connection_manager import get_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+
 
 class AccountTitleDatabase:
     """勘定科目マスタを管理するシンプルなDBクラス"""
@@ -23,15 +30,15 @@ class AccountTitleDatabase:
         self.conn: Optional[sqlite3.Connection] = None
         self._ensure_dir()
         self._connect()
-        self._init_schema()
+        apply_migrations(self.conn, self.db_path, "account_title_db", (self._init_schema,))
+        self._ensure_default_credit_accounts()
 
     def _ensure_dir(self) -> None:
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
     def _connect(self) -> None:
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_path)
 
     def _init_schema(self) -> None:
         cur = self.conn.cursor()
@@ -76,7 +83,9 @@ class AccountTitleDatabase:
             except Exception:
                 pass
 
-        # デフォルトの貸方勘定科目を追加（初回のみ）
+    def _ensure_default_credit_accounts(self) -> None:
+        """デフォルトの貸方勘定科目を追加（空のときのみ）"""
+        cur = self.conn.cursor()
         cur.execute("SELECT COUNT(*) FROM credit_accounts")
         if cur.fetchone()[0] == 0:
             default_accounts = [
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DBクラスの一括書き込み（upsert_many / insert_many）の共通処理
+
+1件ずつの upsert / insert は呼び出しごとに既存行を検索して commit するため、
+CSV取込などで数百件を保存すると、その件数分だけ検索と書き込みの確定が走っていた。
+一括版は次のようにまとめて書き込む。
+
+- 入力の検証・正規化は1回だけ行い、不正な行はその行の結果を "error" にして残りを続ける
+- 既存行はまとめて検索し、同じ列の組み合わせが続く行は executemany で1度に実行する（入力順は保つ）
+- 既存行は書き込む前に保存済みの値とまとめて比べ、どの列も同じなら "unchanged"、違えば "updated" にする
+- 全体を1トランザクションで書き込み、途中で失敗した場合はすべて取り消す
+- 戻り値は入力と同じ順の結果（{"index", "key", "id", "status", "error"}）
+"""
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+STATUS_INSERTED = "inserted"
+STATUS_UPDATED = "updated"
+STATUS_UNCHANGED = "unchanged"
+STATUS_ERROR = "error"
+
+# IN (...) に渡すパラメータ数の上限（SQLite の変数上限より十分小さく）
+_SQL_CHUNK_SIZE = 500
+
+
+def row_result(index: int, status: str, key: Any = None, row_id: Any = None, error: Optional[str] = None) -> Dict[str, Any]:
+    """一括書き込みの1行分の結果。"""
+    return {"index": index, "key": key, "id": row_id, "status": status, "error": error}
+
+
+def consecutive_runs(
+    rows: Iterable[Tuple[int, Dict[str, Any]]],
+    fields_of: Callable[[Dict[str, Any]], Tuple[str, ...]],
+) -> Iterator[Tuple[Tuple[str, ...], List[Tuple[int, Dict[str, Any]]]]]:
+    """(index, 行) を、書き込む列の組み合わせが同じものが続く区間ごとにまとめる（順序は変えない）。"""
+    fields = None
+    run: List[Tuple[int, Dict[str, Any]]] = []
+    for item in rows:
+        item_fields = fields_of(item[1])
+        if run and item_fields != fields:
+            yield fields, run
+            run = []
+        fields = item_fields
+        run.append(item)
+    if run:
+        yield fields, run
+
+
+def upsert_sql(table: str, key_column: str, fields: Sequence[str]) -> str:
+    """
+    key_column が重複する行は fields のうちキー以外の列だけを更新する INSERT 文
+    （キー以外の列が無い場合は既存行をそのまま残す）。
+    """
+    placeholders = ",".join(["?"] * len(fields))
+    update_fields = [k for k in fields if k != key_column]
+    if update_fields:
+        conflict = (
+            "DO UPDATE SET " + ",".join(f"{k}=excluded.{k}" for k in update_fields)
+            + ", updated_at=CURRENT_TIMESTAMP"
+        )
+    else:
+        conflict = "DO NOTHING"
+    return (
+        f"INSERT INTO {table} ({','.join(fields)}) VALUES ({placeholders}) "
+        f"ON CONFLICT({key_column}) {conflict}"
+    )
+
+
+def select_ids(
+    cur: sqlite3.Cursor, table: str, key_column: str, keys: Sequence[Any], id_column: str = "id"
+) -> Dict[Any, Any]:
+    """key_column が keys に含まれる既存行の {キー: ID}（IN 句は分割して実行）。"""
+    found: Dict[Any, Any] = {}
+    unique_keys = list(dict.fromkeys(keys))
+    for start in range(0, len(unique_keys), _SQL_CHUNK_SIZE):
+        chunk = unique_keys[start:start + _SQL_CHUNK_SIZE]
+        placeholders = ",".join(["?"] * len(chunk))
+        cur.execute(
+            f"SELECT {key_column}, {id_column} FROM {table} WHERE {key_column} IN ({placeholders})",
+            chunk,
+        )
+        for key, row_id in cur.fetchall():
+            found[key] = row_id
+    return found
+
+
+def _unique_key_runs(
+    run: List[Tuple[int, Dict[str, Any]]], key_column: str
+) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    """run を、同じキーの行を含まない区間に分ける（後の行は前の行を書き込んだ後の値と比べるため）。"""
+    keys: Set[Any] = set()
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    for item in run:
+        key = item[1][key_column]
+        if key in keys:
+            yield batch
+            keys, batch = set(), []
+        keys.add(key)
+        batch.append(item)
+    if batch:
+        yield batch
+
+
+def changed_keys(
+    cur: sqlite3.Cursor, table: str, key_column: str, fields: Sequence[str], rows: Sequence[Dict[str, Any]]
+) -> Set[Any]:
+    """
+    rows（キーの重複しない既存行）のうち、fields のいずれかの列が保存済みの値と違う行のキー。
+    比較は SQL の IS NOT で行うため列の型アフィニティが効く（TEXT 列の '1000' と 1000 は同じ値、NULL と '' は別の値）。
+    """
+    compare = [k for k in fields if k != key_column]
+    if not compare or not rows:
+        return set()
+    names = ",".join(["k"] + [f"c{i}" for i in range(len(compare))])
+    condition = " OR ".join(f"t.{col} IS NOT v.c{i}" for i, col in enumerate(compare))
+    row_placeholders = "(" + ",".join(["?"] * (len(compare) + 1)) + ")"
+    per_chunk = max(1, _SQL_CHUNK_SIZE // (len(compare) + 1))
+    changed: Set[Any] = set()
+    for start in range(0, len(rows), per_chunk):
+        chunk = rows[start:start + per_chunk]
+        cur.execute(
+            f"WITH v({names}) AS (VALUES {','.join([row_placeholders] * len(chunk))}) "
+            f"SELECT v.k FROM v JOIN {table} t ON t.{key_column} = v.k WHERE {condition}",
+            [value for row in chunk for value in [row[key_column]] + [row.get(k) for k in compare]],
+        )
+        changed.update(key for (key,) in cur.fetchall())
+    return changed
+
+
+def write_upserts(
+    cur: sqlite3.Cursor,
+    table: str,
+    key_column: str,
+    rows: List[Tuple[int, Dict[str, Any]]],
+    fields_of: Callable[[Dict[str, Any]], Tuple[str, ...]],
+) -> Dict[int, str]:
+    """
+    rows（(index, 行)）を入力順に upsert し、{index: 状態（inserted / updated / unchanged）} を返す。
+    commit / rollback は呼び出し側で行う。
+    """
+    seen = set(select_ids(cur, table, key_column, [row[key_column] for _, row in rows], id_column=key_column))
+    statuses: Dict[int, str] = {}
+    for fields, run in consecutive_runs(rows, fields_of):
+        for batch in _unique_key_runs(run, key_column):
+            changed = changed_keys(
+                cur, table, key_column, fields, [row for _, row in batch if row[key_column] in seen]
+            )
+            cur.executemany(upsert_sql(table, key_column, fields), [[row.get(k) for k in fields] for _, row in batch])
+            for index, row in batch:
+                key = row[key_column]
+                if key not in seen:
+                    statuses[index] = STATUS_INSERTED
+                    seen.add(key)
+                else:
+                    statuses[index] = STATUS_UPDATED if key in changed else STATUS_UNCHANGED
+    return statuses
+
+
+def inserted_ids(cur: sqlite3.Cursor, count: int) -> List[int]:
+    """
+    直前の executemany で挿入した count 件のID（挿入順）。
+    AUTOINCREMENT の表に1トランザクション内で続けて挿入した場合は連番になる。
+    """
+    if count <= 0:
+        return []
+    last_id = cur.execute("SELECT last_insert_rowid()").fetchone()[0]
+    return list(range(last_id - count + 1, last_id + 1))
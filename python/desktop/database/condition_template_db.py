@@ -13,6 +13,13 @@ import json
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
+try:
+    from database.connection_manager import get_connection
+    from database.migrations import apply_migrations
+except ImportError:
+    from desktop.database.connection_manager import get_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+
 
 class ConditionTemplateDatabase:
     """アマゾン出品コンディション説明テンプレートDB操作クラス"""
@@ -30,7 +37,9 @@ class ConditionTemplateDatabase:
         self.db_path = db_path
         self.conn: Optional[sqlite3.Connection] = None
         self._ensure_db_directory()
-        self._init_database()
+        apply_migrations(self._get_connection(), self.db_path, "condition_template_db", (self._init_database,))
+        # 初回起動時にテンプレートとデフォルト項目を作成
+        self._initialize_default_template()
 
     def _ensure_db_directory(self):
         """データベースディレクトリの存在確認"""
@@ -40,8 +49,7 @@ class ConditionTemplateDatabase:
     def _get_connection(self) -> sqlite3.Connection:
         """データベース接続を取得"""
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_path)
         return self.conn
 
     def _init_database(self):
@@ -85,9 +93,6 @@ class ConditionTemplateDatabase:
         """)
         
         conn.commit()
-        
-        # 初回起動時にテンプレートとデフォルト項目を作成
-        self._initialize_default_template()
 
     def _initialize_default_template(self):
         """デフォルトテンプレートとコンディション項目を初期化"""
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 接続の一元管理
+
+従来は各DBクラス（PurchaseDatabase, ProductDatabase, StoreDatabase ...）が同じ hirio.db に
+それぞれ接続を開いており、接続ごとにページキャッシュが冷えた状態から始まり、
+ロールバックジャーナルのため書き込み中は読み取りも待たされていた。
+ここではDBファイルごとに接続を共有し、以下の設定をまとめて適用する。
+
+- 書き込み用接続: DBファイルごとに1つ（全DBクラス・全スレッドで共有）
+- 読み取り用接続: DBファイル×スレッドごとに1つ（query_only）。WAL のため書き込み中でも待たない
+- PRAGMA: journal_mode=WAL / synchronous=NORMAL / cache_size / mmap_size / temp_store=MEMORY
+
+共有接続の close() は何もしない（他のDBクラスが使い続けるため）。
+ファイルの削除・置き換え（復元・デモモード切替など）の前は release_db_file() で実際に閉じ、
+残った -wal / -shm も消す。
+":memory:" は共有できないため、従来どおり呼び出しごとに別の接続を返す。
+
+トランザクションの所有:
+書き込み用接続は共有のため、トランザクションは最初の書き込み（暗黙の BEGIN）を実行したスレッドが
+commit() / rollback() するまで所有する。その間、他のスレッドがこの接続で実行する文・commit・rollback は
+終わるまで待つ（BUSY_TIMEOUT_SEC を超えると "database is locked"）。
+そのため rollback() で取り消されるのは、そのスレッドが始めたトランザクションだけになる。
+DBクラスのメソッドは、書き込んだら戻る前に必ず commit() か rollback() すること
+（同じスレッドの別のDBクラスとは、呼び出しの順にトランザクションを共有する）。
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# ページキャッシュ（負の値は KiB 指定）と mmap のサイズ
+CACHE_SIZE_KIB = 32 * 1024
+MMAP_SIZE_BYTES = 256 * 1024 * 1024
+
+# ロック待ちの上限（秒）
+BUSY_TIMEOUT_SEC = 10.0
+
+_MEMORY_PATHS = ("", ":memory:")
+
+# WAL モードで DB ファイルの隣に作られるファイル
+WAL_SIDECAR_SUFFIXES = ("-wal", "-shm")
+
+
+def _lock_timeout() -> sqlite3.OperationalError:
+    return sqlite3.OperationalError(
+        f"database is locked (他のスレッドのトランザクションが {BUSY_TIMEOUT_SEC:.0f} 秒以内に終わりませんでした)"
+    )
+
+
+class ManagedCursor(sqlite3.Cursor):
+    """実行前に接続のトランザクションの所有を取り、トランザクション外になったら手放すカーソル。"""
+
+    def execute(self, *args, **kwargs):
+        self.connection._acquire_transaction()
+        try:
+            return super().execute(*args, **kwargs)
+        finally:
+            self.connection._release_if_idle()
+
+    def executemany(self, *args, **kwargs):
+        self.connection._acquire_transaction()
+        try:
+            return super().executemany(*args, **kwargs)
+        finally:
+            self.connection._release_if_idle()
+
+    def executescript(self, *args, **kwargs):
+        self.connection._acquire_transaction()
+        try:
+            return super().executescript(*args, **kwargs)
+        finally:
+            self.connection._release_if_idle()
+
+
+class ManagedConnection(sqlite3.Connection):
+    """
+    接続管理が所有する接続（close() では閉じない）。
+    スレッド間で共有するため、トランザクションは始めたスレッドが終えるまで他のスレッドを待たせる。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._transaction_lock = threading.Lock()
+        self._transaction_owner: Optional[int] = None
+
+    def _acquire_transaction(self) -> None:
+        """このスレッドがトランザクションを持っていなければ、他のスレッドの分が終わるまで待って取る。"""
+        me = threading.get_ident()
+        if self._transaction_owner == me:
+            return
+        if not self._transaction_lock.acquire(timeout=BUSY_TIMEOUT_SEC):
+            raise _lock_timeout()
+        self._transaction_owner = me
+
+    def _release_if_idle(self) -> None:
+        """このスレッドが持っていて、トランザクション中でなければ手放す。"""
+        if self._transaction_owner == threading.get_ident() and not self.in_transaction:
+            self._transaction_owner = None
+            self._transaction_lock.release()
+
+    def owns_transaction(self) -> bool:
+        """このスレッドが未確定の書き込みを持っているか。"""
+        return self.in_transaction and self._transaction_owner == threading.get_ident()
+
+    def cursor(self, factory=ManagedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args, **kwargs):
+        return self.cursor().execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self.cursor().executemany(*args, **kwargs)
+
+    def executescript(self, *args, **kwargs):
+        return self.cursor().executescript(*args, **kwargs)
+
+    def commit(self) -> None:
+        self._acquire_transaction()
+        try:
+            super().commit()
+        finally:
+            self._release_if_idle()
+
+    def rollback(self) -> None:
+        self._acquire_transaction()
+        try:
+            super().rollback()
+        finally:
+            self._release_if_idle()
+
+    def __exit__(self, *exc_info):
+        self._acquire_transaction()
+        try:
+            return super().__exit__(*exc_info)
+        finally:
+            self._release_if_idle()
+
+    def close(self) -> None:
+        # 共有接続のため、個別のDBクラスからは閉じない（close_path / close_all で閉じる）
+        pass
+
+    def _close(self) -> None:
+        super().close()
+
+
+def _path_key(db_path: str) -> str:
+    return os.path.normcase(os.path.abspath(os.fspath(db_path)))
+
+
+def _is_shareable(db_path: str) -> bool:
+    path = os.fspath(db_path)
+    return path not in _MEMORY_PATHS and not path.startswith("file:")
+
+
+def _apply_pragmas(conn: sqlite3.Connection, query_only: bool = False) -> None:
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA cache_size=-{CACHE_SIZE_KIB}",
+        f"PRAGMA mmap_size={MMAP_SIZE_BYTES}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if query_only:
+        pragmas.append("PRAGMA query_only=ON")
+    for pragma in pragmas:
+        try:
+            conn.execute(pragma).fetchall()
+        except sqlite3.Error as e:
+            print(f"[WARNING] SQLite 設定を適用できません ({pragma}): {str(e)}")
+
+
+def _owns_transaction(conn: sqlite3.Connection) -> bool:
+    if isinstance(conn, ManagedConnection):
+        return conn.owns_transaction()
+    return conn.in_transaction
+
+
+class SQLiteConnectionManager:
+    """DBファイルごとの書き込み用接続と、スレッドごとの読み取り用接続を管理する。"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._writers: Dict[str, ManagedConnection] = {}
+        self._readers: Dict[str, List[Tuple[threading.Thread, ManagedConnection]]] = {}
+        # close_path のたびに進める（スレッドに残った古い読み取り接続を使わないため）
+        self._generations: Dict[str, int] = {}
+        self._local = threading.local()
+        # このプロセスで確認済みのスキーマのバージョン（(DBファイル, コンポーネント) → 番号）
+        self._schema_versions: Dict[Tuple[str, str], int] = {}
+
+    def _open(self, db_path: str, query_only: bool = False) -> ManagedConnection:
+        conn = sqlite3.connect(
+            os.fspath(db_path),
+            timeout=BUSY_TIMEOUT_SEC,
+            check_same_thread=False,
+            factory=ManagedConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        _apply_pragmas(conn, query_only=query_only)
+        return conn
+
+    def writer(self, db_path: str) -> sqlite3.Connection:
+        """書き込み用の共有接続（無ければ開く）。"""
+        if not _is_shareable(db_path):
+            conn = sqlite3.connect(os.fspath(db_path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            return conn
+        key = _path_key(db_path)
+        with self._lock:
+            conn = self._writers.get(key)
+            if conn is None:
+                conn = self._writers[key] = self._open(db_path)
+            return conn
+
+    def reader(self, db_path: str, writer: Optional[sqlite3.Connection] = None) -> sqlite3.Connection:
+        """
+        このスレッドの読み取り用接続（無ければ開く）。
+        このスレッドが writer に未確定の書き込みを持っている場合と、共有できないパスの場合は
+        writer をそのまま返す（自分の書き込みが読めなくならないように）。
+        """
+        if writer is not None and (_owns_transaction(writer) or not _is_shareable(db_path)):
+            return writer
+        if not _is_shareable(db_path):
+            return self.writer(db_path)
+        key = _path_key(db_path)
+        with self._lock:
+            generation = self._generations.get(key, 0)
+        cached: Dict[str, Tuple[int, ManagedConnection]] = self._local.__dict__.setdefault("readers", {})
+        entry = cached.get(key)
+        if entry is not None and entry[0] == generation:
+            return entry[1]
+        conn = self._open(db_path, query_only=True)
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                # 開いている間に close_path された: 次の呼び出しで開き直す
+                conn._close()
+                return self.writer(db_path)
+            readers = self._readers.setdefault(key, [])
+            self._prune_dead_readers(readers)
+            readers.append((threading.current_thread(), conn))
+        cached[key] = (generation, conn)
+        return conn
+
+    @staticmethod
+    def _prune_dead_readers(readers: List[Tuple[threading.Thread, ManagedConnection]]) -> None:
+        """終了したスレッドの読み取り用接続を閉じる（ワーカースレッドの分が溜まらないように）。"""
+        alive = []
+        for thread, conn in readers:
+            if thread.is_alive():
+                alive.append((thread, conn))
+            else:
+                conn._close()
+        readers[:] = alive
+
+    def known_schema_version(self, db_path: str, component: str) -> Optional[int]:
+        """このプロセスで確認済みのスキーマのバージョン（未確認・共有できないパスは None）。"""
+        if not _is_shareable(db_path):
+            return None
+        with self._lock:
+            return self._schema_versions.get((_path_key(db_path), component))
+
+    def remember_schema_version(self, db_path: str, component: str, version: int) -> None:
+        if not _is_shareable(db_path):
+            return
+        with self._lock:
+            self._schema_versions[(_path_key(db_path), component)] = version
+
+    def checkpoint(self, db_path: str) -> None:
+        """
+        WAL の内容を本体ファイルへ書き戻す（バックアップの前に呼ぶ）。
+        他のスレッドのトランザクションは確定させず、終わるまで待ってから実行する。
+        """
+        if not _is_shareable(db_path):
+            return
+        with self._lock:
+            conn = self._writers.get(_path_key(db_path))
+        if conn is None:
+            return
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        except sqlite3.Error as e:
+            print(f"[WARNING] WAL のチェックポイントに失敗 ({db_path}): {str(e)}")
+
+    def close_path(self, db_path: str) -> None:
+        """db_path の書き込み用・読み取り用接続をすべて閉じる（ファイルの削除・置き換え前に呼ぶ）。"""
+        if not _is_shareable(db_path):
+            return
+        key = _path_key(db_path)
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            # ファイルが置き換わるため、スキーマは次に開いたときに確認し直す
+            for schema_key in [k for k in self._schema_versions if k[0] == key]:
+                del self._schema_versions[schema_key]
+            conns = [conn for _, conn in self._readers.pop(key, [])]
+            writer = self._writers.pop(key, None)
+            if writer is not None:
+                conns.append(writer)
+            for conn in conns:
+                try:
+                    conn._close()
+                except sqlite3.Error as e:
+                    print(f"[WARNING] SQLite 接続を閉じられません ({db_path}): {str(e)}")
+
+    def close_all(self) -> None:
+        """管理しているすべての接続を閉じる（アプリ終了・復元の前など）。"""
+        with self._lock:
+            keys = set(self._writers) | set(self._readers)
+        for key in keys:
+            self.close_path(key)
+
+    def open_paths(self) -> List[str]:
+        with self._lock:
+            return sorted(set(self._writers) | set(self._readers))
+
+
+# アプリ全体で共有する接続管理
+connection_manager = SQLiteConnectionManager()
+
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """DBクラス用: db_path の書き込み用共有接続。"""
+    return connection_manager.writer(db_path)
+
+
+def get_read_connection(db_path: str, writer: Optional[sqlite3.Connection] = None) -> sqlite3.Connection:
+    """DBクラス用: このスレッドの読み取り用接続（一覧表示などの参照クエリに使う）。"""
+    return connection_manager.reader(db_path, writer)
+
+
+def release_db_file(db_path: str) -> None:
+    """
+    DBファイルを削除・置き換える前に呼ぶ: 接続を閉じ、残った -wal / -shm を消す
+    （古い WAL が同じ名前の新しいファイルに適用されないように）。
+    """
+    connection_manager.close_path(db_path)
+    if not _is_shareable(db_path):
+        return
+    for suffix in WAL_SIDECAR_SUFFIXES:
+        sidecar = os.fspath(db_path) + suffix
+        if not os.path.exists(sidecar):
+            continue
+        try:
+            os.remove(sidecar)
+        except OSError as e:
+            print(f"[WARNING] WAL ファイルを削除できません ({sidecar}): {str(e)}")
@@ -12,6 +12,49 @@ import sqlite3
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+try:
+    from database.bulk_write import (
+        STATUS_ERROR,
+        STATUS_INSERTED,
+        STATUS_UPDATED,
+        inserted_ids,
+        row_result,
+        select_ids,
+    )
+    from database.connection_manager import get_connection
+    from database.migrations import apply_migrations
+except ImportError:
+    from desktop.database.bulk_write import (  # type: ignore
+        STATUS_ERROR,
+        STATUS_INSERTED,
+        STATUS_UPDATED,
+        inserted_ids,
+        row_result,
+        select_ids,
+    )
+    from desktop.database.connection_manager import get_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+
+
+# 保存する列（id と日時以外）
+_FIELDS = (
+    "expense_date", "expense_category", "account_title",
+    "store_name", "store_code", "amount", "quantity",
+    "unit_price", "payment_method", "receipt_id",
+    "receipt_file_path", "memo"
+)
+
+
+def _validation_error(expense: Dict[str, Any]) -> Optional[str]:
+    """必須項目が欠けている場合のエラーメッセージ（問題なければ None）。"""
+    if not expense.get("expense_date"):
+        return "expense_date is required"
+    if not expense.get("expense_category"):
+        return "expense_category is required"
+    if expense.get("amount") is None:
+        return "amount is required"
+    return None
+
 
 class ExpenseDatabase:
     def __init__(self, db_path: Optional[str] = None):
@@ -26,15 +69,14 @@ class ExpenseDatabase:
         self.conn: Optional[sqlite3.Connection] = None
         self._ensure_dir()
         self._connect()
-        self._init_schema()
+        apply_migrations(self.conn, self.db_path, "expense_db", (self._init_schema,))
 
     def _ensure_dir(self) -> None:
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
     def _connect(self) -> None:
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_path)
 
     def _init_schema(self) -> None:
         cur = self.conn.cursor()
@@ -109,12 +151,9 @@ class ExpenseDatabase:
         Returns:
             挿入/更新されたレコードのID
         """
-        if not expense.get("expense_date"):
-            raise ValueError("expense_date is required")
-        if not expense.get("expense_category"):
-            raise ValueError("expense_category is required")
-        if expense.get("amount") is None:
-            raise ValueError("amount is required")
+        error = _validation_error(expense)
+        if error:
+            raise ValueError(error)
 
         # 既存判定（IDがあれば更新）
         expense_id = expense.get("id")
@@ -122,12 +161,7 @@ class ExpenseDatabase:
             existing = self.get_by_id(expense_id)
             if existing:
                 # 更新
-                fields = [
-                    "expense_date", "expense_category", "account_title",
-                    "store_name", "store_code", "amount", "quantity",
-                    "unit_price", "payment_method", "receipt_id",
-                    "receipt_file_path", "memo"
-                ]
+                fields = _FIELDS
                 set_clause = ",".join([f"{k}=?" for k in fields]) + ", updated_at=CURRENT_TIMESTAMP"
                 update_values = [expense.get(k) for k in fields] + [expense_id]
                 cur = self.conn.cursor()
@@ -136,12 +170,7 @@ class ExpenseDatabase:
                 return expense_id
 
         # 挿入
-        fields = [
-            "expense_date", "expense_category", "account_title",
-            "store_name", "store_code", "amount", "quantity",
-            "unit_price", "payment_method", "receipt_id",
-            "receipt_file_path", "memo"
-        ]
+        fields = _FIELDS
         values = [expense.get(k) for k in fields]
         
         cur = self.conn.cursor()
@@ -154,6 +183,56 @@ class ExpenseDatabase:
         self.conn.commit()
         return expense_id
 
+    def upsert_many(self, expenses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        複数の経費情報をまとめて挿入/更新する（1トランザクション）
+
+        upsert と同じく、既存の id を持つ行は更新し、それ以外は挿入する。
+        必須項目が欠けている行は保存せず、その行の結果を "error" にする。
+
+        Returns:
+            入力と同じ順の結果のリスト（{"index", "key": id, "id", "status", "error"}）
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(expenses)
+        valid = []
+        for index, expense in enumerate(expenses):
+            error = _validation_error(expense)
+            if error:
+                results[index] = row_result(index, STATUS_ERROR, key=expense.get("id"), error=error)
+                continue
+            valid.append((index, expense))
+        if not valid:
+            return results
+
+        cur = self.conn.cursor()
+        existing = select_ids(cur, "expenses", "id", [e["id"] for _, e in valid if e.get("id")])
+        updates = [(index, e) for index, e in valid if e.get("id") and e["id"] in existing]
+        inserts = [(index, e) for index, e in valid if not (e.get("id") and e["id"] in existing)]
+        try:
+            if updates:
+                set_clause = ",".join([f"{k}=?" for k in _FIELDS]) + ", updated_at=CURRENT_TIMESTAMP"
+                cur.executemany(
+                    f"UPDATE expenses SET {set_clause} WHERE id=?",
+                    [[e.get(k) for k in _FIELDS] + [e["id"]] for _, e in updates],
+                )
+            if inserts:
+                placeholders = ",".join(["?"] * len(_FIELDS))
+                cur.executemany(
+                    f"INSERT INTO expenses ({','.join(_FIELDS)}) VALUES ({placeholders})",
+                    [[e.get(k) for k in _FIELDS] for _, e in inserts],
+                )
+            ids = inserted_ids(cur, len(inserts))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        for index, expense in updates:
+            results[index] = row_result(index, STATUS_UPDATED, key=expense["id"], row_id=expense["id"])
+        for (index, expense), expense_id in zip(inserts, ids):
+            results[index] = row_result(index, STATUS_INSERTED, key=expense.get("id"), row_id=expense_id)
+        return results
+
     def get_by_id(self, expense_id: int) -> Optional[Dict[str, Any]]:
         """IDで経費情報を取得"""
         cur = self.conn.cursor()
@@ -12,6 +12,13 @@ import sqlite3
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+try:
+    from database.connection_manager import get_connection
+    from database.migrations import apply_migrations
+except ImportError:
+    from desktop.database.connection_manager import get_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+
 
 class ImageDatabase:
     def __init__(self, db_path: Optional[str] = None):
@@ -26,15 +33,14 @@ class ImageDatabase:
         self.conn: Optional[sqlite3.Connection] = None
         self._ensure_dir()
         self._connect()
-        self._init_schema()
+        apply_migrations(self.conn, self.db_path, "image_db", (self._init_schema,))
 
     def _ensure_dir(self) -> None:
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
     def _connect(self) -> None:
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_path)
 
     def _init_schema(self) -> None:
         cur = self.conn.cursor()
@@ -5,6 +5,7 @@
 
 SQLiteデータベースを使用した仕入データ管理
 - inventory_snapshots テーブル: 仕入データのスナップショット（最大10件）
+  レコードは snapshot_store の圧縮形式（header / payload）で保存する
 """
 
 import sqlite3
@@ -13,6 +14,29 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+try:
+    from database.connection_manager import get_connection
+    from database.migrations import apply_migrations
+    from database.snapshot_store import (
+        CompressedSnapshotPages,
+        ListSnapshotPages,
+        SnapshotPages,
+        dump_header,
+        encode_snapshot,
+        load_header,
+    )
+except ImportError:
+    from desktop.database.connection_manager import get_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+    from desktop.database.snapshot_store import (  # type: ignore
+        CompressedSnapshotPages,
+        ListSnapshotPages,
+        SnapshotPages,
+        dump_header,
+        encode_snapshot,
+        load_header,
+    )
+
 
 def normalize_jan_in_record(record: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -70,7 +94,12 @@ class InventoryDatabase:
         self.db_path = db_path
         self.conn = None
         self._ensure_db_directory()
-        self._init_database()
+        apply_migrations(
+            self._get_connection(),
+            self.db_path,
+            "inventory_db",
+            (self._init_database, self._migrate_to_compressed_snapshots),
+        )
     
     def _ensure_db_directory(self):
         """データベースディレクトリの存在確認"""
@@ -80,8 +109,7 @@ class InventoryDatabase:
     def _get_connection(self):
         """データベース接続を取得"""
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row  # 辞書形式で結果を取得
+            self.conn = get_connection(self.db_path)
         return self.conn
     
     def _init_database(self):
@@ -103,6 +131,35 @@ class InventoryDatabase:
         
         conn.commit()
     
+    def _migrate_to_compressed_snapshots(self):
+        """スナップショットを圧縮形式（header / payload）に変換する"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("PRAGMA table_info(inventory_snapshots)")
+        columns = {row[1] for row in cursor.fetchall()}
+        if 'header' not in columns:
+            cursor.execute("ALTER TABLE inventory_snapshots ADD COLUMN header TEXT")
+        if 'payload' not in columns:
+            cursor.execute("ALTER TABLE inventory_snapshots ADD COLUMN payload BLOB")
+        
+        cursor.execute("SELECT id FROM inventory_snapshots WHERE header IS NULL ORDER BY id")
+        for snapshot_id in [row[0] for row in cursor.fetchall()]:
+            cursor.execute("SELECT data FROM inventory_snapshots WHERE id = ?", (snapshot_id,))
+            data = cursor.fetchone()[0]
+            try:
+                records = json.loads(data) if data else []
+            except json.JSONDecodeError as e:
+                print(f"[WARNING] スナップショット {snapshot_id} のJSONを読めないため変換しません: {str(e)}")
+                continue
+            header, payload = encode_snapshot(normalize_jan_in_records(records))
+            cursor.execute(
+                "UPDATE inventory_snapshots SET header = ?, payload = ?, data = '' WHERE id = ?",
+                (dump_header(header), payload, snapshot_id),
+            )
+        
+        conn.commit()
+    
     def save_inventory_data(self, snapshot_name: str, data: List[Dict[str, Any]]) -> int:
         """
         仕入データを保存
@@ -123,15 +180,15 @@ class InventoryDatabase:
         # JANコードの.0を削除してから保存
         normalized_data = normalize_jan_in_records(data)
         
-        # データをJSON文字列に変換
-        data_json = json.dumps(normalized_data, ensure_ascii=False, default=str)
+        # データを圧縮形式に変換
+        header, payload = encode_snapshot(normalized_data)
         item_count = len(normalized_data)
         
         # データを挿入
         cursor.execute("""
-            INSERT INTO inventory_snapshots (snapshot_name, item_count, data)
-            VALUES (?, ?, ?)
-        """, (snapshot_name, item_count, data_json))
+            INSERT INTO inventory_snapshots (snapshot_name, item_count, data, header, payload)
+            VALUES (?, ?, '', ?, ?)
+        """, (snapshot_name, item_count, dump_header(header), payload))
         
         snapshot_id = cursor.lastrowid
         
@@ -197,7 +254,7 @@ class InventoryDatabase:
         
         cursor.execute("""
             SELECT 
-                id, snapshot_name, item_count, data, 
+                id, snapshot_name, item_count, data, header, payload,
                 created_at, updated_at,
                 datetime(created_at, 'localtime') AS created_at_local,
                 datetime(updated_at, 'localtime') AS updated_at_local
@@ -210,21 +267,49 @@ class InventoryDatabase:
         if row is None:
             return None
         
-        # JSONデータをパース
-        data = json.loads(row['data']) if row['data'] else []
-        
-        # JANコードの.0を削除してから返す
-        normalized_data = normalize_jan_in_records(data)
-        
         return {
             'id': row['id'],
             'snapshot_name': row['snapshot_name'],
             'item_count': row['item_count'],
-            'data': normalized_data,
+            'data': self._snapshot_pages(row).to_list(),
             'created_at': row['created_at_local'] or row['created_at'],
             'updated_at': row['updated_at_local'] or row['updated_at']
         }
     
+    def get_snapshot_pages(self, snapshot_id: int) -> Optional[SnapshotPages]:
+        """
+        指定IDのスナップショットのレコードをページ単位で取得
+        
+        Args:
+            snapshot_id: スナップショットID
+        
+        Returns:
+            ページ単位で展開できるレコード（存在しない場合はNone）。
+            header に件数・列名・ハッシュを持ち、page(0) で先頭ページだけを展開できる
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT data, header, payload FROM inventory_snapshots WHERE id = ?
+        """, (snapshot_id,))
+        
+        row = cursor.fetchone()
+        
+        if row is None:
+            return None
+        
+        return self._snapshot_pages(row)
+    
+    @staticmethod
+    def _snapshot_pages(row) -> SnapshotPages:
+        """行の header / payload（旧形式は data のJSON）からレコードを展開する"""
+        header = load_header(row['header'])
+        if header is not None:
+            return CompressedSnapshotPages(header, row['payload'])
+        data = json.loads(row['data']) if row['data'] else []
+        return ListSnapshotPages(normalize_jan_in_records(data))
+    
     def delete_snapshot(self, snapshot_id: int) -> bool:
         """
         スナップショットを削除
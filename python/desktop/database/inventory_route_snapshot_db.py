@@ -2,6 +2,9 @@
 # -*- coding: utf-8 -*-
 """
 仕入データ＋ルートテンプレート統合スナップショットDB
+
+仕入データは snapshot_store の圧縮形式（purchase_header / purchase_payload）で保存する。
+ルートテンプレート（route_data）は小さいため JSON のまま。
 """
 from __future__ import annotations
 
@@ -10,6 +13,29 @@ import json
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
+try:
+    from database.connection_manager import get_connection
+    from database.migrations import apply_migrations
+    from database.snapshot_store import (
+        CompressedSnapshotPages,
+        ListSnapshotPages,
+        SnapshotPages,
+        dump_header,
+        encode_snapshot,
+        load_header,
+    )
+except ImportError:
+    from desktop.database.connection_manager import get_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+    from desktop.database.snapshot_store import (  # type: ignore
+        CompressedSnapshotPages,
+        ListSnapshotPages,
+        SnapshotPages,
+        dump_header,
+        encode_snapshot,
+        load_header,
+    )
+
 
 def normalize_jan_in_record(record: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -65,15 +91,19 @@ class InventoryRouteSnapshotDatabase:
         self.conn: Optional[sqlite3.Connection] = None
         self._ensure_dir()
         self._connect()
-        self._init_schema()
+        apply_migrations(
+            self.conn,
+            self.db_path,
+            "inventory_route_snapshot_db",
+            (self._init_schema, self._migrate_to_compressed_purchase_data),
+        )
 
     def _ensure_dir(self) -> None:
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
     def _connect(self) -> None:
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_path)
 
     def _init_schema(self) -> None:
         cur = self.conn.cursor()
@@ -91,6 +121,39 @@ class InventoryRouteSnapshotDatabase:
         )
         self.conn.commit()
 
+    def _migrate_to_compressed_purchase_data(self) -> None:
+        """仕入データを圧縮形式に変換し、一覧用の件数を列に持たせる。"""
+        cur = self.conn.cursor()
+        cur.execute("PRAGMA table_info(inventory_route_snapshots)")
+        columns = {row[1] for row in cur.fetchall()}
+        for column, definition in (
+            ("item_count", "INTEGER"),
+            ("purchase_header", "TEXT"),
+            ("purchase_payload", "BLOB"),
+        ):
+            if column not in columns:
+                cur.execute(f"ALTER TABLE inventory_route_snapshots ADD COLUMN {column} {definition}")
+
+        cur.execute("SELECT id FROM inventory_route_snapshots WHERE purchase_header IS NULL ORDER BY id")
+        for snapshot_id in [row[0] for row in cur.fetchall()]:
+            cur.execute("SELECT purchase_data FROM inventory_route_snapshots WHERE id = ?", (snapshot_id,))
+            data = cur.fetchone()[0]
+            try:
+                records = json.loads(data) if data else []
+            except json.JSONDecodeError as e:
+                print(f"[WARNING] 統合スナップショット {snapshot_id} の仕入データを読めないため変換しません: {str(e)}")
+                continue
+            header, payload = encode_snapshot(normalize_jan_in_records(records))
+            cur.execute(
+                """
+                UPDATE inventory_route_snapshots
+                SET item_count = ?, purchase_header = ?, purchase_payload = ?, purchase_data = ''
+                WHERE id = ?
+                """,
+                (header["rows"], dump_header(header), payload, snapshot_id),
+            )
+        self.conn.commit()
+
     def save_snapshot(
         self,
         snapshot_name: str,
@@ -123,15 +186,17 @@ class InventoryRouteSnapshotDatabase:
                         existing_id = row["id"]
                         # JANコードの.0を削除してから保存
                         normalized_purchase_data = normalize_jan_in_records(purchase_data)
-                        purchase_json = json.dumps(normalized_purchase_data, ensure_ascii=False, default=str)
+                        header, payload = encode_snapshot(normalized_purchase_data)
                         route_json = json.dumps(route_payload, ensure_ascii=False, default=str)
                         cur.execute(
                             """
                             UPDATE inventory_route_snapshots
-                            SET snapshot_name = ?, purchase_data = ?, route_data = ?, updated_at = CURRENT_TIMESTAMP
+                            SET snapshot_name = ?, purchase_data = '', item_count = ?,
+                                purchase_header = ?, purchase_payload = ?,
+                                route_data = ?, updated_at = CURRENT_TIMESTAMP
                             WHERE id = ?
                             """,
-                            (snapshot_name, purchase_json, route_json, existing_id),
+                            (snapshot_name, header["rows"], dump_header(header), payload, route_json, existing_id),
                         )
                         self.conn.commit()
                         return existing_id
@@ -142,14 +207,15 @@ class InventoryRouteSnapshotDatabase:
         # 新規保存の場合
         # JANコードの.0を削除してから保存
         normalized_purchase_data = normalize_jan_in_records(purchase_data)
-        purchase_json = json.dumps(normalized_purchase_data, ensure_ascii=False, default=str)
+        header, payload = encode_snapshot(normalized_purchase_data)
         route_json = json.dumps(route_payload, ensure_ascii=False, default=str)
         cur.execute(
             """
-            INSERT INTO inventory_route_snapshots (snapshot_name, purchase_data, route_data)
-            VALUES (?, ?, ?)
+            INSERT INTO inventory_route_snapshots
+                (snapshot_name, purchase_data, item_count, purchase_header, purchase_payload, route_data)
+            VALUES (?, '', ?, ?, ?, ?)
             """,
-            (snapshot_name, purchase_json, route_json),
+            (snapshot_name, header["rows"], dump_header(header), payload, route_json),
         )
         snapshot_id = cur.lastrowid
         
@@ -188,7 +254,7 @@ class InventoryRouteSnapshotDatabase:
                 SELECT
                     id,
                     snapshot_name,
-                    json_array_length(purchase_data) AS item_count,
+                    COALESCE(item_count, json_array_length(NULLIF(purchase_data, ''))) AS item_count,
                     datetime(created_at, 'localtime') AS created_at,
                     datetime(updated_at, 'localtime') AS updated_at
                 FROM inventory_route_snapshots
@@ -206,6 +272,8 @@ class InventoryRouteSnapshotDatabase:
                 id,
                 snapshot_name,
                 purchase_data,
+                purchase_header,
+                purchase_payload,
                 route_data,
                 datetime(created_at, 'localtime') AS created_at,
                 datetime(updated_at, 'localtime') AS updated_at
@@ -217,19 +285,44 @@ class InventoryRouteSnapshotDatabase:
         row = cur.fetchone()
         if not row:
             return None
-        purchase = json.loads(row["purchase_data"]) if row["purchase_data"] else []
         route = json.loads(row["route_data"]) if row["route_data"] else {}
-        # JANコードの.0を削除してから返す
-        normalized_purchase = normalize_jan_in_records(purchase)
         return {
             "id": row["id"],
             "snapshot_name": row["snapshot_name"],
-            "purchase_data": normalized_purchase,
+            "purchase_data": self._purchase_pages(row).to_list(),
             "route_data": route,
             "created_at": row["created_at"],
             "updated_at": row["updated_at"],
         }
 
+    def get_purchase_pages(self, snapshot_id: int) -> Optional[SnapshotPages]:
+        """
+        仕入データをページ単位で取得する（存在しない場合は None）。
+        header に件数・列名・ハッシュを持ち、page(0) で先頭ページだけを展開できる。
+        """
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            SELECT purchase_data, purchase_header, purchase_payload
+            FROM inventory_route_snapshots
+            WHERE id = ?
+            """,
+            (snapshot_id,),
+        )
+        row = cur.fetchone()
+        if not row:
+            return None
+        return self._purchase_pages(row)
+
+    @staticmethod
+    def _purchase_pages(row: sqlite3.Row) -> SnapshotPages:
+        header = load_header(row["purchase_header"])
+        if header is not None:
+            return CompressedSnapshotPages(header, row["purchase_payload"])
+        # 旧形式（JSON）: JANコードの.0を削除してから返す
+        purchase = json.loads(row["purchase_data"]) if row["purchase_data"] else []
+        return ListSnapshotPages(normalize_jan_in_records(purchase))
+
     def delete_snapshot(self, snapshot_id: int) -> bool:
         cur = self.conn.cursor()
         cur.execute(
@@ -13,6 +13,13 @@ import sqlite3
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+try:
+    from database.connection_manager import get_connection, get_read_connection
+    from database.migrations import apply_migrations
+except ImportError:
+    from desktop.database.connection_manager import get_connection, get_read_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+
 
 class LedgerDatabase:
     def __init__(self, db_path: Optional[str] = None):
@@ -27,15 +34,14 @@ class LedgerDatabase:
         self.conn: Optional[sqlite3.Connection] = None
         self._ensure_dir()
         self._connect()
-        self._init_schema()
+        apply_migrations(self.conn, self.db_path, "ledger_db", (self._init_schema,))
 
     def _ensure_dir(self) -> None:
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
     def _connect(self) -> None:
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_path)
 
     def _init_schema(self) -> None:
         cur = self.conn.cursor()
@@ -189,7 +195,7 @@ class LedgerDatabase:
         return cur.rowcount
 
     def query_ledger(self, where: str = "", params: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
-        cur = self.conn.cursor()
+        cur = get_read_connection(self.db_path, self.conn).cursor()
         sql = (
             "SELECT *, datetime(created_at,'localtime') AS created_at_local "
             "FROM ledger_entries " + (f"WHERE {where} " if where else "") + "ORDER BY entry_date DESC, id DESC"
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+スキーマのマイグレーション（番号付き・1回だけ適用）
+
+従来は DBクラスを作るたびに CREATE TABLE / CREATE INDEX IF NOT EXISTS と
+PRAGMA table_info によるカラム追加チェックを実行しており、画面の reinit_databases などで
+同じ処理が何度も繰り返されていた。
+
+- DBクラス（コンポーネント）ごとに、マイグレーション関数を番号順（1始まり）に並べて渡す
+- 適用済みの番号は DBファイル内の schema_migrations テーブルに記録し、未適用の分だけ実行する
+- このプロセスで一度確認した DB は、connection_manager が覚えているため表も読まない
+  （ファイルを置き換える release_db_file / close_path で忘れる）
+
+既存の各DBクラスの初期化処理（CREATE ... IF NOT EXISTS と不足カラムの追加）は
+マイグレーション1として、既存DB・新規DBのどちらにもそのまま適用できる。
+スキーマを変える場合は既存の関数を書き換えず、新しい番号の関数を末尾に追加すること。
+"""
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime
+from typing import Callable, Optional, Sequence
+
+try:
+    from database.connection_manager import connection_manager
+except ImportError:
+    from desktop.database.connection_manager import connection_manager  # type: ignore
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+# マイグレーション1件（DBクラスのメソッド。接続は DBクラスが持っている）
+Migration = Callable[[], None]
+
+_CREATE_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+        component TEXT PRIMARY KEY,
+        version INTEGER NOT NULL,
+        applied_at TEXT NOT NULL
+    )
+"""
+
+
+def get_schema_version(conn: sqlite3.Connection, component: str) -> int:
+    """component の適用済みバージョン（記録が無ければ 0）。"""
+    try:
+        row = conn.execute(
+            f"SELECT version FROM {MIGRATIONS_TABLE} WHERE component = ?", (component,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # schema_migrations がまだ無い（マイグレーション導入前のDB・新規DB）
+        return 0
+    return int(row[0]) if row else 0
+
+
+def _record_version(conn: sqlite3.Connection, component: str, version: int) -> None:
+    conn.execute(_CREATE_TABLE)
+    conn.execute(
+        f"INSERT INTO {MIGRATIONS_TABLE} (component, version, applied_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(component) DO UPDATE SET version = excluded.version, applied_at = excluded.applied_at",
+        (component, version, datetime.now().isoformat(timespec="seconds")),
+    )
+    conn.commit()
+
+
+def apply_migrations(
+    conn: sqlite3.Connection,
+    db_path: str,
+    component: str,
+    migrations: Sequence[Migration],
+) -> Optional[int]:
+    """
+    component のマイグレーションのうち未適用のものを番号順に実行して記録する。
+    実行した場合は適用後のバージョン、最新だった場合は None を返す。
+    """
+    target = len(migrations)
+    if connection_manager.known_schema_version(db_path, component) == target:
+        return None
+
+    current = get_schema_version(conn, component)
+    if current > target:
+        print(
+            f"[WARNING] {component} のスキーマ (v{current}) がアプリの想定 (v{target}) より新しいため、"
+            "マイグレーションを実行しません"
+        )
+    applied = None
+    for number in range(current + 1, target + 1):
+        migrations[number - 1]()
+        _record_version(conn, component, number)
+        applied = number
+    if applied is not None:
+        print(f"[DEBUG] {component}: スキーマを v{current} → v{applied} に更新")
+    connection_manager.remember_schema_version(db_path, component, target)
+    return applied
@@ -14,7 +14,64 @@ from __future__ import annotations
 
 import sqlite3
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from database.bulk_write import (
+        STATUS_ERROR,
+        row_result,
+        write_upserts,
+    )
+    from database.connection_manager import get_connection, get_read_connection
+    from database.migrations import apply_migrations
+except ImportError:
+    from desktop.database.bulk_write import (  # type: ignore
+        STATUS_ERROR,
+        row_result,
+        write_upserts,
+    )
+    from desktop.database.connection_manager import get_connection, get_read_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+
+
+# products テーブルに保存するフィールド一覧
+# レシート画像URL（receipt_image_url）もここで永続化する
+_UPSERT_FIELDS = (
+    "sku",
+    "jan",
+    "asin",
+    "product_name",
+    "purchase_date",
+    "purchase_price",
+    "quantity",
+    "store_code",
+    "store_name",
+    "receipt_id",
+    "receipt_image_url",
+    "warranty_period_days",
+    "warranty_until",
+    "warranty_product_name",
+    "warranty_image_path",
+    "listed_date",
+)
+
+
+def _normalize_jan(jan_value):
+    """JANコードから.0を削除して文字列に変換（数値として読み込まれた場合の正規化）"""
+    if not jan_value:
+        return None
+    jan_str = str(jan_value).strip()
+    # .0で終わる場合は削除（例: 4970381506544.0 → 4970381506544）
+    if jan_str.endswith(".0"):
+        jan_str = jan_str[:-2]
+    # 数字以外の文字を除去（念のため）
+    jan_str = ''.join(c for c in jan_str if c.isdigit())
+    return jan_str if jan_str else None
+
+
+def _written_fields(product: Dict[str, Any]) -> Tuple[str, ...]:
+    """product を挿入するときの列（sku と、product に含まれる列だけ）。"""
+    return tuple(k for k in _UPSERT_FIELDS if k == "sku" or k in product)
 
 
 class ProductDatabase:
@@ -30,15 +87,14 @@ class ProductDatabase:
         self.conn: Optional[sqlite3.Connection] = None
         self._ensure_dir()
         self._connect()
-        self._init_schema()
+        apply_migrations(self.conn, self.db_path, "product_db", (self._init_schema,))
 
     def _ensure_dir(self) -> None:
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
     def _connect(self) -> None:
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_path)
 
     def _init_schema(self) -> None:
         cur = self.conn.cursor()
@@ -121,43 +177,11 @@ class ProductDatabase:
         existing = self.get_by_sku(product["sku"])
         exists = existing is not None
 
-        # JANコードの.0を削除（数値として読み込まれた場合の正規化）
-        def normalize_jan(jan_value):
-            """JANコードから.0を削除して文字列に変換"""
-            if not jan_value:
-                return None
-            jan_str = str(jan_value).strip()
-            # .0で終わる場合は削除（例: 4970381506544.0 → 4970381506544）
-            if jan_str.endswith(".0"):
-                jan_str = jan_str[:-2]
-            # 数字以外の文字を除去（念のため）
-            jan_str = ''.join(c for c in jan_str if c.isdigit())
-            return jan_str if jan_str else None
-        
         # JANコードを正規化
         if "jan" in product and product["jan"]:
-            product["jan"] = normalize_jan(product["jan"])
-
-        # products テーブルに保存するフィールド一覧
-        # レシート画像URL（receipt_image_url）もここで永続化する
-        fields = [
-            "sku",
-            "jan",
-            "asin",
-            "product_name",
-            "purchase_date",
-            "purchase_price",
-            "quantity",
-            "store_code",
-            "store_name",
-            "receipt_id",
-            "receipt_image_url",
-            "warranty_period_days",
-            "warranty_until",
-            "warranty_product_name",
-            "warranty_image_path",
-            "listed_date",
-        ]
+            product["jan"] = _normalize_jan(product["jan"])
+
+        fields = _UPSERT_FIELDS
         cur = self.conn.cursor()
         if exists:
             # 更新時は指定されたキーのみ更新し、未指定のカラムはそのまま残す
@@ -178,6 +202,40 @@ class ProductDatabase:
             )
         self.conn.commit()
 
+    def upsert_many(self, products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        複数の商品をまとめて挿入/更新する（1トランザクション）
+
+        upsert と同じく、各行は含まれるキーだけを保存し、JANコードを正規化する。
+        sku の無い行は保存せず、その行の結果を "error" にする。
+
+        Returns:
+            入力と同じ順の結果のリスト（{"index", "key": sku, "id": None, "status", "error"}）。
+            既存行は保存済みの値と違う列があれば "updated"、無ければ "unchanged"
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(products)
+        valid = []
+        for index, product in enumerate(products):
+            if not product.get("sku"):
+                results[index] = row_result(index, STATUS_ERROR, error="sku is required")
+                continue
+            if "jan" in product and product["jan"]:
+                product["jan"] = _normalize_jan(product["jan"])
+            valid.append((index, product))
+        if not valid:
+            return results
+
+        cur = self.conn.cursor()
+        try:
+            statuses = write_upserts(cur, "products", "sku", valid, _written_fields)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        for index, product in valid:
+            results[index] = row_result(index, statuses[index], key=product["sku"])
+        return results
+
     def get_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
         cur = self.conn.cursor()
         cur.execute("SELECT * FROM products WHERE sku = ?", (sku,))
@@ -186,14 +244,14 @@ class ProductDatabase:
 
     def list_all(self) -> List[Dict[str, Any]]:
         """全商品を更新日時の新しい順で取得"""
-        cur = self.conn.cursor()
+        cur = get_read_connection(self.db_path, self.conn).cursor()
         cur.execute(
             "SELECT * FROM products ORDER BY IFNULL(updated_at, created_at) DESC, sku DESC"
         )
         return [dict(r) for r in cur.fetchall()]
 
     def list_by_date(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
-        cur = self.conn.cursor()
+        cur = get_read_connection(self.db_path, self.conn).cursor()
         where = []
         params: List[Any] = []
         if start_date:
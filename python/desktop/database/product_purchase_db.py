@@ -2,13 +2,70 @@
 # -*- coding: utf-8 -*-
 """
 商品DBタブ用 仕入データスナップショット保存クラス
+
+スナップショットは仕入一覧全体を1つの JSON にせず、行（SKU）ごとの差分として保存する。
+
+- 行の内容は内容ハッシュごとに product_purchase_rows に1回だけ保存する（同じ内容の行は共有）。
+  列名の並びは product_purchase_columns にまとめ、行には値の配列だけを圧縮して持つ
+- 各スナップショット（版）は親の版に対する変更行だけを product_purchase_snapshot_rows に記録する
+  （digest が NULL の行は削除）。最初の版は全行を持つ根になる
+- 並び順は「親の順から削除行を除き、追加行を記録順に末尾へ」と異なる場合だけ row_order に保存する
+- 復元は根から差分を順に当てて組み立てる
+- 保持件数を超えた古い版は、一覧から外した根に差分を畳み込んで消す
+
+保存・整理で書き込むのは変更のあった行の分だけになる。
+一覧用のヘッダー（件数・列名・ハッシュ）は版ごとに header へ持ち、
+get_snapshot_pages ではページごとに必要な行だけを読み込んで展開する。
 """
 from __future__ import annotations
 
+import hashlib
 import sqlite3
 import json
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+try:
+    from database.connection_manager import get_connection
+    from database.migrations import apply_migrations
+    from database.snapshot_store import (
+        SNAPSHOT_FORMAT,
+        SNAPSHOT_PAGE_ROWS,
+        SnapshotPages,
+        compress_json,
+        decompress_json,
+        dump_header,
+        load_header,
+        snapshot_columns,
+    )
+except ImportError:
+    from desktop.database.connection_manager import get_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+    from desktop.database.snapshot_store import (  # type: ignore
+        SNAPSHOT_FORMAT,
+        SNAPSHOT_PAGE_ROWS,
+        SnapshotPages,
+        compress_json,
+        decompress_json,
+        dump_header,
+        load_header,
+        snapshot_columns,
+    )
+
+# 保持するスナップショットの件数
+MAX_SNAPSHOTS = 10
+
+# 同じSKUの2件目以降・SKUなしの行のキーに付ける区切り（SKUには現れない制御文字）
+_KEY_SEPARATOR = "\x1f"
+
+# IN (...) に一度に渡す件数
+_SQL_CHUNK_SIZE = 500
+
+# 版ごとの状態（行キー → 内容ハッシュ, 行キーの並び順）
+_State = Tuple[Dict[str, str], List[str]]
+
+# 最後に保存した版（版ID, 状態）
+_Tip = Tuple[int, _State]
 
 
 def normalize_jan_in_record(record: Dict[str, Any]) -> Dict[str, Any]:
@@ -32,7 +89,8 @@ def normalize_jan_in_record(record: Dict[str, Any]) -> Dict[str, Any]:
             if jan_str.endswith(".0"):
                 jan_str = jan_str[:-2]
             # 数字以外の文字を除去（念のため）
-            jan_str = ''.join(c for c in jan_str if c.isdigit())
+            if not jan_str.isdigit():
+                jan_str = ''.join(c for c in jan_str if c.isdigit())
             record[key] = jan_str if jan_str else None
     
     return record
@@ -51,6 +109,68 @@ def normalize_jan_in_records(records: List[Dict[str, Any]]) -> List[Dict[str, An
     return [normalize_jan_in_record(record.copy()) for record in records]
 
 
+def _row_keys(records: List[Dict[str, Any]]) -> List[str]:
+    """各行のキー（SKU。同じSKUの2件目以降とSKUなしの行は出現順の番号を付ける）。"""
+    seen: Dict[str, int] = {}
+    keys = []
+    for record in records:
+        sku = record.get("SKU")
+        if sku in (None, ""):
+            sku = record.get("sku")
+        base = "" if sku is None else str(sku).strip()
+        count = seen.get(base, 0)
+        seen[base] = count + 1
+        keys.append(base if base and count == 0 else f"{base}{_KEY_SEPARATOR}{count}")
+    return keys
+
+
+def _encode_row(record: Dict[str, Any]) -> Tuple[str, str]:
+    """行の内容ハッシュと JSON。"""
+    text = json.dumps(record, ensure_ascii=False, default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest(), text
+
+
+def _replay_order(order: List[str], changes: List[Tuple[str, Optional[str]]]) -> List[str]:
+    """親の並び順に差分を当てた並び順（削除行を除き、追加行は差分の記録順で末尾へ）。"""
+    deleted = {key for key, digest in changes if digest is None}
+    present = set(order)
+    result = [key for key in order if key not in deleted]
+    result.extend(key for key, digest in changes if digest is not None and key not in present)
+    return result
+
+
+def _chunks(values: List[Any]) -> Iterable[List[Any]]:
+    for i in range(0, len(values), _SQL_CHUNK_SIZE):
+        yield values[i:i + _SQL_CHUNK_SIZE]
+
+
+def _make_header(records: List[Dict[str, Any]], state: _State) -> Dict[str, Any]:
+    """一覧用のヘッダー（件数・列名・行ハッシュを並び順につないだハッシュ）。"""
+    digests, order = state
+    content_hash = hashlib.sha256("\n".join(digests[key] for key in order).encode("ascii")).hexdigest()
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "rows": len(order),
+        "columns": snapshot_columns(records),
+        "page_rows": SNAPSHOT_PAGE_ROWS,
+        "hash": content_hash,
+    }
+
+
+class _RowSnapshotPages(SnapshotPages):
+    """版の行をページごとに product_purchase_rows から読み込んで展開する。"""
+
+    def __init__(self, db: "ProductPurchaseDatabase", snapshot_id: int, header: Dict[str, Any], state: _State):
+        super().__init__(header)
+        self._db = db
+        self._snapshot_id = snapshot_id
+        self._digests, self._order = state
+
+    def _load_page(self, index: int) -> List[Dict[str, Any]]:
+        keys = self._order[index * self.page_rows:(index + 1) * self.page_rows]
+        return self._db._records_for(self._db.conn.cursor(), self._snapshot_id, keys, self._digests)
+
+
 class ProductPurchaseDatabase:
     """商品DBの仕入データ保存専用DB操作クラス"""
 
@@ -63,17 +183,23 @@ class ProductPurchaseDatabase:
             db_path = get_product_purchase_db_path()
         self.db_path = db_path
         self.conn: Optional[sqlite3.Connection] = None
+        # 最後に保存した版（次の保存で差分を取るため。最新かつ一覧に出ている間だけ使う: _current_tip）
+        self._tip: Optional[_Tip] = None
         self._ensure_dir()
         self._connect()
-        self._init_schema()
+        apply_migrations(
+            self.conn,
+            self.db_path,
+            "product_purchase_db",
+            (self._init_schema, self._migrate_to_row_snapshots, self._migrate_to_packed_rows),
+        )
 
     def _ensure_dir(self) -> None:
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
     def _connect(self) -> None:
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_path)
 
     def _init_schema(self) -> None:
         cur = self.conn.cursor()
@@ -91,34 +217,421 @@ class ProductPurchaseDatabase:
         )
         self.conn.commit()
 
-    def save_snapshot(self, snapshot_name: str, data: List[Dict[str, Any]]) -> int:
+    def _migrate_to_row_snapshots(self) -> None:
+        """行ごとの差分のテーブルを作り、既存のスナップショット（全件JSON）を古い順に変換する。"""
         cur = self.conn.cursor()
-        # JANコードの.0を削除してから保存
-        normalized_data = normalize_jan_in_records(data)
-        item_count = len(normalized_data)
-        data_json = json.dumps(normalized_data, ensure_ascii=False, default=str)
+        cur.execute("PRAGMA table_info(product_purchase_snapshots)")
+        columns = {row[1] for row in cur.fetchall()}
+        for column, definition in (
+            ("parent_id", "INTEGER"),
+            ("row_order", "TEXT"),
+            ("hidden", "INTEGER NOT NULL DEFAULT 0"),
+        ):
+            if column not in columns:
+                cur.execute(f"ALTER TABLE product_purchase_snapshots ADD COLUMN {column} {definition}")
         cur.execute(
             """
-            INSERT INTO product_purchase_snapshots (snapshot_name, item_count, data)
-            VALUES (?, ?, ?)
-            """,
-            (snapshot_name, item_count, data_json),
+            CREATE TABLE IF NOT EXISTS product_purchase_rows (
+                digest TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            )
+            """
         )
-        snapshot_id = cur.lastrowid
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS product_purchase_snapshot_rows (
+                snapshot_id INTEGER NOT NULL,
+                row_key TEXT NOT NULL,
+                digest TEXT,
+                PRIMARY KEY (snapshot_id, row_key)
+            )
+            """
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_product_purchase_snapshot_rows_digest "
+            "ON product_purchase_snapshot_rows(digest)"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_product_purchase_snapshots_parent "
+            "ON product_purchase_snapshots(parent_id)"
+        )
+
+        legacy_ids = [
+            row[0]
+            for row in cur.execute(
+                "SELECT id FROM product_purchase_snapshots WHERE data != '' ORDER BY id"
+            ).fetchall()
+        ]
+        parent_id: Optional[int] = None
+        state: _State = ({}, [])
+        for snapshot_id in legacy_ids:
+            data = cur.execute(
+                "SELECT data FROM product_purchase_snapshots WHERE id = ?", (snapshot_id,)
+            ).fetchone()[0]
+            try:
+                records = json.loads(data)
+            except json.JSONDecodeError as e:
+                print(f"[WARNING] スナップショット {snapshot_id} のJSONを読めないため空として変換: {str(e)}")
+                records = []
+            state = self._write_version(cur, snapshot_id, records, parent_id, state, packed=False)
+            parent_id = snapshot_id
+        self.conn.commit()
+        if legacy_ids:
+            print(f"[DEBUG] 仕入スナップショット {len(legacy_ids)}件を行ごとの差分に変換")
 
-        # 古いスナップショットを削除（最新10件を保持）
+    def _migrate_to_packed_rows(self) -> None:
+        """行の内容を「列名の並び + 圧縮した値の配列」に変換し、各版に一覧用のヘッダーを付ける。"""
+        cur = self.conn.cursor()
         cur.execute(
             """
-            DELETE FROM product_purchase_snapshots
-            WHERE id NOT IN (
-                SELECT id FROM product_purchase_snapshots
-                ORDER BY created_at DESC
-                LIMIT 10
+            CREATE TABLE IF NOT EXISTS product_purchase_columns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                columns TEXT NOT NULL UNIQUE
             )
             """
         )
+        cur.execute("PRAGMA table_info(product_purchase_rows)")
+        if "columns_id" not in {row[1] for row in cur.fetchall()}:
+            cur.execute("ALTER TABLE product_purchase_rows ADD COLUMN columns_id INTEGER")
+        cur.execute("PRAGMA table_info(product_purchase_snapshots)")
+        if "header" not in {row[1] for row in cur.fetchall()}:
+            cur.execute("ALTER TABLE product_purchase_snapshots ADD COLUMN header TEXT")
+
+        cur.execute("SELECT digest, data FROM product_purchase_rows WHERE columns_id IS NULL")
+        # JSON のまま保存された行（復元時に正規化しないため、ここでJANコードを正規化しておく）
+        legacy = {digest: normalize_jan_in_record(json.loads(data)) for digest, data in cur.fetchall()}
+        cur.execute("DELETE FROM product_purchase_rows WHERE columns_id IS NULL")
+        self._insert_rows(cur, legacy)
 
+        cur.execute("SELECT id FROM product_purchase_snapshots WHERE hidden = 0 AND header IS NULL")
+        for snapshot_id in [row[0] for row in cur.fetchall()]:
+            state = self._load_state(cur, snapshot_id)
+            records = self._records_for(cur, snapshot_id, state[1], state[0])
+            cur.execute(
+                "UPDATE product_purchase_snapshots SET header = ? WHERE id = ?",
+                (dump_header(_make_header(records, state)), snapshot_id),
+            )
         self.conn.commit()
+
+    # ===== 行の内容 =====
+
+    def _insert_rows(self, cur: sqlite3.Cursor, rows: Dict[str, Dict[str, Any]]) -> None:
+        """内容ハッシュ → 行 を、列名の並びのIDと圧縮した値の配列で保存する（既にある行はそのまま）。"""
+        column_ids: Dict[str, int] = {}
+        packed = []
+        for digest, record in rows.items():
+            columns_json = json.dumps(list(record), ensure_ascii=False)
+            columns_id = column_ids.get(columns_json)
+            if columns_id is None:
+                cur.execute(
+                    "INSERT OR IGNORE INTO product_purchase_columns (columns) VALUES (?)", (columns_json,)
+                )
+                cur.execute("SELECT id FROM product_purchase_columns WHERE columns = ?", (columns_json,))
+                columns_id = column_ids[columns_json] = cur.fetchone()[0]
+            packed.append((digest, compress_json(list(record.values())), columns_id))
+        cur.executemany(
+            "INSERT OR IGNORE INTO product_purchase_rows (digest, data, columns_id) VALUES (?, ?, ?)",
+            packed,
+        )
+
+    def _load_rows(self, cur: sqlite3.Cursor, digests: List[str]) -> Dict[str, Dict[str, Any]]:
+        """内容ハッシュ → 行（見つからないものは含まない）。"""
+        rows: Dict[str, Dict[str, Any]] = {}
+        columns_cache: Dict[int, List[str]] = {}
+        for chunk in _chunks(list(set(digests))):
+            placeholders = ",".join("?" * len(chunk))
+            cur.execute(
+                f"""
+                SELECT r.digest, r.data, r.columns_id, c.columns
+                FROM product_purchase_rows r
+                LEFT JOIN product_purchase_columns c ON c.id = r.columns_id
+                WHERE r.digest IN ({placeholders})
+                """,
+                chunk,
+            )
+            for digest, data, columns_id, columns_json in cur.fetchall():
+                if columns_id is None:
+                    rows[digest] = json.loads(data)
+                    continue
+                columns = columns_cache.get(columns_id)
+                if columns is None:
+                    columns = columns_cache[columns_id] = json.loads(columns_json)
+                rows[digest] = dict(zip(columns, decompress_json(data)))
+        return rows
+
+    def _records_for(
+        self, cur: sqlite3.Cursor, snapshot_id: int, keys: List[str], digests: Dict[str, str]
+    ) -> List[Dict[str, Any]]:
+        """版の状態から keys の行を並び順どおりに取り出す。"""
+        rows = self._load_rows(cur, [digests[key] for key in keys if key in digests])
+        records = []
+        for key in keys:
+            record = rows.get(digests.get(key, ""))
+            if record is None:
+                print(f"[WARNING] スナップショット {snapshot_id} の行 {key!r} の内容が見つかりません")
+                continue
+            records.append(record)
+        return records
+
+    # ===== 版の読み書き =====
+
+    def _latest_version_id(self, cur: sqlite3.Cursor) -> Optional[int]:
+        row = cur.execute("SELECT MAX(id) FROM product_purchase_snapshots").fetchone()
+        return row[0] if row else None
+
+    def _current_tip(self, cur: sqlite3.Cursor, latest_id: Optional[int]) -> Optional[_Tip]:
+        """
+        このインスタンスが最後に保存した版が今も最新で一覧に出ている場合だけ、その状態を返す。
+        他のインスタンスが後から保存・削除していれば None（DB から読み直す）。
+        一覧外の根は畳み込みで状態が変わるため使わない。
+        """
+        if self._tip is None or latest_id is None or self._tip[0] != latest_id:
+            return None
+        row = cur.execute(
+            "SELECT hidden FROM product_purchase_snapshots WHERE id = ?", (latest_id,)
+        ).fetchone()
+        if row is None or row[0]:
+            return None
+        return self._tip
+
+    def _changes(self, cur: sqlite3.Cursor, snapshot_id: int) -> List[Tuple[str, Optional[str]]]:
+        cur.execute(
+            "SELECT row_key, digest FROM product_purchase_snapshot_rows WHERE snapshot_id = ? ORDER BY rowid",
+            (snapshot_id,),
+        )
+        return [(row[0], row[1]) for row in cur.fetchall()]
+
+    def _load_state(self, cur: sqlite3.Cursor, snapshot_id: Optional[int]) -> _State:
+        """根から snapshot_id までの差分を当てた状態。"""
+        if snapshot_id is None:
+            return {}, []
+        cur.execute(
+            """
+            WITH RECURSIVE chain(id, parent_id, row_order, depth) AS (
+                SELECT id, parent_id, row_order, 0 FROM product_purchase_snapshots WHERE id = ?
+                UNION ALL
+                SELECT s.id, s.parent_id, s.row_order, chain.depth + 1
+                FROM product_purchase_snapshots s JOIN chain ON s.id = chain.parent_id
+            )
+            SELECT id, row_order FROM chain ORDER BY depth DESC
+            """,
+            (snapshot_id,),
+        )
+        digests: Dict[str, str] = {}
+        order: List[str] = []
+        for version_id, row_order in cur.fetchall():
+            changes = self._changes(cur, version_id)
+            order = json.loads(row_order) if row_order is not None else _replay_order(order, changes)
+            for key, digest in changes:
+                if digest is None:
+                    digests.pop(key, None)
+                else:
+                    digests[key] = digest
+        return digests, order
+
+    def _write_version(
+        self,
+        cur: sqlite3.Cursor,
+        snapshot_id: int,
+        records: List[Dict[str, Any]],
+        parent_id: Optional[int],
+        parent_state: _State,
+        packed: bool = True,
+    ) -> _State:
+        """
+        snapshot_id の版として、親の版から変わった行だけを書き込む。
+        変わったかどうかは JSON にした行のハッシュで判定する（辞書の == は列の並びや 1 と 1.0・True の違いを見ない）。
+        packed=False は行を JSON のまま保存する（圧縮形式の導入前のマイグレーション用）。
+        """
+        keys = _row_keys(records)
+        parent_digests, parent_order = parent_state
+        digests: Dict[str, str] = {}
+        encoded: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        for key, record in zip(keys, records):
+            digest, text = _encode_row(record)
+            digests[key] = digest
+            encoded[digest] = (text, record)
+
+        changes: List[Tuple[str, Optional[str]]] = [
+            (key, digests[key]) for key in keys if parent_digests.get(key) != digests[key]
+        ]
+        changes.extend((key, None) for key in parent_order if key not in digests)
+        row_order = None
+        if _replay_order(parent_order, changes) != keys:
+            row_order = json.dumps(keys, ensure_ascii=False)
+
+        changed = {digest for _, digest in changes if digest is not None}
+        if packed:
+            self._insert_rows(
+                cur, {digest: record for digest, (_, record) in encoded.items() if digest in changed}
+            )
+        else:
+            cur.executemany(
+                "INSERT OR IGNORE INTO product_purchase_rows (digest, data) VALUES (?, ?)",
+                [(digest, text) for digest, (text, _) in encoded.items() if digest in changed],
+            )
+        cur.executemany(
+            "INSERT INTO product_purchase_snapshot_rows (snapshot_id, row_key, digest) VALUES (?, ?, ?)",
+            [(snapshot_id, key, digest) for key, digest in changes],
+        )
+        cur.execute(
+            "UPDATE product_purchase_snapshots SET parent_id = ?, row_order = ?, data = '' WHERE id = ?",
+            (parent_id, row_order, snapshot_id),
+        )
+        return digests, keys
+
+    def _materialize(self, cur: sqlite3.Cursor, snapshot_id: int) -> List[Dict[str, Any]]:
+        digests, order = self._load_state(cur, snapshot_id)
+        return self._records_for(cur, snapshot_id, order, digests)
+
+    # ===== 版の削除・畳み込み =====
+
+    def _remove_version(self, cur: sqlite3.Cursor, snapshot_id: int) -> None:
+        """版を消す。他の版の復元に必要な差分は、親（一覧外の根）か子へ畳み込む。"""
+        version = cur.execute(
+            "SELECT id, parent_id, row_order, item_count FROM product_purchase_snapshots WHERE id = ?",
+            (snapshot_id,),
+        ).fetchone()
+        if version is None:
+            return
+        child = cur.execute(
+            "SELECT id, row_order FROM product_purchase_snapshots WHERE parent_id = ? ORDER BY id LIMIT 1",
+            (snapshot_id,),
+        ).fetchone()
+        parent = None
+        if version["parent_id"] is not None:
+            parent = cur.execute(
+                "SELECT id, hidden FROM product_purchase_snapshots WHERE id = ?", (version["parent_id"],)
+            ).fetchone()
+
+        if child is None:
+            # 最新の版: 差分ごと消す（一覧外の根だけが残る場合は根も消す）
+            orphans = [digest for _, digest in self._changes(cur, snapshot_id) if digest is not None]
+            self._drop_version(cur, snapshot_id)
+            self._delete_unused_rows(cur, orphans)
+            if parent is not None and parent["hidden"]:
+                self._remove_version(cur, parent["id"])
+        elif parent is None:
+            # 根の版: 子の復元に必要なため、一覧から外すだけ
+            cur.execute("UPDATE product_purchase_snapshots SET hidden = 1 WHERE id = ?", (snapshot_id,))
+        elif parent["hidden"]:
+            self._fold_into_root(cur, version, parent["id"])
+        else:
+            self._fold_into_child(cur, version, child)
+
+    def _fold_into_root(self, cur: sqlite3.Cursor, version: sqlite3.Row, root_id: int) -> None:
+        """一覧外の根に版の差分を当て、根をその版の状態にしてから版を消す。"""
+        changes = self._changes(cur, version["id"])
+        # 根は他のインスタンスの保存でも畳み込まれるため、状態は常に DB から読む
+        root_digests, root_order = self._load_state(cur, root_id)
+        if version["row_order"] is not None:
+            order_json = version["row_order"]
+        else:
+            order_json = json.dumps(_replay_order(root_order, changes), ensure_ascii=False)
+        orphans = [root_digests[key] for key, _ in changes if key in root_digests]
+
+        cur.executemany(
+            "DELETE FROM product_purchase_snapshot_rows WHERE snapshot_id = ? AND row_key = ?",
+            [(root_id, key) for key, digest in changes if digest is None],
+        )
+        cur.executemany(
+            "INSERT INTO product_purchase_snapshot_rows (snapshot_id, row_key, digest) VALUES (?, ?, ?) "
+            "ON CONFLICT(snapshot_id, row_key) DO UPDATE SET digest = excluded.digest",
+            [(root_id, key, digest) for key, digest in changes if digest is not None],
+        )
+        cur.execute(
+            "UPDATE product_purchase_snapshots SET row_order = ?, item_count = ? WHERE id = ?",
+            (order_json, version["item_count"], root_id),
+        )
+        cur.execute(
+            "UPDATE product_purchase_snapshots SET parent_id = ? WHERE parent_id = ?",
+            (root_id, version["id"]),
+        )
+        self._drop_version(cur, version["id"])
+        self._delete_unused_rows(cur, orphans)
+
+    def _fold_into_child(self, cur: sqlite3.Cursor, version: sqlite3.Row, child: sqlite3.Row) -> None:
+        """途中の版を消す: 子が上書きしていない差分を子へ移し、子の親を付け替える。"""
+        if child["row_order"] is None:
+            # 子の並び順は消す版の状態を前提にしているため、先に確定させる
+            _, child_order = self._load_state(cur, child["id"])
+            cur.execute(
+                "UPDATE product_purchase_snapshots SET row_order = ? WHERE id = ?",
+                (json.dumps(child_order, ensure_ascii=False), child["id"]),
+            )
+        changes = self._changes(cur, version["id"])
+        child_keys = {key for key, _ in self._changes(cur, child["id"])}
+        orphans = [digest for key, digest in changes if key in child_keys and digest is not None]
+        cur.executemany(
+            "INSERT INTO product_purchase_snapshot_rows (snapshot_id, row_key, digest) VALUES (?, ?, ?)",
+            [(child["id"], key, digest) for key, digest in changes if key not in child_keys],
+        )
+        cur.execute(
+            "UPDATE product_purchase_snapshots SET parent_id = ? WHERE id = ?",
+            (version["parent_id"], child["id"]),
+        )
+        self._drop_version(cur, version["id"])
+        self._delete_unused_rows(cur, orphans)
+
+    def _drop_version(self, cur: sqlite3.Cursor, snapshot_id: int) -> None:
+        cur.execute("DELETE FROM product_purchase_snapshot_rows WHERE snapshot_id = ?", (snapshot_id,))
+        cur.execute("DELETE FROM product_purchase_snapshots WHERE id = ?", (snapshot_id,))
+
+    def _delete_unused_rows(self, cur: sqlite3.Cursor, digests: List[str]) -> None:
+        """どの版からも参照されなくなった行の内容を消す（候補の分だけ調べる）。"""
+        for chunk in _chunks(list(set(digests))):
+            placeholders = ",".join("?" * len(chunk))
+            cur.execute(
+                f"""
+                DELETE FROM product_purchase_rows
+                WHERE digest IN ({placeholders})
+                  AND NOT EXISTS (
+                      SELECT 1 FROM product_purchase_snapshot_rows s
+                      WHERE s.digest = product_purchase_rows.digest
+                  )
+                """,
+                chunk,
+            )
+
+    def _apply_retention(self, cur: sqlite3.Cursor) -> None:
+        """一覧に出す版を最新 MAX_SNAPSHOTS 件に保つ（古い順に消す）。"""
+        cur.execute("SELECT id FROM product_purchase_snapshots WHERE hidden = 0 ORDER BY id DESC")
+        expired = [row[0] for row in cur.fetchall()[MAX_SNAPSHOTS:]]
+        for snapshot_id in reversed(expired):
+            self._remove_version(cur, snapshot_id)
+
+    # ===== 公開API =====
+
+    def save_snapshot(self, snapshot_name: str, data: List[Dict[str, Any]]) -> int:
+        cur = self.conn.cursor()
+        # JANコードの.0を削除してから保存
+        normalized_data = normalize_jan_in_records(data)
+        item_count = len(normalized_data)
+        try:
+            parent_id = self._latest_version_id(cur)
+            tip = self._current_tip(cur, parent_id)
+            parent_state = tip[1] if tip is not None else self._load_state(cur, parent_id)
+            cur.execute(
+                """
+                INSERT INTO product_purchase_snapshots (snapshot_name, item_count, data)
+                VALUES (?, ?, '')
+                """,
+                (snapshot_name, item_count),
+            )
+            snapshot_id = cur.lastrowid
+            state = self._write_version(cur, snapshot_id, normalized_data, parent_id, parent_state)
+            cur.execute(
+                "UPDATE product_purchase_snapshots SET header = ? WHERE id = ?",
+                (dump_header(_make_header(normalized_data, state)), snapshot_id),
+            )
+
+            # 古いスナップショットを整理（最新10件を保持）
+            self._apply_retention(cur)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self._tip = (snapshot_id, state)
         return snapshot_id
 
     def list_snapshots(self) -> List[Dict[str, Any]]:
@@ -132,7 +645,8 @@ class ProductPurchaseDatabase:
                 datetime(created_at, 'localtime') AS created_at,
                 datetime(updated_at, 'localtime') AS updated_at
             FROM product_purchase_snapshots
-            ORDER BY created_at DESC
+            WHERE hidden = 0
+            ORDER BY created_at DESC, id DESC
             """
         )
         return [dict(row) for row in cur.fetchall()]
@@ -145,40 +659,62 @@ class ProductPurchaseDatabase:
                 id,
                 snapshot_name,
                 item_count,
-                data,
                 datetime(created_at, 'localtime') AS created_at,
                 datetime(updated_at, 'localtime') AS updated_at
             FROM product_purchase_snapshots
-            WHERE id = ?
+            WHERE id = ? AND hidden = 0
             """,
             (snapshot_id,),
         )
         row = cur.fetchone()
         if not row:
             return None
-        data = json.loads(row["data"]) if row["data"] else []
-        # JANコードの.0を削除してから返す
-        normalized_data = normalize_jan_in_records(data)
+        # JANコードは保存時に正規化済み
         return {
             "id": row["id"],
             "snapshot_name": row["snapshot_name"],
             "item_count": row["item_count"],
-            "data": normalized_data,
+            "data": self._materialize(cur, row["id"]),
             "created_at": row["created_at"],
             "updated_at": row["updated_at"],
         }
 
-    def delete_snapshot(self, snapshot_id: int) -> bool:
+    def get_snapshot_pages(self, snapshot_id: int) -> Optional[SnapshotPages]:
+        """
+        スナップショットのレコードをページ単位で取得する（存在しない場合は None）。
+        header に件数・列名・ハッシュを持ち、page(0) は先頭ページの行だけを読み込んで展開する。
+        """
         cur = self.conn.cursor()
-        cur.execute(
-            "DELETE FROM product_purchase_snapshots WHERE id = ?",
+        row = cur.execute(
+            "SELECT id, header FROM product_purchase_snapshots WHERE id = ? AND hidden = 0",
             (snapshot_id,),
-        )
-        self.conn.commit()
-        return cur.rowcount > 0
+        ).fetchone()
+        if not row:
+            return None
+        state = self._load_state(cur, row["id"])
+        header = load_header(row["header"]) or {
+            "format": SNAPSHOT_FORMAT,
+            "rows": len(state[1]),
+            "page_rows": SNAPSHOT_PAGE_ROWS,
+        }
+        return _RowSnapshotPages(self, row["id"], header, state)
+
+    def delete_snapshot(self, snapshot_id: int) -> bool:
+        cur = self.conn.cursor()
+        row = cur.execute(
+            "SELECT hidden FROM product_purchase_snapshots WHERE id = ?", (snapshot_id,)
+        ).fetchone()
+        if row is None or row["hidden"]:
+            return False
+        try:
+            self._remove_version(cur, snapshot_id)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return True
 
     def close(self) -> None:
         if self.conn:
             self.conn.close()
             self.conn = None
-
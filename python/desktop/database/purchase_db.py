@@ -14,7 +14,79 @@ from __future__ import annotations
 
 import sqlite3
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from database.bulk_write import (
+        STATUS_ERROR,
+        row_result,
+        select_ids,
+        write_upserts,
+    )
+    from database.connection_manager import get_connection, get_read_connection
+    from database.migrations import apply_migrations
+except ImportError:
+    from desktop.database.bulk_write import (  # type: ignore
+        STATUS_ERROR,
+        row_result,
+        select_ids,
+        write_upserts,
+    )
+    from desktop.database.connection_manager import get_connection, get_read_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+
+
+# upsert で保存する列
+_UPSERT_FIELDS = (
+    "product_id",
+    "sku",
+    "purchase_date",
+    "purchase_price",
+    "quantity",
+    "store_code",
+    "store_name",
+    "condition_code",
+    "condition_note",
+    "receipt_id",
+    "comment",
+    "other_cost",
+    "storage_fee",
+    "sales_channel",
+    "expected_margin",
+    "expected_roi",
+    "status",
+    "status_reason",
+    # TP0/TP1/TP2/TP3 のみを使用（旧 ta1/ta2/ta3 は読み取り専用の互換カラムとして残す）
+    "tp0",
+    "tp1",
+    "tp2",
+    "tp3",
+    "tp0_source",
+    "tp1_source",
+    "tp2_source",
+    "tp3_source",
+    "status_set_at",
+    "listed_date",
+    "repricing_enabled",
+    "ladder_enabled",
+    "ladder_rules",
+)
+
+# 画像カラム（purchase辞書に含まれている場合のみ保存）
+_IMAGE_FIELDS = (
+    "image_url_1", "image_url_2", "image_url_3", "image_url_4", "image_url_5", "image_url_6",
+    "barcode_image_url",
+)
+
+
+def _purchase_fields(purchase: Dict[str, Any]) -> List[str]:
+    """upsert の対象列（基本の列 + purchase に含まれる画像列）。"""
+    return list(_UPSERT_FIELDS) + [k for k in _IMAGE_FIELDS if k in purchase]
+
+
+def _written_fields(purchase: Dict[str, Any]) -> Tuple[str, ...]:
+    """purchase を挿入するときの列（sku と、purchase に含まれる列だけ）。"""
+    return tuple(k for k in _purchase_fields(purchase) if k == "sku" or k in purchase)
 
 
 class PurchaseDatabase:
@@ -30,15 +102,14 @@ class PurchaseDatabase:
         self.conn: Optional[sqlite3.Connection] = None
         self._ensure_dir()
         self._connect()
-        self._init_schema()
+        apply_migrations(self.conn, self.db_path, "purchase_db", (self._init_schema,))
 
     def _ensure_dir(self) -> None:
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
     def _connect(self) -> None:
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_path)
 
     def _init_schema(self) -> None:
         cur = self.conn.cursor()
@@ -171,51 +242,9 @@ class PurchaseDatabase:
         # 既存判定
         existing = self.get_by_sku(purchase["sku"])
 
-        fields = [
-            "product_id",
-            "sku",
-            "purchase_date",
-            "purchase_price",
-            "quantity",
-            "store_code",
-            "store_name",
-            "condition_code",
-            "condition_note",
-            "receipt_id",
-            "comment",
-            "other_cost",
-            "storage_fee",
-            "sales_channel",
-            "expected_margin",
-            "expected_roi",
-            "status",
-            "status_reason",
-            # TP0/TP1/TP2/TP3 のみを使用（旧 ta1/ta2/ta3 は読み取り専用の互換カラムとして残す）
-            "tp0",
-            "tp1",
-            "tp2",
-            "tp3",
-            "tp0_source",
-            "tp1_source",
-            "tp2_source",
-            "tp3_source",
-            "status_set_at",
-            "listed_date",
-            "repricing_enabled",
-            "ladder_enabled",
-            "ladder_rules",
-        ]
-        # purchase辞書に含まれるキーのみを対象とする
-        
-        # 画像カラムが含まれている場合は追加
-        image_fields = [
-            "image_url_1", "image_url_2", "image_url_3", "image_url_4", "image_url_5", "image_url_6",
-            "barcode_image_url"
-        ]
-        for img_field in image_fields:
-            if img_field in purchase:
-                fields.append(img_field)
-        
+        # purchase辞書に含まれるキーのみを対象とする（画像カラムは含まれている場合のみ）
+        fields = _purchase_fields(purchase)
+
         cur = self.conn.cursor()
         if existing:
             # 更新（部分更新：指定されたキーのみ更新。未指定の列をNULLで上書きしない）
@@ -240,6 +269,46 @@ class PurchaseDatabase:
         self.conn.commit()
         return purchase_id
 
+    def upsert_many(self, purchases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        複数の仕入情報をまとめて挿入/更新する（1トランザクション）
+
+        upsert と同じく、各行は含まれるキーだけを保存する（既存行の未指定の列は残す）。
+        sku の無い行は保存せず、その行の結果を "error" にする。
+
+        Args:
+            purchases: 仕入情報の辞書のリスト
+
+        Returns:
+            入力と同じ順の結果のリスト
+            （{"index", "key": sku, "id", "status": inserted/updated/unchanged/error, "error"}）。
+            既存行は保存済みの値と違う列があれば updated、無ければ unchanged
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(purchases)
+        valid = []
+        for index, purchase in enumerate(purchases):
+            if not purchase.get("sku"):
+                results[index] = row_result(index, STATUS_ERROR, error="sku is required")
+                continue
+            valid.append((index, purchase))
+        if not valid:
+            return results
+
+        cur = self.conn.cursor()
+        skus = [purchase["sku"] for _, purchase in valid]
+        try:
+            statuses = write_upserts(cur, "purchases", "sku", valid, _written_fields)
+            ids = select_ids(cur, "purchases", "sku", skus)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        for index, purchase in valid:
+            sku = purchase["sku"]
+            results[index] = row_result(index, statuses[index], key=sku, row_id=ids.get(sku))
+        return results
+
     def get_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
         """SKUで仕入情報を取得"""
         cur = self.conn.cursor()
@@ -256,7 +325,7 @@ class PurchaseDatabase:
 
     def list_all(self) -> List[Dict[str, Any]]:
         """全仕入情報を取得（更新日時の新しい順）"""
-        cur = self.conn.cursor()
+        cur = get_read_connection(self.db_path, self.conn).cursor()
         cur.execute(
             "SELECT * FROM purchases ORDER BY IFNULL(updated_at, created_at) DESC, sku DESC"
         )
@@ -264,7 +333,7 @@ class PurchaseDatabase:
 
     def list_by_date(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
         """期間で仕入情報を取得"""
-        cur = self.conn.cursor()
+        cur = get_read_connection(self.db_path, self.conn).cursor()
         where = []
         params: List[Any] = []
         if start_date:
@@ -282,7 +351,7 @@ class PurchaseDatabase:
 
     def list_by_store(self, store_code: str) -> List[Dict[str, Any]]:
         """店舗コードで仕入情報を取得"""
-        cur = self.conn.cursor()
+        cur = get_read_connection(self.db_path, self.conn).cursor()
         cur.execute(
             "SELECT * FROM purchases WHERE store_code = ? ORDER BY purchase_date DESC",
             (store_code,)
@@ -13,6 +13,13 @@ import sqlite3
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+try:
+    from database.connection_manager import get_connection, get_read_connection
+    from database.migrations import apply_migrations
+except ImportError:
+    from desktop.database.connection_manager import get_connection, get_read_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+
 
 class ReceiptDatabase:
     def __init__(self, db_path: Optional[str] = None):
@@ -27,15 +34,14 @@ class ReceiptDatabase:
         self.conn: Optional[sqlite3.Connection] = None
         self._ensure_dir()
         self._connect()
-        self._init_schema()
+        apply_migrations(self.conn, self.db_path, "receipt_db", (self._init_schema,))
 
     def _ensure_dir(self) -> None:
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
     def _connect(self) -> None:
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_path)
 
     def _init_schema(self) -> None:
         cur = self.conn.cursor()
@@ -252,7 +258,7 @@ class ReceiptDatabase:
         return dict(row) if row else None
 
     def find_by_date_and_store(self, purchase_date: Optional[str], store_code: Optional[str] = None) -> List[Dict[str, Any]]:
-        cur = self.conn.cursor()
+        cur = get_read_connection(self.db_path, self.conn).cursor()
         if purchase_date:
             if store_code:
                 cur.execute(
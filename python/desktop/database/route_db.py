@@ -14,6 +14,13 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+try:
+    from database.connection_manager import get_connection, get_read_connection
+    from database.migrations import apply_migrations
+except ImportError:
+    from desktop.database.connection_manager import get_connection, get_read_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+
 
 class RouteDatabase:
     """ルートサマリーデータベース操作クラス"""
@@ -31,7 +38,7 @@ class RouteDatabase:
         self.db_path = db_path
         self.conn = None
         self._ensure_db_directory()
-        self._init_database()
+        apply_migrations(self._get_connection(), self.db_path, "route_db", (self._init_database,))
     
     def _ensure_db_directory(self):
         """データベースディレクトリの存在確認"""
@@ -41,8 +48,7 @@ class RouteDatabase:
     def _get_connection(self):
         """データベース接続を取得"""
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row  # 辞書形式で結果を取得
+            self.conn = get_connection(self.db_path)
         return self.conn
     
     def _init_database(self):
@@ -372,7 +378,7 @@ class RouteDatabase:
     
     def list_route_summaries(self, start_date: Optional[str] = None, end_date: Optional[str] = None, route_code: Optional[str] = None) -> List[Dict[str, Any]]:
         """ルートサマリー一覧を取得（検索対応）"""
-        conn = self._get_connection()
+        conn = get_read_connection(self.db_path, self._get_connection())
         cursor = conn.cursor()
         
         # updated_atはUTC保存のため、表示用にローカルタイムへ変換して返す
@@ -13,6 +13,13 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+try:
+    from database.connection_manager import get_connection
+    from database.migrations import apply_migrations
+except ImportError:
+    from desktop.database.connection_manager import get_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+
 # IN・OUT の両方が空の行は未訪問（履歴表示・店舗スコア集計から除外）
 _SQL_ACTUAL_VISIT = (
     "TRIM(COALESCE(store_in_time, '')) != '' "
@@ -35,15 +42,14 @@ class RouteVisitDatabase:
         self.db_path = db_path
         self.conn: Optional[sqlite3.Connection] = None
         self._ensure_db_directory()
-        self._init_database()
+        apply_migrations(self._get_connection(), self.db_path, "route_visit_db", (self._init_database,))
 
     def _ensure_db_directory(self):
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
     def _get_connection(self) -> sqlite3.Connection:
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_path)
         return self.conn
 
     def _init_database(self):
@@ -16,6 +16,40 @@ import sqlite3
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+try:
+    from database.bulk_write import STATUS_ERROR, STATUS_INSERTED, inserted_ids, row_result
+    from database.connection_manager import get_connection, get_read_connection
+    from database.migrations import apply_migrations
+except ImportError:
+    from desktop.database.bulk_write import STATUS_ERROR, STATUS_INSERTED, inserted_ids, row_result  # type: ignore
+    from desktop.database.connection_manager import get_connection, get_read_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+
+
+# insert で保存する列
+_INSERT_FIELDS = (
+    "purchase_id", "inventory_status_id", "sku", "sale_date",
+    "sales_method", "platform", "sale_price", "quantity", "title", "platform_fee",
+    "shipping_fee", "fba_fee", "storage_fee", "other_fees", "refund_total",
+    "net_profit", "order_id", "buyer_name", "transaction_method"
+)
+_INSERT_SQL = (
+    f"INSERT INTO sales ({','.join(_INSERT_FIELDS)}) VALUES ({','.join(['?'] * len(_INSERT_FIELDS))})"
+)
+
+
+def _fill_net_profit(sale: Dict[str, Any]) -> None:
+    """net_profit が未指定なら、販売価格から各手数料を引いた値を設定する。"""
+    if sale.get("net_profit") is None:
+        sale["net_profit"] = (
+            sale.get("sale_price", 0) -
+            sale.get("platform_fee", 0) -
+            sale.get("shipping_fee", 0) -
+            sale.get("fba_fee", 0) -
+            sale.get("storage_fee", 0) -
+            sale.get("other_fees", 0)
+        )
+
 
 class SalesDatabase:
     def __init__(self, db_path: Optional[str] = None):
@@ -30,15 +64,14 @@ class SalesDatabase:
         self.conn: Optional[sqlite3.Connection] = None
         self._ensure_dir()
         self._connect()
-        self._init_schema()
+        apply_migrations(self.conn, self.db_path, "sales_db", (self._init_schema,))
 
     def _ensure_dir(self) -> None:
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
     def _connect(self) -> None:
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_path)
 
     def _init_schema(self) -> None:
         cur = self.conn.cursor()
@@ -112,51 +145,57 @@ class SalesDatabase:
             raise ValueError("sku and sale_date are required")
 
         # net_profitを計算（指定されていない場合）
-        if sale.get("net_profit") is None:
-            net_profit = (
-                sale.get("sale_price", 0) -
-                sale.get("platform_fee", 0) -
-                sale.get("shipping_fee", 0) -
-                sale.get("fba_fee", 0) -
-                sale.get("storage_fee", 0) -
-                sale.get("other_fees", 0)
-            )
-            sale["net_profit"] = net_profit
+        _fill_net_profit(sale)
 
-        fields = [
-            "purchase_id", "inventory_status_id", "sku", "sale_date",
-            "sales_method", "platform", "sale_price", "quantity", "title", "platform_fee",
-            "shipping_fee", "fba_fee", "storage_fee", "other_fees", "refund_total",
-            "net_profit", "order_id", "buyer_name", "transaction_method"
-        ]
-        values = [sale.get(k) for k in fields]
+        values = [sale.get(k) for k in _INSERT_FIELDS]
 
         cur = self.conn.cursor()
-        placeholders = ",".join(["?"] * len(fields))
-        cur.execute(
-            f"INSERT INTO sales ({','.join(fields)}) VALUES ({placeholders})",
-            values,
-        )
+        cur.execute(_INSERT_SQL, values)
         sale_id = cur.lastrowid
         self.conn.commit()
         return sale_id
 
+    def insert_many(self, sales: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        複数の販売情報をまとめて挿入する（1トランザクション）
+
+        sku / sale_date の無い行は保存せず、その行の結果を "error" にする。
+        net_profit は insert と同じく未指定なら計算する（渡された辞書は変更しない）。
+
+        Returns:
+            入力と同じ順の結果のリスト（{"index", "key": sku, "id", "status", "error"}）
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(sales)
+        valid = []
+        for index, sale in enumerate(sales):
+            if not sale.get("sku") or not sale.get("sale_date"):
+                results[index] = row_result(index, STATUS_ERROR, key=sale.get("sku"), error="sku and sale_date are required")
+                continue
+            sale = dict(sale)
+            _fill_net_profit(sale)
+            valid.append((index, sale))
+        if not valid:
+            return results
+
+        cur = self.conn.cursor()
+        try:
+            cur.executemany(_INSERT_SQL, [[sale.get(k) for k in _INSERT_FIELDS] for _, sale in valid])
+            ids = inserted_ids(cur, len(valid))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        for (index, sale), sale_id in zip(valid, ids):
+            results[index] = row_result(index, STATUS_INSERTED, key=sale["sku"], row_id=sale_id)
+        return results
+
     def update(self, sale_id: int, sale: Dict[str, Any]) -> bool:
         """IDで販売情報を更新する（指定キーのみ部分更新）。"""
         if not sale_id:
             return False
 
         # net_profitを計算（指定されていない場合）
-        if sale.get("net_profit") is None:
-            net_profit = (
-                sale.get("sale_price", 0) -
-                sale.get("platform_fee", 0) -
-                sale.get("shipping_fee", 0) -
-                sale.get("fba_fee", 0) -
-                sale.get("storage_fee", 0) -
-                sale.get("other_fees", 0)
-            )
-            sale["net_profit"] = net_profit
+        _fill_net_profit(sale)
 
         fields = [
             "purchase_id", "inventory_status_id", "sku", "sale_date",
@@ -193,7 +232,7 @@ class SalesDatabase:
 
     def list_all(self) -> List[Dict[str, Any]]:
         """全販売情報を取得（販売日の新しい順）"""
-        cur = self.conn.cursor()
+        cur = get_read_connection(self.db_path, self.conn).cursor()
         cur.execute(
             "SELECT * FROM sales ORDER BY sale_date DESC, id DESC"
         )
@@ -201,7 +240,7 @@ class SalesDatabase:
 
     def list_by_date(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
         """期間で販売情報を取得"""
-        cur = self.conn.cursor()
+        cur = get_read_connection(self.db_path, self.conn).cursor()
         where = []
         params: List[Any] = []
         if start_date:
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+スナップショットの圧縮保存（ページごとに列単位の JSON を zlib で圧縮）
+
+仕入データのスナップショットは一覧全体を JSON の文字列で保存しており、
+読み込むたびに全件をパースし、JANコードの正規化もやり直していた。
+
+- レコードを SNAPSHOT_PAGE_ROWS 件ずつのページに分け、ページごとに列単位の JSON を圧縮して連結する
+- 一覧・確認用のヘッダー（件数・列名・ハッシュ・各ページの位置）は小さな JSON として別の列に持つ
+- 復元は SnapshotPages でページ単位にも展開できる。ただし現在の画面（統合読込・仕入データの読込など）は
+  全件を DataFrame にして照合するため、get_snapshot 系で全件を展開している
+- JANコードは保存時に正規化済みのため、復元時には正規化しない
+
+ヘッダーの列は全レコードの列名を最初に現れた順に並べたもの。復元したレコードのキーは
+各レコードの元の順になる（列の順と違うレコードだけ、ページ内に並び順を持つ。無かった列は復元後も無い）。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+SNAPSHOT_FORMAT = 1
+
+# 1ページのレコード数
+SNAPSHOT_PAGE_ROWS = 500
+
+_COMPRESS_LEVEL = 6
+
+
+def snapshot_columns(records: List[Dict[str, Any]]) -> List[str]:
+    """全レコードの列名（最初に現れた順）。"""
+    return list(dict.fromkeys(chain.from_iterable(records)))
+
+
+def compress_json(value: Any) -> bytes:
+    text = json.dumps(value, ensure_ascii=False, default=str)
+    return zlib.compress(text.encode("utf-8"), _COMPRESS_LEVEL)
+
+
+def decompress_json(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def _encode_page(records: List[Dict[str, Any]], columns: List[str]) -> bytes:
+    values = [[record.get(column) for record in records] for column in columns]
+    all_columns = tuple(columns)
+    position = {column: index for index, column in enumerate(columns)}
+    # 列が欠けているレコード（列数が全体より少ないものだけ調べる）
+    missing: Dict[str, List[int]] = {}
+    # キーの順が列の順と違うレコード: [行, orders の番号]（同じ並びは1つにまとめる）
+    order_ids: Dict[Tuple[int, ...], int] = {}
+    row_orders: List[List[int]] = []
+    for row, record in enumerate(records):
+        keys = tuple(record)
+        if keys == all_columns:
+            continue
+        expected = all_columns
+        if len(keys) != len(columns):
+            expected = tuple(column for column in columns if column in record)
+            for column in columns:
+                if column not in record:
+                    missing.setdefault(column, []).append(row)
+        if keys != expected:
+            order = tuple(position[key] for key in keys)
+            order_id = order_ids.setdefault(order, len(order_ids))
+            row_orders.append([row, order_id])
+    page: Dict[str, Any] = {"rows": len(records), "values": values, "missing": missing}
+    if row_orders:
+        page["orders"] = [list(order) for order in order_ids]
+        page["row_orders"] = row_orders
+    return compress_json(page)
+
+
+def _decode_page(blob: bytes, columns: List[str]) -> List[Dict[str, Any]]:
+    page = decompress_json(blob)
+    if columns:
+        records = [dict(zip(columns, row)) for row in zip(*page["values"])]
+    else:
+        records = [{} for _ in range(page["rows"])]
+    for column, rows in page.get("missing", {}).items():
+        for row in rows:
+            records[row].pop(column, None)
+    orders = page.get("orders", [])
+    for row, order_id in page.get("row_orders", []):
+        record = records[row]
+        records[row] = {columns[index]: record[columns[index]] for index in orders[order_id]}
+    return records
+
+
+def encode_snapshot(records: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], bytes]:
+    """レコードを圧縮し、(ヘッダー, ペイロード) を返す。"""
+    columns = snapshot_columns(records)
+    pages: List[List[int]] = []
+    blobs: List[bytes] = []
+    offset = 0
+    for start in range(0, len(records), SNAPSHOT_PAGE_ROWS):
+        blob = _encode_page(records[start:start + SNAPSHOT_PAGE_ROWS], columns)
+        pages.append([offset, len(blob)])
+        blobs.append(blob)
+        offset += len(blob)
+    payload = b"".join(blobs)
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "codec": "zlib",
+        "rows": len(records),
+        "columns": columns,
+        "page_rows": SNAPSHOT_PAGE_ROWS,
+        "pages": pages,
+        "hash": hashlib.sha256(payload).hexdigest(),
+    }
+    return header, payload
+
+
+def dump_header(header: Dict[str, Any]) -> str:
+    return json.dumps(header, ensure_ascii=False)
+
+
+def load_header(text: Optional[str]) -> Optional[Dict[str, Any]]:
+    """保存したヘッダー（無い・読めない場合は None）。"""
+    if not text:
+        return None
+    try:
+        header = json.loads(text)
+    except json.JSONDecodeError as e:
+        print(f"[WARNING] スナップショットのヘッダーを読めません: {str(e)}")
+        return None
+    if header.get("format") != SNAPSHOT_FORMAT:
+        print(f"[WARNING] 未対応のスナップショット形式です: {header.get('format')}")
+        return None
+    return header
+
+
+class SnapshotPages:
+    """
+    スナップショットのレコードをページ単位で展開する。
+    len() は全件数、page(i) は i ページ目だけを展開し、for で回すと先頭から順に展開する。
+    """
+
+    def __init__(self, header: Dict[str, Any]):
+        self.header = header
+
+    def __len__(self) -> int:
+        return int(self.header.get("rows", 0))
+
+    @property
+    def page_rows(self) -> int:
+        return int(self.header.get("page_rows") or SNAPSHOT_PAGE_ROWS)
+
+    @property
+    def page_count(self) -> int:
+        return -(-len(self) // self.page_rows)
+
+    def page(self, index: int) -> List[Dict[str, Any]]:
+        if not 0 <= index < self.page_count:
+            return []
+        return self._load_page(index)
+
+    def _load_page(self, index: int) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(self.page_count):
+            yield from self._load_page(index)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+
+class CompressedSnapshotPages(SnapshotPages):
+    """encode_snapshot で作ったペイロードを展開する。"""
+
+    def __init__(self, header: Dict[str, Any], payload: bytes):
+        super().__init__(header)
+        self._payload = payload
+
+    def _load_page(self, index: int) -> List[Dict[str, Any]]:
+        offset, length = self.header["pages"][index]
+        return _decode_page(self._payload[offset:offset + length], self.header["columns"])
+
+
+class ListSnapshotPages(SnapshotPages):
+    """展開済みのレコード（旧形式の JSON から読んだものなど）をページ単位で返す。"""
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        super().__init__({"format": SNAPSHOT_FORMAT, "rows": len(records), "page_rows": SNAPSHOT_PAGE_ROWS})
+        self._records = records
+
+    def _load_page(self, index: int) -> List[Dict[str, Any]]:
+        start = index * self.page_rows
+        return self._records[start:start + self.page_rows]
+
+
+def decode_snapshot(header: Dict[str, Any], payload: bytes) -> List[Dict[str, Any]]:
+    """encode_snapshot で作ったペイロードを全件展開する。"""
+    return CompressedSnapshotPages(header, payload).to_list()
@@ -15,6 +15,13 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+try:
+    from database.connection_manager import get_connection, get_read_connection
+    from database.migrations import apply_migrations
+except ImportError:
+    from desktop.database.connection_manager import get_connection, get_read_connection  # type: ignore
+    from desktop.database.migrations import apply_migrations  # type: ignore
+
 
 class StoreDatabase:
     """店舗マスタデータベース操作クラス"""
@@ -32,7 +39,11 @@ class StoreDatabase:
         self.db_path = db_path
         self.conn = None
         self._ensure_db_directory()
-        self._init_database()
+        apply_migrations(self._get_connection(), self.db_path, "store_db", (self._init_database,))
+        try:
+            self.repair_invalid_route_codes()
+        except Exception as exc:
+            print(f"ルートコード修復スキップ: {exc}")
     
     def _ensure_db_directory(self):
         """データベースディレクトリの存在確認"""
@@ -42,8 +53,7 @@ class StoreDatabase:
     def _get_connection(self):
         """データベース接続を取得"""
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row  # 辞書形式で結果を取得
+            self.conn = get_connection(self.db_path)
         return self.conn
     
     def _init_database(self):
@@ -391,10 +401,6 @@ class StoreDatabase:
         )
 
         conn.commit()
-        try:
-            self.repair_invalid_route_codes()
-        except Exception as exc:
-            print(f"ルートコード修復スキップ: {exc}")
     
     def close(self):
         """データベース接続を閉じる"""
@@ -783,7 +789,7 @@ class StoreDatabase:
     
     def list_stores(self, search_term: Optional[str] = None) -> List[Dict[str, Any]]:
         """店舗一覧を取得（検索対応）"""
-        conn = self._get_connection()
+        conn = get_read_connection(self.db_path, self._get_connection())
         cursor = conn.cursor()
         
         if search_term:
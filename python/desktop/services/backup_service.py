@@ -15,6 +15,11 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
+try:
+    from database.connection_manager import connection_manager, release_db_file
+except ImportError:
+    from desktop.database.connection_manager import connection_manager, release_db_file  # type: ignore
+
 logger = logging.getLogger(__name__)
 
 BACKUP_FILE_PREFIX = "HIRIO_backup_"
@@ -267,6 +272,8 @@ def create_backup(
             for src, arc_rel in pairs:
                 dst = staging / arc_rel
                 if src.suffix == ".db":
+                    # 共有接続の WAL を本体へ書き戻してからコピーする（-wal が大きいまま残らないように）
+                    connection_manager.checkpoint(str(src))
                     backup_sqlite_file(src, dst)
                 elif src.is_file():
                     _copy_plain_file(src, dst)
@@ -384,6 +391,8 @@ def restore_from_zip(
 
             if close_connections is not None:
                 close_connections()
+            # 共有接続を閉じる（WAL を本体へ書き戻してから退避・上書きする）
+            connection_manager.close_all()
 
             stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             safety_dir = data_dir.parent / f"data_before_restore_{stamp}"
@@ -410,6 +419,8 @@ def restore_from_zip(
                     shutil.copy2(target, safety_copy)
 
                 target.parent.mkdir(parents=True, exist_ok=True)
+                if target.suffix == ".db":
+                    release_db_file(str(target))
                 with zf.open(name) as src, open(target, "wb") as dst:
                     shutil.copyfileobj(src, dst)
                 restored.append(name)
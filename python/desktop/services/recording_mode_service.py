@@ -8,6 +8,7 @@ import sqlite3
 from pathlib import Path
 
 try:
+    from database.connection_manager import release_db_file
     from utils.db_bootstrap import init_empty_hirio_db, is_valid_sqlite_db
     from utils.db_paths import (
         get_data_dir,
@@ -17,6 +18,7 @@ try:
         get_recording_product_purchase_db_path,
     )
 except ImportError:
+    from desktop.database.connection_manager import release_db_file  # type: ignore
     from desktop.utils.db_bootstrap import init_empty_hirio_db, is_valid_sqlite_db  # type: ignore
     from desktop.utils.db_paths import (  # type: ignore
         get_data_dir,
@@ -44,6 +46,7 @@ _MASTER_TABLES = frozenset(
         "condition_templates",
         "condition_template_items",
         "sqlite_sequence",
+        "schema_migrations",
     }
 )
 
@@ -81,14 +84,26 @@ def _clear_transactional_tables(db_path: Path) -> None:
         conn.close()
 
 
+def _copy_sqlite_db(src_path: Path, dst_path: Path) -> None:
+    """SQLite のバックアップ機能でコピーする（WAL に残っている更新も含める）。"""
+    src_conn = sqlite3.connect(str(src_path))
+    dst_conn = sqlite3.connect(str(dst_path))
+    try:
+        src_conn.backup(dst_conn)
+    finally:
+        dst_conn.close()
+        src_conn.close()
+
+
 def _create_hirio_recording_db(recording_db: Path) -> None:
     """撮影用 hirio.db を作成（本番が使える場合はマスタのみコピー）。"""
+    release_db_file(str(recording_db))
     if recording_db.is_file():
         recording_db.unlink()
 
     prod_db = _production_hirio_db_path()
     if is_valid_sqlite_db(prod_db):
-        shutil.copy2(prod_db, recording_db)
+        _copy_sqlite_db(prod_db, recording_db)
         _clear_transactional_tables(recording_db)
         return
 
@@ -128,6 +143,7 @@ def create_recording_databases() -> None:
         (get_recording_inventory_route_db_path(), _create_inventory_route_db),
     ):
         p = Path(path)
+        release_db_file(path)
         if p.is_file():
             p.unlink()
         factory(path)
@@ -135,6 +151,12 @@ def create_recording_databases() -> None:
 
 def delete_recording_databases() -> None:
     """仮想DBフォルダごと削除する。"""
+    for path in (
+        get_recording_hirio_db_path(),
+        get_recording_product_purchase_db_path(),
+        get_recording_inventory_route_db_path(),
+    ):
+        release_db_file(path)
     recording_dir = get_recording_data_dir()
     if recording_dir.exists():
         shutil.rmtree(recording_dir, ignore_errors=True)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""各DBクラスの一括書き込み（upsert_many / insert_many）のテスト。"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from database.connection_manager import release_db_file
+from database.expense_db import ExpenseDatabase
+from database.product_db import ProductDatabase
+from database.purchase_db import PurchaseDatabase
+from database.sales_db import SalesDatabase
+
+
+@pytest.fixture
+def db_path(tmp_path: Path):
+    path = str(tmp_path / "hirio.db")
+    yield path
+    release_db_file(path)
+
+
+def test_purchase_upsert_many_matches_single_upserts(db_path):
+    db = PurchaseDatabase(db_path=db_path)
+    existing_id = db.upsert({"sku": "A", "purchase_price": 100, "store_name": "店舗A"})
+
+    results = db.upsert_many([
+        {"sku": "A", "status": "sold"},
+        {"sku": "B", "purchase_price": 200},
+        {"store_name": "SKUなし"},
+        {"sku": "C", "purchase_price": 300, "image_url_1": "https://example.com/c.jpg"},
+        {"sku": "B", "status": "sold"},
+        {"sku": "A"},
+    ])
+
+    assert [r["status"] for r in results] == ["updated", "inserted", "error", "inserted", "updated", "unchanged"]
+    assert [r["index"] for r in results] == list(range(6))
+    assert results[0]["id"] == results[5]["id"] == existing_id
+    assert results[1]["id"] == results[4]["id"] == db.get_by_sku("B")["id"]
+
+    # 未指定の列は残す
+    a = db.get_by_sku("A")
+    assert (a["purchase_price"], a["store_name"], a["status"]) == (100, "店舗A", "sold")
+    b = db.get_by_sku("B")
+    assert (b["purchase_price"], b["status"]) == (200, "sold")
+    assert db.get_by_sku("C")["image_url_1"] == "https://example.com/c.jpg"
+    assert db.upsert_many([]) == []
+
+
+def test_purchase_upsert_many_reports_unchanged_rows_by_stored_values(db_path):
+    db = PurchaseDatabase(db_path=db_path)
+    db.upsert({"sku": "A", "purchase_price": 100, "store_name": "店舗A", "comment": None})
+
+    results = db.upsert_many([
+        {"sku": "A", "purchase_price": 100, "store_name": "店舗A"},
+        # INTEGER 列の "100" は 100 として保存されるので変更なし、NULL → "" は変更あり
+        {"sku": "A", "purchase_price": "100", "comment": ""},
+        {"sku": "A", "comment": ""},
+        {"sku": "B", "purchase_price": 200},
+        {"sku": "B", "purchase_price": 200},
+        {"sku": "B", "purchase_price": 250},
+    ])
+
+    assert [r["status"] for r in results] == ["unchanged", "updated", "unchanged", "inserted", "unchanged", "updated"]
+    assert db.get_by_sku("A")["comment"] == ""
+    assert db.get_by_sku("B")["purchase_price"] == 250
+
+
+def test_purchase_upsert_many_rolls_back_on_failure(db_path):
+    db = PurchaseDatabase(db_path=db_path)
+    db.upsert({"sku": "A", "status": "ready"})
+    db.conn.execute(
+        "CREATE TRIGGER fail_b BEFORE INSERT ON purchases WHEN NEW.sku = 'B' "
+        "BEGIN SELECT RAISE(ABORT, 'fail'); END"
+    )
+    db.conn.commit()
+    with pytest.raises(Exception):
+        db.upsert_many([{"sku": "A", "status": "sold"}, {"sku": "B", "status": "x"}])
+    # 途中で失敗した場合は、それより前の行の更新も残らない
+    assert db.get_by_sku("A")["status"] == "ready"
+
+
+def test_product_upsert_many_normalizes_jan(db_path):
+    db = ProductDatabase(db_path=db_path)
+    db.upsert({"sku": "A", "product_name": "商品A", "jan": "4970381506544.0"})
+
+    results = db.upsert_many([
+        {"sku": "A", "listed_date": "2025-01-01"},
+        {"sku": "B", "jan": 4970381506545.0, "product_name": "商品B"},
+        {"sku": ""},
+    ])
+    assert [r["status"] for r in results] == ["updated", "inserted", "error"]
+    a = db.get_by_sku("A")
+    assert (a["product_name"], a["jan"], a["listed_date"]) == ("商品A", "4970381506544", "2025-01-01")
+    assert db.get_by_sku("B")["jan"] == "4970381506545"
+
+
+def test_sales_insert_many_returns_ids_in_order(db_path):
+    db = SalesDatabase(db_path=db_path)
+    first_id = db.insert({"sku": "X", "sale_date": "2025-01-01", "sales_method": "FBA", "platform": "Amazon", "sale_price": 500})
+    sales = [
+        {"sku": "A", "sale_date": "2025-01-02", "sales_method": "FBA", "platform": "Amazon", "sale_price": 1000, "platform_fee": 100, "shipping_fee": 50},
+        {"sku": "B"},
+        {"sku": "C", "sale_date": "2025-01-03", "sales_method": "FBA", "platform": "Amazon", "sale_price": 800, "net_profit": 1},
+    ]
+    results = db.insert_many(sales)
+
+    assert [r["status"] for r in results] == ["inserted", "error", "inserted"]
+    assert [results[0]["id"], results[2]["id"]] == [first_id + 1, first_id + 2]
+    assert db.get_by_id(results[0]["id"])["net_profit"] == 850
+    assert db.get_by_id(results[2]["id"])["sku"] == "C"
+    # 渡した辞書は変更しない
+    assert "net_profit" not in sales[0]
+
+
+def test_expense_upsert_many_updates_by_id_and_inserts_rest(db_path):
+    db = ExpenseDatabase(db_path=db_path)
+    expense = {"expense_date": "2025-01-01", "expense_category": "消耗品費", "amount": 100}
+    existing_id = db.upsert(expense)
+
+    results = db.upsert_many([
+        dict(expense, id=existing_id, amount=150),
+        dict(expense, memo="新規"),
+        {"expense_date": "2025-01-02", "amount": 10},
+        dict(expense, id=9999, memo="IDなし"),
+    ])
+    assert [r["status"] for r in results] == ["updated", "inserted", "error", "inserted"]
+    assert results[2]["error"] == "expense_category is required"
+    assert db.get_by_id(existing_id)["amount"] == 150
+    assert db.get_by_id(results[1]["id"])["memo"] == "新規"
+    assert db.get_by_id(results[3]["id"])["memo"] == "IDなし"
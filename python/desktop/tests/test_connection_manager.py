@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""SQLite 接続管理（共有の書き込み用接続・スレッドごとの読み取り用接続）のテスト。"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+
+from database.connection_manager import (
+    CACHE_SIZE_KIB,
+    get_connection,
+    get_read_connection,
+    release_db_file,
+)
+from database.product_db import ProductDatabase
+from database.purchase_db import PurchaseDatabase
+
+
+@pytest.fixture
+def db_path(tmp_path: Path):
+    path = str(tmp_path / "hirio.db")
+    yield path
+    release_db_file(path)
+
+
+def test_db_classes_share_tuned_writer(db_path):
+    purchase_db = PurchaseDatabase(db_path=db_path)
+    product_db = ProductDatabase(db_path=db_path)
+    assert purchase_db.conn is product_db.conn
+
+    conn = purchase_db.conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -CACHE_SIZE_KIB
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+
+    # 片方の close() で共有接続は閉じない
+    product_db.close()
+    purchase_db.upsert({"sku": "SKU-1", "purchase_price": 100})
+    assert purchase_db.get_by_sku("SKU-1")["purchase_price"] == 100
+
+
+def test_reader_does_not_wait_for_open_write_transaction(db_path):
+    db = PurchaseDatabase(db_path=db_path)
+    db.upsert({"sku": "SKU-1", "purchase_price": 100})
+
+    writer = get_connection(db_path)
+    writer.execute("UPDATE purchases SET purchase_price = 200 WHERE sku = 'SKU-1'")
+    assert writer.in_transaction
+
+    result = {}
+
+    def read_in_other_thread():
+        reader = get_read_connection(db_path)
+        result["reader"] = reader
+        result["rows"] = [dict(r) for r in reader.execute("SELECT sku, purchase_price FROM purchases")]
+
+    thread = threading.Thread(target=read_in_other_thread)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    # 別スレッドは確定済みの値を待たずに読める
+    assert result["rows"] == [{"sku": "SKU-1", "purchase_price": 100}]
+    assert result["reader"] is not writer
+
+    # 同じスレッドで未確定の書き込みがあるときは書き込み用接続で読む（自分の更新が見える）
+    assert db.list_all()[0]["purchase_price"] == 200
+    writer.commit()
+    assert get_read_connection(db_path, writer) is not writer
+    assert db.list_all()[0]["purchase_price"] == 200
+
+
+
+def test_other_thread_waits_for_transaction_instead_of_rolling_it_back(db_path):
+    db = PurchaseDatabase(db_path=db_path)
+    db.upsert({"sku": "SKU-1", "purchase_price": 100})
+
+    writer = get_connection(db_path)
+    writer.execute("UPDATE purchases SET purchase_price = 200 WHERE sku = 'SKU-1'")
+    assert writer.owns_transaction()
+
+    finished = threading.Event()
+    results = {}
+
+    def write_in_other_thread():
+        other = PurchaseDatabase(db_path=db_path)
+        assert other.conn is writer
+        assert not writer.owns_transaction()
+        # 失敗した一括書き込みの rollback でも、他のスレッドの未確定の更新は取り消さない
+        try:
+            other.upsert_many([{"sku": "SKU-2", "purchase_price": 300}, {"sku": "SKU-3", "purchase_price": ["不正"]}])
+        except Exception as e:
+            results["error"] = e
+        finished.set()
+
+    thread = threading.Thread(target=write_in_other_thread)
+    thread.start()
+    # 他のスレッドはこのスレッドのトランザクションが終わるまで待つ
+    assert not finished.wait(timeout=0.3)
+    writer.commit()
+    thread.join(timeout=5)
+    assert finished.is_set()
+    assert "error" in results
+    assert db.get_by_sku("SKU-1")["purchase_price"] == 200
+    assert db.get_by_sku("SKU-2") is None
+
+def test_reader_is_per_thread_and_query_only(db_path):
+    PurchaseDatabase(db_path=db_path)
+    reader = get_read_connection(db_path)
+    assert get_read_connection(db_path) is reader
+    with pytest.raises(sqlite3.OperationalError):
+        reader.execute("DELETE FROM purchases")
+
+    others = []
+    thread = threading.Thread(target=lambda: others.append(get_read_connection(db_path)))
+    thread.start()
+    thread.join()
+    assert others[0] is not reader
+
+
+def test_release_db_file_closes_connections_and_removes_wal(db_path):
+    db = PurchaseDatabase(db_path=db_path)
+    db.upsert({"sku": "SKU-1"})
+    old_reader = get_read_connection(db_path)
+    assert Path(db_path + "-wal").exists()
+
+    release_db_file(db_path)
+    assert not Path(db_path + "-wal").exists()
+    assert not Path(db_path + "-shm").exists()
+    with pytest.raises(sqlite3.ProgrammingError):
+        old_reader.execute("SELECT 1")
+
+    # 開き直した接続で続きが使える（WAL は本体へ書き戻し済み）
+    reopened = PurchaseDatabase(db_path=db_path)
+    assert reopened.conn is not db.conn
+    assert reopened.get_by_sku("SKU-1") is not None
+    assert get_read_connection(db_path) is not old_reader
+
+
+def test_memory_database_is_not_shared():
+    first = get_connection(":memory:")
+    second = get_connection(":memory:")
+    assert first is not second
+    assert get_read_connection(":memory:", first) is first
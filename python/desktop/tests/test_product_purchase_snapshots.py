@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""仕入データスナップショット（行ごとの差分で保存）のテスト。"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from database.connection_manager import release_db_file
+from database.product_purchase_db import MAX_SNAPSHOTS, ProductPurchaseDatabase, normalize_jan_in_records
+
+
+@pytest.fixture
+def db_path(tmp_path: Path):
+    path = str(tmp_path / "product_purchase.db")
+    yield path
+    release_db_file(path)
+
+
+def _records(count: int, price: int = 1000):
+    return [
+        {"SKU": f"SKU-{i:04d}", "商品名": f"商品{i}", "JAN": f"497038150{i:04d}.0", "仕入価格": price + i}
+        for i in range(count)
+    ]
+
+
+def _count(db: ProductPurchaseDatabase, table: str) -> int:
+    return db.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_roundtrip_keeps_order_duplicates_and_rows_without_sku(db_path):
+    db = ProductPurchaseDatabase(db_path=db_path)
+    data = _records(3) + [{"SKU": "SKU-0001", "商品名": "重複"}, {"商品名": "SKUなし"}, {"SKU": "", "商品名": "空"}]
+    snapshot_id = db.save_snapshot("初回", data)
+
+    snapshot = db.get_snapshot(snapshot_id)
+    assert snapshot["item_count"] == 6
+    assert [r["商品名"] for r in snapshot["data"]] == ["商品0", "商品1", "商品2", "重複", "SKUなし", "空"]
+    assert snapshot["data"][0]["JAN"] == "4970381500000"
+
+    # 並べ替え・削除・追加した版も、そのままの順で復元できる
+    changed = [data[2], data[0], {"SKU": "SKU-9999", "商品名": "追加"}, data[4]]
+    second_id = db.save_snapshot("2回目", changed)
+    assert [r["商品名"] for r in db.get_snapshot(second_id)["data"]] == ["商品2", "商品0", "追加", "SKUなし"]
+    assert len(db.get_snapshot(snapshot_id)["data"]) == 6
+
+
+def test_save_writes_only_changed_rows(db_path):
+    db = ProductPurchaseDatabase(db_path=db_path)
+    data = _records(200)
+    first_id = db.save_snapshot("初回", data)
+    assert _count(db, "product_purchase_rows") == 200
+
+    data[10] = dict(data[10], 仕入価格=1)
+    data.append({"SKU": "SKU-NEW", "商品名": "新規"})
+    del data[0]
+    second_id = db.save_snapshot("2回目", data)
+
+    changes = db.conn.execute(
+        "SELECT row_key, digest IS NULL AS deleted FROM product_purchase_snapshot_rows WHERE snapshot_id = ? "
+        "ORDER BY row_key",
+        (second_id,),
+    ).fetchall()
+    assert [(r["row_key"], r["deleted"]) for r in changes] == [("SKU-0000", 1), ("SKU-0010", 0), ("SKU-NEW", 0)]
+    # 末尾への追加・削除だけなら並び順は保存しない
+    assert db.conn.execute(
+        "SELECT row_order FROM product_purchase_snapshots WHERE id = ?", (second_id,)
+    ).fetchone()[0] is None
+    assert _count(db, "product_purchase_rows") == 202
+
+    # 変更なしの保存は差分0件
+    third_id = db.save_snapshot("3回目", data)
+    assert db.conn.execute(
+        "SELECT COUNT(*) FROM product_purchase_snapshot_rows WHERE snapshot_id = ?", (third_id,)
+    ).fetchone()[0] == 0
+
+    # 別のインスタンス（キャッシュなし）からも同じ内容で復元できる
+    other = ProductPurchaseDatabase(db_path=db_path)
+    assert other.get_snapshot(third_id)["data"] == db.get_snapshot(second_id)["data"]
+    assert len(other.get_snapshot(first_id)["data"]) == 200
+
+
+def test_rows_with_reordered_columns_or_changed_value_types_are_saved_again(db_path):
+    db = ProductPurchaseDatabase(db_path=db_path)
+    data = [{"SKU": "A", "商品名": "商品A", "仕入価格": 1000}, {"SKU": "B", "商品名": "商品B", "在庫": 1}]
+    first_id = db.save_snapshot("初回", data)
+
+    # 辞書としては等しい（列の並びと 1000 / 1000.0 / True の違いだけ）が、保存し直して新しい形で復元する
+    changed = [{"仕入価格": 1000.0, "SKU": "A", "商品名": "商品A"}, {"SKU": "B", "商品名": "商品B", "在庫": True}]
+    assert changed == data
+    second_id = db.save_snapshot("2回目", changed)
+
+    for reader in (db, ProductPurchaseDatabase(db_path=db_path)):
+        restored = reader.get_snapshot(second_id)["data"]
+        assert [list(r) for r in restored] == [list(r) for r in changed]
+        assert type(restored[0]["仕入価格"]) is float and restored[1]["在庫"] is True
+        assert reader.get_snapshot(first_id)["data"] == data
+
+
+def test_retention_compacts_old_versions_into_hidden_root(db_path):
+    db = ProductPurchaseDatabase(db_path=db_path)
+    data = _records(50)
+    expected = {}
+    for n in range(MAX_SNAPSHOTS + 5):
+        data[n] = dict(data[n], 仕入価格=n)
+        snapshot_id = db.save_snapshot(f"版{n}", data)
+        expected[snapshot_id] = [dict(r) for r in data]
+
+    listed = db.list_snapshots()
+    assert len(listed) == MAX_SNAPSHOTS
+    assert [s["snapshot_name"] for s in listed][0] == f"版{MAX_SNAPSHOTS + 4}"
+    for snapshot in listed:
+        restored = db.get_snapshot(snapshot["id"])["data"]
+        assert [r["仕入価格"] for r in restored] == [r["仕入価格"] for r in expected[snapshot["id"]]]
+
+    # 一覧外の根1件 + 保持する版。根以外の版は変更した1行だけを持つ
+    assert _count(db, "product_purchase_snapshots") == MAX_SNAPSHOTS + 1
+    assert _count(db, "product_purchase_snapshot_rows") == 50 + MAX_SNAPSHOTS
+    # 消した版にしか無かった行の内容は残らない
+    assert _count(db, "product_purchase_rows") == 50 + MAX_SNAPSHOTS
+    assert db.get_snapshot(min(expected)) is None
+
+
+def test_retention_with_two_instances_uses_current_root(db_path):
+    # 別々のインスタンス（商品画面・在庫画面など）が交互に保存しても、根の状態は DB から読む
+    a = ProductPurchaseDatabase(db_path=db_path)
+    b = ProductPurchaseDatabase(db_path=db_path)
+    data = normalize_jan_in_records(_records(5))
+    a.save_snapshot("A1", data)
+
+    data = data + [{"SKU": "SKU-ADD", "商品名": "追加"}]
+    expected = {}
+    for n in range(MAX_SNAPSHOTS + 2):
+        data = [dict(data[0], 仕入価格=n)] + data[1:]
+        expected[b.save_snapshot(f"B{n}", data)] = data
+    expected[a.save_snapshot("A2", data)] = data
+
+    listed = a.list_snapshots()
+    assert len(listed) == MAX_SNAPSHOTS
+    for snapshot in listed:
+        assert a.get_snapshot(snapshot["id"])["data"] == expected[snapshot["id"]]
+        assert b.get_snapshot(snapshot["id"])["data"] == expected[snapshot["id"]]
+
+def test_delete_snapshot_keeps_other_versions_restorable(db_path):
+    db = ProductPurchaseDatabase(db_path=db_path)
+    v1 = normalize_jan_in_records(_records(5))
+    v2 = [dict(v1[0], 仕入価格=1)] + v1[1:4]
+    v3 = list(reversed(v2)) + [{"SKU": "SKU-NEW"}]
+    ids = [db.save_snapshot(f"版{i}", data) for i, data in enumerate((v1, v2, v3))]
+
+    # 途中の版
+    assert db.delete_snapshot(ids[1]) is True
+    assert db.get_snapshot(ids[1]) is None
+    assert db.get_snapshot(ids[2])["data"] == v3
+
+    # 根の版は一覧から外れるが、子は復元できる
+    assert db.delete_snapshot(ids[0]) is True
+    assert [s["id"] for s in db.list_snapshots()] == [ids[2]]
+    assert db.get_snapshot(ids[2])["data"] == v3
+    assert db.delete_snapshot(ids[0]) is False
+
+    # 最後の版を消すと何も残らない
+    assert db.delete_snapshot(ids[2]) is True
+    assert _count(db, "product_purchase_snapshots") == 0
+    assert _count(db, "product_purchase_rows") == 0
+
+    new_id = db.save_snapshot("新規", v1)
+    assert db.get_snapshot(new_id)["item_count"] == 5
+
+
+def test_legacy_json_snapshots_are_converted(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        CREATE TABLE product_purchase_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            snapshot_name TEXT NOT NULL,
+            item_count INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    old, new = _records(4), _records(4, price=2000)
+    for name, data in (("旧1", old), ("旧2", new)):
+        conn.execute(
+            "INSERT INTO product_purchase_snapshots (snapshot_name, item_count, data) VALUES (?, ?, ?)",
+            (name, len(data), json.dumps(data, ensure_ascii=False)),
+        )
+    conn.commit()
+    conn.close()
+
+    db = ProductPurchaseDatabase(db_path=db_path)
+    assert [s["snapshot_name"] for s in db.list_snapshots()] == ["旧2", "旧1"]
+    assert db.get_snapshot(1)["data"][3]["仕入価格"] == 1003
+    assert db.get_snapshot(2)["data"][3]["仕入価格"] == 2003
+    assert db.get_snapshot(2)["data"][3]["JAN"] == "4970381500003"
+    assert db.conn.execute("SELECT COUNT(*) FROM product_purchase_snapshots WHERE data != ''").fetchone()[0] == 0
+
+    # 変換後の版に続けて差分で保存できる
+    third_id = db.save_snapshot("新", new)
+    assert db.get_snapshot(third_id)["data"] == db.get_snapshot(2)["data"]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""スキーマのマイグレーション（番号付き・1回だけ適用）のテスト。"""
+
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from database.account_title_db import AccountTitleDatabase
+from database.condition_template_db import ConditionTemplateDatabase
+from database.connection_manager import get_connection, release_db_file
+from database.ledger_db import LedgerDatabase
+from database.migrations import apply_migrations, get_schema_version
+from database.product_db import ProductDatabase
+from database.purchase_db import PurchaseDatabase
+from database.receipt_db import ReceiptDatabase
+from database.route_db import RouteDatabase
+from database.store_db import StoreDatabase
+
+DB_CLASSES = (
+    PurchaseDatabase,
+    ProductDatabase,
+    ReceiptDatabase,
+    LedgerDatabase,
+    StoreDatabase,
+    RouteDatabase,
+    AccountTitleDatabase,
+    ConditionTemplateDatabase,
+)
+
+_DDL_PREFIXES = ("CREATE", "ALTER", "DROP", "PRAGMA TABLE_INFO")
+
+
+@pytest.fixture
+def db_path(tmp_path: Path):
+    path = str(tmp_path / "hirio.db")
+    yield path
+    release_db_file(path)
+
+
+def _ddl_statements(db_path: str, action) -> list:
+    conn = get_connection(db_path)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        action()
+    finally:
+        conn.set_trace_callback(None)
+    return [s for s in statements if s.strip().upper().startswith(_DDL_PREFIXES)]
+
+
+def test_constructors_skip_ddl_once_schema_is_current(db_path):
+    first = _ddl_statements(db_path, lambda: [cls(db_path=db_path) for cls in DB_CLASSES])
+    assert first
+    conn = get_connection(db_path)
+    for component in ("purchase_db", "product_db", "store_db", "route_db"):
+        assert get_schema_version(conn, component) == 1
+
+    again = _ddl_statements(db_path, lambda: [cls(db_path=db_path) for cls in DB_CLASSES])
+    assert again == []
+
+
+def test_recorded_version_is_read_from_db_after_reopen(db_path):
+    PurchaseDatabase(db_path=db_path)
+    release_db_file(db_path)
+
+    # プロセス内の記憶は消えるが、DB内の記録で最新と分かる
+    assert _ddl_statements(db_path, lambda: PurchaseDatabase(db_path=db_path)) == []
+
+
+def test_legacy_db_gets_missing_columns_once(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE purchases (id INTEGER PRIMARY KEY AUTOINCREMENT, product_id INTEGER, "
+        "sku TEXT UNIQUE NOT NULL, purchase_date TEXT, purchase_price INTEGER, store_code TEXT, "
+        "receipt_id INTEGER, created_at DATETIME, updated_at DATETIME)"
+    )
+    conn.execute("INSERT INTO purchases (sku) VALUES ('OLD-1')")
+    conn.commit()
+    conn.close()
+
+    db = PurchaseDatabase(db_path=db_path)
+    columns = {row[1] for row in db.conn.execute("PRAGMA table_info(purchases)")}
+    assert {"tp0", "status", "listed_date"} <= columns
+    assert db.get_by_sku("OLD-1")["status"] == "ready"
+    assert get_schema_version(db.conn, "purchase_db") == 1
+
+
+def test_only_pending_migrations_run_in_order(db_path):
+    conn = get_connection(db_path)
+    calls = []
+    steps = [lambda: calls.append(1), lambda: calls.append(2)]
+
+    assert apply_migrations(conn, db_path, "demo", steps) == 2
+    assert calls == [1, 2]
+
+    steps.append(lambda: calls.append(3))
+    assert apply_migrations(conn, db_path, "demo", steps) == 3
+    assert calls == [1, 2, 3]
+    assert apply_migrations(conn, db_path, "demo", steps) is None
+    assert get_schema_version(conn, "demo") == 3
+
+
+def test_failed_migration_is_retried(db_path):
+    conn = get_connection(db_path)
+
+    def broken():
+        raise sqlite3.OperationalError("boom")
+
+    with pytest.raises(sqlite3.OperationalError):
+        apply_migrations(conn, db_path, "demo", [lambda: None, broken])
+    assert get_schema_version(conn, "demo") == 1
+    assert apply_migrations(conn, db_path, "demo", [lambda: None, lambda: None]) == 2
+
+
+def test_default_rows_are_still_seeded_per_construct(db_path):
+    db = AccountTitleDatabase(db_path=db_path)
+    db.conn.execute("DELETE FROM credit_accounts")
+    db.conn.commit()
+    AccountTitleDatabase(db_path=db_path)
+    assert db.conn.execute("SELECT COUNT(*) FROM credit_accounts").fetchone()[0] == 2
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""デスクトップ側の SKU 出品日抽出（LRU メモ）のテスト。"""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+
+from utils import sku_listing_date
+from utils.sku_listing_date import parse_listing_date_from_sku
+
+
+def test_memo_is_safe_across_threads(monkeypatch):
+    # 上限を小さくして追い出しを頻発させ、並行に参照・登録しても壊れないことを確認する
+    monkeypatch.setattr(sku_listing_date, "_MEMO_MAXSIZE", 8)
+    skus = [f"202501{d:02d}-a" for d in range(1, 29)]
+    errors = []
+
+    def worker(offset: int) -> None:
+        try:
+            for n in range(300):
+                sku = skus[(offset + n) % len(skus)]
+                assert parse_listing_date_from_sku(sku) == datetime.strptime(sku[:8], "%Y%m%d")
+        except Exception as e:  # pragma: no cover - 失敗時の報告用
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert sku_listing_date.listing_date_memo_size() <= 8
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""スナップショットの圧縮保存（ページ単位の展開）と、各スナップショットDBのテスト。"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from database.connection_manager import release_db_file
+from database.inventory_db import InventoryDatabase
+from database.inventory_route_snapshot_db import InventoryRouteSnapshotDatabase
+from database.product_purchase_db import ProductPurchaseDatabase
+from database.snapshot_store import (
+    SNAPSHOT_PAGE_ROWS,
+    CompressedSnapshotPages,
+    decode_snapshot,
+    encode_snapshot,
+)
+
+
+@pytest.fixture
+def db_path(tmp_path: Path):
+    path = str(tmp_path / "snapshots.db")
+    yield path
+    release_db_file(path)
+
+
+def _records(count: int):
+    return [
+        {"SKU": f"SKU-{i:05d}", "JAN": f"49703815{i:05d}.0", "商品名": f"商品{i}", "仕入れ価格": 1000 + i}
+        for i in range(count)
+    ]
+
+
+def test_encode_decode_roundtrip_with_missing_columns():
+    records = [
+        {"SKU": "A", "価格": 100, "メモ": None},
+        {"SKU": "B", "追加列": [1, 2]},
+        {},
+        {"価格": 1.5, "SKU": "C"},
+    ]
+    header, payload = encode_snapshot(records)
+    assert header["rows"] == 4
+    assert header["columns"] == ["SKU", "価格", "メモ", "追加列"]
+    assert decode_snapshot(header, payload) == records
+
+    header, payload = encode_snapshot([])
+    assert header["rows"] == 0 and payload == b""
+    assert decode_snapshot(header, payload) == []
+
+
+
+def test_records_keep_their_own_key_order():
+    records = [
+        {"SKU": "A", "価格": 100, "メモ": "x"},
+        {"価格": 200, "SKU": "B", "メモ": "y"},
+        {"メモ": "z", "SKU": "C"},
+        {"価格": 300, "SKU": "D", "メモ": "w"},
+        {"SKU": "E", "メモ": "v"},
+    ]
+    header, payload = encode_snapshot(records)
+    assert header["columns"] == ["SKU", "価格", "メモ"]
+    decoded = decode_snapshot(header, payload)
+    assert decoded == records
+    assert [list(r) for r in decoded] == [list(r) for r in records]
+
+def test_pages_decode_independently():
+    records = _records(SNAPSHOT_PAGE_ROWS * 2 + 7)
+    header, payload = encode_snapshot(records)
+    pages = CompressedSnapshotPages(header, payload)
+    assert len(pages) == len(records)
+    assert pages.page_count == 3
+    assert pages.page(0) == records[:SNAPSHOT_PAGE_ROWS]
+    assert pages.page(2) == records[-7:]
+    assert pages.page(3) == []
+    assert pages.to_list() == records
+    # 同じ内容なら同じハッシュ
+    assert encode_snapshot(records)[0]["hash"] == header["hash"]
+
+
+def test_inventory_snapshots_are_compressed_and_legacy_rows_converted(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        CREATE TABLE inventory_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            snapshot_name TEXT NOT NULL,
+            item_count INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    conn.execute(
+        "INSERT INTO inventory_snapshots (snapshot_name, item_count, data) VALUES (?, ?, ?)",
+        ("旧", 3, json.dumps(_records(3), ensure_ascii=False)),
+    )
+    conn.commit()
+    conn.close()
+
+    db = InventoryDatabase(db_path=db_path)
+    legacy = db.get_snapshot_by_id(1)
+    assert legacy["data"][2]["JAN"] == "4970381500002"
+    assert db.conn.execute("SELECT data FROM inventory_snapshots WHERE id = 1").fetchone()[0] == ""
+
+    snapshot_id = db.save_inventory_data("新", _records(SNAPSHOT_PAGE_ROWS + 1))
+    counts = {s["id"]: s["item_count"] for s in db.get_all_snapshots()}
+    assert counts == {1: 3, snapshot_id: SNAPSHOT_PAGE_ROWS + 1}
+    pages = db.get_snapshot_pages(snapshot_id)
+    assert pages.header["columns"] == ["SKU", "JAN", "商品名", "仕入れ価格"]
+    assert pages.page(1) == [dict(_records(SNAPSHOT_PAGE_ROWS + 1)[-1], JAN=f"49703815{SNAPSHOT_PAGE_ROWS:05d}")]
+    assert len(db.get_snapshot_by_id(snapshot_id)["data"]) == SNAPSHOT_PAGE_ROWS + 1
+    assert db.get_snapshot_pages(999) is None
+
+
+def test_route_snapshots_keep_item_count_and_overwrite(db_path):
+    db = InventoryRouteSnapshotDatabase(db_path=db_path)
+    payload = {"route": {"route_date": "2025-01-01", "route_code": "R01"}, "visits": []}
+    first_id = db.save_snapshot("1回目", _records(2), payload, route_date="2025-01-01", route_code="R01")
+    second_id = db.save_snapshot("2回目", _records(5), payload, route_date="2025-01-01", route_code="R01")
+    assert first_id == second_id
+
+    listed = db.list_snapshots()
+    assert [(s["snapshot_name"], s["item_count"]) for s in listed] == [("2回目", 5)]
+    snapshot = db.get_snapshot(first_id)
+    assert snapshot["route_data"] == payload
+    assert [r["SKU"] for r in snapshot["purchase_data"]] == [f"SKU-{i:05d}" for i in range(5)]
+    assert db.get_purchase_pages(first_id).page(0)[0]["JAN"] == "4970381500000"
+
+
+def test_product_purchase_pages_load_only_requested_rows(db_path):
+    db = ProductPurchaseDatabase(db_path=db_path)
+    records = _records(SNAPSHOT_PAGE_ROWS + 3)
+    snapshot_id = db.save_snapshot("初回", records)
+
+    pages = db.get_snapshot_pages(snapshot_id)
+    assert pages.header["rows"] == len(records)
+    assert pages.header["columns"] == ["SKU", "JAN", "商品名", "仕入れ価格"]
+    assert [r["SKU"] for r in pages.page(1)] == [r["SKU"] for r in records[-3:]]
+    assert pages.to_list() == db.get_snapshot(snapshot_id)["data"]
+
+    # 行は列名の並びIDと圧縮した値で保存する（同じ列の並びは1件）
+    assert db.conn.execute("SELECT COUNT(*) FROM product_purchase_columns").fetchone()[0] == 1
+    assert isinstance(db.conn.execute("SELECT data FROM product_purchase_rows LIMIT 1").fetchone()[0], bytes)
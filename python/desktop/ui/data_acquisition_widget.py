@@ -32,7 +32,7 @@ from desktop.database.sales_db import SalesDatabase
 
 import pandas as pd
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 
 
 class DataAcquisitionWidget(QWidget):
@@ -406,8 +406,9 @@ class DataAcquisitionWidget(QWidget):
             QMessageBox.information(self, "データなし", "SKU と出品日が取得できませんでした。")
             return
 
-        updated_products = 0
-        updated_purchases = 0
+        # 更新は SKU ごとに集め、DBごとに1トランザクションでまとめて保存する
+        product_updates: List[Dict[str, str]] = []
+        purchase_updates: List[Dict[str, str]] = []
 
         for sku, listed_date in sku_to_date.items():
             try:
@@ -416,9 +417,7 @@ class DataAcquisitionWidget(QWidget):
                 if product:
                     current = (product.get("listed_date") or "").strip()
                     if not current or current != listed_date:
-                        product_update = {"sku": sku, "listed_date": listed_date}
-                        self.product_db.upsert(product_update)
-                        updated_products += 1
+                        product_updates.append({"sku": sku, "listed_date": listed_date})
                     else:
                         self._append_log(f"[商品DB] 変更なしのためスキップ SKU={sku}")
             except Exception:
@@ -431,13 +430,15 @@ class DataAcquisitionWidget(QWidget):
                 if purchase:
                     current = (purchase.get("listed_date") or "").strip()
                     if not current or current != listed_date:
-                        self.purchase_db.upsert({"sku": sku, "listed_date": listed_date})
-                        updated_purchases += 1
+                        purchase_updates.append({"sku": sku, "listed_date": listed_date})
                     else:
                         self._append_log(f"[仕入DB] 変更なしのためスキップ SKU={sku}")
             except Exception:
                 self._append_log(f"[仕入DB] 更新失敗 SKU={sku}")
 
+        updated_products = self._upsert_listed_dates("商品DB", self.product_db, product_updates)
+        updated_purchases = self._upsert_listed_dates("仕入DB", self.purchase_db, purchase_updates)
+
         self._append_log(
             f"更新完了: 商品DB {updated_products} 件, 仕入DB {updated_purchases} 件（ファイル: {file_path}）"
         )
@@ -447,6 +448,18 @@ class DataAcquisitionWidget(QWidget):
             f"商品DB: {updated_products} 件\n仕入DB: {updated_purchases} 件\nに出品日を反映しました。",
         )
 
+    def _upsert_listed_dates(self, label: str, db, updates: List[Dict[str, str]]) -> int:
+        """出品日の更新をまとめて保存し、更新した件数を返す（失敗はログに残す）。"""
+        try:
+            results = db.upsert_many(updates)
+        except Exception as e:
+            self._append_log(f"[{label}] 更新失敗（{len(updates)} 件）: {e}")
+            return 0
+        for result in results:
+            if result["status"] == "error":
+                self._append_log(f"[{label}] 更新失敗 SKU={result['key']}")
+        return sum(1 for result in results if result["status"] != "error")
+
     # --- トランザクション取り込み実処理 ---
     def _run_transaction_import(self) -> None:
         file_path = self.transaction_file_edit.text().strip()
@@ -472,13 +485,21 @@ class DataAcquisitionWidget(QWidget):
             QMessageBox.critical(self, "エラー", f"既存販売データのクリアに失敗しました:\n{e}")
             return
 
+        # 全件を1トランザクションで挿入する（不正な行はその行だけスキップ）
+        try:
+            results = self.sales_db.insert_many(sales_rows)
+        except Exception as e:
+            QMessageBox.critical(self, "エラー", f"販売データの取り込みに失敗しました:\n{e}")
+            return
         inserted = 0
-        for row in sales_rows:
-            try:
-                self.sales_db.insert(row)
+        for result in results:
+            if result["status"] == "error":
+                row = sales_rows[result["index"]]
+                self._append_log(
+                    f"[トランザクション] 挿入失敗 SKU={row.get('sku')} order_id={row.get('order_id')} error={result['error']}"
+                )
+            else:
                 inserted += 1
-            except Exception as e:  # 個別エラーはログだけにして続行
-                self._append_log(f"[トランザクション] 挿入失敗 SKU={row.get('sku')} order_id={row.get('order_id')} error={e}")
 
         self._append_log(f"[トランザクション] 取り込み完了: {inserted} 件（ファイル: {file_path}）")
         QMessageBox.information(
@@ -7543,7 +7543,7 @@ class InventoryWidget(QWidget):
 
         lay.addWidget(QLabel("スコープ:"), 2, 2)
         self.seq_scope_combo = QComboBox()
-        self.seq_scope_combo.addItems(["day"])  # まずはdayのみ
+        self.seq_scope_combo.addItems(["day", "day_supplier"])  # 日付ごと / 日付・仕入先ごと
         self.seq_scope_combo.setFixedHeight(30)
         lay.addWidget(self.seq_scope_combo, 2, 3)
 
@@ -1171,6 +1171,8 @@ class ProductWidget(QWidget):
             return summary
 
         now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # ステータスの更新は最後にまとめて1トランザクションで保存する
+        status_updates: List[Dict[str, Any]] = []
         for sku, sold_qty in sold_qty_by_sku.items():
             purchase = self.purchase_history_db.get_by_sku(sku)
             if not purchase:
@@ -1195,12 +1197,17 @@ class ProductWidget(QWidget):
                 summary["unchanged"] += 1
                 continue
 
-            self.purchase_history_db.upsert({
+            status_updates.append({
                 "sku": sku,
                 "status": next_status,
                 "status_reason": reason,
                 "status_set_at": now_str,
             })
+
+        for result in self.purchase_history_db.upsert_many(status_updates):
+            if result["status"] == "error":
+                continue
+            next_status = status_updates[result["index"]]["status"]
             if next_status == "sold":
                 summary["updated_sold"] += 1
             elif next_status == "partially_sold":
@@ -1251,6 +1258,8 @@ class ProductWidget(QWidget):
                 if key not in existing_by_key:
                     existing_by_key[key] = s
             imported_keys = set()
+            # 新規の販売は最後にまとめて1トランザクションで挿入する
+            new_sales: List[Dict[str, Any]] = []
 
             inserted = 0
             updated = 0
@@ -1330,9 +1339,12 @@ class ProductWidget(QWidget):
                     skipped_duplicate += 1
                     continue
 
-                self.sales_db.insert(sale_payload)
+                new_sales.append(sale_payload)
                 imported_keys.add(dedupe_key)
-                inserted += 1
+
+            insert_results = self.sales_db.insert_many(new_sales)
+            inserted = sum(1 for r in insert_results if r["status"] == "inserted")
+            skipped_invalid += sum(1 for r in insert_results if r["status"] == "error")
 
             status_sync = self._sync_purchase_status_from_sales()
             self.load_sales_data()
@@ -1514,6 +1526,16 @@ class ProductWidget(QWidget):
         prog.setCancelButton(None)
         QApplication.processEvents()
 
+    def _upsert_purchase_history_rows(self, updates: List[Dict[str, Any]]) -> List[str]:
+        """TP 一括処理の結果を hirio.db へ1トランザクションで反映し、エラーを「SKU: 内容」で返す。"""
+        if not updates or not hasattr(self, "purchase_history_db"):
+            return []
+        try:
+            results = self.purchase_history_db.upsert_many(updates)
+        except Exception as e:
+            return [f"{len(updates)} 件の一括反映に失敗しました: {e}"]
+        return [f"{r['key'] or '-'}: {r['error']}" for r in results if r["status"] == "error"]
+
     def autofill_purchase_tp_from_369_rules(self) -> None:
         """
         TP0〜TP3 が空の行に、SKU と 3-6-9 改定ルールの TP 利益保持率で価格を入れる。
@@ -1553,7 +1575,7 @@ class ProductWidget(QWidget):
             total,
         )
         changed_rows = 0
-        db_errors: List[str] = []
+        db_updates: List[Dict[str, Any]] = []
         canceled = False
         update_every = max(1, min(50, total // 100 or 1))
 
@@ -1564,25 +1586,20 @@ class ProductWidget(QWidget):
             if fill_purchase_record_tp_from_369(record, config):
                 changed_rows += 1
                 sku = str(record.get("SKU") or record.get("sku") or "").strip()
-                if sku and hasattr(self, "purchase_history_db"):
-                    try:
-                        status = record.get("ステータス") or record.get("status") or "ready"
-                        reason = record.get("ステータス理由") or record.get("status_reason") or ""
-                        self.purchase_history_db.upsert({
-                            "sku": sku,
-                            "status": status,
-                            "status_reason": reason,
-                            "tp0": record.get("tp0") or record.get("TP0") or "",
-                            "tp1": record.get("tp1") or record.get("TP1") or "",
-                            "tp2": record.get("tp2") or record.get("TP2") or "",
-                            "tp3": record.get("tp3") or record.get("TP3") or "",
-                            "tp0_source": record.get("tp0_source") or "",
-                            "tp1_source": record.get("tp1_source") or "",
-                            "tp2_source": record.get("tp2_source") or "",
-                            "tp3_source": record.get("tp3_source") or "",
-                        })
-                    except Exception as e:
-                        db_errors.append(f"{sku}: {e}")
+                if sku:
+                    db_updates.append({
+                        "sku": sku,
+                        "status": record.get("ステータス") or record.get("status") or "ready",
+                        "status_reason": record.get("ステータス理由") or record.get("status_reason") or "",
+                        "tp0": record.get("tp0") or record.get("TP0") or "",
+                        "tp1": record.get("tp1") or record.get("TP1") or "",
+                        "tp2": record.get("tp2") or record.get("TP2") or "",
+                        "tp3": record.get("tp3") or record.get("TP3") or "",
+                        "tp0_source": record.get("tp0_source") or "",
+                        "tp1_source": record.get("tp1_source") or "",
+                        "tp2_source": record.get("tp2_source") or "",
+                        "tp3_source": record.get("tp3_source") or "",
+                    })
             if (i + 1) % update_every == 0 or i + 1 == total:
                 prog.setValue(i + 1)
                 prog.setLabelText(f"{i + 1} / {total} 行を処理中…")
@@ -1591,6 +1608,7 @@ class ProductWidget(QWidget):
         if not canceled:
             prog.setValue(total)
         self._tp_batch_progress_set_save_phase(prog)
+        db_errors = self._upsert_purchase_history_rows(db_updates)
 
         try:
             self.purchase_all_records_master = copy.deepcopy(self.purchase_all_records)
@@ -1674,7 +1692,7 @@ class ProductWidget(QWidget):
         changed_rows = 0
         skipped_rows = 0
         failed_rows = 0
-        db_errors: List[str] = []
+        db_updates: List[Dict[str, Any]] = []
         fail_samples: List[str] = []
         changed_records: List[Dict[str, Any]] = []
         canceled = False
@@ -1709,27 +1727,22 @@ class ProductWidget(QWidget):
                 self.apply_purchase_row_edit_to_memory(record)
             except Exception:
                 pass
-            if sku and hasattr(self, "purchase_history_db"):
-                try:
-                    status = record.get("ステータス") or record.get("status") or "ready"
-                    reason = record.get("ステータス理由") or record.get("status_reason") or ""
-                    self.purchase_history_db.upsert({
-                        "sku": sku,
-                        "status": status,
-                        "status_reason": reason,
-                        "repricing_enabled": 1,
-                        "ladder_enabled": 1,
-                        "ladder_rules": record.get("ladder_rules") or "",
-                        "tp0": "",
-                        "tp1": "",
-                        "tp2": "",
-                        "tp3": "",
-                        "sales_channel": record.get("sales_channel")
-                        or record.get("販売チャネル")
-                        or "Amazon",
-                    })
-                except Exception as e:
-                    db_errors.append(f"{sku}: {e}")
+            if sku:
+                db_updates.append({
+                    "sku": sku,
+                    "status": record.get("ステータス") or record.get("status") or "ready",
+                    "status_reason": record.get("ステータス理由") or record.get("status_reason") or "",
+                    "repricing_enabled": 1,
+                    "ladder_enabled": 1,
+                    "ladder_rules": record.get("ladder_rules") or "",
+                    "tp0": "",
+                    "tp1": "",
+                    "tp2": "",
+                    "tp3": "",
+                    "sales_channel": record.get("sales_channel")
+                    or record.get("販売チャネル")
+                    or "Amazon",
+                })
 
             changed_records.append(record)
             if changed_rows % ui_refresh_every == 0:
@@ -1746,6 +1759,7 @@ class ProductWidget(QWidget):
         if not canceled:
             prog.setValue(total)
         self._tp_batch_progress_set_save_phase(prog)
+        db_errors = self._upsert_purchase_history_rows(db_updates)
 
         try:
             self.purchase_all_records_master = copy.deepcopy(self.purchase_all_records)
@@ -1823,7 +1837,7 @@ class ProductWidget(QWidget):
             total,
         )
         cleared_rows = 0
-        db_errors: List[str] = []
+        db_updates: List[Dict[str, Any]] = []
         canceled = False
         update_every = max(1, min(50, total // 100 or 1))
 
@@ -1841,21 +1855,16 @@ class ProductWidget(QWidget):
                 cleared_rows += 1
 
             sku = str(record.get("SKU") or record.get("sku") or "").strip()
-            if sku and hasattr(self, "purchase_history_db"):
-                try:
-                    status = record.get("ステータス") or record.get("status") or "ready"
-                    reason = record.get("ステータス理由") or record.get("status_reason") or ""
-                    self.purchase_history_db.upsert({
-                        "sku": sku,
-                        "status": status,
-                        "status_reason": reason,
-                        "tp0": "",
-                        "tp1": "",
-                        "tp2": "",
-                        "tp3": "",
-                    })
-                except Exception as e:
-                    db_errors.append(f"{sku}: {e}")
+            if sku:
+                db_updates.append({
+                    "sku": sku,
+                    "status": record.get("ステータス") or record.get("status") or "ready",
+                    "status_reason": record.get("ステータス理由") or record.get("status_reason") or "",
+                    "tp0": "",
+                    "tp1": "",
+                    "tp2": "",
+                    "tp3": "",
+                })
             if (i + 1) % update_every == 0 or i + 1 == total:
                 prog.setValue(i + 1)
                 prog.setLabelText(f"{i + 1} / {total} 行を処理中…")
@@ -1864,6 +1873,7 @@ class ProductWidget(QWidget):
         if not canceled:
             prog.setValue(total)
         self._tp_batch_progress_set_save_phase(prog)
+        db_errors = self._upsert_purchase_history_rows(db_updates)
 
         try:
             self.purchase_all_records_master = copy.deepcopy(self.purchase_all_records)
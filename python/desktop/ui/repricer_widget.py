@@ -22,6 +22,11 @@ try:
 except ImportError:
     from desktop.ui.utils.draggable_file_icon import DraggableFileIconWidget  # type: ignore
 
+try:
+    from api.client import RepricerJobCancelled
+except ImportError:
+    from desktop.api.client import RepricerJobCancelled  # type: ignore
+
 try:
     from ui.utils.browser_front_scheduler import schedule_bring_browser_to_front
 except ImportError:
@@ -31,10 +36,10 @@ _PRICETAR_BROWSER_TITLE_KEYWORDS = ["pricetar", "プライスター"]
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
-import re
 from typing import Any, Dict, List, Optional
 from utils.error_handler import ErrorHandler, validate_csv_file, safe_execute
 from utils.settings_helper import get_pricetar_repricing_url
+from utils.sku_listing_date import UNKNOWN_DAYS, days_since_listed_series, parse_listing_date_from_sku
 try:
     from desktop.services.keepa_service import KeepaService
 except ImportError:
@@ -97,10 +102,12 @@ class NumericTableWidgetItem(QTableWidgetItem):
 
 
 class RepricerWorker(QThread):
-    """価格改定処理のワーカースレッド"""
+    """価格改定処理のワーカースレッド（サーバー側ジョブの進捗を受け取り、途中キャンセル可能）"""
     progress_updated = Signal(int)
+    status_updated = Signal(str)
     result_ready = Signal(dict)
     error_occurred = Signal(str)
+    cancelled = Signal()
     
     def __init__(self, csv_path, api_client, is_preview=True, mode="standard"):
         super().__init__()
@@ -108,30 +115,43 @@ class RepricerWorker(QThread):
         self.api_client = api_client
         self.is_preview = is_preview
         self.mode = mode
+        self._cancel_requested = False
+
+    def cancel(self):
+        """キャンセルを要求する（サーバー側はチャンクの区切りで中断）"""
+        self._cancel_requested = True
+        self.status_updated.emit("キャンセル中")
+
+    def _on_job_progress(self, percent: int, message: str):
+        self.progress_updated.emit(percent)
+        if message:
+            self.status_updated.emit(message)
         
     def run(self):
         """価格改定処理の実行"""
         try:
-            # 進捗更新
-            self.progress_updated.emit(10)
+            self.status_updated.emit("接続確認中")
             
             # API接続確認
             if not self.api_client.test_connection():
                 raise Exception("FastAPIサーバーに接続できません。サーバーが起動しているか確認してください。")
             
-            self.progress_updated.emit(20)
-            
-            # 実際のAPI呼び出し
-            if self.is_preview:
-                result = self.api_client.repricer_preview(self.csv_path, mode=self.mode)
-            else:
-                result = self.api_client.repricer_apply(self.csv_path, mode=self.mode)
+            # サーバー側ジョブとして実行し、実際の進捗（段階・改定済み行数）を受け取る
+            result = self.api_client.repricer_run_job(
+                self.csv_path,
+                kind="preview" if self.is_preview else "apply",
+                mode=self.mode,
+                progress_callback=self._on_job_progress,
+                is_cancelled=lambda: self._cancel_requested,
+            )
             
             self.progress_updated.emit(100)
             
             # 結果を返す
             self.result_ready.emit(result)
             
+        except RepricerJobCancelled:
+            self.cancelled.emit()
         except Exception as e:
             self.error_occurred.emit(str(e))
 
@@ -346,9 +366,14 @@ class RepricerWidget(QWidget):
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
         self.progress_bar.setMaximumHeight(25)
-        self.progress_bar.setMaximumWidth(160)
+        self.progress_bar.setMaximumWidth(260)
         file_layout.addWidget(self.progress_bar)
 
+        self.cancel_job_btn = QPushButton("中止")
+        self.cancel_job_btn.setVisible(False)
+        self.cancel_job_btn.clicked.connect(self.cancel_running_job)
+        file_layout.addWidget(self.cancel_job_btn)
+
         file_layout.addStretch()
 
         self.clear_file_btn = QPushButton("クリア")
@@ -706,9 +731,6 @@ class RepricerWidget(QWidget):
 
     def _compute_days_from_sku(self, df: pd.DataFrame):
         """SKUから日付を推定し、経過日数リストを返す（行数と同じ長さ）"""
-        days_list = []
-        today = datetime.now().date()
-
         # SKU列を探す
         sku_col_name = None
         for col in df.columns:
@@ -719,30 +741,14 @@ class RepricerWidget(QWidget):
         if sku_col_name is None:
             return [None] * len(df)
 
-        for _, row in df.iterrows():
-            sku = row.get(sku_col_name, "")
-            parsed_date = self._parse_date_from_sku(str(sku))
-            if parsed_date is None:
-                days_list.append(None)
-            else:
-                days_list.append((today - parsed_date).days)
-
-        return days_list
+        # 価格改定ロジックと同じ抽出規則で列ごとに算出（SKU単位のメモ付き）
+        days = days_since_listed_series(df[sku_col_name], datetime.now())
+        return [None if d == UNKNOWN_DAYS else int(d) for d in days.tolist()]
 
     def _parse_date_from_sku(self, sku: str):
-        """SKU文字列からYYYYMMDD形式の日付を推定して返す"""
-        if not sku:
-            return None
-
-        # 例: 20251108B01AUKUZ3G337065780003F / hmk-20251108-new-047 など
-        m = re.search(r"(20\d{2})(0[1-9]|1[0-2])(0[1-9]|[12]\d|3[01])", sku)
-        if not m:
-            return None
-        y, mth, d = m.groups()
-        try:
-            return datetime(int(y), int(mth), int(d)).date()
-        except ValueError:
-            return None
+        """SKU文字列から出品日を推定して返す（抽出できない場合は None）"""
+        parsed = parse_listing_date_from_sku(sku)
+        return parsed.date() if parsed else None
 
     def on_preview_context_menu(self, position):
         """CSVプレビューテーブルの右クリックメニュー"""
@@ -982,10 +988,32 @@ class RepricerWidget(QWidget):
         
         # ワーカースレッドの作成と実行（プレビューモード）
         self.worker = RepricerWorker(self.csv_path, self.api_client, is_preview=True, mode=self.mode)
-        self.worker.progress_updated.connect(self.progress_bar.setValue)
+        self._connect_worker_progress(self.worker)
         self.worker.result_ready.connect(self.on_preview_completed)
         self.worker.error_occurred.connect(self.on_preview_error)
+        self.worker.cancelled.connect(self.on_preview_cancelled)
         self.worker.start()
+
+    def _connect_worker_progress(self, worker: RepricerWorker) -> None:
+        """ワーカーの進捗（進捗率・段階メッセージ）を進捗バーへ反映し、中止ボタンを出す。"""
+        self.progress_bar.setFormat("%p%")
+        worker.progress_updated.connect(self.progress_bar.setValue)
+        worker.status_updated.connect(lambda message: self.progress_bar.setFormat(f"%p% {message}"))
+        self.cancel_job_btn.setEnabled(True)
+        self.cancel_job_btn.setVisible(True)
+
+    def _finish_worker_progress(self) -> None:
+        """進捗バーと中止ボタンを隠す。"""
+        self.progress_bar.setVisible(False)
+        self.progress_bar.setFormat("%p%")
+        self.cancel_job_btn.setVisible(False)
+
+    def cancel_running_job(self):
+        """実行中の価格改定ジョブを中止する"""
+        worker = getattr(self, "worker", None)
+        if isinstance(worker, RepricerWorker) and worker.isRunning():
+            self.cancel_job_btn.setEnabled(False)
+            worker.cancel()
         
     def show_csv_preview(self):
         """CSVファイルの内容プレビュー"""
@@ -1651,7 +1679,7 @@ class RepricerWidget(QWidget):
         """プレビュー完了時の処理"""
         result = self._apply_manual_overrides_to_result(result)
         self.repricing_result = result
-        self.progress_bar.setVisible(False)
+        self._finish_worker_progress()
         self.preview_btn.setEnabled(True)
         self.keepa_fetch_btn.setEnabled(True)
         
@@ -1670,10 +1698,16 @@ class RepricerWidget(QWidget):
         
     def on_preview_error(self, error_message):
         """プレビューエラー時の処理"""
-        self.progress_bar.setVisible(False)
+        self._finish_worker_progress()
         self.preview_btn.setEnabled(True)
         
         QMessageBox.critical(self, "エラー", f"プレビューに失敗しました:\n{error_message}")
+
+    def on_preview_cancelled(self):
+        """プレビュー中止時の処理"""
+        self._finish_worker_progress()
+        self.preview_btn.setEnabled(True)
+        QMessageBox.information(self, "中止", "価格改定プレビューを中止しました")
             
     def execute_repricing(self):
         """価格改定の実行"""
@@ -1700,16 +1734,17 @@ class RepricerWidget(QWidget):
         
         # ワーカースレッドの作成と実行（実行モード）
         self.worker = RepricerWorker(self.csv_path, self.api_client, is_preview=False, mode=self.mode)
-        self.worker.progress_updated.connect(self.progress_bar.setValue)
+        self._connect_worker_progress(self.worker)
         self.worker.result_ready.connect(self.on_repricing_completed)
         self.worker.error_occurred.connect(self.on_repricing_error)
+        self.worker.cancelled.connect(self.on_repricing_cancelled)
         self.worker.start()
         
     def on_repricing_completed(self, result):
         """価格改定完了時の処理"""
         result = self._apply_manual_overrides_to_result(result)
         self.repricing_result = result
-        self.progress_bar.setVisible(False)
+        self._finish_worker_progress()
         self.execute_btn.setEnabled(True)
         self.save_btn.setEnabled(True)
         self.keepa_fetch_btn.setEnabled(True)
@@ -1736,10 +1771,16 @@ class RepricerWidget(QWidget):
         
     def on_repricing_error(self, error_message):
         """価格改定エラー時の処理"""
-        self.progress_bar.setVisible(False)
+        self._finish_worker_progress()
         self.execute_btn.setEnabled(True)
         
         QMessageBox.critical(self, "エラー", f"価格改定に失敗しました:\n{error_message}")
+
+    def on_repricing_cancelled(self):
+        """価格改定中止時の処理"""
+        self._finish_worker_progress()
+        self.execute_btn.setEnabled(True)
+        QMessageBox.information(self, "中止", "価格改定を中止しました")
         
     def update_result_table(self, result):
         """結果テーブルの更新"""
@@ -279,6 +279,29 @@ class SettingsWidget(QWidget):
         dir_layout.addWidget(result_browse_btn, 1, 2)
         
         layout.addWidget(dir_group)
+
+        # サーバー計測（GET /metrics/summary）
+        metrics_group = QGroupBox("サーバー計測")
+        metrics_layout = QVBoxLayout(metrics_group)
+        self.metrics_table = QTableWidget(0, 6)
+        self.metrics_table.setHorizontalHeaderLabels(["対象", "件数", "平均(ms)", "p95(ms)", "最大(ms)", "平均応答サイズ"])
+        self.metrics_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.metrics_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.metrics_table.setMinimumHeight(180)
+        metrics_layout.addWidget(self.metrics_table)
+        self.metrics_status_label = QLabel("「更新」でAPIサーバーの処理時間を取得します")
+        self.metrics_status_label.setStyleSheet("color: #666;")
+        metrics_layout.addWidget(self.metrics_status_label)
+        metrics_btn_layout = QHBoxLayout()
+        refresh_metrics_btn = QPushButton("更新")
+        refresh_metrics_btn.clicked.connect(self.refresh_server_metrics)
+        metrics_btn_layout.addWidget(refresh_metrics_btn)
+        reset_metrics_btn = QPushButton("リセット")
+        reset_metrics_btn.clicked.connect(self.reset_server_metrics)
+        metrics_btn_layout.addWidget(reset_metrics_btn)
+        metrics_btn_layout.addStretch()
+        metrics_layout.addLayout(metrics_btn_layout)
+        layout.addWidget(metrics_group)
         
         layout.addStretch()
         parent.addTab(api_widget, "API設定")
@@ -1358,6 +1381,45 @@ PySide6 バージョン: {__import__('PySide6').__version__}
         finally:
             self.api_client.base_url = original_url
 
+    def refresh_server_metrics(self):
+        """サーバー計測の表示を更新（ルート別 → 処理段階別の順、合計時間の大きい順）"""
+        summary = self.api_client.get_server_metrics()
+        if summary is None:
+            self.metrics_status_label.setText("計測値を取得できませんでした（APIサーバーが起動しているか確認してください）")
+            return
+        rows = [
+            (f"{r['method']} {r['route']}", r["count"], r["avg"], r["p95"], r["max"], r.get("response_bytes_avg"))
+            for r in summary.get("routes", [])
+        ] + [
+            (f"  └ {r['stage']}", r["count"], r["avg"], r["p95"], r["max"], None)
+            for r in summary.get("stages", [])
+        ]
+        self.metrics_table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, value in enumerate(row):
+                if value is None:
+                    text = ""
+                elif j == 5:
+                    text = f"{value / 1024:,.1f} KB"
+                elif isinstance(value, float):
+                    text = f"{value:,.1f}"
+                else:
+                    text = str(value)
+                item = QTableWidgetItem(text)
+                if j > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.metrics_table.setItem(i, j, item)
+        self.metrics_status_label.setText(
+            f"計測開始: {summary.get('since', '')}（{datetime.now().strftime('%H:%M:%S')} 更新）"
+        )
+
+    def reset_server_metrics(self):
+        """サーバー計測値をリセット"""
+        if self.api_client.reset_server_metrics():
+            self.refresh_server_metrics()
+        else:
+            self.metrics_status_label.setText("リセットできませんでした（APIサーバーが起動しているか確認してください）")
+
     def test_maps_api_key(self):
         """Google Maps APIキーの接続テスト"""
         try:
@@ -8,6 +8,11 @@ import sqlite3
 from datetime import datetime
 from pathlib import Path
 
+try:
+    from database.connection_manager import release_db_file
+except ImportError:
+    from desktop.database.connection_manager import release_db_file  # type: ignore
+
 
 def is_valid_sqlite_db(path: Path) -> bool:
     """SQLite ファイルかどうかを確認する。"""
@@ -41,6 +46,7 @@ def init_empty_hirio_db(db_path: str) -> None:
     """空の hirio.db を各DBクラスのスキーマ初期化で作成する。"""
     path = Path(db_path)
     path.parent.mkdir(parents=True, exist_ok=True)
+    release_db_file(str(path))
     if path.is_file():
         path.unlink()
 
@@ -86,6 +92,7 @@ def backup_invalid_db_file(path: Path) -> Path | None:
     """破損DBを退避する。リネームできない場合はコピー後に削除を試みる。"""
     if not path.is_file():
         return None
+    release_db_file(str(path))
     stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     backup = path.with_name(f"{path.name}.corrupt.{stamp}.bak")
     try:
@@ -1,13 +1,20 @@
 from fastapi import APIRouter, UploadFile, File
-from core.csv_utils import read_csv_with_fallback
+from core.csv_utils import ingest_csv_bytes, read_csv_with_fallback
 
 router = APIRouter(prefix="/csv", tags=["csv"])
 
 @router.post("/inspect")
 async def inspect(file: UploadFile = File(...)):
     content = await file.read()
-    df = read_csv_with_fallback(content)
-    return {"columns": list(df.columns), "rows": int(len(df))}
+    result = ingest_csv_bytes(content, arrow_strings=True)
+    return {
+        "columns": list(result.df.columns),
+        "rows": int(len(result.df)),
+        "encoding": result.encoding,
+        "bom": result.bom,
+        "engine": result.engine,
+        "bad_lines": [bad._asdict() for bad in result.bad_lines],
+    }
 
 @router.post("/normalize")
 async def normalize(file: UploadFile = File(...)):
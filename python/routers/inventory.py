@@ -4,9 +4,11 @@ inventory.py
 
 作成日: 2025-10-06
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Body
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Body, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import StreamingResponse, Response
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
 import io
 import pandas as pd
 import math
@@ -14,6 +16,9 @@ import json
 from pathlib import Path
 
 from services.inventory_service import InventoryService
+from services.sku_template import invalidate_sku_settings
+from services.job_queue import Job, job_queue
+from routers.jobs import job_accepted_response
 from services.inventory_store_matching import (
     InventoryStoreMatchingError,
     match_stores_from_purchase_data,
@@ -79,16 +84,26 @@ async def generate_single_sku(request: SKUGenerationRequest):
 
 
 @router.post("/generate-sku-bulk", response_model=BulkSKUGenerationResponse)
-async def generate_bulk_sku(request: BulkSKUGenerationRequest):
+async def generate_bulk_sku(
+    request: BulkSKUGenerationRequest,
+    run_async: bool = Query(default=False, alias="async"),
+):
     """
     一括SKU生成（アップロードされた全商品）
+    async=true の場合はジョブとして登録して 202 を返す（結果は GET /jobs/{job_id}/result）
     """
-    # Delegate to InventoryService class（オプションでSKU日付を指定可能）
-    response_data = InventoryService.generate_sku_bulk(
-        request.products,
-        sku_date=request.sku_date,
-    )
-    return BulkSKUGenerationResponse(**response_data)
+    def generate() -> BulkSKUGenerationResponse:
+        # Delegate to InventoryService class（オプションでSKU日付を指定可能）
+        response_data = InventoryService.generate_sku_bulk(
+            request.products,
+            sku_date=request.sku_date,
+        )
+        return BulkSKUGenerationResponse(**response_data)
+
+    if run_async:
+        job = job_queue.submit(Job("inventory.generate_sku_bulk"), lambda j: jsonable_encoder(generate()))
+        return job_accepted_response(job)
+    return generate()
 
 
 @router.post("/process-listing", response_model=ProcessListingResponse)
@@ -104,73 +119,107 @@ async def process_listing(request: ProcessListingRequest):
 
 
 @router.post("/export-listing-csv")
-async def export_listing_csv(request: ProcessListingRequest):
+async def export_listing_csv(
+    request: ProcessListingRequest,
+    run_async: bool = Query(default=False, alias="async"),
+):
     """
     出品用CSV直接ダウンロード
     
     商品データから出品用CSVを生成して返却（Shift-JIS）
+    async=true の場合はジョブとして登録し、CSV は GET /jobs/{job_id}/result で受け取る
     """
     try:
         if not request.products:
             raise HTTPException(status_code=400, detail="商品データがありません")
-        
-        # 出品用CSV生成
-        csv_bytes = InventoryService.generate_listing_csv_content(request.products)
-        
-        # HTTPレスポンスとして返却
-        return Response(
-            content=csv_bytes,
-            media_type="text/csv; charset=Shift_JIS",
-            headers={
-                "Content-Disposition": "attachment; filename=listing_export.csv"
-            }
-        )
+
+        def export() -> Response:
+            # 出品用CSV生成
+            csv_bytes = InventoryService.generate_listing_csv_content(request.products)
+
+            # HTTPレスポンスとして返却
+            return Response(
+                content=csv_bytes,
+                media_type="text/csv; charset=Shift_JIS",
+                headers={
+                    "Content-Disposition": "attachment; filename=listing_export.csv"
+                }
+            )
+
+        if run_async:
+            return job_accepted_response(job_queue.submit(Job("inventory.export_listing"), lambda j: export()))
+        return export()
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"出品CSV生成エラー: {str(e)}")
 
+def _match_stores_preview(
+    df: pd.DataFrame,
+    stats: Dict[str, Any],
+    route_summary_id: int,
+    time_tolerance_minutes: int,
+    cancel_check: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    """読込済みの仕入CSVをルートと照合し、仕入先へ店舗コードを付与したプレビューを返す"""
+    # 仕入日時カラムの推定
+    purchase_date_candidates = ["仕入れ日", "purchaseDate", "purchase_date"]
+    purchase_date_col = next((c for c in purchase_date_candidates if c in df.columns), None)
+    if not purchase_date_col:
+        raise HTTPException(status_code=400, detail="仕入れ日カラムが見つかりません（例: 仕入れ日, purchaseDate）")
+
+    # 仕入先カラム（なければ作成）
+    supplier_candidates = ["仕入先", "supplier"]
+    supplier_col = next((c for c in supplier_candidates if c in df.columns), None)
+    if not supplier_col:
+        supplier_col = "仕入先"
+        df[supplier_col] = ""
+
+    result = match_stores_from_purchase_data(
+        purchase_data=df.to_dict(orient="records"),
+        route_summary_id=route_summary_id,
+        time_tolerance_minutes=time_tolerance_minutes,
+        db_path=get_hirio_db_path_for_api(),
+        cancel_check=cancel_check,
+    )
+    preview = result["data"][:10]
+    return {
+        "status": "success",
+        "stats": {**stats, "matched_rows": result["stats"]["matched_rows"]},
+        "preview": preview,
+    }
+
+
 @router.post("/match-stores")
 async def match_stores_with_route(
     file: UploadFile = File(...),
     route_summary_id: int = Form(...),
-    time_tolerance_minutes: int = Form(30)
+    time_tolerance_minutes: int = Form(30),
+    run_async: bool = Query(default=False, alias="async"),
 ):
     """
     仕入CSVの仕入れ日時を参照し、指定ルートの店舗IN/OUTの間にある場合は
     仕入先へ店舗コードを自動付与してプレビューを返却する。
+    async=true の場合はジョブとして登録して 202 を返す（照合ループの商品ごとにキャンセルできる）
     """
     try:
         content = await file.read()
 
+        if run_async:
+            def work(job: Job) -> Dict[str, Any]:
+                # CSV読込・正規化（既存）
+                df, stats = asyncio.run(InventoryService.process_inventory_csv(content))
+                job.check_cancelled()
+                try:
+                    return _match_stores_preview(df, stats, route_summary_id, time_tolerance_minutes, job.check_cancelled)
+                except InventoryStoreMatchingError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+
+            return job_accepted_response(job_queue.submit(Job("inventory.match_stores"), work))
+
         # CSV読込・正規化（既存）
         df, stats = await InventoryService.process_inventory_csv(content)
-
-        # 仕入日時カラムの推定
-        purchase_date_candidates = ["仕入れ日", "purchaseDate", "purchase_date"]
-        purchase_date_col = next((c for c in purchase_date_candidates if c in df.columns), None)
-        if not purchase_date_col:
-            raise HTTPException(status_code=400, detail="仕入れ日カラムが見つかりません（例: 仕入れ日, purchaseDate）")
-
-        # 仕入先カラム（なければ作成）
-        supplier_candidates = ["仕入先", "supplier"]
-        supplier_col = next((c for c in supplier_candidates if c in df.columns), None)
-        if not supplier_col:
-            supplier_col = "仕入先"
-            df[supplier_col] = ""
-
-        result = match_stores_from_purchase_data(
-            purchase_data=df.to_dict(orient="records"),
-            route_summary_id=route_summary_id,
-            time_tolerance_minutes=time_tolerance_minutes,
-            db_path=get_hirio_db_path_for_api(),
-        )
-        preview = result["data"][:10]
-        return {
-            "status": "success",
-            "stats": {**stats, "matched_rows": result["stats"]["matched_rows"]},
-            "preview": preview,
-        }
+        return _match_stores_preview(df, stats, route_summary_id, time_tolerance_minutes)
     except InventoryStoreMatchingError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
@@ -216,6 +265,7 @@ async def update_sku_template_settings(payload: Dict[str, Any]):
             "seqScope": payload.get("seqScope", "day"),
             "seqStart": int(payload.get("seqStart", 1))
         }, ensure_ascii=False, indent=2), encoding="utf-8")
+        invalidate_sku_settings()
         return {"status": "success"}
     except HTTPException:
         raise
@@ -226,19 +276,33 @@ async def update_sku_template_settings(payload: Dict[str, Any]):
 async def match_stores_from_data(
     purchase_data: List[Dict[str, Any]] = Body(...),
     route_summary_id: int = Body(...),
-    time_tolerance_minutes: int = Body(30)
+    time_tolerance_minutes: int = Body(30),
+    run_async: bool = Query(default=False, alias="async"),
 ):
     """
     仕入データ（JSON）とルートサマリーを照合して店舗コードを自動付与
     CSVファイルではなく、フロントエンドから送信されたJSONデータを処理
+    async=true の場合はジョブとして登録して 202 を返す
     """
     try:
-        return match_stores_from_purchase_data(
-            purchase_data=purchase_data,
-            route_summary_id=route_summary_id,
-            time_tolerance_minutes=time_tolerance_minutes,
-            db_path=get_hirio_db_path_for_api(),
-        )
+        def match(cancel_check: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+            return match_stores_from_purchase_data(
+                purchase_data=purchase_data,
+                route_summary_id=route_summary_id,
+                time_tolerance_minutes=time_tolerance_minutes,
+                db_path=get_hirio_db_path_for_api(),
+                cancel_check=cancel_check,
+            )
+
+        if run_async:
+            def work(job: Job) -> Dict[str, Any]:
+                try:
+                    return match(job.check_cancelled)
+                except InventoryStoreMatchingError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+
+            return job_accepted_response(job_queue.submit(Job("inventory.match_stores"), work))
+        return match()
     except InventoryStoreMatchingError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
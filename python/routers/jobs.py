@@ -0,0 +1,74 @@
+"""
+バックグラウンドジョブAPI
+
+各エンドポイントの async=true で登録したジョブ（services.job_queue）の
+一覧・状態・結果の取得とキャンセル。
+"""
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
+
+from core.json_response import FastJSONResponse
+from services.job_queue import Job, job_queue
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def job_accepted_response(job: Job) -> JSONResponse:
+    """async=true で登録したジョブの 202 レスポンス（状態・結果の取得先URL付き）"""
+    return JSONResponse(
+        status_code=202,
+        content={
+            **job.snapshot(),
+            "status_url": f"/jobs/{job.job_id}",
+            "result_url": f"/jobs/{job.job_id}/result",
+        },
+    )
+
+
+def _get_job_or_404(job_id: str) -> Job:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"ジョブが見つかりません（期限切れの可能性があります）: {job_id}")
+    return job
+
+
+@router.get("")
+def list_jobs(
+    job_type: Optional[str] = Query(default=None, description="例: repricer / repricer.apply / inventory.match_stores"),
+    status: Optional[str] = Query(default=None),
+):
+    """保持中のジョブ一覧（登録順）"""
+    jobs = [job.snapshot() for job in job_queue.list_jobs(job_type)]
+    if status:
+        jobs = [job for job in jobs if job["status"] == status]
+    return {"jobs": jobs}
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """ジョブの状態（queued / running / done / error / cancelled と進捗）"""
+    return _get_job_or_404(job_id).snapshot()
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str):
+    """完了したジョブの結果（同期版のエンドポイントと同じ形式。失敗時も同期版と同じステータス）"""
+    job = _get_job_or_404(job_id)
+    if job.status == "error":
+        raise HTTPException(status_code=job.error_status or 500, detail=job.error or "ジョブが失敗しました")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"ジョブは完了していません（status={job.status}）")
+    if isinstance(job.result, Response):
+        return job.result
+    return FastJSONResponse(job.result)
+
+
+@router.delete("/{job_id}")
+def cancel_job(job_id: str):
+    """ジョブのキャンセルを要求する（順番待ちなら即座に、実行中なら処理の区切りで中断）"""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"ジョブが見つかりません: {job_id}")
+    return job.snapshot()
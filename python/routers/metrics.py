@@ -0,0 +1,32 @@
+"""
+計測API
+
+core.metrics が記録したルートごとの処理時間・サイズと処理段階ごとの時間を返す。
+- GET /metrics: Prometheus テキスト形式
+- GET /metrics/summary: 設定タブ表示用の JSON
+- DELETE /metrics: 計測値をリセット
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core.metrics import metrics
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+@router.get("/summary")
+def metrics_summary():
+    return metrics.summary()
+
+
+@router.delete("")
+def reset_metrics():
+    metrics.reset()
+    return {"success": True}
@@ -1,16 +1,34 @@
 from fastapi import APIRouter, UploadFile, File, Body, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, Optional, Literal, Any
 import asyncio
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import io, csv, os
+import itertools
+import math
+import shutil
+import tempfile
+from pathlib import Path
 import re
 from services.repricer_weekly import apply_repricing_rules, preprocess_dataframe
+from services.repricer_config import get_compiled_config, invalidate_compiled_config
+from services.repricer_result_cache import build_cache_key, result_cache
+from services.repricer_stream import DEFAULT_STREAM_CHUNK_SIZE, UnionColumnCsvWriter, iter_repriced_chunks
+from services.repricer_jobs import DEFAULT_JOB_CHUNK_SIZE, RepricerJob, job_manager, run_chunked_repricing
+from services.repricer_incremental import apply_repricing_rules_incremental
+from services.repricer_simulate import simulate_price_trajectories
+from services.repricer_parallel import apply_repricing_rules_parallel
+from services.repricer_artifacts import RetentionPolicy, artifact_store
+from routers.jobs import job_accepted_response
+from utils.sku_listing_date import parse_listing_date_from_sku
 from core.config import BASE_DIR
 BASE_DIR_TMP = BASE_DIR / "python" / "tmp"
 from core.csv_utils import read_csv_with_fallback, normalize_dataframe_for_cp932
+from core.json_response import FastJSONResponse, dataframe_records_json
+from core.metrics import stage_span
 from utils.csv_io import write_listing_csv_from_dataframe, write_repricer_csv
 import numpy as np
 
@@ -85,11 +103,37 @@ def _get_len(obj, key: str) -> int:
     except Exception:
         return 0
 
-def _rebuild_report_csv_with_trace(items: list) -> str:
+def _clean_json_value(value):
+    """JSONにシリアライズできない値（NaN・Infinity）を0に変換"""
+    if isinstance(value, (int, float)):
+        if math.isnan(value):
+            return 0
+        if math.isinf(value):
+            return 0
+    return value
+
+def _clean_item_for_json(item):
+    """アイテム（dict）内の数値をクリーンアップ（ネストした dict / list も対象）"""
+    if isinstance(item, dict):
+        cleaned = {}
+        for key, value in item.items():
+            if isinstance(value, (int, float)):
+                cleaned[key] = _clean_json_value(value)
+            elif isinstance(value, dict):
+                cleaned[key] = _clean_item_for_json(value)
+            elif isinstance(value, list):
+                cleaned[key] = [_clean_item_for_json(v) if isinstance(v, dict) else _clean_json_value(v) if isinstance(v, (int, float)) else v for v in value]
+            else:
+                cleaned[key] = value
+        return cleaned
+    return item
+
+def _rebuild_report_csv_with_trace(items: list, include_header: bool = True) -> str:
     buf = io.StringIO()
     # Always quote and use CRLF to avoid Excel column shifts
     w = csv.writer(buf, lineterminator="\r\n", quoting=csv.QUOTE_ALL)
-    w.writerow(["sku", "days", "action", "reason", "price", "new_price", "trace"])
+    if include_header:
+        w.writerow(["sku", "days", "action", "reason", "price", "new_price", "trace"])
     for it in (items or []):
         rf = _read_field
         sku = (rf(it, "sku") or "")
@@ -102,6 +146,90 @@ def _rebuild_report_csv_with_trace(items: list) -> str:
         w.writerow([sku, days, action, reason, price, new_price, trace])
     return buf.getvalue()
 
+def _format_updated_for_repricer(base_df: pd.DataFrame):
+    """
+    updated_df をプライスター取込フォーマット（列順・整数表記・テキスト列）へ整形する。
+    Returns: (formatted_df, desired_cols)
+    """
+    # 入力CSV互換のための正規化（文字化け/列崩れ対策・決定版）
+    base_df = normalize_dataframe_for_cp932(base_df)
+
+    # Map and derive fields
+    if "new_price" in base_df.columns:
+        base_df["price"] = base_df["new_price"]
+    if "new_priceTrace" in base_df.columns:
+        base_df["priceTrace"] = base_df["new_priceTrace"]
+    # number はそのまま
+    if "number" not in base_df.columns:
+        base_df["number"] = 1
+
+    # 出力列（conditionNoteをJ列に追加、priceTraceを保持）
+    desired_cols = [
+        "SKU", "ASIN", "title", "number", "price", "cost", "akaji", "takane",
+        "condition", "conditionNote", "priceTrace", "leadtime", "amazon-fee", "shipping-price", "profit", "add-delete",
+    ]
+    # Keep only desired columns in correct order (fill missing with empty string)
+    for col in desired_cols:
+        if col not in base_df.columns:
+            base_df[col] = ""
+    formatted_df = base_df[desired_cols]
+
+    # Format numeric columns as integer-like strings (no trailing .0)
+    num_cols = ["number", "price", "cost", "akaji", "takane", "condition", "priceTrace", "leadtime", "amazon-fee", "shipping-price", "profit"]
+    for col in num_cols:
+        if col in formatted_df.columns:
+            try:
+                formatted_df[col] = pd.to_numeric(formatted_df[col], errors="coerce").fillna(0).astype(int).astype(str)
+            except Exception:
+                formatted_df[col] = formatted_df[col].astype(str)
+
+    # Force text columns to Excel-safe formula style ="..." (to match historical files)
+    excel_text_cols = ["SKU", "ASIN", "title"]
+    for col in excel_text_cols:
+        if col in formatted_df.columns:
+            def _wrap(v: str) -> str:
+                v = "" if v is None else str(v)
+                # 既に ="..." ならそのまま
+                if v.startswith('="') and v.endswith('"'):
+                    return v
+                # 内部の"は2重化（CSVライタがさらに適切に処理）
+                v_escaped = v.replace('"', '""')
+                return f'="{v_escaped}"'
+            formatted_df[col] = formatted_df[col].apply(_wrap)
+
+    # conditionNote を空文字で追加（J列）
+    if 'conditionNote' not in formatted_df.columns:
+        formatted_df['conditionNote'] = ""
+
+    # desired_colsのみに絞り直し（念のため）
+    formatted_df = formatted_df[desired_cols]
+
+    # leadtime を空白に（0ではなく空文字）
+    if 'leadtime' in formatted_df.columns:
+        formatted_df['leadtime'] = ""
+
+    # ="..." 形式を除去（念のため）
+    for col in formatted_df.columns:
+        if formatted_df[col].dtype == 'object':
+            formatted_df[col] = (formatted_df[col]
+                                 .astype(str)
+                                 .str.replace(r'^=\"', '', regex=True)
+                                 .str.replace(r'\"$', '', regex=True))
+    return formatted_df, desired_cols
+
+def _strip_formula_cells(df: pd.DataFrame) -> pd.DataFrame:
+    """全セルから ="..." 形式を除去したコピーを返す（CSV出力直前の最終防衛ライン）"""
+    def remove_formula_from_cell(x):
+        """セル値から ="..." を除去"""
+        if isinstance(x, str) and x.startswith('="') and x.endswith('"'):
+            return x[2:-1]  # =" と " を除去
+        return x
+
+    cleaned = df.copy()
+    for col in cleaned.columns:
+        cleaned[col] = cleaned[col].apply(remove_formula_from_cell)
+    return cleaned
+
 router = APIRouter(prefix="/repricer", tags=["repricer"])
 
 CONFIG_PATH = BASE_DIR / "config" / "reprice_rules.json"
@@ -145,16 +273,40 @@ def _normalize_mode(mode: Optional[str]) -> str:
     return "369" if str(mode or "").strip() == "369" else "standard"
 
 
-def _apply_repricing_from_csv_bytes(content: bytes, mode: Optional[str]):
+def _apply_repricing_from_csv_bytes(
+    content: bytes, mode: Optional[str], incremental: bool = False, workers: int = 0, debug: bool = False
+):
     """
     CSV読込〜前処理〜ルール適用（同期処理）。
     asyncio.to_thread から呼び、イベントループを塞がない。
+    結果は result_cache に保持し、同じCSV・設定・仕入DB・実行日なら再計算しない。
+    incremental=True の場合は前回実行から変わった SKU だけを再評価する（結果は一括改定と同じ）。
+    workers が 2 以上の場合は行範囲を分割してプロセス並列で改定する（結果は一括改定と同じ）。
+    debug=True の場合は前処理の診断ログを出力する。
     """
-    df = read_csv_with_fallback(content)
+    normalized_mode = _normalize_mode(mode)
+    today = datetime.now()
+    # 同じCSVの preview → apply では、プレビュー時の結果を再利用する
+    cache_key = build_cache_key(content, normalized_mode, today)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    with stage_span("repricer.read_csv"):
+        df = read_csv_with_fallback(content)
     if df is None or df.empty:
         raise ValueError("CSV_EMPTY")
-    df = preprocess_dataframe(df)
-    return apply_repricing_rules(df, today=datetime.now(), mode=_normalize_mode(mode))
+    with stage_span("repricer.preprocess"):
+        df = preprocess_dataframe(df, debug=debug)
+    with stage_span("repricer.rules"):
+        if incremental:
+            outputs = apply_repricing_rules_incremental(df, today=today, mode=normalized_mode)
+        elif workers > 1:
+            outputs = apply_repricing_rules_parallel(df, today, mode=normalized_mode, workers=workers)
+        else:
+            outputs = apply_repricing_rules(df, today=today, mode=normalized_mode)
+    result_cache.put(cache_key, outputs)
+    return outputs
 
 
 # --- Config Endpoints ---
@@ -246,13 +398,311 @@ def update_config(config: RepriceConfig = Body(...), mode: Optional[str] = Query
             output_data["alerts"] = existing_data.get("alerts", output_data.get("alerts", {"enabled": True, "reason_prefix": "ALERT"}))
         with open(CONFIG_PATH, "w", encoding="utf-8") as f:
             json.dump(output_data, f, indent=2, default=str)
+        # mtime 判定を待たず、次回の preview/apply で確実に再コンパイルさせる
+        invalidate_compiled_config()
         return config
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to write config file: {e}")
 
+@router.get("/cache/stats")
+def get_cache_stats():
+    """preview/apply 共有の改定結果キャッシュの統計（ヒット・ミス・追い出し件数など）"""
+    return result_cache.stats()
+
+def _dataframe_to_cp932_csv(df: pd.DataFrame) -> bytes:
+    """出力CSV（cp932・CRLF・全項目クォート。変換できない文字は ? に置換）"""
+    return df.to_csv(index=False, lineterminator="\r\n", quoting=csv.QUOTE_ALL).encode("cp932", errors="replace")
+
+
+def _artifact_file_urls(run_id: str, kinds) -> Dict[str, str]:
+    """run の出力ファイルのダウンロードURL"""
+    return {kind: f"/repricer/runs/{run_id}/files/{kind}" for kind in kinds}
+
+
+# --- Response builders ---
+# apply で priceTraceChange が空の行に入れる表示ラベル
+_APPLY_TRACE_LABEL = "FBA譛螳牙､"
+
+
+def _build_preview_response(outputs) -> Dict[str, Any]:
+    """preview のレスポンス（summary + JSON化済み items）を作る。FastJSONResponse で返すこと"""
+    row_count = _get_len(outputs, "updated_df") + _get_len(outputs, "excluded_df")
+    print(f"[DEBUG] 価格改定ルール適用完了（概算行数={row_count}）")
+
+    # ---- safe summary (no-attr errors) ----
+    print("[DEBUG] サマリー生成開始...")
+    summary = {
+        'updated_rows': _get_len(outputs, 'updated_df'),
+        'excluded_rows': _get_len(outputs, 'excluded_df'),
+        'q4_switched': _get_len(outputs, 'q4_switched_df'),
+        'date_unknown': _get_len(outputs, 'date_unknown_df'),
+        'log_rows': _get_len(outputs, 'log_df'),
+    }
+    print(f"[DEBUG] サマリー: {summary}")
+
+    # outputs.items を直接使用
+    print("[DEBUG] items取得開始...")
+    items = outputs.items if hasattr(outputs, 'items') else []
+    print(f"[DEBUG] items取得完了: 件数={len(items)}")
+
+    # JSONにシリアライズできない値（Infinity、NaN）は 0 にする。
+    # items は log_df の行そのものなので、log_df から直接 JSON 化する（行ごとの dict を走査しない）
+    print("[DEBUG] itemsのJSON化開始...")
+    log_df = getattr(outputs, "log_df", None)
+    if isinstance(log_df, pd.DataFrame) and len(log_df) == len(items):
+        cleaned_items = dataframe_records_json(log_df, non_finite=0)
+    else:
+        cleaned_items = [_clean_item_for_json(item) for item in items]
+    print(f"[DEBUG] itemsのJSON化完了: {len(items)}件")
+
+    print("[DEBUG] レスポンス返却開始...")
+    return {
+        "summary": summary,
+        "items": cleaned_items
+    }
+
+
+def _build_apply_response(outputs, mode: str = "standard") -> Dict[str, Any]:
+    """
+    apply のレスポンスを作る（updated / excluded / log / report CSV は出力保管庫へ
+    バックグラウンドで保存し、レポートCSV・プライスター取込CSVを base64 で同梱）
+    """
+    _fill_price_trace_change_on_items(outputs, trace_label=_APPLY_TRACE_LABEL)
+    run_id = artifact_store.new_run_id()
+
+    # Build report CSV with trace information
+    items = outputs.get("items") if isinstance(outputs, dict) else getattr(outputs, "items", [])
+
+    # JSONにシリアライズできない値（Infinity、NaN）をクリーンアップ
+    print("[DEBUG] apply: itemsの数値検証開始...")
+    cleaned_items = [_clean_item_for_json(item) for item in items]
+    print(f"[DEBUG] apply: itemsの数値検証完了: {len(cleaned_items)}件")
+
+    report_csv = _rebuild_report_csv_with_trace(cleaned_items) if cleaned_items else ""
+    # Encode report CSV as cp932 base64 for Excel safety
+    try:
+        report_csv_bytes = report_csv.encode("cp932", errors="replace")
+    except Exception:
+        report_csv_bytes = report_csv.encode("utf-8", errors="replace")
+    import base64 as _b64
+    report_csv_content_b64 = _b64.b64encode(report_csv_bytes).decode("ascii")
+
+    # Generate updated CSV content for download (Prister upload format)
+    # Build a dataframe that matches the expected schema and values
+    base_df = outputs.updated_df.copy()
+
+    formatted_df, desired_cols = _format_updated_for_repricer(base_df)
+
+    # Repricing用CSV（説明行なし、ヘッダー+データのみ）
+    updated_csv_bytes = write_repricer_csv(formatted_df, desired_cols)
+    import base64 as _b64
+    updated_csv_content = _b64.b64encode(updated_csv_bytes).decode("ascii")
+
+    summary = {
+        'updated_rows': _get_len(outputs, 'updated_df'),
+        'excluded_rows': _get_len(outputs, 'excluded_df'),
+        'q4_switched': _get_len(outputs, 'q4_switched_df'),
+        'date_unknown': _get_len(outputs, 'date_unknown_df'),
+        'log_rows': _get_len(outputs, 'log_df'),
+    }
+
+    @stage_span("repricer.artifacts")
+    def render_files() -> Dict[str, bytes]:
+        # updated.csv はプライスター取込フォーマット（writerの結果をそのまま保存）
+        # excluded / log は CSV出力直前に全セルから ="..." 形式を除去（最終防衛ライン）
+        return {
+            "updated": updated_csv_bytes,
+            "excluded": _dataframe_to_cp932_csv(_strip_formula_cells(outputs.excluded_df)),
+            "log": _dataframe_to_cp932_csv(_strip_formula_cells(outputs.log_df)),
+            "report": report_csv_bytes,
+        }
+
+    artifact_store.submit_run(run_id, mode, render_files, summary)
+
+    response_data = {
+        "ok": True,
+        "reportCsvContent": report_csv_content_b64,
+        "reportCsvEncoding": "cp932-base64",
+        "updatedCsvContent": updated_csv_content,
+        "updatedCsvEncoding": "cp932-base64",
+        "run_id": run_id,
+        "files": _artifact_file_urls(run_id, ("updated", "excluded", "log", "report")),
+        "items": cleaned_items,
+        "summary": summary,
+    }
+    return response_data
+
+
+# --- Streaming (NDJSON) ---
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _ndjson_line(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def _spool_upload(upload) -> Path:
+    """アップロードを自前の一時ファイルへ退避（ストリーミング中もリクエスト側の後始末に影響されない）"""
+    fd, path = tempfile.mkstemp(prefix="repricer_upload_", suffix=".csv")
+    with os.fdopen(fd, "wb") as out:
+        upload.seek(0)
+        shutil.copyfileobj(upload, out, 1 << 20)
+    return Path(path)
+
+
+async def _open_reprice_stream(file: UploadFile, mode: Optional[str], chunk_size: int):
+    """
+    ストリーミング改定を開始する。最初のチャンクまでは応答前に処理し、
+    空CSV・デコード不可はここで 400 を返す（応答開始後はステータスを変えられないため）。
+    Returns: (一時ファイルパス, ファイル, チャンクイテレータ, 最初のチャンク結果, モード, チャンク行数)
+    """
+    normalized_mode = _normalize_mode(mode)
+    path = await asyncio.to_thread(_spool_upload, file.file)
+    if path.stat().st_size == 0:
+        path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail="CSVファイルが空です")
+    source = open(path, "rb")
+    chunks = iter_repriced_chunks(source, normalized_mode, chunk_size)
+    try:
+        first = await asyncio.to_thread(next, chunks, None)
+    except BaseException:
+        source.close()
+        path.unlink(missing_ok=True)
+        raise
+    if first is None:
+        source.close()
+        path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=400,
+            detail="CSVファイルの読み込みに失敗しました、またはデータが空です",
+        )
+    return path, source, chunks, first, normalized_mode, chunk_size
+
+
+def _add_chunk_summary(summary: Dict[str, int], outputs) -> None:
+    summary["updated_rows"] += _get_len(outputs, "updated_df")
+    summary["excluded_rows"] += _get_len(outputs, "excluded_df")
+    summary["log_rows"] += _get_len(outputs, "log_df")
+
+
+def _new_stream_summary() -> Dict[str, int]:
+    return {"updated_rows": 0, "excluded_rows": 0, "q4_switched": 0, "date_unknown": 0, "log_rows": 0}
+
+
+def _chunk_item_lines(items) -> bytes:
+    return b"".join(_ndjson_line({"type": "item", "item": _clean_item_for_json(it)}) for it in items)
+
+
+def _iter_preview_ndjson(path: Path, source, chunks, first, mode: str, chunk_size: int):
+    """preview のストリーミング本体（start → item... / progress → summary）"""
+    summary = _new_stream_summary()
+    try:
+        yield _ndjson_line({"type": "start", "mode": mode, "chunk_size": chunk_size})
+        for index, outputs in enumerate(itertools.chain([first], chunks), start=1):
+            items = outputs.items if hasattr(outputs, "items") else []
+            _add_chunk_summary(summary, outputs)
+            yield _chunk_item_lines(items) + _ndjson_line(
+                {"type": "progress", "chunk": index, "rows": summary["log_rows"]}
+            )
+        yield _ndjson_line({"type": "summary", "summary": summary})
+    except Exception as e:
+        import traceback
+        print(f"[ERROR] 価格改定プレビュー（ストリーミング）エラー: {str(e)}")
+        print(f"[ERROR] トレースバック:\n{traceback.format_exc()}")
+        yield _ndjson_line({"type": "error", "detail": f"価格改定プレビューに失敗しました: {str(e)}"})
+    finally:
+        source.close()
+        path.unlink(missing_ok=True)
+
+
+def _iter_apply_ndjson(path: Path, source, chunks, first, mode: str, chunk_size: int):
+    """
+    apply のストリーミング本体。チャンクごとに tmp の updated / excluded / log / report CSV へ追記し、
+    最後に出力保管庫へ移して（バックグラウンド）run_id・ダウンロードURL・サマリーを返す。
+    """
+    run_id = artifact_store.new_run_id()
+    files = {
+        "updated": BASE_DIR_TMP / f"updated_{run_id}.csv",
+        "excluded": BASE_DIR_TMP / f"excluded_{run_id}.csv",
+        "log": BASE_DIR_TMP / f"log_{run_id}.csv",
+        "report": BASE_DIR_TMP / f"report_{run_id}.csv",
+    }
+    summary = _new_stream_summary()
+    try:
+        BASE_DIR_TMP.mkdir(parents=True, exist_ok=True)
+        excluded_writer = UnionColumnCsvWriter(files["excluded"])
+        log_writer = UnionColumnCsvWriter(files["log"])
+        with open(files["updated"], "wb") as updated_file, open(files["report"], "wb") as report_file:
+            yield _ndjson_line({"type": "start", "mode": mode, "chunk_size": chunk_size})
+            for index, outputs in enumerate(itertools.chain([first], chunks), start=1):
+                _fill_price_trace_change_on_items(outputs, trace_label=_APPLY_TRACE_LABEL)
+                is_first = index == 1
+
+                formatted_df, desired_cols = _format_updated_for_repricer(outputs.updated_df.copy())
+                updated_file.write(write_repricer_csv(formatted_df, desired_cols, include_header=is_first))
+                excluded_writer.write(_strip_formula_cells(outputs.excluded_df))
+                log_writer.write(_strip_formula_cells(outputs.log_df))
+
+                items = outputs.items if hasattr(outputs, "items") else []
+                cleaned_items = [_clean_item_for_json(it) for it in items]
+                report_csv = _rebuild_report_csv_with_trace(cleaned_items, include_header=is_first)
+                report_file.write(report_csv.encode("cp932", errors="replace"))
+
+                _add_chunk_summary(summary, outputs)
+                yield _chunk_item_lines(cleaned_items) + _ndjson_line(
+                    {"type": "progress", "chunk": index, "rows": summary["log_rows"]}
+                )
+        excluded_writer.close()
+        log_writer.close()
+        artifact_store.submit_run(run_id, mode, lambda: dict(files), dict(summary))
+        yield _ndjson_line({
+            "type": "summary",
+            "ok": True,
+            "summary": summary,
+            "run_id": run_id,
+            "files": _artifact_file_urls(run_id, files),
+            "reportCsvEncoding": "cp932",
+            "updatedCsvEncoding": "cp932",
+        })
+    except Exception as e:
+        import traceback
+        print(f"[ERROR] 価格改定実行（ストリーミング）エラー: {str(e)}")
+        print(f"[ERROR] トレースバック:\n{traceback.format_exc()}")
+        yield _ndjson_line({"type": "error", "detail": f"価格改定実行に失敗しました: {str(e)}"})
+    finally:
+        source.close()
+        path.unlink(missing_ok=True)
+
 # --- Repricing Endpoints ---
+async def _accept_reprice_job(file: UploadFile, kind: str, mode: Optional[str]):
+    """
+    preview / apply の async=true: チャンク改定ジョブとして登録する（/repricer/jobs と同じ処理）。
+    チャンクの区切りでキャンセルできる。incremental / workers は適用しない。
+    """
+    content = await file.read()
+    if not content:
+        raise HTTPException(status_code=400, detail="CSVファイルが空です")
+    return job_accepted_response(_submit_reprice_job(content, kind, mode, DEFAULT_JOB_CHUNK_SIZE))
+
+
 @router.post("/preview")
-async def preview(file: UploadFile = File(...), mode: Optional[str] = Query(default="standard")):
+async def preview(
+    file: UploadFile = File(...),
+    mode: Optional[str] = Query(default="standard"),
+    stream: bool = Query(default=False),
+    chunk_size: int = Query(default=DEFAULT_STREAM_CHUNK_SIZE, ge=1),
+    incremental: bool = Query(default=False),
+    workers: int = Query(default=0, ge=0, le=64),
+    debug: bool = Query(default=False),
+    run_async: bool = Query(default=False, alias="async"),
+):
+    if stream:
+        # 大容量CSV向け: チャンク単位で改定し、items を NDJSON で逐次返す
+        opened = await _open_reprice_stream(file, mode, chunk_size)
+        return StreamingResponse(_iter_preview_ndjson(*opened), media_type=NDJSON_MEDIA_TYPE)
+    if run_async:
+        # ジョブとして登録して 202 を返す（結果は GET /jobs/{job_id}/result）
+        return await _accept_reprice_job(file, "preview", mode)
     try:
         print(f"[DEBUG] プレビューAPI呼び出し開始: ファイル名={file.filename}")
         content = await file.read()
@@ -263,7 +713,7 @@ async def preview(file: UploadFile = File(...), mode: Optional[str] = Query(defa
 
         print("[DEBUG] 価格改定ルール適用開始（バックグラウンドスレッド）...")
         try:
-            outputs = await asyncio.to_thread(_apply_repricing_from_csv_bytes, content, mode)
+            outputs = await asyncio.to_thread(_apply_repricing_from_csv_bytes, content, mode, incremental, workers, debug)
         except ValueError as ve:
             if str(ve) == "CSV_EMPTY":
                 raise HTTPException(
@@ -271,61 +721,8 @@ async def preview(file: UploadFile = File(...), mode: Optional[str] = Query(defa
                     detail="CSVファイルの読み込みに失敗しました、またはデータが空です",
                 )
             raise
-        row_count = _get_len(outputs, "updated_df") + _get_len(outputs, "excluded_df")
-        print(f"[DEBUG] 価格改定ルール適用完了（概算行数={row_count}）")
-
-        # ---- safe summary (no-attr errors) ----
-        print("[DEBUG] サマリー生成開始...")
-        summary = {
-            'updated_rows': _get_len(outputs, 'updated_df'),
-            'excluded_rows': _get_len(outputs, 'excluded_df'),
-            'q4_switched': _get_len(outputs, 'q4_switched_df'),
-            'date_unknown': _get_len(outputs, 'date_unknown_df'),
-            'log_rows': _get_len(outputs, 'log_df'),
-        }
-        print(f"[DEBUG] サマリー: {summary}")
-        
-        # outputs.items を直接使用
-        print("[DEBUG] items取得開始...")
-        items = outputs.items if hasattr(outputs, 'items') else []
-        print(f"[DEBUG] items取得完了: 件数={len(items)}")
-        
-        # JSONにシリアライズできない値（Infinity、NaN）をクリーンアップ
-        print("[DEBUG] itemsの数値検証開始...")
-        import math
-        def clean_value(value):
-            """JSONにシリアライズできない値を適切な値に変換"""
-            if isinstance(value, (int, float)):
-                if math.isnan(value):
-                    return 0
-                if math.isinf(value):
-                    return 0 if value > 0 else 0
-            return value
-        
-        def clean_item(item):
-            """アイテムの数値をクリーンアップ"""
-            if isinstance(item, dict):
-                cleaned = {}
-                for key, value in item.items():
-                    if isinstance(value, (int, float)):
-                        cleaned[key] = clean_value(value)
-                    elif isinstance(value, dict):
-                        cleaned[key] = clean_item(value)
-                    elif isinstance(value, list):
-                        cleaned[key] = [clean_item(v) if isinstance(v, dict) else clean_value(v) if isinstance(v, (int, float)) else v for v in value]
-                    else:
-                        cleaned[key] = value
-                return cleaned
-            return item
-        
-        cleaned_items = [clean_item(item) for item in items]
-        print(f"[DEBUG] itemsの数値検証完了: {len(cleaned_items)}件")
-        
-        print("[DEBUG] レスポンス返却開始...")
-        return {
-            "summary": summary,
-            "items": cleaned_items
-        }
+        with stage_span("repricer.serialize"):
+            return FastJSONResponse(_build_preview_response(outputs))
     except HTTPException:
         raise
     except Exception as e:
@@ -342,7 +739,22 @@ async def preview(file: UploadFile = File(...), mode: Optional[str] = Query(defa
         )
 
 @router.post("/apply")
-async def apply(file: UploadFile = File(...), mode: Optional[str] = Query(default="standard")):
+async def apply(
+    file: UploadFile = File(...),
+    mode: Optional[str] = Query(default="standard"),
+    stream: bool = Query(default=False),
+    chunk_size: int = Query(default=DEFAULT_STREAM_CHUNK_SIZE, ge=1),
+    incremental: bool = Query(default=False),
+    workers: int = Query(default=0, ge=0, le=64),
+    debug: bool = Query(default=False),
+    run_async: bool = Query(default=False, alias="async"),
+):
+    if stream:
+        # 大容量CSV向け: チャンクごとに出力CSVへ追記し、items を NDJSON で逐次返す
+        opened = await _open_reprice_stream(file, mode, chunk_size)
+        return StreamingResponse(_iter_apply_ndjson(*opened), media_type=NDJSON_MEDIA_TYPE)
+    if run_async:
+        return await _accept_reprice_job(file, "apply", mode)
     try:
         print(f"[DEBUG] apply: 価格改定実行API呼び出し開始")
         content = await file.read()
@@ -351,7 +763,7 @@ async def apply(file: UploadFile = File(...), mode: Optional[str] = Query(defaul
 
         print("[DEBUG] apply: 価格改定ルール適用開始（バックグラウンドスレッド）...")
         try:
-            outputs = await asyncio.to_thread(_apply_repricing_from_csv_bytes, content, mode)
+            outputs = await asyncio.to_thread(_apply_repricing_from_csv_bytes, content, mode, incremental, workers, debug)
         except ValueError as ve:
             if str(ve) == "CSV_EMPTY":
                 raise HTTPException(
@@ -360,201 +772,8 @@ async def apply(file: UploadFile = File(...), mode: Optional[str] = Query(defaul
                 )
             raise
         print("[DEBUG] apply: 価格改定ルール適用完了")
-        _fill_price_trace_change_on_items(outputs, trace_label="FBA譛螳牙､")
-
-        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        updated_path = BASE_DIR_TMP / f"updated_{stamp}.csv"
-        excluded_path = BASE_DIR_TMP / f"excluded_{stamp}.csv"
-        log_path = BASE_DIR_TMP / f"log_{stamp}.csv"
-
-        # rename priceTrace -> trace + Excel formula removal
-        try:
-            # 列名は仕様に合わせてそのまま保持（priceTrace を維持）
-            updated_df_renamed = outputs.updated_df.copy()
-
-            # CSV出力直前: 全セルから ="..." 形式を除去（最終防衛ライン）
-            def remove_formula_from_cell(x):
-                """セル値から ="..." を除去"""
-                if isinstance(x, str) and x.startswith('="') and x.endswith('"'):
-                    return x[2:-1]  # =" と " を除去
-                return x
-
-            # updated_df の全列に適用
-            for col in updated_df_renamed.columns:
-                updated_df_renamed[col] = updated_df_renamed[col].apply(remove_formula_from_cell)
-
-            # excluded_df の全列に適用
-            excluded_df_cleaned = outputs.excluded_df.copy()
-            for col in excluded_df_cleaned.columns:
-                excluded_df_cleaned[col] = excluded_df_cleaned[col].apply(remove_formula_from_cell)
-
-            # log_df の全列に適用
-            log_df_cleaned = outputs.log_df.copy()
-            for col in log_df_cleaned.columns:
-                log_df_cleaned[col] = log_df_cleaned[col].apply(remove_formula_from_cell)
-
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            # フォールバック: 元のDataFrameを使用
-            updated_df_renamed = outputs.updated_df.copy()
-            excluded_df_cleaned = outputs.excluded_df.copy()
-            log_df_cleaned = outputs.log_df.copy()
-
-        # Build report CSV with trace information
-        items = outputs.get("items") if isinstance(outputs, dict) else getattr(outputs, "items", [])
-        
-        # JSONにシリアライズできない値（Infinity、NaN）をクリーンアップ
-        print("[DEBUG] apply: itemsの数値検証開始...")
-        import math
-        def clean_value(value):
-            """JSONにシリアライズできない値を適切な値に変換"""
-            if isinstance(value, (int, float)):
-                if math.isnan(value):
-                    return 0
-                if math.isinf(value):
-                    return 0 if value > 0 else 0
-            return value
-        
-        def clean_item(item):
-            """アイテムの数値をクリーンアップ"""
-            if isinstance(item, dict):
-                cleaned = {}
-                for key, value in item.items():
-                    if isinstance(value, (int, float)):
-                        cleaned[key] = clean_value(value)
-                    elif isinstance(value, dict):
-                        cleaned[key] = clean_item(value)
-                    elif isinstance(value, list):
-                        cleaned[key] = [clean_item(v) if isinstance(v, dict) else clean_value(v) if isinstance(v, (int, float)) else v for v in value]
-                    else:
-                        cleaned[key] = value
-                return cleaned
-            return item
-        
-        cleaned_items = [clean_item(item) for item in items]
-        print(f"[DEBUG] apply: itemsの数値検証完了: {len(cleaned_items)}件")
-        
-        report_csv = _rebuild_report_csv_with_trace(cleaned_items) if cleaned_items else ""
-        # Encode report CSV as cp932 base64 for Excel safety
-        try:
-            report_csv_bytes = report_csv.encode("cp932", errors="replace")
-        except Exception:
-            report_csv_bytes = report_csv.encode("utf-8", errors="replace")
-        import base64 as _b64
-        report_csv_content_b64 = _b64.b64encode(report_csv_bytes).decode("ascii")
-
-        # Generate updated CSV content for download (Prister upload format)
-        # Build a dataframe that matches the expected schema and values
-        try:
-            base_df = outputs.updated_df.copy()
-        except Exception:
-            base_df = updated_df_renamed.copy()
-
-        # 入力CSV互換のための正規化（文字化け/列崩れ対策・決定版）
-        base_df = normalize_dataframe_for_cp932(base_df)
-
-        # Map and derive fields
-        if "new_price" in base_df.columns:
-            base_df["price"] = base_df["new_price"]
-        if "new_priceTrace" in base_df.columns:
-            base_df["priceTrace"] = base_df["new_priceTrace"]
-        # number はそのまま
-        if "number" not in base_df.columns:
-            base_df["number"] = 1
-
-        # 出力列（conditionNoteをJ列に追加、priceTraceを保持）
-        desired_cols = [
-            "SKU", "ASIN", "title", "number", "price", "cost", "akaji", "takane",
-            "condition", "conditionNote", "priceTrace", "leadtime", "amazon-fee", "shipping-price", "profit", "add-delete",
-        ]
-        # Keep only desired columns in correct order (fill missing with empty string)
-        for col in desired_cols:
-            if col not in base_df.columns:
-                base_df[col] = ""
-        formatted_df = base_df[desired_cols]
-
-        # Format numeric columns as integer-like strings (no trailing .0)
-        num_cols = ["number", "price", "cost", "akaji", "takane", "condition", "priceTrace", "leadtime", "amazon-fee", "shipping-price", "profit"]
-        for col in num_cols:
-            if col in formatted_df.columns:
-                try:
-                    formatted_df[col] = pd.to_numeric(formatted_df[col], errors="coerce").fillna(0).astype(int).astype(str)
-                except Exception:
-                    formatted_df[col] = formatted_df[col].astype(str)
-
-        # Force text columns to Excel-safe formula style ="..." (to match historical files)
-        excel_text_cols = ["SKU", "ASIN", "title"]
-        for col in excel_text_cols:
-            if col in formatted_df.columns:
-                def _wrap(v: str) -> str:
-                    v = "" if v is None else str(v)
-                    # 既に ="..." ならそのまま
-                    if v.startswith('="') and v.endswith('"'):
-                        return v
-                    # 内部の"は2重化（CSVライタがさらに適切に処理）
-                    v_escaped = v.replace('"', '""')
-                    return f'="{v_escaped}"'
-                formatted_df[col] = formatted_df[col].apply(_wrap)
-
-        # conditionNote を空文字で追加（J列）
-        if 'conditionNote' not in formatted_df.columns:
-            formatted_df['conditionNote'] = ""
-
-        # desired_colsのみに絞り直し（念のため）
-        formatted_df = formatted_df[desired_cols]
-
-        # leadtime を空白に（0ではなく空文字）
-        if 'leadtime' in formatted_df.columns:
-            formatted_df['leadtime'] = ""
-
-        # ="..." 形式を除去（念のため）
-        for col in formatted_df.columns:
-            if formatted_df[col].dtype == 'object':
-                formatted_df[col] = (formatted_df[col]
-                                     .astype(str)
-                                     .str.replace(r'^=\"', '', regex=True)
-                                     .str.replace(r'\"$', '', regex=True))
-
-        # Repricing用CSV（説明行なし、ヘッダー+データのみ）
-        updated_csv_bytes = write_repricer_csv(formatted_df, desired_cols)
-        import base64 as _b64
-        updated_csv_content = _b64.b64encode(updated_csv_bytes).decode("ascii")
-
-        # updated.csv はプライスター取込フォーマットで出力（writerの結果をそのまま保存）
-        try:
-            with open(updated_path, "wb") as f:
-                f.write(updated_csv_bytes)
-        except Exception:
-            # フォールバック（従来方式）
-            updated_df_renamed.to_csv(updated_path, index=False,
-                encoding="cp932", lineterminator="\r\n", quoting=csv.QUOTE_ALL, errors='replace')
-        excluded_df_cleaned.to_csv(excluded_path, index=False,
-            encoding="cp932", lineterminator="\r\n", quoting=csv.QUOTE_ALL, errors='replace')
-        log_df_cleaned.to_csv(log_path, index=False,
-            encoding="cp932", lineterminator="\r\n", quoting=csv.QUOTE_ALL, errors='replace')
-
-        response_data = {
-            "ok": True,
-            "reportCsvContent": report_csv_content_b64,
-            "reportCsvEncoding": "cp932-base64",
-            "updatedCsvContent": updated_csv_content,
-            "updatedCsvEncoding": "cp932-base64",
-            "files": {
-                "updated": str(updated_path),
-                "excluded": str(excluded_path),
-                "log": str(log_path),
-            },
-            "items": cleaned_items,
-            "summary": {
-                'updated_rows': _get_len(outputs, 'updated_df'),
-                'excluded_rows': _get_len(outputs, 'excluded_df'),
-                'q4_switched': _get_len(outputs, 'q4_switched_df'),
-                'date_unknown': _get_len(outputs, 'date_unknown_df'),
-                'log_rows': _get_len(outputs, 'log_df'),
-            }
-        }
-        return response_data
+        with stage_span("repricer.serialize"):
+            return FastJSONResponse(_build_apply_response(outputs, _normalize_mode(mode)))
     except HTTPException:
         raise
     except Exception as e:
@@ -570,6 +789,238 @@ async def apply(file: UploadFile = File(...), mode: Optional[str] = Query(defaul
             detail=f"価格改定実行に失敗しました: {str(e)}"
         )
 
+# --- Repricer Runs (output artifacts) ---
+class RetentionSettings(BaseModel):
+    keep_runs: Optional[int] = Field(default=None, ge=1, description="新しい順に残す run 数（未指定は無制限）")
+    keep_days: Optional[int] = Field(default=None, ge=1, description="残す日数（未指定は無制限）")
+
+
+def _get_run_or_404(run_id: str):
+    run = artifact_store.get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"出力が見つかりません（保持期間切れの可能性があります）: {run_id}")
+    return run
+
+
+@router.get("/runs")
+def list_runs(limit: int = Query(default=50, ge=1, le=1000)):
+    """apply の実行履歴（新しい順）"""
+    return {"runs": [run.to_dict() for run in artifact_store.list_runs(limit)]}
+
+
+@router.get("/runs/retention", response_model=RetentionSettings)
+def get_run_retention():
+    return RetentionSettings(**artifact_store.get_retention()._asdict())
+
+
+@router.put("/runs/retention", response_model=RetentionSettings)
+def update_run_retention(settings: RetentionSettings = Body(...)):
+    """保持ポリシーを変更し、すぐに古い run を削除する"""
+    policy = artifact_store.set_retention(RetentionPolicy(settings.keep_runs, settings.keep_days))
+    return RetentionSettings(**policy._asdict())
+
+
+@router.get("/runs/{run_id}")
+def get_run(run_id: str):
+    run = _get_run_or_404(run_id)
+    return {**run.to_dict(), "download": _artifact_file_urls(run_id, run.files)}
+
+
+@router.get("/runs/{run_id}/files/{kind}")
+def download_run_file(run_id: str, kind: str):
+    """run の出力ファイル（updated / excluded / log / report）をダウンロードする"""
+    run = _get_run_or_404(run_id)
+    artifact = run.files.get(kind)
+    if artifact is None or not artifact.path.exists():
+        raise HTTPException(status_code=404, detail=f"出力ファイルが見つかりません: {run_id}/{kind}")
+    return FileResponse(artifact.path, media_type="text/csv", filename=f"{kind}_{run_id}.csv")
+
+
+# --- Repricer Simulation (3-6-9 price trajectory) ---
+def _price_matrix_for_json(prices: np.ndarray) -> list:
+    """価格行列を JSON 用の int（不明は None）のリストへ。"""
+    out = np.rint(np.nan_to_num(prices)).astype(np.int64).astype(object)
+    out[np.isnan(prices)] = None
+    return out.tolist()
+
+
+def _simulate_from_csv_bytes(
+    content: bytes, horizon_days: int, step_days: Optional[int], debug: bool = False
+) -> Dict[str, Any]:
+    """CSV読込〜前処理〜価格推移シミュレーション（同期処理）。"""
+    with stage_span("repricer.read_csv"):
+        df = read_csv_with_fallback(content)
+    if df is None or df.empty:
+        raise ValueError("CSV_EMPTY")
+    with stage_span("repricer.preprocess"):
+        df = preprocess_dataframe(df, debug=debug)
+    compiled = get_compiled_config(mode="369")
+    step = step_days or max(1, int(compiled.config.get("interval_days", 7)))
+    today = datetime.now()
+    dates = [today + timedelta(days=step * k) for k in range(horizon_days // step + 1)]
+    with stage_span("repricer.simulate"):
+        trajectories = simulate_price_trajectories(df, dates, compiled=compiled)
+    return {
+        "mode": "369",
+        "step_days": step,
+        "dates": [d.isoformat() for d in trajectories.dates],
+        "skus": trajectories.skus,
+        "current_prices": _price_matrix_for_json(trajectories.current_prices),
+        "prices": _price_matrix_for_json(trajectories.prices),
+    }
+
+
+@router.post("/simulate")
+async def simulate(
+    file: UploadFile = File(...),
+    horizon_days: int = Query(default=364, ge=0, le=3650),
+    step_days: Optional[int] = Query(default=None, ge=1),
+    debug: bool = Query(default=False),
+):
+    """
+    売れ残った場合の 3-6-9 改定の価格推移（SKU × 日付の価格行列）を返す。
+    今日から step_days（未指定時は設定の interval_days）ごとに horizon_days 先まで改定を連続適用する。
+    """
+    try:
+        content = await file.read()
+        if not content:
+            raise HTTPException(status_code=400, detail="CSVファイルが空です")
+        try:
+            return await asyncio.to_thread(_simulate_from_csv_bytes, content, horizon_days, step_days, debug)
+        except ValueError as ve:
+            if str(ve) == "CSV_EMPTY":
+                raise HTTPException(
+                    status_code=400,
+                    detail="CSVファイルの読み込みに失敗しました、またはデータが空です",
+                )
+            raise
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        print(f"[ERROR] 価格推移シミュレーションエラー: {str(e)}")
+        print(f"[ERROR] トレースバック:\n{traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"価格推移シミュレーションに失敗しました: {str(e)}")
+
+# --- Repricer Jobs (progress / cancel) ---
+# SSE のキープアライブ間隔（秒）。クライアントはこの間隔でキャンセル要求も確認できる
+_JOB_EVENT_HEARTBEAT_SEC = 2.0
+
+
+def _run_reprice_job(job: RepricerJob, content: bytes, chunk_size: int) -> Dict[str, Any]:
+    """ジョブ本体: CSV読込 → チャンク改定（進捗報告）→ preview / apply のレスポンス作成"""
+    job.update(stage="reading", message="CSV読込中")
+    today = datetime.now()
+    cache_key = build_cache_key(content, job.mode, today)
+    outputs = result_cache.get(cache_key)
+    if outputs is None:
+        with stage_span("repricer.read_csv"):
+            df = read_csv_with_fallback(content)
+        if df is None or df.empty:
+            raise ValueError("CSVファイルの読み込みに失敗しました、またはデータが空です")
+        with stage_span("repricer.rules"):
+            outputs = run_chunked_repricing(job, df, job.mode, today, chunk_size)
+        result_cache.put(cache_key, outputs)
+    else:
+        job.update(processed_rows=_get_len(outputs, "log_df"), total_rows=_get_len(outputs, "log_df"))
+    job.check_cancelled()
+    if job.kind == "apply":
+        job.update(stage="writing", message="CSV出力中", progress=95)
+        return _build_apply_response(outputs, job.mode)
+    job.update(stage="finalizing", message="結果を作成中", progress=95)
+    return _build_preview_response(outputs)
+
+
+def _submit_reprice_job(content: bytes, kind: str, mode: Optional[str], chunk_size: int) -> RepricerJob:
+    job = job_manager.submit(kind, _normalize_mode(mode), lambda j: _run_reprice_job(j, content, chunk_size))
+    print(f"[DEBUG] 価格改定ジョブ開始: kind={kind}, job_id={job.job_id}, size={len(content)} bytes")
+    return job
+
+
+def _get_job_or_404(job_id: str) -> RepricerJob:
+    job = job_manager.get(job_id)
+    if job is None or not job.job_type.startswith("repricer."):
+        raise HTTPException(status_code=404, detail=f"ジョブが見つかりません: {job_id}")
+    return job
+
+
+def _sse_message(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _iter_job_events(job: RepricerJob):
+    """
+    ジョブ状態の変化を SSE で送る（progress → done / error / cancelled で終了）。
+    同期ジェネレータのため StreamingResponse がスレッドプールで回す。
+    """
+    version = -1
+    while True:
+        current = job.wait_for_change(version, timeout=_JOB_EVENT_HEARTBEAT_SEC)
+        if current == version:
+            yield ": keep-alive\n\n"
+            continue
+        version = current
+        snapshot = job.snapshot()
+        if job.finished:
+            yield _sse_message(job.status, snapshot)
+            return
+        yield _sse_message("progress", snapshot)
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    kind: Literal["preview", "apply"] = Query(default="preview"),
+    mode: Optional[str] = Query(default="standard"),
+    chunk_size: int = Query(default=DEFAULT_JOB_CHUNK_SIZE, ge=1),
+):
+    """
+    preview / apply をサーバー側ジョブとして開始する。
+    進捗は GET /repricer/jobs/{job_id}（ポーリング）または /events（SSE）で取得し、
+    完了後に /result で preview / apply と同じレスポンスを受け取る。
+    """
+    content = await file.read()
+    if not content:
+        raise HTTPException(status_code=400, detail="CSVファイルが空です")
+    return _submit_reprice_job(content, kind, mode, chunk_size).snapshot()
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """ジョブの状態（段階・進捗率・改定済み行数）"""
+    return _get_job_or_404(job_id).snapshot()
+
+
+@router.get("/jobs/{job_id}/events")
+def job_events(job_id: str):
+    """ジョブの進捗を Server-Sent Events で配信する"""
+    job = _get_job_or_404(job_id)
+    return StreamingResponse(
+        _iter_job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """完了したジョブの結果（preview / apply と同じ形式）"""
+    job = _get_job_or_404(job_id)
+    if job.status == "error":
+        raise HTTPException(status_code=500, detail=job.error or "価格改定ジョブが失敗しました")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"ジョブは完了していません（status={job.status}）")
+    return FastJSONResponse(job.result)
+
+
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """ジョブのキャンセルを要求する（処理中のチャンクが終わった時点で中断）"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"ジョブが見つかりません: {job_id}")
+    return job.snapshot()
+
 @router.post("/debug")
 async def debug(file: UploadFile = File(...)):
     """
@@ -586,17 +1037,21 @@ async def debug(file: UploadFile = File(...)):
 
     today = datetime.now()
 
-    # 譛€蛻昴・10莉ｶ繧定ｧ｣譫・    debug_results = []
+    # 最初の10件を解析
+    debug_results = []
     for i, row in df.head(10).iterrows():
         sku = row.get('SKU', '')
 
-        # SKU譌･莉倩ｧ｣譫・        parsed_date = parse_listing_date_from_sku(sku)
+        # SKU日付解析
+        parsed_date = parse_listing_date_from_sku(sku)
 
-        # 邨碁℃譌･謨ｰ險育ｮ・        days_since = None
+        # 経過日数計算
+        days_since = None
         if parsed_date:
             days_since = (today - parsed_date).days
 
-        # 蛻・｡槫愛螳・        category = "invalid"
+        # 分類判定
+        category = "invalid"
         if parsed_date and days_since is not None:
             if days_since > 365:
                 category = "long_term"
@@ -52,6 +52,7 @@ class BulkSKUGenerationResponse(BaseModel):
     success: bool
     processed: int
     results: List[dict]  # [{original_data..., sku, condition_code, q_tag}, ...]
+    duplicates: List[dict] = []  # [{sku, indexes}, ...] 同じ一括生成内で重複した SKU
 
 class ProcessListingRequest(BaseModel):
     """出品CSV処理リクエスト"""
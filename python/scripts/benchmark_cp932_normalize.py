@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cp932 正規化のベンチマークスクリプト
+
+価格改定・出品CSVの出力に近い DataFrame（SKU はユニーク、商品名・コンディション説明は重複が多い）を作り、
+normalize_dataframe_for_cp932 の 100万セルあたりの処理時間を表示する。
+比較用に、セルごとに apply する手順（_normalize_columns_cellwise）も計測する。
+
+使い方: python scripts/benchmark_cp932_normalize.py [行数]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.csv_utils import _normalize_columns_cellwise, normalize_dataframe_for_cp932  # noqa: E402
+
+TITLE_PARTS = ["【新品】", "ポケモンカード", "ＢＯＸ", "限定版～", "★特典付き", "DVD", "ﾌｨｷﾞｭｱ", "1/7スケール", "—"]
+NOTES = ["", "未開封品です。\n丁寧に梱包します。", "外箱に小キズあり※動作確認済み", "Amazon倉庫より発送"]
+
+
+def build_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = random.Random(seed)
+    titles = [" ".join(rng.sample(TITLE_PARTS, 4)) for _ in range(max(1, rows // 20))]
+    return pd.DataFrame({
+        "SKU": [f'="20250{rng.randint(1, 9)}01-{rng.choice("369")}-{i:06d}"' for i in range(rows)],
+        "ASIN": [f"B0{rng.randint(10**7, 10**8 - 1)}" for _ in range(rows)],
+        "title": [rng.choice(titles) for _ in range(rows)],
+        "number": ["1"] * rows,
+        "price": [str(rng.randint(300, 20000)) for _ in range(rows)],
+        "akaji": [str(rng.randint(100, 9000)) for _ in range(rows)],
+        "takane": ["0"] * rows,
+        "condition": [rng.choice(["1", "2", "3"]) for _ in range(rows)],
+        "conditionNote": [rng.choice(NOTES) for _ in range(rows)],
+        "priceTrace": [rng.choice(["0", "1", "3"]) for _ in range(rows)],
+    })
+
+
+def measure(label: str, func, df: pd.DataFrame) -> None:
+    cells = df.shape[0] * df.shape[1]
+    started = time.perf_counter()
+    func(df.copy())
+    elapsed = time.perf_counter() - started
+    print(f"{label:<12} {elapsed:7.3f}s  ({elapsed * 1_000_000 / cells:6.3f}s / 100万セル)")
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = build_frame(rows)
+    print(f"{rows}行 × {df.shape[1]}列 = {rows * df.shape[1]}セル")
+    measure("cellwise", lambda d: _normalize_columns_cellwise(d.fillna("")), df)
+    measure("compiled", normalize_dataframe_for_cp932, df)
+
+
+if __name__ == "__main__":
+    main()
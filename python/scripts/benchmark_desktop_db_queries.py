@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+デスクトップ版 hirio.db の一覧クエリのベンチマークスクリプト
+
+仕入・商品・販売・店舗・ルート・レシート・台帳の件数を揃えた hirio.db を一時フォルダに作り、
+画面の一覧表示で使うクエリ（各DBクラスの list_* と同じSQL）の時間を比べる。
+
+- before: 従来どおり DBクラスごとに sqlite3.connect（ロールバックジャーナル・既定の PRAGMA）
+- after:  connection_manager の読み取り用接続（WAL / synchronous=NORMAL / cache_size / mmap）
+
+計測は「初回（接続を開いてから1回）」「2回目以降（同じ接続で繰り返し）」「別スレッドが1件ずつ
+書き込んでいる間の読み取り」「1件ずつの書き込み（commit ごと）」の4種類。
+
+使い方: python scripts/benchmark_desktop_db_queries.py [仕入件数]
+"""
+from __future__ import annotations
+
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+DESKTOP_DIR = Path(__file__).resolve().parents[1] / "desktop"
+sys.path.insert(0, str(DESKTOP_DIR))
+
+from database.connection_manager import get_connection, get_read_connection, release_db_file  # noqa: E402
+from database.ledger_db import LedgerDatabase  # noqa: E402
+from database.product_db import ProductDatabase  # noqa: E402
+from database.purchase_db import PurchaseDatabase  # noqa: E402
+from database.receipt_db import ReceiptDatabase  # noqa: E402
+from database.route_db import RouteDatabase  # noqa: E402
+from database.sales_db import SalesDatabase  # noqa: E402
+from database.store_db import StoreDatabase  # noqa: E402
+
+# 画面の一覧表示で使うクエリ（ラベル, SQL, パラメータ）
+QUERIES: List[Tuple[str, str, tuple]] = [
+    ("仕入一覧", "SELECT * FROM purchases ORDER BY IFNULL(updated_at, created_at) DESC, sku DESC", ()),
+    ("仕入(期間)", "SELECT * FROM purchases WHERE purchase_date >= ? AND purchase_date <= ? "
+                 "ORDER BY purchase_date DESC, sku DESC", ("2025-03-01", "2025-05-31")),
+    ("商品一覧", "SELECT * FROM products ORDER BY IFNULL(updated_at, created_at) DESC, sku DESC", ()),
+    ("販売一覧", "SELECT * FROM sales ORDER BY sale_date DESC, id DESC", ()),
+    ("店舗一覧", "SELECT * FROM stores ORDER BY store_name", ()),
+    ("ルート一覧", "SELECT *, datetime(updated_at, 'localtime') AS updated_at_local FROM route_summaries "
+                 "ORDER BY route_date DESC, id DESC", ()),
+    ("レシート一覧", "SELECT * FROM receipts ORDER BY id DESC", ()),
+    ("台帳一覧", "SELECT *, datetime(created_at,'localtime') AS created_at_local FROM ledger_entries "
+               "ORDER BY entry_date DESC, id DESC", ()),
+]
+
+
+def build_db(path: Path, purchases: int, seed: int = 0) -> None:
+    """各DBクラスでスキーマを作り、件数を揃えたデータを入れる。"""
+    rng = random.Random(seed)
+    for cls in (PurchaseDatabase, ProductDatabase, SalesDatabase, StoreDatabase,
+                RouteDatabase, ReceiptDatabase, LedgerDatabase):
+        cls(db_path=str(path))
+    conn = get_connection(str(path))
+    stores = max(50, purchases // 100)
+
+    def date() -> str:
+        return f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+    conn.executemany(
+        "INSERT INTO stores (supplier_code, store_name, route_code, address) VALUES (?, ?, ?, ?)",
+        [(f"S-{i:04d}", f"店舗{i:04d}", f"R{i % 40:02d}", f"東京都サンプル区{i}-1") for i in range(stores)],
+    )
+    conn.executemany(
+        "INSERT INTO purchases (sku, purchase_date, purchase_price, quantity, store_code, store_name, comment, "
+        "created_at, updated_at) VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)",
+        [
+            (f"20250101-SKU-{i:07d}", date(), rng.randint(300, 20000), f"S-{i % stores:04d}",
+             f"店舗{i % stores:04d}", "メモ" * rng.randint(0, 20), f"{date()} 10:00:00", f"{date()} 12:00:00")
+            for i in range(purchases)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO products (sku, asin, product_name, purchase_date, purchase_price, quantity, store_code, "
+        "created_at, updated_at) VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?)",
+        [
+            (f"20250101-SKU-{i:07d}", f"B0{i:08d}", f"サンプル商品 {i} " + "説明" * rng.randint(0, 15), date(),
+             rng.randint(300, 20000), f"S-{i % stores:04d}", f"{date()} 10:00:00", f"{date()} 12:00:00")
+            for i in range(purchases)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO sales (sku, sale_date, sales_method, platform, sale_price, title) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (f"20250101-SKU-{i:07d}", date(), "FBA", "amazon", rng.randint(500, 30000), f"サンプル商品 {i}")
+            for i in range(0, purchases, 2)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO route_summaries (route_date, route_code, remarks) VALUES (?, ?, ?)",
+        [(date(), f"R{i % 40:02d}", "") for i in range(max(100, purchases // 50))],
+    )
+    conn.executemany(
+        "INSERT INTO receipts (file_path, purchase_date, store_code, total_amount) VALUES (?, ?, ?, ?)",
+        [(f"receipts/{i}.jpg", date(), f"S-{i % stores:04d}", rng.randint(500, 50000))
+         for i in range(max(100, purchases // 10))],
+    )
+    conn.executemany(
+        "INSERT INTO ledger_entries (entry_date, counterparty_name, hinmei) VALUES (?, ?, ?)",
+        [(date(), f"店舗{i % stores:04d}", f"サンプル商品 {i}") for i in range(max(100, purchases // 5))],
+    )
+    conn.commit()
+    release_db_file(str(path))
+
+
+def legacy_connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def run_query(conn: sqlite3.Connection, sql: str, params: tuple) -> int:
+    return len([dict(r) for r in conn.execute(sql, params).fetchall()])
+
+
+def timeit_once(conn: sqlite3.Connection, sql: str, params: tuple) -> float:
+    started = time.perf_counter()
+    run_query(conn, sql, params)
+    return time.perf_counter() - started
+
+
+def measure_cold(connect: Callable[[], sqlite3.Connection], close: bool) -> float:
+    """DBクラスを作り直した直後（接続を開いて1回目）。"""
+    started = time.perf_counter()
+    for _, sql, params in QUERIES:
+        conn = connect()
+        run_query(conn, sql, params)
+        if close:
+            conn.close()
+    return time.perf_counter() - started
+
+
+def measure_warm(conns: List[sqlite3.Connection], repeat: int) -> float:
+    """同じ接続で一覧を繰り返し表示する（1周あたりの秒数）。"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for conn, (_, sql, params) in zip(conns, QUERIES):
+            run_query(conn, sql, params)
+    return (time.perf_counter() - started) / repeat
+
+
+def measure_under_writes(
+    read_conn: sqlite3.Connection, write_conn: sqlite3.Connection, repeat: int
+) -> Tuple[float, float, int, int]:
+    """別スレッドが1件ずつ commit している間の一覧表示（中央値・最大・書き込み件数・ロック待ちの失敗数）。"""
+    stop = threading.Event()
+    written = [0]
+
+    def writer() -> None:
+        i = 0
+        while not stop.is_set():
+            write_conn.execute("UPDATE purchases SET comment = ? WHERE id = ?", (f"更新{i}", i % 1000 + 1))
+            write_conn.commit()
+            i += 1
+        written[0] = i
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    timings = []
+    locked = 0
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            try:
+                for _, sql, params in QUERIES[:2]:
+                    run_query(read_conn, sql, params)
+            except sqlite3.OperationalError:
+                # database is locked（busy_timeout まで待っても読めなかった）
+                locked += 1
+            timings.append(time.perf_counter() - started)
+    finally:
+        stop.set()
+        thread.join()
+    return statistics.median(timings), max(timings), written[0], locked
+
+
+def measure_single_writes(conn: sqlite3.Connection, count: int) -> float:
+    started = time.perf_counter()
+    for i in range(count):
+        conn.execute("UPDATE purchases SET status = ? WHERE id = ?", (f"s{i}", i % 1000 + 1))
+        conn.commit()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    purchases = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    with tempfile.TemporaryDirectory(prefix="hirio_db_bench_") as tmp:
+        before_path = Path(tmp) / "before" / "hirio.db"
+        after_path = Path(tmp) / "after" / "hirio.db"
+        after_path.parent.mkdir(parents=True)
+        build_db(after_path, purchases)
+        before_path.parent.mkdir(parents=True)
+        shutil.copy2(after_path, before_path)
+        conn = sqlite3.connect(str(before_path))
+        conn.execute("PRAGMA journal_mode=DELETE").fetchall()
+        conn.close()
+        print(f"仕入 {purchases}件 / DB {after_path.stat().st_size / 1024 / 1024:.1f}MiB / 一覧クエリ {len(QUERIES)}種類")
+
+        # 初回
+        before_cold = measure_cold(lambda: legacy_connect(before_path), close=True)
+        after_cold = measure_cold(lambda: get_read_connection(str(after_path)), close=False)
+        print(f"{'初回':<14} before {before_cold * 1000:8.1f}ms   after {after_cold * 1000:8.1f}ms")
+
+        # 2回目以降
+        legacy_conns = [legacy_connect(before_path) for _ in QUERIES]
+        reader = get_read_connection(str(after_path))
+        before_warm = measure_warm(legacy_conns, 10)
+        after_warm = measure_warm([reader] * len(QUERIES), 10)
+        print(f"{'2回目以降(1周)':<14} before {before_warm * 1000:8.1f}ms   after {after_warm * 1000:8.1f}ms")
+        for label, sql, params in QUERIES:
+            b = min(timeit_once(legacy_conns[0], sql, params) for _ in range(3))
+            a = min(timeit_once(reader, sql, params) for _ in range(3))
+            print(f"  {label:<12} before {b * 1000:8.1f}ms   after {a * 1000:8.1f}ms")
+
+        # 書き込み中の読み取り
+        for label, (med, worst, written, locked) in (
+            ("before", measure_under_writes(legacy_conns[0], legacy_connect(before_path), 20)),
+            ("after", measure_under_writes(reader, get_connection(str(after_path)), 20)),
+        ):
+            print(f"{'書き込み中':<14} {label:<6} 中央値 {med * 1000:7.1f}ms  最大 {worst * 1000:8.1f}ms  "
+                  f"ロック失敗 {locked}/20回  (書込 {written}件)")
+
+        # 1件ずつの書き込み
+        before_write = measure_single_writes(legacy_conns[0], 500)
+        after_write = measure_single_writes(get_connection(str(after_path)), 500)
+        print(f"{'1件ずつ書込x500':<14} before {before_write * 1000:8.1f}ms   after {after_write * 1000:8.1f}ms")
+
+        for c in legacy_conns:
+            c.close()
+        release_db_file(str(after_path))
+
+
+
+if __name__ == "__main__":
+    main()
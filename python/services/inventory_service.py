@@ -9,12 +9,15 @@ from pathlib import Path
 
 # 新しいSKUテンプレートレンダラ
 try:
-    from services.sku_template import SKUTemplateRenderer
+    from services.sku_template import SKUTemplateRenderer, find_duplicate_skus, load_sku_settings
+    from services.sku_sequence import sku_sequence_allocator
 except Exception:
     # 相対パスでの実行環境向けフォールバック
-    from .sku_template import SKUTemplateRenderer
+    from .sku_template import SKUTemplateRenderer, find_duplicate_skus, load_sku_settings
+    from .sku_sequence import sku_sequence_allocator
 
 from core.csv_utils import read_csv_with_fallback, normalize_dataframe_for_cp932
+from core.metrics import stage_span
 from utils.csv_io import write_listing_csv
 
 # コンディションマッピング（Amazonコンディション番号）
@@ -38,8 +41,10 @@ class InventoryService:
         """
         アップロードされたCSVファイルを処理し、DataFrameと統計情報を返却する。
         """
-        df = read_csv_with_fallback(content)
-        df = normalize_dataframe_for_cp932(df)
+        with stage_span("inventory.read_csv"):
+            df = read_csv_with_fallback(content)
+        with stage_span("inventory.normalize"):
+            df = normalize_dataframe_for_cp932(df)
 
         # Debugging: Print DataFrame columns and a sample of data
         print(f"DEBUG: DataFrame columns after normalization: {list(df.columns)}")
@@ -55,6 +60,7 @@ class InventoryService:
         return df, stats
 
     @staticmethod
+    @stage_span("inventory.generate_sku")
     def generate_sku_bulk(products: List[dict], sku_date: Optional[str] = None) -> dict:
         """
         SKUを一括生成（店舗マスタ連携対応）
@@ -65,33 +71,21 @@ class InventoryService:
         - store_id: 店舗ID
         """
         
-        # 設定ファイル読み込み（無ければ初期値）
-        # 設定ファイルはリポジトリ直下の config/ に統一
-        # services/ からは parents[2] がリポジトリルート
-        config_path = Path(__file__).resolve().parents[2] / "config" / "inventory_settings.json"
-        default_settings = {
-            "skuTemplate": "{date:YYYYMMDD}-{ASIN|JAN}-{supplier}-{seq:3}-{condNum}",
-            "seqScope": "day",
-            "seqStart": 1
-        }
-        try:
-            if config_path.exists():
-                settings = json.loads(config_path.read_text(encoding="utf-8"))
-            else:
-                settings = default_settings
-        except Exception:
-            settings = default_settings
+        # 設定ファイル（リポジトリ直下の config/inventory_settings.json。無ければ初期値）は
+        # 更新されるまでコンパイル済みテンプレートごとキャッシュされる
+        settings = load_sku_settings().settings
 
         # オプションのSKU日付（"YYYYMMDD" など）を受け取り、テンプレート側で使用する
         renderer = SKUTemplateRenderer(settings, sku_date=sku_date)
+        # 連番はスコープ（日付・仕入先）ごとに今回の件数分をまとめて確保する（並行生成でも重ならない）
+        skus = renderer.render_many(products, allocator=sku_sequence_allocator)
 
-        results = []
-        for idx, product in enumerate(products):
-            try:
-                sku = renderer.render_sku(product, seq_offset=idx)
-            except Exception:
-                sku = ""
+        duplicates = find_duplicate_skus(skus)
+        if duplicates:
+            print(f"[WARNING] SKUが重複しています: {len(duplicates)}種類（例: {next(iter(duplicates))}）")
 
+        results = []
+        for product, sku in zip(products, skus):
             # 補助値
             condition = product.get("condition") or product.get("コンディション", "")
             supplier_code = product.get("supplier_code", "")
@@ -114,7 +108,9 @@ class InventoryService:
         return {
             "success": True,
             "processed": len(results),
-            "results": results
+            "results": results,
+            # 同じ一括生成内で重複した SKU（SKU と products の添字）
+            "duplicates": [{"sku": sku, "indexes": idxs} for sku, idxs in duplicates.items()],
         }
 
     @staticmethod
@@ -178,6 +174,7 @@ class InventoryService:
         return str_value
 
     @staticmethod
+    @stage_span("inventory.listing_csv")
     def generate_listing_csv_content(products: List[dict]) -> bytes:
         """
         商品リストから出品用CSVコンテンツを生成する（Shift-JISエンコーディング）。
@@ -5,7 +5,8 @@
 from __future__ import annotations
 
 import math
-from typing import Any, Dict, List, Optional
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional
 
 import pandas as pd
 
@@ -15,6 +16,13 @@ except ImportError:
     from database.route_db import RouteDatabase
 from services.route_matching_service import RouteMatchingService
 
+try:
+    from core.metrics import stage_span
+except ImportError:
+    # デスクトップから直接読み込む場合（API の計測は不要）
+    def stage_span(stage: str):
+        return nullcontext()
+
 
 class InventoryStoreMatchingError(Exception):
     """照合処理の入力・DBエラー。"""
@@ -40,7 +48,9 @@ def match_stores_from_purchase_data(
     route_summary_id: int,
     time_tolerance_minutes: int = 30,
     db_path: Optional[str] = None,
+    cancel_check: Optional[Callable[[], None]] = None,
 ) -> Dict[str, Any]:
+    """cancel_check は照合ループの商品ごとに呼ぶ（バックグラウンドジョブのキャンセル確認用）"""
     df = pd.DataFrame(purchase_data)
 
     purchase_date_candidates = ["仕入れ日", "purchaseDate", "purchase_date"]
@@ -54,12 +64,13 @@ def match_stores_from_purchase_data(
         supplier_col = "仕入先"
         df[supplier_col] = ""
 
-    route_db = RouteDatabase(db_path=db_path) if db_path else RouteDatabase()
-    route_summary = route_db.get_route_summary(route_summary_id)
+    with stage_span("matching.load_route"):
+        route_db = RouteDatabase(db_path=db_path) if db_path else RouteDatabase()
+        route_summary = route_db.get_route_summary(route_summary_id)
+        store_visits = route_db.get_store_visits_by_route(route_summary_id) if route_summary else []
     if not route_summary:
         raise InventoryStoreMatchingError("指定ルートが見つかりません")
 
-    store_visits = route_db.get_store_visits_by_route(route_summary_id)
     if not store_visits:
         raise InventoryStoreMatchingError("指定ルートに店舗訪問詳細がありません")
 
@@ -67,11 +78,13 @@ def match_stores_from_purchase_data(
 
     items = df.to_dict(orient="records")
     matcher = RouteMatchingService()
-    matched = matcher.match_store_code_by_time_and_profit(
-        purchase_items=items,
-        store_visits=store_visits,
-        time_tolerance_minutes=time_tolerance_minutes,
-    )
+    with stage_span("matching.match_items"):
+        matched = matcher.match_store_code_by_time_and_profit(
+            purchase_items=items,
+            store_visits=store_visits,
+            time_tolerance_minutes=time_tolerance_minutes,
+            cancel_check=cancel_check,
+        )
 
     df = df.reset_index(drop=True)
     matched_rows = 0
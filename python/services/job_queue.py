@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+プロセス内のバックグラウンドジョブ（時間のかかる API 処理用）。
+
+価格改定・店舗照合・出品CSV出力・SKU一括生成は1回の同期HTTPで結果を返すため、
+クライアントは長いタイムアウトで待つしかなかった。各エンドポイントの async=true で
+ジョブとして登録し、/jobs で状態・結果の取得とキャンセルを行う。
+
+- Job: 状態のスナップショット・変更待ち（SSE 用）・キャンセル要求（check_cancelled）を持つ
+- JobQueue: 上限付きのワーカースレッドで実行する。種類（job_type）ごとに同時実行数の上限があり、
+  上限に達した種類のジョブは順番待ち（queued）になる。終了したジョブの結果は TTL で破棄する
+- キャンセルは協調的: 処理側がループの区切りで job.check_cancelled() を呼ぶ。
+  順番待ちのジョブは即座にキャンセル済みになる
+"""
+
+from __future__ import annotations
+
+import threading
+import uuid
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+# 終了状態
+TERMINAL_STATUSES = ("done", "error", "cancelled")
+
+# ワーカースレッド数（全種類の同時実行数の上限）
+DEFAULT_MAX_WORKERS = 4
+
+# 種類ごとの同時実行数の上限（未登録の種類は DEFAULT_TYPE_LIMIT）
+# apply は出力保管庫へ、SKU一括生成は連番カウンタへ書き込むため1件ずつ実行する
+DEFAULT_TYPE_LIMITS: Dict[str, int] = {
+    "repricer.preview": 2,
+    "repricer.apply": 1,
+    "inventory.match_stores": 2,
+    "inventory.export_listing": 2,
+    "inventory.generate_sku_bulk": 1,
+}
+DEFAULT_TYPE_LIMIT = 1
+
+# 終了したジョブ（結果）を保持する秒数・件数
+DEFAULT_RESULT_TTL_SEC = 30 * 60
+DEFAULT_MAX_FINISHED = 64
+
+
+class JobCancelled(Exception):
+    """キャンセル要求を受けてジョブを中断した"""
+
+
+class Job:
+    """バックグラウンドジョブ1件の状態。"""
+
+    def __init__(self, job_type: str, kind: Optional[str] = None, mode: Optional[str] = None):
+        self.job_id = uuid.uuid4().hex
+        self.job_type = job_type
+        self.kind = kind
+        self.mode = mode
+        self.status = "queued"
+        self.stage = "queued"
+        self.message = "待機中"
+        self.progress = 0
+        self.processed_rows = 0
+        self.total_rows: Optional[int] = None
+        self.error: Optional[str] = None
+        # 失敗時に /jobs/{id}/result で返すHTTPステータス（処理側の例外の status_code。無ければ 500）
+        self.error_status: Optional[int] = None
+        self.result: Any = None
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.version = 0
+        self._cancel = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def request_cancel(self) -> None:
+        self._cancel.set()
+        self._touch()
+
+    def check_cancelled(self) -> None:
+        """キャンセル要求があれば JobCancelled を送出する（ループの区切りで呼ぶ）。"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def update(self, **fields: Any) -> None:
+        """状態を更新し、変更待ちのスレッドへ通知する。"""
+        for key, value in fields.items():
+            setattr(self, key, value)
+        self._touch()
+
+    def _touch(self) -> None:
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, since_version: int, timeout: float) -> int:
+        """version が since_version から進むまで（最大 timeout 秒）待ち、現在の version を返す。"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != since_version, timeout=timeout)
+            return self.version
+
+    def snapshot(self) -> Dict[str, Any]:
+        """APIで返す状態（結果本体は含めない）。"""
+        return {
+            "job_id": self.job_id,
+            "job_type": self.job_type,
+            "kind": self.kind,
+            "mode": self.mode,
+            "status": self.status,
+            "stage": self.stage,
+            "message": self.message,
+            "progress": self.progress,
+            "processed_rows": self.processed_rows,
+            "total_rows": self.total_rows,
+            "cancel_requested": self.cancel_requested,
+            "error": self.error,
+            "error_status": self.error_status,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+JobWork = Callable[[Job], Any]
+
+
+class JobQueue:
+    """ジョブの登録・実行・取得・キャンセル（プロセス内・スレッドセーフ）。"""
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        type_limits: Optional[Dict[str, int]] = None,
+        default_type_limit: int = DEFAULT_TYPE_LIMIT,
+        result_ttl_sec: float = DEFAULT_RESULT_TTL_SEC,
+        max_finished: int = DEFAULT_MAX_FINISHED,
+    ):
+        self.max_workers = max_workers
+        self.type_limits = dict(DEFAULT_TYPE_LIMITS if type_limits is None else type_limits)
+        self.default_type_limit = default_type_limit
+        self.result_ttl_sec = result_ttl_sec
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._pending: Deque[Tuple[Job, JobWork]] = deque()
+        self._running: Counter = Counter()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def limit_for(self, job_type: str) -> int:
+        return max(1, self.type_limits.get(job_type, self.default_type_limit))
+
+    def submit(self, job: Job, work: JobWork) -> Job:
+        """ジョブを登録し、空きがあればすぐに実行する。work の戻り値がジョブの結果になる。"""
+        with self._lock:
+            self._expire_locked()
+            self._jobs[job.job_id] = job
+            self._pending.append((job, work))
+            self._dispatch_locked()
+        return job
+
+    def _dispatch_locked(self) -> None:
+        """順番待ちのジョブを、全体・種類ごとの上限の範囲で実行に回す（登録順）。"""
+        started: List[Tuple[Job, JobWork]] = []
+        waiting: Deque[Tuple[Job, JobWork]] = deque()
+        running_total = sum(self._running.values())
+        for job, work in self._pending:
+            if job.finished:
+                continue
+            if running_total < self.max_workers and self._running[job.job_type] < self.limit_for(job.job_type):
+                self._running[job.job_type] += 1
+                running_total += 1
+                started.append((job, work))
+            else:
+                waiting.append((job, work))
+        self._pending = waiting
+        if started and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="api-job")
+        for job, work in started:
+            self._executor.submit(self._run, job, work)
+
+    def _run(self, job: Job, work: JobWork) -> None:
+        try:
+            job.check_cancelled()
+            job.update(status="running", stage="running", message="実行中")
+            result = work(job)
+            job.update(
+                status="done", stage="done", message="完了", progress=100,
+                result=result, finished_at=datetime.now(),
+            )
+        except JobCancelled:
+            job.update(status="cancelled", stage="cancelled", message="キャンセルしました", finished_at=datetime.now())
+        except Exception as e:
+            import traceback
+            print(f"[ERROR] ジョブ失敗 ({job.job_type}, {job.job_id}): {str(e)}")
+            print(f"[ERROR] トレースバック:\n{traceback.format_exc()}")
+            detail = getattr(e, "detail", None) or str(e)
+            # HTTPException（入力エラーの 400 など）は同期版と同じステータスを結果取得時に返す
+            status_code = getattr(e, "status_code", None)
+            job.update(
+                status="error", stage="error", message="失敗しました", error=str(detail),
+                error_status=status_code if isinstance(status_code, int) else 500,
+                finished_at=datetime.now(),
+            )
+        finally:
+            with self._lock:
+                self._running[job.job_type] -= 1
+                self._dispatch_locked()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._expire_locked()
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, job_type: Optional[str] = None) -> List[Job]:
+        """保持中のジョブ（登録順）。job_type を指定すると、その種類か「種類.」で始まるものに絞る"""
+        with self._lock:
+            self._expire_locked()
+            jobs = list(self._jobs.values())
+        if job_type:
+            jobs = [job for job in jobs if job.job_type == job_type or job.job_type.startswith(job_type + ".")]
+        return jobs
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """キャンセルを要求する（順番待ちなら即座に、実行中なら次の確認時点で中断）。"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.request_cancel()
+        with self._lock:
+            if job.status == "queued" and any(queued is job for queued, _ in self._pending):
+                self._pending = deque((j, w) for j, w in self._pending if j is not job)
+                job.update(status="cancelled", stage="cancelled", message="キャンセルしました", finished_at=datetime.now())
+        return job
+
+    def _expire_locked(self) -> None:
+        """TTL を過ぎた終了済みジョブと、件数上限を超えた古い終了済みジョブを破棄する。"""
+        cutoff = datetime.now() - timedelta(seconds=self.result_ttl_sec)
+        finished = [job for job in self._jobs.values() if job.finished]
+        overflow = max(0, len(finished) - self.max_finished)
+        for i, job in enumerate(finished):
+            if i < overflow or (job.finished_at is not None and job.finished_at < cutoff):
+                del self._jobs[job.job_id]
+
+
+# API 全体で共有するジョブキュー
+job_queue = JobQueue()
@@ -0,0 +1,877 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+3-6-9 改定の列指向エンジン。
+
+repricer_weekly._apply_repricing_rules_369_rowwise（iterrows 版）と同一の
+RepriceOutputs を、行ごとの Series 生成・row.to_dict() を行わずに
+NumPy / pandas のマスク演算でまとめて算出する。
+
+- ルール解決は repricer_config のコンパイル済み表（日数→ルール番号・ルール属性）を添字で引く
+- 価格・akaji・takane・TP 到達判定はすべて配列演算
+- 理由文字列は分岐マスクごとにトークンを積み上げ、最後に " / " で連結
+- 月別運用（個別ラダー）は SKU ごとにルールが異なるため、対象行のみ従来の行関数を使う
+
+出力 DataFrame は pd.DataFrame(list_of_dicts) と同じ型推論経路（行リスト→列変換）で
+組み立てるため、列順・dtype ともに行ループ版と一致する。
+reprice_rows_369_vectorized は同じ判定結果を DataFrame にする前の行 dict（RepriceRows）で返す
+（チャンク・差分・並列改定で結果を連結する用）。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from services.repricer_weekly import (
+    ACTION_NAMES_JP,
+    PurchaseRecord,
+    RepriceOutputs,
+    RepriceRows,
+    _apply_monthly_ladder_for_row,
+    _is_repricing_off,
+    _prefetch_purchase_records,
+    _to_float_or_none,
+    _to_float_or_none_strict,
+    format_trace_value,
+)
+from services.repricer_config import CompiledRepricerConfig, compile_repricer_config
+from utils.repricer_tp_target import format_tp_target_label, resolve_tp_behavior
+from utils.sku_listing_date import days_since_listed_series
+
+TP_TIERS = ("tp0", "tp1", "tp2", "tp3")
+
+_PRICE_DOWN_ACTIONS = ("price_down_1", "price_down_2", "price_down_3", "price_down_4")
+
+# ログ行のキー構成（行ループ版の dict リテラルと同順）
+_BASE_LOG_KEYS = (
+    "sku", "asin", "title", "days", "action", "reason", "price", "new_price",
+    "priceTrace", "new_priceTrace", "priceTraceChange", "priceTraceChangeDisplay",
+    "csv_profit", "tp_floor", "is_tp_floor_or_below", "tp_reach_status",
+)
+_RULE_EXCLUDED_LOG_KEYS = (
+    "sku", "asin", "title", "days", "action", "reason", "price", "new_price",
+    "priceTrace", "new_priceTrace", "priceTraceChange", "priceTraceChangeDisplay",
+    "csv_profit", "rule_action", "tp_target", "akaji", "akaji_drop_percent",
+    "keepa_min_same_condition", "tp_floor", "is_tp_floor_or_below", "tp_reach_status",
+)
+_RULE_UPDATED_LOG_KEYS = (
+    "sku", "asin", "title", "days", "action", "reason", "price", "new_price",
+    "priceTrace", "new_priceTrace", "priceTraceChange", "priceTraceChangeDisplay",
+    "csv_profit", "rule_action", "tp_target", "akaji", "akaji_drop_percent",
+    "takane", "takane_rise_percent", "keepa_min_same_condition", "tp_floor",
+    "is_tp_floor_or_below", "tp_reach_status",
+)
+
+# 改定後に上書きする在庫列（row_dict への代入順）
+_UPDATED_ROW_KEYS = ("price", "priceTrace", "akaji", "takane")
+
+_SKU_PROFILE_PATTERNS = (
+    (r"(?:^|[-_])3(?:[PN])?(?:$|[-_])", "3"),
+    (r"(?:^|[-_])6(?:[PN])?(?:$|[-_])", "6"),
+    (r"(?:^|[-_])9(?:[PN])?(?:$|[-_])", "9"),
+    (r"(?:3P|3N)", "3"),
+    (r"(?:6P|6N)", "6"),
+    (r"(?:9P|9N)", "9"),
+)
+
+
+def _map_values(values: Sequence[Any], func: Callable[[Any], Any]) -> np.ndarray:
+    """ユニーク値ごとに func を1回だけ評価して object 配列へ展開する。"""
+    cache: Dict[Any, Any] = {}
+    out = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        try:
+            key = (type(v), v)
+            if key in cache:
+                out[i] = cache[key]
+            else:
+                out[i] = cache[key] = func(v)
+        except TypeError:
+            out[i] = func(v)
+    return out
+
+
+def _float_or_zero(df: pd.DataFrame, column: str, values: np.ndarray) -> np.ndarray:
+    """float(row.get(column, 0) or 0) の列版。"""
+    if column in df.columns and pd.api.types.is_numeric_dtype(df[column].dtype):
+        return df[column].to_numpy(dtype=float, na_value=np.nan)
+    return np.array([float(v or 0) for v in values], dtype=float)
+
+
+def _strict_float(values: np.ndarray) -> np.ndarray:
+    """_to_float_or_none_strict の列版（None は NaN で表す）。"""
+    mapped = _map_values(values, _to_float_or_none_strict)
+    return np.array([np.nan if v is None else v for v in mapped], dtype=float)
+
+
+def _csv_profit_column(get_column: Callable[[str, Any], np.ndarray]) -> np.ndarray:
+    """_csv_profit_from_inventory_row の列版。"""
+    profit = _strict_float(get_column("profit", None))
+    price = _strict_float(get_column("price", None))
+    cost = _strict_float(get_column("cost", None))
+    amazon_fee = np.nan_to_num(_strict_float(get_column("amazon-fee", None)), nan=0.0)
+    shipping_price = np.nan_to_num(_strict_float(get_column("shipping-price", None)), nan=0.0)
+
+    has_profit = ~np.isnan(profit) & (profit != 0)
+    missing_base = np.isnan(price) | np.isnan(cost)
+    with np.errstate(invalid="ignore"):
+        derived = price - cost - amazon_fee - shipping_price
+    return np.where(
+        has_profit,
+        profit,
+        np.where(missing_base, np.nan_to_num(profit, nan=0.0), derived),
+    )
+
+
+def _strip_excel_formula(values: np.ndarray) -> np.ndarray:
+    """="..." 形式の文字列のみ外側を剥がす。"""
+    is_str = np.array([isinstance(v, str) for v in values], dtype=bool)
+    out = values.copy()
+    if is_str.any():
+        text = pd.Series(values[is_str], dtype=object)
+        wrapped = (text.str.startswith('="') & text.str.endswith('"')).to_numpy()
+        if wrapped.any():
+            idx = np.flatnonzero(is_str)[wrapped]
+            out[idx] = text[wrapped].str.slice(2, -1).to_numpy(dtype=object)
+    return out
+
+
+def _detect_profiles(sku_text: pd.Series, default_profile: str) -> tuple[np.ndarray, np.ndarray]:
+    """detect_369_profile_from_sku の列版。Returns: (profile, is_fallback)"""
+    upper = sku_text.str.upper()
+    conditions = [upper.str.contains(p, regex=True).to_numpy(dtype=bool) for p, _ in _SKU_PROFILE_PATTERNS]
+    choices = [profile for _, profile in _SKU_PROFILE_PATTERNS]
+    profile = np.select(conditions, choices, default=default_profile).astype(object)
+    matched = np.logical_or.reduce(conditions) if conditions else np.zeros(len(sku_text), dtype=bool)
+    return profile, ~matched
+
+
+def _tp_band(days: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """_get_tp_band の列版。"""
+    conditions = [days <= 90, days <= 180, days <= 270]
+    tier = np.select(conditions, ["tp0", "tp1", "tp2"], default="tp3").astype(object)
+    period_end = np.select(conditions, [90, 180, 270], default=365)
+    return tier, period_end
+
+
+def _frame_from_rows(rows: np.ndarray, columns: Sequence[str]) -> pd.DataFrame:
+    """
+    2次元 object 配列から DataFrame を作る。
+    行リストを渡すことで pd.DataFrame(list_of_dicts) と同じ列型推論になる。
+    """
+    if len(rows) == 0:
+        return pd.DataFrame([])
+    return pd.DataFrame(rows.tolist(), columns=list(columns))
+
+
+def _union_keys(keysets: np.ndarray, keyset_table: List[Sequence[str]]) -> List[str]:
+    """行ごとのキー構成から、初出順の列リストを作る（dict リスト→DataFrame の列順）。"""
+    columns: List[str] = []
+    seen = set()
+    _, first_rows = np.unique(keysets, return_index=True)
+    for code in keysets[np.sort(first_rows)]:
+        for key in keyset_table[int(code)]:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+    return columns
+
+
+class _Evaluated369(NamedTuple):
+    """列演算の評価結果（出力組み立て前）。"""
+    columns: List[str]
+    values: np.ndarray
+    keyset: np.ndarray
+    keyset_table: List[Sequence[str]]
+    log_values: Dict[str, np.ndarray]
+    is_updated: np.ndarray
+    is_repriced: np.ndarray
+    repriced_row_values: Dict[str, np.ndarray]
+
+
+def apply_repricing_rules_369_vectorized(
+    df: pd.DataFrame,
+    today: datetime,
+    config: Dict[str, Any],
+    compiled: Optional[CompiledRepricerConfig] = None,
+    purchase_records: Optional[Dict[str, PurchaseRecord]] = None,
+) -> RepriceOutputs:
+    """
+    3-6-9 改定を DataFrame 全体に列演算で適用する。
+    compiled 未指定時は config からルール引き表をその場でコンパイルする。
+    purchase_records 未指定時は仕入DBから対象 SKU を先読みする。
+    """
+    n = len(df)
+    if n == 0:
+        return RepriceOutputs(
+            log_df=pd.DataFrame([]), updated_df=pd.DataFrame([]), excluded_df=pd.DataFrame([]), items=[]
+        )
+    ev = _evaluate_369(df, today, config, compiled, purchase_records)
+    columns, values, keyset, keyset_table = ev.columns, ev.values, ev.keyset, ev.keyset_table
+
+    # --- 出力組み立て ---
+    log_columns = _union_keys(keyset, keyset_table)
+    log_rows = np.full((n, len(log_columns)), np.nan, dtype=object)
+    for j, key in enumerate(log_columns):
+        has_key = np.array([key in keys for keys in keyset_table], dtype=bool)[keyset]
+        log_rows[has_key, j] = ev.log_values[key][has_key]
+    log_df = _frame_from_rows(log_rows, log_columns)
+
+    updated_idx = np.flatnonzero(ev.is_updated)
+    extra_columns = [k for k in _UPDATED_ROW_KEYS if k not in columns] if ev.is_repriced.any() else []
+    updated_columns = columns + extra_columns
+    updated_rows = np.full((len(updated_idx), len(updated_columns)), np.nan, dtype=object)
+    updated_rows[:, : len(columns)] = values[updated_idx]
+    repriced_sel = ev.is_repriced[updated_idx]
+    for key in _UPDATED_ROW_KEYS:
+        j = updated_columns.index(key)
+        updated_rows[repriced_sel, j] = ev.repriced_row_values[key][updated_idx[repriced_sel]]
+    updated_df = _frame_from_rows(updated_rows, updated_columns)
+
+    excluded_idx = np.flatnonzero(~ev.is_updated)
+    excluded_df = _frame_from_rows(values[excluded_idx], columns)
+
+    items_list = log_df.to_dict(orient="records")
+    return RepriceOutputs(log_df=log_df, updated_df=updated_df, excluded_df=excluded_df, items=items_list)
+
+
+def reprice_rows_369_vectorized(
+    df: pd.DataFrame,
+    today: datetime,
+    config: Dict[str, Any],
+    compiled: Optional[CompiledRepricerConfig] = None,
+    purchase_records: Optional[Dict[str, PurchaseRecord]] = None,
+) -> RepriceRows:
+    """apply_repricing_rules_369_vectorized の結果を、DataFrame にする前の行 dict の形で返す。"""
+    if len(df) == 0:
+        return RepriceRows(log_rows=[], inventory_rows=[], excluded=[])
+    ev = _evaluate_369(df, today, config, compiled, purchase_records)
+    log_values = ev.log_values
+    log_rows = [
+        {key: log_values[key][i] for key in ev.keyset_table[code]}
+        for i, code in enumerate(ev.keyset.tolist())
+    ]
+    inventory_rows = []
+    for i, (values, repriced) in enumerate(zip(ev.values.tolist(), ev.is_repriced.tolist())):
+        row = dict(zip(ev.columns, values))
+        if repriced:
+            for key in _UPDATED_ROW_KEYS:
+                row[key] = ev.repriced_row_values[key][i]
+        inventory_rows.append(row)
+    return RepriceRows(
+        log_rows=log_rows, inventory_rows=inventory_rows, excluded=(~ev.is_updated).tolist()
+    )
+
+
+def _evaluate_369(
+    df: pd.DataFrame,
+    today: datetime,
+    config: Dict[str, Any],
+    compiled: Optional[CompiledRepricerConfig],
+    purchase_records: Optional[Dict[str, PurchaseRecord]],
+) -> _Evaluated369:
+    """3-6-9 改定の判定を列演算で行う（n >= 1）。"""
+    n = len(df)
+    columns = list(df.columns)
+    col_pos = {c: i for i, c in enumerate(columns)}
+    values = df.to_numpy()
+    if values.dtype != object:
+        values = values.astype(object)
+
+    def get_column(name: str, default: Any) -> np.ndarray:
+        if name in col_pos:
+            return values[:, col_pos[name]]
+        return np.full(n, default, dtype=object)
+
+    excluded_skus = set(config.get("excluded_skus", []))
+    profiles = config.get("rule_profiles", {})
+    if compiled is None:
+        compiled = compile_repricer_config(config, mode="369")
+    exception_rules = config.get("exception_reprice_rules", []) or []
+    default_profile = str(config.get("default_profile", "6"))
+    interval_days = max(1, int(config.get("interval_days", 7)))
+    alert_cfg = config.get("alerts", {}) or {}
+    alert_enabled = bool(alert_cfg.get("enabled", True))
+    alert_prefix = str(alert_cfg.get("reason_prefix", "ALERT")).strip() or "ALERT"
+
+    sku = _strip_excel_formula(get_column("SKU", ""))
+    sku_key = pd.Series(sku, dtype=object).astype(str).str.strip().to_numpy(dtype=object)
+    if purchase_records is None:
+        purchase_records = _prefetch_purchase_records([str(s or "").strip() for s in sku])
+    record_by_row = [purchase_records.get(k) for k in sku_key]
+
+    price = _float_or_zero(df, "price", get_column("price", 0))
+    akaji = _float_or_zero(df, "akaji", get_column("akaji", 0))
+    price_trace = get_column("priceTrace", 0)
+    asin = get_column("ASIN", "")
+    title = get_column("title", "")
+    csv_profit = _csv_profit_column(get_column)
+
+    # --- 行の分類（優先順は行ループ版と同じ） ---
+    row_off = _map_values(get_column("価格改定", None), _is_repricing_off).astype(bool)
+    db_enabled = np.array([rec.repricing_enabled if rec else True for rec in record_by_row], dtype=bool)
+    is_off = row_off | ~db_enabled
+    is_excluded_sku = ~is_off & pd.Series(sku, dtype=object).isin(list(excluded_skus)).to_numpy(dtype=bool)
+    pending = ~is_off & ~is_excluded_sku
+
+    days = np.full(n, -1, dtype=np.int64)
+    pending_idx = np.flatnonzero(pending)
+    if len(pending_idx):
+        days[pending_idx] = days_since_listed_series(pd.Series(sku[pending_idx], dtype=object), today).to_numpy()
+    is_unknown = pending & (days == -1)
+    is_over = pending & ~is_unknown & (days > 365)
+    active = pending & ~is_unknown & ~is_over
+
+    is_ladder = np.zeros(n, dtype=bool)
+    for i in np.flatnonzero(active):
+        rec = record_by_row[i]
+        if rec and rec.ladder_enabled and rec.ladder_rules:
+            is_ladder[i] = True
+    is_profile = active & ~is_ladder
+
+    # --- ログ・在庫行の器 ---
+    keyset_table: List[Sequence[str]] = [_BASE_LOG_KEYS, _RULE_EXCLUDED_LOG_KEYS, _RULE_UPDATED_LOG_KEYS]
+    keyset_codes = {keys: code for code, keys in enumerate(keyset_table)}
+    keyset = np.zeros(n, dtype=np.int64)
+    log_values: Dict[str, np.ndarray] = {}
+
+    def log_column(key: str) -> np.ndarray:
+        if key not in log_values:
+            log_values[key] = np.full(n, np.nan, dtype=object)
+        return log_values[key]
+
+    is_updated = is_unknown.copy()
+    is_repriced = np.zeros(n, dtype=bool)
+    repriced_row_values: Dict[str, np.ndarray] = {k: np.empty(n, dtype=object) for k in _UPDATED_ROW_KEYS}
+
+    base_rows = is_off | is_excluded_sku | is_unknown | is_over
+    price_list = price.tolist()
+    base_idx = np.flatnonzero(base_rows)
+    for key, source in (("sku", sku), ("asin", asin), ("title", title), ("priceTrace", price_trace)):
+        log_column(key)[base_idx] = source[base_idx]
+    log_column("days")[base_idx] = days[base_idx].tolist()
+    log_column("price")[base_idx] = [price_list[i] for i in base_idx]
+    log_column("new_price")[base_idx] = [price_list[i] for i in base_idx]
+    log_column("new_priceTrace")[base_idx] = price_trace[base_idx]
+    log_column("priceTraceChange")[base_idx] = 0
+    log_column("priceTraceChangeDisplay")[base_idx] = "無し"
+    log_column("csv_profit")[base_idx] = csv_profit[base_idx].tolist()
+    log_column("tp_floor")[base_idx] = None
+    log_column("is_tp_floor_or_below")[base_idx] = False
+    log_column("tp_reach_status")[base_idx] = ""
+    action_col = log_column("action")
+    reason_col = log_column("reason")
+    action_col[is_off | is_excluded_sku | is_over] = "除外"
+    action_col[is_unknown] = "維持"
+    reason_col[is_off] = "価格改定OFF（仕入DB設定）"
+    reason_col[is_excluded_sku] = "除外SKU（設定で除外指定）"
+    reason_col[is_unknown] = "日付不明（維持）"
+    over_idx = np.flatnonzero(is_over)
+    reason_col[over_idx] = [f"{d}日経過: 365日超過（要手動対応）" for d in days[over_idx].tolist()]
+
+    # --- 月別運用（個別ラダー）: SKU ごとのルールなので行関数で評価 ---
+    ladder_rows: Dict[int, Dict[str, Any]] = {}
+    for i in np.flatnonzero(is_ladder):
+        row = dict(zip(columns, values[i]))
+        kind, log_entry, row_payload = _apply_monthly_ladder_for_row(
+            row, int(days[i]), record_by_row[i].ladder_rules, config
+        )
+        entry_keys = tuple(log_entry.keys())
+        if entry_keys not in keyset_codes:
+            keyset_codes[entry_keys] = len(keyset_table)
+            keyset_table.append(entry_keys)
+        keyset[i] = keyset_codes[entry_keys]
+        for key, value in log_entry.items():
+            log_column(key)[i] = value
+        if kind == "excluded":
+            continue
+        is_updated[i] = True
+        is_repriced[i] = True
+        ladder_rows[i] = row_payload
+        for key in _UPDATED_ROW_KEYS:
+            repriced_row_values[key][i] = row_payload[key]
+
+    # --- 3-6-9 プロファイル改定（列演算） ---
+    pidx = np.flatnonzero(is_profile)
+    if len(pidx):
+        _apply_profile_rules(
+            pidx=pidx,
+            sku=sku,
+            sku_key=sku_key,
+            days=days,
+            price=price,
+            akaji=akaji,
+            price_trace=price_trace,
+            asin=asin,
+            title=title,
+            csv_profit=csv_profit,
+            keepa_raw=get_column("keepa_min_same_condition", None),
+            purchase_records=purchase_records,
+            profiles=profiles,
+            exception_rules=exception_rules,
+            compiled=compiled,
+            default_profile=default_profile,
+            interval_days=interval_days,
+            alert_enabled=alert_enabled,
+            alert_prefix=alert_prefix,
+            config=config,
+            keyset=keyset,
+            log_column=log_column,
+            is_updated=is_updated,
+            is_repriced=is_repriced,
+            repriced_row_values=repriced_row_values,
+        )
+
+    return _Evaluated369(
+        columns=columns,
+        values=values,
+        keyset=keyset,
+        keyset_table=keyset_table,
+        log_values=log_values,
+        is_updated=is_updated,
+        is_repriced=is_repriced,
+        repriced_row_values=repriced_row_values,
+    )
+
+
+class _ProfileRows(NamedTuple):
+    """プロファイル対象行の、経過日数に依らない判定（SKU タグ・仕入DB TP）。"""
+    profile: np.ndarray
+    is_fallback: np.ndarray
+    fallback_to_profile6: np.ndarray
+    using_exception_rules: np.ndarray
+    db_tp: np.ndarray
+
+
+class _ProfilePricing(NamedTuple):
+    """プロファイル対象行の改定計算結果（理由トークンの分岐マスクを含む）。"""
+    raw_action: np.ndarray
+    trace_value: np.ndarray
+    tp_target_raw: np.ndarray
+    tp_key: np.ndarray
+    tp_rate: np.ndarray
+    use_db_tp: np.ndarray
+    tp_floor: np.ndarray
+    period_end: np.ndarray
+    akaji_drop_percent: np.ndarray
+    takane_rise_percent: np.ndarray
+    keep_tp0: np.ndarray
+    keep_tp0_restore: np.ndarray
+    follow_restore: np.ndarray
+    follow_step: np.ndarray
+    daily: np.ndarray
+    tp_down_step: np.ndarray
+    keepa_below: np.ndarray
+    reach_akaji: np.ndarray
+    keep_below: np.ndarray
+    guard_restore: np.ndarray
+    guard_fix: np.ndarray
+    new_price: np.ndarray
+    final_akaji: np.ndarray
+    final_takane: np.ndarray
+
+
+def _resolve_profile_rows(
+    sku_text: pd.Series,
+    tp_rows: Sequence[Optional[Dict[str, Any]]],
+    default_profile: str,
+    exception_rules: Any,
+) -> _ProfileRows:
+    """SKU タグと仕入DB TP からプロファイル（6ルールへの振替・例外ルール）を決める。"""
+    m = len(tp_rows)
+    profile, is_fallback = _detect_profiles(sku_text, default_profile)
+    has_db_sku = np.array([tp_row is not None for tp_row in tp_rows], dtype=bool)
+    db_tp = np.full((m, len(TP_TIERS)), np.nan)
+    for r, tp_row in enumerate(tp_rows):
+        if tp_row:
+            for t, tier in enumerate(TP_TIERS):
+                v = tp_row.get(tier)
+                if v is not None:
+                    db_tp[r, t] = v
+    has_any_db_tp = (db_tp > 0).any(axis=1)
+
+    fallback_to_profile6 = is_fallback & has_db_sku & has_any_db_tp
+    using_exception_rules = is_fallback & ~fallback_to_profile6 & bool(exception_rules)
+    profile[fallback_to_profile6] = "6"
+    return _ProfileRows(profile, is_fallback, fallback_to_profile6, using_exception_rules, db_tp)
+
+
+def _price_profile_rows(
+    rows: _ProfileRows,
+    d: np.ndarray,
+    p: np.ndarray,
+    a: np.ndarray,
+    keepa: np.ndarray,
+    keepa_is_none: np.ndarray,
+    profiles: Dict[str, Any],
+    compiled: CompiledRepricerConfig,
+    interval_days: int,
+    config: Dict[str, Any],
+) -> _ProfilePricing:
+    """経過日数 d・現在価格 p・akaji a に対する改定価格を配列演算で求める（ログ・理由文字列は作らない）。"""
+    m = len(d)
+    profile = rows.profile
+    using_exception_rules = rows.using_exception_rules
+
+    # ルール解決（コンパイル済みの日数→ルール表とルール属性表を添字で引く）
+    raw_action = np.empty(m, dtype=object)
+    trace_value = np.empty(m, dtype=object)
+    rule_tp_target = np.empty(m, dtype=object)
+    has_tp_target = np.zeros(m, dtype=bool)
+    akaji_drop_percent = np.zeros(m, dtype=np.int64)
+    takane_rise_percent = np.zeros(m, dtype=np.int64)
+    tp_down_period_end = np.zeros(m, dtype=np.int64)
+    rulesets = [(using_exception_rules, compiled.exception_table)]
+    for key in pd.unique(profile[~using_exception_rules]):
+        rulesets.append((~using_exception_rules & (profile == key), compiled.profile_table(key)))
+    for mask, table in rulesets:
+        if not mask.any():
+            continue
+        rule_idx = table.indices(d[mask])
+        raw_action[mask] = table.raw_action[rule_idx]
+        trace_value[mask] = table.trace_value[rule_idx]
+        rule_tp_target[mask] = table.tp_target[rule_idx]
+        has_tp_target[mask] = table.has_tp_target[rule_idx]
+        akaji_drop_percent[mask] = table.akaji_drop_percent[rule_idx]
+        takane_rise_percent[mask] = table.takane_rise_percent[rule_idx]
+        tp_down_period_end[mask] = table.tp_down_period_end[rule_idx]
+
+    tp_key_default, period_end_default = _tp_band(d)
+    tp_target_raw = np.where(has_tp_target, rule_tp_target, tp_key_default)
+    target_codes, target_uniques = pd.factorize(tp_target_raw)
+    behaviors = [resolve_tp_behavior(t, config) for t in target_uniques]
+    tp_key = np.array([b[0] for b in behaviors], dtype=object)[target_codes]
+    gradual = np.array([b[1] for b in behaviors], dtype=bool)[target_codes]
+    floor_guard = np.array([b[2] for b in behaviors], dtype=bool)[target_codes]
+    invalid_tier = ~np.isin(tp_key, TP_TIERS)
+    tp_key[invalid_tier] = tp_key_default[invalid_tier]
+
+    tier_index = np.select([tp_key == t for t in TP_TIERS], list(range(len(TP_TIERS))), default=0)
+    profile_codes, profile_uniques = pd.factorize(profile)
+    rate_table = np.array([
+        [float((((profiles.get(prof) or {}).get("tp_rates") or {}).get(tier, 0)) or 0) for tier in TP_TIERS]
+        for prof in profile_uniques
+    ], dtype=float).reshape(len(profile_uniques), len(TP_TIERS))
+    tp_rate = rate_table[profile_codes, tier_index]
+
+    db_tp_value = rows.db_tp[np.arange(m), tier_index]
+    use_db_tp = ~np.isnan(db_tp_value) & (db_tp_value > 0)
+    base = np.where(a > 0, a, p)
+    rate_floor = np.rint(np.where(base > 0, base, 0.0) * (np.where(tp_rate > 0, tp_rate, 0.0) / 100.0))
+    tp_floor = np.where(use_db_tp, np.rint(np.nan_to_num(db_tp_value)), rate_floor)
+
+    is_tp_down = raw_action == "tp_down"
+    is_price_trace = raw_action == "priceTrace"
+    period_end = np.where(is_tp_down, tp_down_period_end, period_end_default)
+
+    # --- 改定価格 ---
+    new_price = np.rint(p)
+    tp0 = tp_key == "tp0"
+    floor_positive = use_db_tp & (tp_floor > 0)
+    below_floor = p < tp_floor
+    steps = np.maximum(1, np.ceil(np.maximum(0, period_end - d) / interval_days))
+
+    # TP0（価格維持）: priceTrace / tp_down 共通
+    keep_tp0 = (is_price_trace | is_tp_down) & tp0 & ~gradual
+    keep_tp0_restore = keep_tp0 & floor_guard & floor_positive & below_floor
+    new_price[keep_tp0_restore] = tp_floor[keep_tp0_restore]
+
+    # priceTrace: TP0（追従）
+    follow_tp0 = is_price_trace & tp0 & gradual & floor_positive
+    follow_restore = follow_tp0 & below_floor & floor_guard
+    follow_step = follow_tp0 & ~follow_restore & (p > tp_floor)
+    follow_floor = follow_tp0 & ~follow_restore & ~follow_step
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stepped = np.maximum(tp_floor, np.rint(p - (p - tp_floor) / steps))
+    new_price[follow_restore | follow_floor] = tp_floor[follow_restore | follow_floor]
+    new_price[follow_step] = stepped[follow_step]
+
+    # priceTrace: TP1+ 段階調整
+    daily = is_price_trace & ~keep_tp0 & ~follow_tp0 & floor_positive & (p > tp_floor)
+    new_price[daily] = stepped[daily]
+
+    # tp_down
+    tp_down_step = is_tp_down & ~keep_tp0
+    keepa_below = ~keepa_is_none & (keepa < tp_floor)
+    start_price = np.where(
+        keepa_is_none,
+        p,
+        np.where(keepa_below, tp_floor, np.where(keepa < p, keepa, p)),
+    )
+    with np.errstate(invalid="ignore"):
+        stepped_down = np.maximum(tp_floor, np.rint(start_price - (start_price - tp_floor) / steps))
+    new_price[tp_down_step] = stepped_down[tp_down_step]
+
+    # price_down_N
+    for action in _PRICE_DOWN_ACTIONS:
+        mask = raw_action == action
+        if mask.any():
+            down_percent = int(action.replace("price_down_", ""))
+            new_price[mask] = np.rint(p[mask] * (1.0 - down_percent / 100.0))
+
+    # --- akaji / TP 下限ガード ---
+    final_akaji = np.maximum(0, np.rint(new_price * (1.0 - akaji_drop_percent / 100.0)))
+    skip_maintain_below = floor_guard & floor_positive & below_floor
+    reach_akaji = (p > final_akaji) & (new_price <= final_akaji)
+    keep_below = ~reach_akaji & (p <= final_akaji) & ~skip_maintain_below
+    new_price[reach_akaji] = final_akaji[reach_akaji]
+    new_price[keep_below] = np.rint(p[keep_below])
+
+    strong_guard = floor_guard & tp0 & use_db_tp & (tp_floor > 0)
+    guard_restore = strong_guard & below_floor
+    guard_fix = strong_guard & ~guard_restore & (new_price < tp_floor)
+    new_price[guard_restore | guard_fix] = tp_floor[guard_restore | guard_fix]
+    final_akaji[strong_guard] = np.maximum(tp_floor[strong_guard], final_akaji[strong_guard])
+
+    final_takane = np.maximum(new_price, np.rint(new_price * (1.0 + takane_rise_percent / 100.0)))
+    return _ProfilePricing(
+        raw_action=raw_action,
+        trace_value=trace_value,
+        tp_target_raw=tp_target_raw,
+        tp_key=tp_key,
+        tp_rate=tp_rate,
+        use_db_tp=use_db_tp,
+        tp_floor=tp_floor,
+        period_end=period_end,
+        akaji_drop_percent=akaji_drop_percent,
+        takane_rise_percent=takane_rise_percent,
+        keep_tp0=keep_tp0,
+        keep_tp0_restore=keep_tp0_restore,
+        follow_restore=follow_restore,
+        follow_step=follow_step,
+        daily=daily,
+        tp_down_step=tp_down_step,
+        keepa_below=keepa_below,
+        reach_akaji=reach_akaji,
+        keep_below=keep_below,
+        guard_restore=guard_restore,
+        guard_fix=guard_fix,
+        new_price=new_price,
+        final_akaji=final_akaji,
+        final_takane=final_takane,
+    )
+
+
+def _keepa_column(keepa_raw: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """keepa_min_same_condition 列を (ログ用の値, 未入力マスク, float 配列) へ。"""
+    keepa_min = _map_values(keepa_raw, _to_float_or_none)
+    keepa_is_none = np.array([v is None for v in keepa_min], dtype=bool)
+    keepa = np.array([np.nan if v is None else v for v in keepa_min], dtype=float)
+    return keepa_min, keepa_is_none, keepa
+
+
+def _apply_profile_rules(
+    *,
+    pidx: np.ndarray,
+    sku: np.ndarray,
+    sku_key: np.ndarray,
+    days: np.ndarray,
+    price: np.ndarray,
+    akaji: np.ndarray,
+    price_trace: np.ndarray,
+    asin: np.ndarray,
+    title: np.ndarray,
+    csv_profit: np.ndarray,
+    keepa_raw: np.ndarray,
+    purchase_records: Dict[str, PurchaseRecord],
+    profiles: Dict[str, Any],
+    exception_rules: Any,
+    compiled: CompiledRepricerConfig,
+    default_profile: str,
+    interval_days: int,
+    alert_enabled: bool,
+    alert_prefix: str,
+    config: Dict[str, Any],
+    keyset: np.ndarray,
+    log_column: Callable[[str], np.ndarray],
+    is_updated: np.ndarray,
+    is_repriced: np.ndarray,
+    repriced_row_values: Dict[str, np.ndarray],
+) -> None:
+    """プロファイル（3/6/9・例外）ルール対象行 pidx をまとめて改定する。"""
+    m = len(pidx)
+    d = days[pidx]
+    p = price[pidx]
+    a = akaji[pidx]
+
+    # プロファイル判定と仕入DB TP
+    tp_rows = [rec.tp if rec else None for rec in (purchase_records.get(k) for k in sku_key[pidx])]
+    rows = _resolve_profile_rows(
+        pd.Series(sku[pidx], dtype=object).astype(str), tp_rows, default_profile, exception_rules
+    )
+    profile = rows.profile
+    is_fallback = rows.is_fallback
+    fallback_to_profile6 = rows.fallback_to_profile6
+    using_exception_rules = rows.using_exception_rules
+
+    keepa_min, keepa_is_none, keepa = _keepa_column(keepa_raw[pidx])
+    pricing = _price_profile_rows(
+        rows, d, p, a, keepa, keepa_is_none, profiles, compiled, interval_days, config
+    )
+    raw_action = pricing.raw_action
+    tp_target_raw = pricing.tp_target_raw
+    tp_key = pricing.tp_key
+    tp_rate = pricing.tp_rate
+    use_db_tp = pricing.use_db_tp
+    tp_floor = pricing.tp_floor
+    period_end = pricing.period_end
+    akaji_drop_percent = pricing.akaji_drop_percent
+    takane_rise_percent = pricing.takane_rise_percent
+    new_price = pricing.new_price
+    final_akaji = pricing.final_akaji
+    final_takane = pricing.final_takane
+    is_price_trace = raw_action == "priceTrace"
+    is_exclude = raw_action == "exclude"
+
+    action_jp = _map_values(raw_action, lambda act: ACTION_NAMES_JP.get(act, act))
+    tier_upper = _map_values(tp_key, lambda t: t.upper())
+
+    # --- 理由トークン（行ループ版の追加順を保つ） ---
+    d_list = d.tolist()
+    price_round = np.rint(p).astype(np.int64)
+    price_round_list = price_round.tolist()
+    tp_floor_int = tp_floor.astype(np.int64)
+    tp_floor_list = tp_floor_int.tolist()
+    tokens: List[List[str]] = []
+    for r in range(m):
+        rule_label = "例外ルール" if using_exception_rules[r] else f"{profile[r]}ルール"
+        if using_exception_rules[r]:
+            tokens.append([f"{d_list[r]}日経過: 3-6-9改定({rule_label}/{action_jp[r]})"])
+        else:
+            tokens.append([
+                f"{d_list[r]}日経過: 3-6-9改定({rule_label}/{format_tp_target_label(tp_target_raw[r])}/{action_jp[r]})"
+            ])
+
+    def add_tokens(mask: np.ndarray, build: Callable[[int], str]) -> None:
+        for r in np.flatnonzero(mask):
+            tokens[r].append(build(r))
+
+    add_tokens(fallback_to_profile6, lambda r: "PROFILE_FALLBACK: SKUタグ判定不可だが仕入DBのTP入力ありのため6ルール適用")
+    add_tokens(
+        is_fallback & using_exception_rules,
+        lambda r: "PROFILE_FALLBACK: SKUタグ判定不可のため例外タブルール適用",
+    )
+    add_tokens(
+        is_fallback & ~fallback_to_profile6 & ~using_exception_rules,
+        lambda r: f"PROFILE_FALLBACK: SKUタグ判定不可（例外ルール未設定のため{profile[r]}ルール適用）",
+    )
+    for r in range(m):
+        if use_db_tp[r]:
+            tokens[r].append(f"TP_DB: 仕入DBの{tier_upper[r]}={tp_floor_list[r]}を適用")
+            if p[r] <= tp_floor[r]:
+                tokens[r].append(
+                    f"{tier_upper[r]}は{tp_floor_list[r]}だが現在価格{price_round_list[r]}のためTP下限以下判定で{price_round_list[r]}維持"
+                )
+        else:
+            tokens[r].append(f"TP_RATE: {tier_upper[r]}={float(tp_rate[r])}% で算出")
+
+    restore_token = lambda r: (
+        f"TP0下限固定: 現在価格{price_round_list[r]}円 < TP0({tp_floor_list[r]}円) のため復帰"
+    )
+    add_tokens(pricing.keep_tp0, lambda r: "TP0（価格維持）: 段階的下げを行わず価格維持")
+    add_tokens(pricing.keep_tp0_restore, restore_token)
+    add_tokens(pricing.follow_restore, restore_token)
+    add_tokens(
+        pricing.follow_step,
+        lambda r: f"TP0（追従）: {d_list[r]}日→{int(period_end[r])}日でTP0({tp_floor_list[r]})へ段階調整",
+    )
+    add_tokens(
+        pricing.daily,
+        lambda r: f"TP_DAILY: {d_list[r]}日→{int(period_end[r])}日で{tp_floor_list[r]}へ段階調整",
+    )
+    new_trace = price_trace[pidx].copy()
+    new_trace[is_price_trace] = pricing.trace_value[is_price_trace]
+
+    add_tokens(pricing.tp_down_step & keepa_is_none, lambda r: "KEEPA_MISSING: keepa_min_same_condition 未入力")
+    if alert_enabled:
+        add_tokens(
+            pricing.tp_down_step & pricing.keepa_below,
+            lambda r: (
+                f"{alert_prefix}: keepa_min({round(float(keepa[r]))}) < {tier_upper[r]}_floor({tp_floor_list[r]}) のためTP下限で固定"
+            ),
+        )
+
+    active = ~is_exclude
+    add_tokens(active & pricing.reach_akaji, lambda r: "TP下限に到達（維持）")
+    add_tokens(
+        active & pricing.keep_below,
+        lambda r: (
+            f"{tier_upper[r]}は{tp_floor_list[r]}だが現在価格{price_round_list[r]}のためTP下限以下判定で{price_round_list[r]}維持"
+        ),
+    )
+    add_tokens(
+        active & pricing.guard_restore,
+        lambda r: f"TP0_GUARD: 現在価格{price_round_list[r]}円がTP0({tp_floor_list[r]}円)未満のため強制復帰",
+    )
+    add_tokens(active & pricing.guard_fix, lambda r: f"TP0_GUARD: 改定価格をTP0({tp_floor_list[r]}円)で固定")
+
+    is_tp_floor_or_below = (tp_floor > 0) & ((new_price <= tp_floor) | (p <= tp_floor))
+    tp_reach_status = np.where(
+        is_tp_floor_or_below,
+        np.where((p <= tp_floor) & (d < period_end), "期間外到達", "期間到達"),
+        "",
+    ).astype(object)
+
+    # --- ログ書き込み ---
+    new_price_list = new_price.astype(np.int64).tolist()
+    final_akaji_list = final_akaji.astype(np.int64).tolist()
+    final_takane_list = final_takane.astype(np.int64).tolist()
+    price_list = p.tolist()
+    keepa_list = keepa_min.tolist()
+
+    excl = np.flatnonzero(is_exclude)
+    upd = np.flatnonzero(~is_exclude)
+    rows_excl = pidx[excl]
+    rows_upd = pidx[upd]
+    keyset[rows_excl] = 1
+    keyset[rows_upd] = 2
+
+    for key, source in (("sku", sku), ("asin", asin), ("title", title), ("priceTrace", price_trace)):
+        log_column(key)[pidx] = source[pidx]
+    log_column("days")[pidx] = d_list
+    log_column("price")[pidx] = price_list
+    log_column("csv_profit")[pidx] = csv_profit[pidx].tolist()
+    log_column("rule_action")[pidx] = raw_action
+    log_column("akaji_drop_percent")[pidx] = akaji_drop_percent.tolist()
+    log_column("keepa_min_same_condition")[pidx] = keepa_list
+    log_column("tp_floor")[pidx] = tp_floor_list
+
+    # ルール設定による除外
+    log_column("action")[rows_excl] = "除外"
+    log_column("reason")[rows_excl] = [f"{d_list[r]}日経過: 除外（ルール設定）" for r in excl]
+    log_column("new_price")[rows_excl] = [price_list[r] for r in excl]
+    log_column("new_priceTrace")[rows_excl] = price_trace[rows_excl]
+    log_column("priceTraceChange")[rows_excl] = 0
+    log_column("priceTraceChangeDisplay")[rows_excl] = "無し"
+    log_column("tp_target")[rows_excl] = tp_key[excl]
+    log_column("akaji")[rows_excl] = a[excl].tolist()
+    log_column("is_tp_floor_or_below")[rows_excl] = False
+    log_column("tp_reach_status")[rows_excl] = ""
+
+    # 改定行
+    upd_is_trace = is_price_trace[upd]
+    log_column("action")[rows_upd] = action_jp[upd]
+    log_column("reason")[rows_upd] = [" / ".join(tokens[r]) for r in upd]
+    log_column("new_price")[rows_upd] = [new_price_list[r] for r in upd]
+    log_column("new_priceTrace")[rows_upd] = new_trace[upd]
+    log_column("priceTraceChange")[rows_upd] = np.where(upd_is_trace, new_trace[upd], 0)
+    log_column("priceTraceChangeDisplay")[rows_upd] = [
+        format_trace_value(new_trace[r]) if is_price_trace[r] else "無し" for r in upd
+    ]
+    log_column("tp_target")[rows_upd] = tp_target_raw[upd]
+    log_column("akaji")[rows_upd] = [final_akaji_list[r] for r in upd]
+    log_column("takane")[rows_upd] = [final_takane_list[r] for r in upd]
+    log_column("takane_rise_percent")[rows_upd] = takane_rise_percent[upd].tolist()
+    log_column("is_tp_floor_or_below")[rows_upd] = is_tp_floor_or_below[upd].tolist()
+    log_column("tp_reach_status")[rows_upd] = tp_reach_status[upd]
+
+    is_updated[rows_upd] = True
+    is_repriced[rows_upd] = True
+    repriced_row_values["price"][rows_upd] = [new_price_list[r] for r in upd]
+    repriced_row_values["priceTrace"][rows_upd] = new_trace[upd]
+    repriced_row_values["akaji"][rows_upd] = [final_akaji_list[r] for r in upd]
+    repriced_row_values["takane"][rows_upd] = [final_takane_list[r] for r in upd]
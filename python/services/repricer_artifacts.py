@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+価格改定の出力ファイル（updated / excluded / log / report CSV）の保管庫。
+
+従来は実行のたびに python/tmp へ日時付きのファイルを書き出し、削除もしていなかった。
+ここでは出力を内容のハッシュ（SHA-256）で名前付けして保存し、実行（run）ごとの
+ファイル一覧を SQLite の索引に記録する。
+
+- 同じ内容のファイルは1つだけ保存する（複数の run から参照できる）
+- 保存は専用の書き込みスレッドで行い、リクエスト処理を待たせない。
+  保存前に run のファイルを要求された場合は書き込み完了を待ってから返す
+- 保存のたびに保持ポリシー（最新 N 件・D 日以内。索引DBに保存）で古い run を削除し、
+  どの run からも参照されなくなったファイルを消す
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Union
+
+from core.config import BASE_DIR
+
+# 保管庫の場所（objects/ に内容ハッシュ名のファイル、index.db に run の索引）
+ARTIFACT_DIR = BASE_DIR / "python" / "data" / "repricer_artifacts"
+
+# 既定の保持ポリシー（None は無制限）
+DEFAULT_KEEP_RUNS = 30
+DEFAULT_KEEP_DAYS = 30
+
+# 保存前の run を待つ上限（秒）
+PENDING_WAIT_SEC = 120.0
+
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS artifact_runs (
+        run_id TEXT PRIMARY KEY,
+        mode TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        summary TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS artifact_files (
+        run_id TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        PRIMARY KEY (run_id, kind)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_artifact_files_digest ON artifact_files (digest)",
+    """
+    CREATE TABLE IF NOT EXISTS artifact_settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """,
+)
+
+# 保存するファイルの内容: バイト列、または書き出し済みのファイル（保管庫へ移動する）
+ArtifactContent = Union[bytes, Path]
+
+
+class RetentionPolicy(NamedTuple):
+    """保持ポリシー（keep_runs: 最新から残す run 数、keep_days: 残す日数。None は無制限）。"""
+    keep_runs: Optional[int] = DEFAULT_KEEP_RUNS
+    keep_days: Optional[int] = DEFAULT_KEEP_DAYS
+
+
+class ArtifactFile(NamedTuple):
+    kind: str
+    digest: str
+    size: int
+    path: Path
+
+
+class ArtifactRun(NamedTuple):
+    run_id: str
+    mode: str
+    created_at: str
+    summary: Dict[str, Any]
+    files: Dict[str, ArtifactFile]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "mode": self.mode,
+            "created_at": self.created_at,
+            "summary": self.summary,
+            "files": {kind: {"digest": f.digest, "size": f.size} for kind, f in self.files.items()},
+        }
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RepricerArtifactStore:
+    """内容ハッシュで重複を除いて出力ファイルを保存し、run 単位で取り出す。"""
+
+    def __init__(self, root: Path = ARTIFACT_DIR):
+        self.root = Path(root)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="repricer-artifacts")
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    # --- 索引DB ---
+    def _connect(self) -> sqlite3.Connection:
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.root / "index.db"), timeout=10)
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        return conn
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.csv"
+
+    # --- 保存 ---
+    @staticmethod
+    def new_run_id() -> str:
+        return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+    def _store_object(self, kind: str, content: ArtifactContent) -> ArtifactFile:
+        """内容を objects/ へ保存する（同じ内容が既にあれば書かない）。"""
+        if isinstance(content, Path):
+            digest, size = _hash_file(content), content.stat().st_size
+        else:
+            digest, size = hashlib.sha256(content).hexdigest(), len(content)
+        target = self._object_path(digest)
+        if target.exists():
+            if isinstance(content, Path):
+                content.unlink(missing_ok=True)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            staging = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+            if isinstance(content, Path):
+                shutil.move(str(content), str(staging))
+            else:
+                staging.write_bytes(content)
+            os.replace(staging, target)
+        return ArtifactFile(kind, digest, size, target)
+
+    def save_run(
+        self,
+        run_id: str,
+        mode: str,
+        files: Dict[str, ArtifactContent],
+        summary: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """run のファイルを保存して索引へ登録し、保持ポリシーで古い run を削除する（同期）。"""
+        stored = {kind: self._store_object(kind, content) for kind, content in files.items()}
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO artifact_runs (run_id, mode, created_at, summary) VALUES (?, ?, ?, ?)",
+                    (run_id, mode, datetime.now().isoformat(timespec="seconds"),
+                     json.dumps(summary or {}, ensure_ascii=False, default=str)),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO artifact_files (run_id, kind, digest, size) VALUES (?, ?, ?, ?)",
+                    [(run_id, kind, f.digest, f.size) for kind, f in stored.items()],
+                )
+            self._prune(conn, self._read_retention(conn))
+        finally:
+            conn.close()
+
+    def submit_run(
+        self,
+        run_id: str,
+        mode: str,
+        render: Callable[[], Dict[str, ArtifactContent]],
+        summary: Optional[Dict[str, Any]] = None,
+    ) -> Future:
+        """
+        書き込みスレッドで render() の結果を保存する（CSV の組み立てもスレッド側で行う）。
+        失敗は [ERROR] を出力して握りつぶす（レスポンスは返却済みのため）。
+        """
+        def task() -> None:
+            try:
+                self.save_run(run_id, mode, render(), summary)
+            except Exception as e:
+                import traceback
+                print(f"[ERROR] 価格改定の出力ファイル保存に失敗 (run_id={run_id}): {str(e)}")
+                print(f"[ERROR] トレースバック:\n{traceback.format_exc()}")
+            finally:
+                with self._lock:
+                    self._pending.pop(run_id, None)
+
+        with self._lock:
+            future = self._executor.submit(task)
+            self._pending[run_id] = future
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """送信済みの保存がすべて終わるまで待つ。"""
+        self._executor.submit(lambda: None).result(timeout=timeout)
+
+    # --- 参照 ---
+    def _wait_pending(self, run_id: str) -> None:
+        with self._lock:
+            future = self._pending.get(run_id)
+        if future is not None:
+            future.result(timeout=PENDING_WAIT_SEC)
+
+    def get_run(self, run_id: str) -> Optional[ArtifactRun]:
+        """run の情報（保存中なら完了を待つ）。無い・保持期間切れの場合は None"""
+        self._wait_pending(run_id)
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT run_id, mode, created_at, summary FROM artifact_runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            files = {
+                kind: ArtifactFile(kind, digest, size, self._object_path(digest))
+                for kind, digest, size in conn.execute(
+                    "SELECT kind, digest, size FROM artifact_files WHERE run_id = ? ORDER BY kind", (run_id,)
+                )
+            }
+        finally:
+            conn.close()
+        return ArtifactRun(row[0], row[1], row[2], json.loads(row[3]), files)
+
+    def list_runs(self, limit: int = 50) -> List[ArtifactRun]:
+        """新しい順の run 一覧（保存中の run は含まない）"""
+        conn = self._connect()
+        try:
+            run_ids = [
+                r[0] for r in conn.execute(
+                    "SELECT run_id FROM artifact_runs ORDER BY created_at DESC, run_id DESC LIMIT ?", (limit,)
+                )
+            ]
+        finally:
+            conn.close()
+        return [run for run in (self.get_run(run_id) for run_id in run_ids) if run is not None]
+
+    # --- 保持ポリシー ---
+    @staticmethod
+    def _read_retention(conn: sqlite3.Connection) -> RetentionPolicy:
+        values = dict(conn.execute("SELECT key, value FROM artifact_settings"))
+
+        def parse(key: str, default: Optional[int]) -> Optional[int]:
+            if key not in values:
+                return default
+            return None if values[key] is None else int(values[key])
+
+        return RetentionPolicy(parse("keep_runs", DEFAULT_KEEP_RUNS), parse("keep_days", DEFAULT_KEEP_DAYS))
+
+    def get_retention(self) -> RetentionPolicy:
+        conn = self._connect()
+        try:
+            return self._read_retention(conn)
+        finally:
+            conn.close()
+
+    def set_retention(self, policy: RetentionPolicy) -> RetentionPolicy:
+        """保持ポリシーを保存し、すぐに適用する。"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO artifact_settings (key, value) VALUES (?, ?)",
+                    [(key, None if value is None else str(int(value))) for key, value in policy._asdict().items()],
+                )
+            self._prune(conn, policy)
+        finally:
+            conn.close()
+        return policy
+
+    def _prune(self, conn: sqlite3.Connection, policy: RetentionPolicy) -> int:
+        """ポリシー外の run を索引から削除し、参照されなくなったファイルを消す。削除した run 数を返す"""
+        runs = conn.execute(
+            "SELECT run_id, created_at FROM artifact_runs ORDER BY created_at DESC, run_id DESC"
+        ).fetchall()
+        cutoff = (
+            (datetime.now() - timedelta(days=policy.keep_days)).isoformat(timespec="seconds")
+            if policy.keep_days is not None else None
+        )
+        expired = [
+            run_id for i, (run_id, created_at) in enumerate(runs)
+            if (policy.keep_runs is not None and i >= policy.keep_runs)
+            or (cutoff is not None and created_at < cutoff)
+        ]
+        if not expired:
+            return 0
+        placeholders = ",".join("?" * len(expired))
+        with conn:
+            digests = {
+                r[0] for r in conn.execute(
+                    f"SELECT DISTINCT digest FROM artifact_files WHERE run_id IN ({placeholders})", expired
+                )
+            }
+            conn.execute(f"DELETE FROM artifact_files WHERE run_id IN ({placeholders})", expired)
+            conn.execute(f"DELETE FROM artifact_runs WHERE run_id IN ({placeholders})", expired)
+        still_used = {
+            r[0] for r in conn.execute("SELECT DISTINCT digest FROM artifact_files")
+        }
+        for digest in digests - still_used:
+            try:
+                self._object_path(digest).unlink(missing_ok=True)
+            except OSError as e:
+                print(f"[WARNING] 価格改定の出力ファイルを削除できません ({digest}): {str(e)}")
+        print(f"[DEBUG] 価格改定の出力: 保持期間外の {len(expired)}件の run を削除")
+        return len(expired)
+
+
+# ルーターで共有する保管庫
+artifact_store = RepricerArtifactStore()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+価格改定設定（config/reprice_rules.json）のコンパイル済みキャッシュ。
+
+load_config の結果を、行ごとのルール解決が配列の添字参照だけで済む形に前計算して保持する。
+
+- プロファイル（3/6/9）・例外ルールごとに、経過日数 0..365 → ルール番号の密な配列を持つ
+- ルール属性（アクション・Trace値・TP指定・赤字/高値幅）と tp_down の連続帯終端日もルール単位で前計算
+- 通常モードの 30日刻みルール（get_rule_for_days）も同様に日数→結果の表にする
+- ファイルの mtime・サイズが変わるまでキャッシュを使い回す。PUT /repricer/config 書き込み時は
+  invalidate_compiled_config() で明示的に破棄する
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import CONFIG_PATH
+from core.metrics import stage_span
+from services.repricer_weekly import _get_tp_down_period_end, get_rule_for_days, load_config
+
+# 密な表で引く経過日数の上限（これを超える・負の日数は searchsorted で解決）
+DENSE_MAX_DAYS = 365
+
+# _get_profile_rule_for_days がルール未設定時に返す既定ルール
+EMPTY_PROFILE_RULE: Dict[str, Any] = {
+    "days_from": 999, "action": "maintain", "value": 0, "tp_target": "tp0",
+    "akaji_drop_percent": 1, "takane_rise_percent": 0,
+}
+
+# get_rule_for_days の 30日刻み境界
+_STANDARD_BUCKETS = (30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330, 360)
+
+# ルール表以外で判定が切り替わる経過日数
+# （-1=日付不明、TP帯 90/180/270/365 の「以下」と期間終端「未満」、365日超過）
+_FIXED_DAY_EDGES = (-2, -1, 89, 90, 179, 180, 269, 270, 364, 365)
+
+
+class RuleTable:
+    """
+    ルールセット1つ分の日数→ルール引き表（_get_profile_rule_for_days と同じ結果）。
+
+    ルール属性の配列は「ソート済みルール + 末尾に既定ルール」の並びで、
+    ルール未設定時の番号 -1 がそのまま末尾の既定ルールを指す。
+    """
+
+    def __init__(self, rules: Any):
+        if isinstance(rules, list) and rules:
+            self.rules: List[Dict[str, Any]] = sorted(rules, key=lambda r: int(r.get("days_from", 999)))
+            self.thresholds = np.array([int(r.get("days_from", 999)) for r in self.rules], dtype=np.int64)
+        else:
+            self.rules = []
+            self.thresholds = np.zeros(0, dtype=np.int64)
+        self.index_by_day = self._search(np.arange(DENSE_MAX_DAYS + 1, dtype=np.int64))
+
+        slots = self.rules + [EMPTY_PROFILE_RULE]
+        self.raw_action = np.array([str(r.get("action", "maintain")) for r in slots], dtype=object)
+        self.trace_value = np.empty(len(slots), dtype=object)
+        self.trace_value[:] = [r.get("value", 0) for r in slots]
+        self.has_tp_target = np.array(["tp_target" in r for r in slots], dtype=bool)
+        self.tp_target = np.array(
+            [str(r.get("tp_target")).lower() if "tp_target" in r else None for r in slots], dtype=object
+        )
+        self.akaji_drop_percent = np.array(
+            [min(10, max(1, int(r.get("akaji_drop_percent", 1) or 1))) for r in slots], dtype=np.int64
+        )
+        self.takane_rise_percent = np.array(
+            [min(10, max(0, int(r.get("takane_rise_percent", 0) or 0))) for r in slots], dtype=np.int64
+        )
+        # 同一TP指定の tp_down が連続する帯の終端日（tp_down 以外は 0）
+        self.tp_down_period_end = np.array(
+            [
+                _get_tp_down_period_end(idx, rule, rules) if self.raw_action[idx] == "tp_down" else 0
+                for idx, rule in enumerate(self.rules)
+            ] + [0],
+            dtype=np.int64,
+        )
+
+    def _search(self, days: np.ndarray) -> np.ndarray:
+        if not self.rules:
+            return np.full(len(days), -1, dtype=np.int64)
+        return np.minimum(np.searchsorted(self.thresholds, days, side="left"), len(self.rules) - 1)
+
+    def indices(self, days: np.ndarray) -> np.ndarray:
+        """経過日数の配列をルール番号（未設定時 -1）の配列へ。"""
+        days = np.asarray(days, dtype=np.int64)
+        in_range = (days >= 0) & (days <= DENSE_MAX_DAYS)
+        if in_range.all():
+            return self.index_by_day[days]
+        out = np.empty(len(days), dtype=np.int64)
+        out[in_range] = self.index_by_day[days[in_range]]
+        out[~in_range] = self._search(days[~in_range])
+        return out
+
+    def rule_for_days(self, days: int) -> Tuple[int, Dict[str, Any]]:
+        """_get_profile_rule_for_days の表引き版。"""
+        if 0 <= days <= DENSE_MAX_DAYS:
+            idx = int(self.index_by_day[days])
+        else:
+            idx = int(self._search(np.array([days], dtype=np.int64))[0])
+        if idx < 0:
+            return -1, EMPTY_PROFILE_RULE
+        return idx, self.rules[idx]
+
+
+class CompiledRepricerConfig:
+    """load_config の結果と、そこから前計算したルール引き表。"""
+
+    def __init__(self, config: Dict[str, Any], mode: str = "standard", mtime_ns: Optional[int] = None):
+        self.config = config
+        self.mode = mode
+        self.mtime_ns = mtime_ns
+        self.exception_table = RuleTable(config.get("exception_reprice_rules", []) or [])
+        self.profile_tables: Dict[str, RuleTable] = {}
+        for key, profile in (config.get("rule_profiles") or {}).items():
+            self.profile_tables[str(key)] = RuleTable((profile or {}).get("reprice_rules", []) or [])
+        self._empty_table: Optional[RuleTable] = None
+        self._day_band_edges: Optional[np.ndarray] = None
+
+        # 通常モード: 30日刻みの区分ごとに1回だけ get_rule_for_days を評価
+        self._standard_results: List[Tuple[str, Dict[str, Any]]] = []
+        self._standard_bucket_by_day = np.zeros(0, dtype=np.int64)
+        rules = config.get("reprice_rules")
+        if mode != "369" and rules is not None:
+            self._standard_results = [get_rule_for_days(b, rules) for b in _STANDARD_BUCKETS]
+            self._standard_results.append(get_rule_for_days(_STANDARD_BUCKETS[-1] + 1, rules))
+            self._standard_bucket_by_day = np.searchsorted(
+                np.array(_STANDARD_BUCKETS), np.arange(DENSE_MAX_DAYS + 1), side="left"
+            )
+
+    def profile_table(self, profile: str) -> RuleTable:
+        """プロファイルのルール引き表（未定義プロファイルは空の表）。"""
+        table = self.profile_tables.get(str(profile))
+        if table is None:
+            if self._empty_table is None:
+                self._empty_table = RuleTable([])
+            table = self._empty_table
+        return table
+
+    def day_band_edges(self) -> np.ndarray:
+        """
+        ルール選択が切り替わる経過日数の境界（昇順）。
+        searchsorted(edges, days, side="left") が同じ2つの日数は、どのルール表・TP帯でも同じ区分になる。
+        """
+        if self._day_band_edges is None:
+            edges = set(_STANDARD_BUCKETS) | set(_FIXED_DAY_EDGES)
+            for table in [self.exception_table, *self.profile_tables.values()]:
+                edges.update(int(t) for t in table.thresholds)
+            self._day_band_edges = np.array(sorted(edges), dtype=np.int64)
+        return self._day_band_edges
+
+    def standard_rule_for_days(self, days: int) -> Tuple[str, Dict[str, Any]]:
+        """get_rule_for_days の表引き版（通常モード）。"""
+        if 0 <= days <= DENSE_MAX_DAYS:
+            return self._standard_results[int(self._standard_bucket_by_day[days])]
+        if days < 0:
+            return self._standard_results[0]
+        return self._standard_results[-1]
+
+
+def compile_repricer_config(config: Dict[str, Any], mode: str = "standard") -> CompiledRepricerConfig:
+    """設定 dict をコンパイルする（ファイルを介さない呼び出し・テスト用）。"""
+    return CompiledRepricerConfig(config, mode=mode)
+
+
+_cache: Dict[str, Tuple[Tuple[int, int], CompiledRepricerConfig]] = {}
+_cache_lock = threading.Lock()
+
+
+def config_file_stamp() -> Optional[Tuple[int, int]]:
+    """設定ファイルの (mtime_ns, サイズ)。ファイルが無ければ None。"""
+    try:
+        stat = os.stat(CONFIG_PATH)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@stage_span("repricer.config")
+def get_compiled_config(mode: str = "standard") -> CompiledRepricerConfig:
+    """
+    設定ファイルを読み込んでコンパイルした結果を返す。
+    ファイルの mtime・サイズが前回と同じならキャッシュを返す。
+    """
+    normalized_mode = "369" if str(mode) == "369" else "standard"
+    stamp = config_file_stamp()
+
+    with _cache_lock:
+        cached = _cache.get(normalized_mode)
+        if stamp is not None and cached is not None and cached[0] == stamp:
+            return cached[1]
+
+    # 読込エラー（ファイル無し・JSON不正）は load_config が出力・送出する
+    compiled = CompiledRepricerConfig(
+        load_config(mode=normalized_mode), mode=normalized_mode, mtime_ns=stamp[0] if stamp else None
+    )
+    if stamp is not None:
+        with _cache_lock:
+            _cache[normalized_mode] = (stamp, compiled)
+    return compiled
+
+
+def invalidate_compiled_config() -> None:
+    """コンパイル済み設定のキャッシュを破棄する（設定ファイル書き込み後に呼ぶ）。"""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+差分（インクリメンタル）価格改定。
+
+週次の改定では、大半の SKU は経過日数が進んだだけで、ルールの境界をまたぐのは一部に限られる。
+前回実行時の SKU ごとの入力シグネチャと判定結果を SQLite に保存し、次回は次の行だけを再評価する。
+
+- 入力が変わった行（CSV の行の値・仕入DBの TP / 改定フラグ / 月別運用）。設定ファイル・モード・
+  CSV の列構成が変わった場合は全行
+- 経過日数がルール表の境界（CompiledRepricerConfig.day_band_edges）をまたいだ行
+- 経過日数そのものに結果が依存する行（3-6-9 の tp_down / priceTrace の段階調整、月別運用）
+
+状態DB（アプリ専用のキャッシュファイル）には、SKU 単位の表（シグネチャ・日数区分・前回結果の行位置）と、
+前回結果の行（RepriceRows の pickle）を保存する。再利用した行は前回結果から行単位で取り出し、
+ログの経過日数（days と理由の「N日経過」）だけを今回の日数へ差し替える。
+再利用した行と再評価した行は入力順に並べてから一括改定と同じ手順（outputs_from_rows）で DataFrame にする。
+SKU が空・重複する CSV や、状態DBの読み書きに失敗した場合は通常の一括改定を行う。
+"""
+
+from __future__ import annotations
+
+import pickle
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.config import BASE_DIR
+from services.repricer_config import config_file_stamp, get_compiled_config
+from services.repricer_weekly import (
+    RepriceOutputs,
+    RepriceRows,
+    _prefetch_purchase_records,
+    apply_repricing_rules,
+    days_since_listed_series,
+    outputs_from_rows,
+    reprice_rows,
+)
+
+# 前回実行の状態を保存する SQLite（モード別）
+STATE_DB_PATH = BASE_DIR / "python" / "data" / "repricer_state.db"
+
+# 経過日数で結果が変わる（段階調整の残り日数を使う）3-6-9 のアクション
+_DAYS_SENSITIVE_ACTIONS = ("tp_down", "priceTrace")
+
+# 状態DBの形式（変わったら保存済みの状態を破棄して作り直す）
+_STATE_VERSION = 2
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS repricer_state (
+        mode TEXT NOT NULL,
+        sku TEXT NOT NULL,
+        signature INTEGER NOT NULL,
+        band INTEGER NOT NULL,
+        days INTEGER NOT NULL,
+        sensitive INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (mode, sku)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS repricer_state_run (
+        mode TEXT PRIMARY KEY,
+        frame_key TEXT NOT NULL,
+        outputs BLOB NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    """,
+)
+
+
+class _SavedRun(NamedTuple):
+    """前回実行の結果（SKU → 行位置の表と改定結果の行）。"""
+    rows: Dict[str, Tuple[int, int, int, int, int]]  # signature, band, days, sensitive, position
+    result: RepriceRows
+
+
+def _strip_sku(value: Any) -> str:
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    if isinstance(value, str) and value.startswith('="') and value.endswith('"'):
+        value = value[2:-1]
+    return str(value).strip()
+
+
+def _frame_key(df: pd.DataFrame, mode: str) -> str:
+    """全行に共通する入力（モード・設定ファイル版数・列構成）。変われば全行を再評価する。"""
+    return repr((mode, config_file_stamp(), list(df.columns), [str(t) for t in df.dtypes]))
+
+
+def _row_signatures(df: pd.DataFrame, records: List[Any]) -> np.ndarray:
+    """行ごとの入力シグネチャ（CSV の行の値と仕入DBレコード）を int64 で返す。"""
+    row_hash = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    record_hash = pd.util.hash_array(np.array([repr(r) for r in records], dtype=object))
+    combined = pd.util.hash_pandas_object(
+        pd.DataFrame({"row": row_hash, "record": record_hash}), index=False
+    ).to_numpy()
+    return combined.view(np.int64)
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=10)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != _STATE_VERSION:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS repricer_state")
+            conn.execute("DROP TABLE IF EXISTS repricer_state_run")
+            conn.execute(f"PRAGMA user_version = {_STATE_VERSION}")
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def _load_run(conn: sqlite3.Connection, mode: str, frame_key: str) -> Optional[_SavedRun]:
+    row = conn.execute(
+        "SELECT frame_key, outputs FROM repricer_state_run WHERE mode = ?", (mode,)
+    ).fetchone()
+    if row is None or row[0] != frame_key:
+        return None
+    result = RepriceRows(*pickle.loads(row[1]))
+    rows = {
+        r[0]: r[1:]
+        for r in conn.execute(
+            "SELECT sku, signature, band, days, sensitive, position FROM repricer_state WHERE mode = ?",
+            (mode,),
+        )
+    }
+    return _SavedRun(rows, result)
+
+
+def _save_run(conn: sqlite3.Connection, mode: str, frame_key: str, result: RepriceRows, rows: List[Tuple]) -> None:
+    """今回の結果で状態を置き換える（今回の CSV に無い SKU の状態は残さない）。"""
+    blob = pickle.dumps(tuple(result), protocol=pickle.HIGHEST_PROTOCOL)
+    with conn:
+        conn.execute("DELETE FROM repricer_state WHERE mode = ?", (mode,))
+        conn.executemany(
+            "INSERT INTO repricer_state (mode, sku, signature, band, days, sensitive, position) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(mode, *row) for row in rows],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO repricer_state_run (mode, frame_key, outputs, updated_at) VALUES (?, ?, ?, ?)",
+            (mode, frame_key, blob, datetime.now().isoformat(timespec="seconds")),
+        )
+
+
+def clear_incremental_state(state_path: Optional[Path] = None) -> None:
+    """保存済みの状態をすべて消す（次回は全行を再評価する）。"""
+    path = Path(state_path or STATE_DB_PATH)
+    if not path.exists():
+        return
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute("DELETE FROM repricer_state")
+            conn.execute("DELETE FROM repricer_state_run")
+    finally:
+        conn.close()
+
+
+def _days_sensitive(mode: str, log_rows: List[Dict[str, Any]], records: List[Any]) -> np.ndarray:
+    """経過日数そのものに結果が依存する行（3-6-9 の段階調整・月別運用）。"""
+    n = len(records)
+    if mode != "369":
+        return np.zeros(n, dtype=bool)
+    return np.array(
+        [
+            bool(r is not None and r.ladder_enabled and r.ladder_rules)
+            or log.get("rule_action") in _DAYS_SENSITIVE_ACTIONS
+            for r, log in zip(records, log_rows)
+        ],
+        dtype=bool,
+    )
+
+
+def _rebase_log_days(log_row: Dict[str, Any], old_days: int, new_days: int) -> Dict[str, Any]:
+    """再利用した行のログの経過日数表示（days・理由の「N日経過」）を今回の日数へ差し替える。"""
+    if old_days == new_days:
+        return log_row
+    log_row = dict(log_row)
+    if "days" in log_row and log_row["days"] == old_days:
+        log_row["days"] = new_days
+    reason = log_row.get("reason")
+    prefix = f"{old_days}日経過"
+    if isinstance(reason, str) and reason.startswith(prefix):
+        log_row["reason"] = f"{new_days}日経過" + reason[len(prefix):]
+    return log_row
+
+
+def apply_repricing_rules_incremental(
+    df: pd.DataFrame,
+    today: datetime,
+    mode: str = "standard",
+    state_path: Optional[Path] = None,
+) -> RepriceOutputs:
+    """
+    前処理済みの在庫 DataFrame を差分改定する（判定結果は apply_repricing_rules と同じ）。
+    今回の結果は状態DBへ保存し、次回の差分判定に使う。
+    """
+    normalized_mode = "369" if str(mode) == "369" else "standard"
+    path = Path(state_path or STATE_DB_PATH)
+    started = time.perf_counter()
+    n = len(df)
+    if n == 0:
+        return apply_repricing_rules(df, today=today, mode=normalized_mode)
+
+    raw_skus = df["SKU"].tolist() if "SKU" in df.columns else [""] * n
+    skus = [_strip_sku(value) for value in raw_skus]
+    if len(set(skus)) != n or "" in skus:
+        print("[DEBUG INCREMENTAL] SKU が空または重複しているため全行を再評価します")
+        return apply_repricing_rules(df, today=today, mode=normalized_mode)
+
+    compiled = get_compiled_config(mode=normalized_mode)
+    days = days_since_listed_series(pd.Series(raw_skus, dtype=object), today).to_numpy(dtype=np.int64)
+    bands = np.searchsorted(compiled.day_band_edges(), days, side="left")
+    purchase_records = _prefetch_purchase_records(skus)
+    records = [purchase_records.get(sku) for sku in skus]
+    signatures = _row_signatures(df, records)
+    frame_key = _frame_key(df, normalized_mode)
+
+    try:
+        conn = _connect(path)
+    except sqlite3.Error as e:
+        print(f"[WARNING INCREMENTAL] 状態DBを開けません（全行を再評価）: {e}")
+        return apply_repricing_rules(df, today=today, mode=normalized_mode)
+
+    try:
+        try:
+            saved = _load_run(conn, normalized_mode, frame_key)
+        except (sqlite3.Error, pickle.PickleError, EOFError, TypeError, ValueError) as e:
+            print(f"[WARNING INCREMENTAL] 状態DBの読込に失敗（全行を再評価）: {e}")
+            saved = None
+
+        # 前回結果を再利用できる行（シグネチャ・日数区分が同じで、日数に依存しない行）
+        reuse = np.zeros(n, dtype=bool)
+        saved_rows = np.zeros((n, 5), dtype=np.int64)
+        if saved is not None:
+            for i, sku in enumerate(skus):
+                row = saved.rows.get(sku)
+                if row is not None and row[0] == signatures[i] and row[1] == bands[i] and not row[3]:
+                    reuse[i] = True
+                    saved_rows[i] = row
+        reuse_idx = np.flatnonzero(reuse)
+        fresh_idx = np.flatnonzero(~reuse)
+
+        # 入力順に行を並べる（再評価した行は今回の結果、再利用した行は前回結果から）
+        log_rows: List[Dict[str, Any]] = [{}] * n
+        inventory_rows: List[Dict[str, Any]] = [{}] * n
+        excluded: List[bool] = [False] * n
+        if len(fresh_idx):
+            subset = df.iloc[fresh_idx].reset_index(drop=True)
+            fresh = reprice_rows(
+                subset, today=today, mode=normalized_mode, compiled=compiled, purchase_records=purchase_records
+            )
+            for j, i in enumerate(fresh_idx.tolist()):
+                log_rows[i] = fresh.log_rows[j]
+                inventory_rows[i] = fresh.inventory_rows[j]
+                excluded[i] = fresh.excluded[j]
+        for i in reuse_idx.tolist():
+            _, _, old_days, _, pos = saved_rows[i].tolist()
+            log_rows[i] = _rebase_log_days(saved.result.log_rows[pos], old_days, int(days[i]))
+            inventory_rows[i] = saved.result.inventory_rows[pos]
+            excluded[i] = saved.result.excluded[pos]
+        result = RepriceRows(log_rows=log_rows, inventory_rows=inventory_rows, excluded=excluded)
+        outputs = outputs_from_rows(result)
+
+        sensitive = _days_sensitive(normalized_mode, log_rows, records)
+        state_rows = list(zip(
+            skus, signatures.tolist(), bands.tolist(), days.tolist(), sensitive.astype(int).tolist(), range(n),
+        ))
+        try:
+            _save_run(conn, normalized_mode, frame_key, result, state_rows)
+        except (sqlite3.Error, pickle.PickleError) as e:
+            print(f"[WARNING INCREMENTAL] 状態DBの保存に失敗: {e}")
+    finally:
+        conn.close()
+
+    print(
+        f"[DEBUG INCREMENTAL] {n}行中 {len(fresh_idx)}行を再評価、{len(reuse_idx)}行は前回結果を再利用 "
+        f"({time.perf_counter() - started:.2f}s)"
+    )
+    return outputs
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+価格改定のサーバー側ジョブ（進捗通知・キャンセル対応）。
+
+/repricer/preview・/repricer/apply は1回の同期HTTPで結果を返すため、行数が多いと
+クライアント側では進捗が分からず、タイムアウトにもかかりやすい。ジョブとして
+バックグラウンドスレッドで実行し、段階（読込→改定→出力）と改定済み行数を公開する。
+
+- RepricerJob: 価格改定ジョブ（services.job_queue.Job。状態・変更待ち・キャンセル要求を持つ）
+- RepricerJobManager: ジョブの登録・取得・キャンセル。実行・同時実行数・結果の破棄は JobQueue が行う
+- run_chunked_repricing: CSV を chunk_size 行ずつ改定し、チャンクごとに進捗を報告する。
+  チャンクごとの行（RepriceRows）を連結してから DataFrame にするため、結果は一括処理
+  （apply_repricing_rules を全行に1回）と同じになる
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from services.job_queue import Job, JobQueue, job_queue
+from services.repricer_weekly import (
+    RepriceOutputs,
+    RepriceRows,
+    concat_reprice_rows,
+    outputs_from_rows,
+    preprocess_dataframe,
+    reprice_rows,
+)
+
+# ジョブ実行時の既定チャンク行数（進捗・キャンセル確認の粒度）
+DEFAULT_JOB_CHUNK_SIZE = 2000
+
+# 段階ごとの進捗率の範囲（改定中は行数に比例して REPRICE_START..REPRICE_END）
+_PROGRESS_READ_DONE = 5
+_PROGRESS_REPRICE_END = 90
+
+
+class RepricerJob(Job):
+    """価格改定ジョブ1件の状態（kind: preview / apply）。"""
+
+    def __init__(self, kind: str, mode: str):
+        super().__init__(f"repricer.{kind}", kind=kind, mode=mode)
+
+
+class RepricerJobManager:
+    """価格改定ジョブの登録・取得・キャンセル（実行は JobQueue に任せる）。"""
+
+    def __init__(self, max_workers: int = 2, max_finished: int = 16, queue: Optional[JobQueue] = None):
+        self.queue = queue or JobQueue(max_workers=max_workers, max_finished=max_finished)
+
+    def submit(self, kind: str, mode: str, work: Callable[[RepricerJob], Dict[str, Any]]) -> RepricerJob:
+        """ジョブを登録してバックグラウンドで実行する。work の戻り値がジョブの結果になる。"""
+        return self.queue.submit(RepricerJob(kind, mode), work)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.queue.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """キャンセルを要求する（実行中のチャンクが終わった時点で中断）。"""
+        return self.queue.cancel(job_id)
+
+
+def merge_reprice_rows(parts: List[RepriceRows]) -> RepriceOutputs:
+    """
+    チャンク単位の改定結果（入力順）を1つの RepriceOutputs にまとめる。
+    行 dict を連結して各 DataFrame を1回で作るため、列順・dtype・None は一括処理と同じになる。
+    """
+    return outputs_from_rows(concat_reprice_rows(parts))
+
+
+def run_chunked_repricing(
+    job: RepricerJob,
+    df: pd.DataFrame,
+    mode: str,
+    today: datetime,
+    chunk_size: int = DEFAULT_JOB_CHUNK_SIZE,
+) -> RepriceOutputs:
+    """
+    読込済みの在庫 DataFrame を chunk_size 行ずつ前処理・改定し、進捗を job へ報告する。
+    チャンクの区切りごとにキャンセル要求を確認する。
+    """
+    total = len(df)
+    job.update(stage="repricing", message=f"改定中 (0/{total}行)", progress=_PROGRESS_READ_DONE, total_rows=total)
+    parts: List[RepriceRows] = []
+    started = time.perf_counter()
+    for start in range(0, total, chunk_size):
+        job.check_cancelled()
+        chunk = preprocess_dataframe(df.iloc[start:start + chunk_size].reset_index(drop=True))
+        parts.append(reprice_rows(chunk, today=today, mode=mode))
+        done = min(total, start + chunk_size)
+        job.update(
+            processed_rows=done,
+            progress=_PROGRESS_READ_DONE + (_PROGRESS_REPRICE_END - _PROGRESS_READ_DONE) * done // max(1, total),
+            message=f"改定中 ({done}/{total}行)",
+        )
+    job.check_cancelled()
+    print(f"[DEBUG] 価格改定ジョブ: {total}行を {len(parts)}チャンクで改定 ({time.perf_counter() - started:.2f}s)")
+    job.update(stage="finalizing", message="結果を作成中", progress=_PROGRESS_REPRICE_END)
+    return merge_reprice_rows(parts)
+
+
+# ルーターで共有するジョブ管理（API 全体のジョブキューで実行する）
+job_manager = RepricerJobManager(queue=job_queue)
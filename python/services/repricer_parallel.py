@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+価格改定のプロセス並列実行。
+
+列指向化した後も、月別運用（_apply_monthly_ladder_for_row）や通常モードの行ループは
+行ごとの Python 処理で1コアしか使えない。前処理済みの DataFrame を行範囲で分割し、
+複数プロセスで改定してから入力順に結合する。
+
+- コンパイル済み設定と仕入DBの先読み結果は親プロセスで1回だけ作り、
+  ワーカー起動時（initializer）に1度だけ渡す。ワーカーは設定ファイル・仕入DBを読まない
+- 改定判定は行ごとに独立しているため、行範囲ごとの結果を順に結合すると一括処理と同じになる
+  （ワーカーは行 dict（RepriceRows）を返し、repricer_jobs.merge_reprice_rows で1回だけ DataFrame にする）
+- 行数が少ない・ワーカー数 1 以下の場合や、プロセスプールが使えない場合は通常の一括改定を行う
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from services.repricer_config import CompiledRepricerConfig, get_compiled_config
+from services.repricer_jobs import merge_reprice_rows
+from services.repricer_weekly import (
+    PurchaseRecord,
+    RepriceOutputs,
+    RepriceRows,
+    _prefetch_purchase_records,
+    apply_repricing_rules,
+    reprice_rows,
+)
+from utils.sku_listing_date import strip_excel_formula
+
+# 1ワーカーあたりの最小行数（これ未満ならプロセス起動の方が高くつくので分割しない）
+MIN_ROWS_PER_WORKER = 2000
+
+# ワーカープロセス内で共有する改定条件（initializer で設定）
+_worker_state: Dict[str, Any] = {}
+
+
+def default_worker_count() -> int:
+    """既定のワーカー数（CPU コア数。取得できなければ 1）。"""
+    return max(1, os.cpu_count() or 1)
+
+
+def _init_worker(
+    mode: str,
+    compiled: CompiledRepricerConfig,
+    purchase_records: Dict[str, PurchaseRecord],
+) -> None:
+    _worker_state["mode"] = mode
+    _worker_state["compiled"] = compiled
+    _worker_state["purchase_records"] = purchase_records
+
+
+def _reprice_range(chunk: pd.DataFrame, today: datetime) -> RepriceRows:
+    """ワーカー側: 受け取った行範囲を、親から渡された設定・仕入DBで改定する。"""
+    return reprice_rows(
+        chunk,
+        today=today,
+        mode=_worker_state["mode"],
+        compiled=_worker_state["compiled"],
+        purchase_records=_worker_state["purchase_records"],
+    )
+
+
+def _row_ranges(total: int, parts: int) -> List[range]:
+    """0..total を parts 個のほぼ等しい連続範囲に分ける。"""
+    size, extra = divmod(total, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append(range(start, stop))
+        start = stop
+    return ranges
+
+
+def apply_repricing_rules_parallel(
+    df: pd.DataFrame,
+    today: datetime,
+    mode: str = "standard",
+    workers: Optional[int] = None,
+    min_rows_per_worker: int = MIN_ROWS_PER_WORKER,
+) -> RepriceOutputs:
+    """
+    前処理済みの在庫 DataFrame を workers 個のプロセスで並列に改定する（未指定時は CPU コア数）。
+    結果は apply_repricing_rules(df, today, mode) と同じ。
+    """
+    normalized_mode = "369" if str(mode) == "369" else "standard"
+    workers = default_worker_count() if workers is None else workers
+    parts = min(workers, len(df) // max(1, min_rows_per_worker))
+    if parts <= 1:
+        return apply_repricing_rules(df, today=today, mode=normalized_mode)
+
+    started = time.perf_counter()
+    compiled = get_compiled_config(mode=normalized_mode)
+    skus = df["SKU"].tolist() if "SKU" in df.columns else []
+    purchase_records = _prefetch_purchase_records([str(strip_excel_formula(s) or "").strip() for s in skus])
+
+    chunks = [df.iloc[r.start:r.stop].reset_index(drop=True) for r in _row_ranges(len(df), parts)]
+    try:
+        with ProcessPoolExecutor(
+            max_workers=parts,
+            initializer=_init_worker,
+            initargs=(normalized_mode, compiled, purchase_records),
+        ) as executor:
+            results = list(executor.map(_reprice_range, chunks, [today] * parts))
+    except (BrokenProcessPool, OSError) as e:
+        print(f"[WARNING] 並列改定に失敗したため一括改定に切り替えます: {str(e)}")
+        return apply_repricing_rules(df, today=today, mode=normalized_mode)
+
+    outputs = merge_reprice_rows(results)
+    print(
+        f"[DEBUG PARALLEL] {len(df)}行を {parts}プロセスで改定 ({time.perf_counter() - started:.2f}s)"
+    )
+    return outputs
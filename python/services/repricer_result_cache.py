@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+価格改定結果（RepriceOutputs）のサーバー内キャッシュ。
+
+運用では同じ在庫CSVに対して /repricer/preview → /repricer/apply の順で呼ぶため、
+プレビュー時の改定結果を保持し、実行時は CSV 出力だけを行えるようにする。
+
+- キー: アップロード内容の SHA-256・モード・設定ファイル版数（mtime/サイズ）・仕入DB版数・実行日
+  （いずれかが変われば別キーになるため、明示的な破棄は不要）
+- 件数と概算メモリ量の上限を超えたら LRU で追い出す
+- 取り出し時は DataFrame と items をコピーして返す（呼び出し側の書き換えがキャッシュへ波及しない）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from services.repricer_config import config_file_stamp
+from services.repricer_weekly import RepriceOutputs, _purchase_db_version
+
+# 既定の上限（在庫数万行の CSV を数件保持できる程度）
+DEFAULT_MAX_ENTRIES = 8
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def build_cache_key(content: bytes, mode: str, today: datetime) -> Tuple[Any, ...]:
+    """改定結果を一意に決める要素からキャッシュキーを作る。"""
+    return (
+        hashlib.sha256(content).hexdigest(),
+        mode,
+        config_file_stamp(),
+        _purchase_db_version(),
+        today.date().isoformat(),
+    )
+
+
+def _copy_outputs(outputs: RepriceOutputs) -> RepriceOutputs:
+    return RepriceOutputs(
+        log_df=outputs.log_df.copy(),
+        updated_df=outputs.updated_df.copy(),
+        excluded_df=outputs.excluded_df.copy(),
+        items=[dict(item) for item in outputs.items],
+    )
+
+
+def _estimate_bytes(outputs: RepriceOutputs) -> int:
+    """保持する DataFrame の概算メモリ量（文字列実体を含む）。"""
+    total = 0
+    for df in (outputs.log_df, outputs.updated_df, outputs.excluded_df):
+        total += int(df.memory_usage(index=True, deep=True).sum())
+    # items は log_df と同じ値を参照する dict のリスト。dict 本体分を上乗せする
+    total += 256 * len(outputs.items)
+    return total
+
+
+class RepriceResultCache:
+    """RepriceOutputs の LRU キャッシュ（スレッドセーフ）。"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[RepriceOutputs, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[RepriceOutputs]:
+        """キャッシュ済みの結果のコピーを返す。無ければ None。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            outputs = entry[0]
+        return _copy_outputs(outputs)
+
+    def put(self, key: Tuple[Any, ...], outputs: RepriceOutputs) -> None:
+        """結果を保持する（呼び出し側の以後の書き換えの影響を受けないようコピーして保持）。"""
+        stored = _copy_outputs(outputs)
+        size = _estimate_bytes(stored)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (stored, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """保持している結果をすべて破棄する（カウンタは維持）。"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット率などの統計。"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+# preview / apply で共有するプロセス内キャッシュ
+result_cache = RepriceResultCache()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+3-6-9 改定の価格推移シミュレーション。
+
+「売れ残った場合に 60日・90日・180日時点でいくらになるか」を、today を変えた改定を
+日付ごとに回し直さずに、SKU × 日付の価格行列として一度に求める。
+
+- 日付ベクトルの各日を1回の改定実行とみなし、改定後の価格・akaji を次の実行の入力にする
+  （週次運用で改定後CSVを再アップロードし続けた場合と同じ連鎖）
+- SKU タグ・仕入DB（TP・改定フラグ・月別運用）・keepa 等の日付に依らない判定は最初に1回だけ行い、
+  日付ごとの計算は経過日数と現在価格に依存する部分（ルール引き・TP下限・段階調整・下限ガード）に限る
+- ルール引きと価格計算は列指向エンジン（repricer_369_vectorized）と同じ関数を使う。
+  月別運用（個別ラダー）の行のみ従来の行関数で評価する
+- 理由文字列・ログ・出力 DataFrame は作らない
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import date, datetime
+from typing import Any, List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from services.repricer_369_vectorized import (
+    _ProfileRows,
+    _float_or_zero,
+    _keepa_column,
+    _map_values,
+    _price_profile_rows,
+    _resolve_profile_rows,
+    _strip_excel_formula,
+)
+from services.repricer_config import CompiledRepricerConfig, get_compiled_config
+from services.repricer_weekly import (
+    _apply_monthly_ladder_for_row,
+    _is_repricing_off,
+    _prefetch_purchase_records,
+)
+from utils.sku_listing_date import UNKNOWN_DAYS, days_since_listed_series
+
+# 出品日序数の逆算に使う基準日（抽出できた SKU は必ず正の経過日数になる）
+_FAR_FUTURE = date(9999, 12, 31)
+
+
+class PriceTrajectories(NamedTuple):
+    """SKU × 日付の価格行列（prices[i, j] は dates[j] の改定後の skus[i] の価格。不明は NaN）。"""
+    skus: List[str]
+    dates: List[date]
+    current_prices: np.ndarray
+    prices: np.ndarray
+
+
+def _as_date(value: Union[datetime, date]) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _subset_rows(rows: _ProfileRows, mask: np.ndarray) -> _ProfileRows:
+    return _ProfileRows(*(field[mask] for field in rows))
+
+
+def simulate_price_trajectories(
+    df: pd.DataFrame,
+    dates: Sequence[Union[datetime, date]],
+    compiled: Optional[CompiledRepricerConfig] = None,
+) -> PriceTrajectories:
+    """
+    前処理済みの在庫 DataFrame に対し、dates（昇順）の各日に 3-6-9 改定を連続適用した価格推移を返す。
+    各日の結果は、前日付の改定後CSVで apply_repricing_rules(mode="369") を実行した結果と一致する。
+    """
+    compiled = compiled or get_compiled_config(mode="369")
+    config = compiled.config
+    run_dates = sorted(_as_date(d) for d in dates)
+    n = len(df)
+    prices = np.full((n, len(run_dates)), np.nan)
+    started = time.perf_counter()
+    if n == 0:
+        return PriceTrajectories([], run_dates, np.zeros(0), prices)
+
+    columns = list(df.columns)
+    values = df.to_numpy()
+    if values.dtype != object:
+        values = values.astype(object)
+
+    def get_column(name: str, default: Any) -> np.ndarray:
+        if name in columns:
+            return values[:, columns.index(name)]
+        return np.full(n, default, dtype=object)
+
+    sku = _strip_excel_formula(get_column("SKU", ""))
+    sku_key = pd.Series(sku, dtype=object).astype(str).str.strip().to_numpy(dtype=object)
+    purchase_records = _prefetch_purchase_records([str(s or "").strip() for s in sku])
+    record_by_row = [purchase_records.get(k) for k in sku_key]
+
+    price = _float_or_zero(df, "price", get_column("price", 0))
+    akaji = _float_or_zero(df, "akaji", get_column("akaji", 0))
+    current_prices = price.copy()
+
+    # --- 日付に依らない判定（行ループ版の優先順: 改定OFF → 除外SKU → 日付不明・365日超 → 月別運用） ---
+    row_off = _map_values(get_column("価格改定", None), _is_repricing_off).astype(bool)
+    db_enabled = np.array([rec.repricing_enabled if rec else True for rec in record_by_row], dtype=bool)
+    excluded_skus = list(config.get("excluded_skus", []))
+    frozen = row_off | ~db_enabled | pd.Series(sku, dtype=object).isin(excluded_skus).to_numpy(dtype=bool)
+
+    far_days = days_since_listed_series(pd.Series(sku, dtype=object), _FAR_FUTURE).to_numpy()
+    has_listing = far_days != UNKNOWN_DAYS
+    listing_ordinal = _FAR_FUTURE.toordinal() - far_days
+
+    is_ladder = np.array(
+        [bool(rec and rec.ladder_enabled and rec.ladder_rules) for rec in record_by_row], dtype=bool
+    )
+    candidates = ~frozen & has_listing
+    ladder_idx = np.flatnonzero(candidates & is_ladder)
+    pidx = np.flatnonzero(candidates & ~is_ladder)
+
+    profile_rows = _resolve_profile_rows(
+        pd.Series(sku[pidx], dtype=object).astype(str),
+        [record_by_row[i].tp if record_by_row[i] else None for i in pidx],
+        str(config.get("default_profile", "6")),
+        config.get("exception_reprice_rules", []) or [],
+    )
+    _, keepa_is_none, keepa = _keepa_column(get_column("keepa_min_same_condition", None)[pidx])
+    profiles = config.get("rule_profiles", {})
+    interval_days = max(1, int(config.get("interval_days", 7)))
+
+    for j, run_date in enumerate(run_dates):
+        ordinal = run_date.toordinal()
+
+        # 3-6-9 プロファイル行（日付不明扱いの -1 日・365日超は価格据え置き）
+        d = ordinal - listing_ordinal[pidx]
+        active = (d != UNKNOWN_DAYS) & (d <= 365)
+        if active.any():
+            rows = pidx[active]
+            pricing = _price_profile_rows(
+                _subset_rows(profile_rows, active),
+                d[active],
+                price[rows],
+                akaji[rows],
+                keepa[active],
+                keepa_is_none[active],
+                profiles,
+                compiled,
+                interval_days,
+                config,
+            )
+            repriced = pricing.raw_action != "exclude"
+            price[rows[repriced]] = pricing.new_price[repriced]
+            akaji[rows[repriced]] = pricing.final_akaji[repriced]
+
+        # 月別運用（個別ラダー）
+        for i in ladder_idx:
+            days = int(ordinal - listing_ordinal[i])
+            if days == UNKNOWN_DAYS or days > 365:
+                continue
+            row = dict(zip(columns, values[i]))
+            row["price"] = price[i]
+            row["akaji"] = akaji[i]
+            kind, _, payload = _apply_monthly_ladder_for_row(row, days, record_by_row[i].ladder_rules, config)
+            if kind == "updated":
+                price[i] = payload["price"]
+                akaji[i] = payload["akaji"]
+
+        prices[:, j] = price
+
+    print(
+        f"[DEBUG SIMULATE] {n}行 × {len(run_dates)}日付の価格推移を算出 "
+        f"({time.perf_counter() - started:.2f}s)"
+    )
+    return PriceTrajectories([str(s) for s in sku], run_dates, current_prices, prices)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+価格改定のストリーミング（チャンク）処理。
+
+10万行級の在庫CSVでも、CSV全体を1つの DataFrame に載せずに一定行数ずつ
+前処理→ルール適用し、結果をチャンク単位で呼び出し側へ渡す。
+改定判定は行ごとに独立しているため、チャンク分割しても各行の結果は一括処理と同じ。
+
+- iter_repriced_chunks: CSV を chunk_size 行ずつ改定し RepriceOutputs を順に返す
+- UnionColumnCsvWriter: 列構成がチャンクごとに異なり得る DataFrame（ログ・除外）を
+  一時ファイルへ追記し、最後に全チャンクの列の和集合（初出順）をヘッダーにして書き出す
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from core.csv_utils import iter_csv_chunks
+from services.repricer_weekly import RepriceOutputs, apply_repricing_rules, preprocess_dataframe
+
+# ストリーミング時の既定チャンク行数
+DEFAULT_STREAM_CHUNK_SIZE = 5000
+
+
+def iter_repriced_chunks(
+    source: BinaryIO,
+    mode: str,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+    today: Optional[datetime] = None,
+) -> Iterator[RepriceOutputs]:
+    """CSV（バイナリファイル）を chunk_size 行ずつ前処理・改定して返す。"""
+    today = today or datetime.now()
+    for chunk in iter_csv_chunks(source, chunk_size):
+        if chunk.empty:
+            # ヘッダーのみの CSV は pandas が空チャンクを1つ返す
+            continue
+        chunk = preprocess_dataframe(chunk.reset_index(drop=True))
+        yield apply_repricing_rules(chunk, today=today, mode=mode)
+
+
+class UnionColumnCsvWriter:
+    """
+    チャンクごとの DataFrame を追記し、close() で1本の CSV（cp932・QUOTE_ALL・CRLF）にまとめる。
+
+    各チャンクは自身の列で一時ファイルへ書き、close() 時に全チャンクの列の和集合（初出順）へ
+    並べ替えて出力する。DataFrame(list_of_dicts) の列順と同じ規則になる。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._columns: List[str] = []
+        self._seen = set()
+        self._parts: List[Tuple[List[str], int]] = []
+        fd, part_path = tempfile.mkstemp(prefix=f".{self.path.stem}_", suffix=".part", dir=str(self.path.parent))
+        os.close(fd)
+        self._part_path = Path(part_path)
+        self._part = open(self._part_path, "w", encoding="utf-8", newline="")
+
+    def write(self, df: pd.DataFrame) -> None:
+        """チャンクを追記する（列が無い空の DataFrame は無視）。"""
+        if df is None or len(df.columns) == 0:
+            return
+        columns = [str(c) for c in df.columns]
+        for col in columns:
+            if col not in self._seen:
+                self._seen.add(col)
+                self._columns.append(col)
+        df.to_csv(self._part, header=False, index=False, lineterminator="\r\n", quoting=csv.QUOTE_ALL)
+        self._parts.append((columns, len(df)))
+
+    def close(self) -> None:
+        """一時ファイルを和集合ヘッダーの CSV へ書き出し、一時ファイルを消す。"""
+        self._part.close()
+        try:
+            if not self._columns:
+                pd.DataFrame([]).to_csv(
+                    self.path, index=False, encoding="cp932", lineterminator="\r\n",
+                    quoting=csv.QUOTE_ALL, errors="replace",
+                )
+                return
+            position = {col: i for i, col in enumerate(self._columns)}
+            with open(self._part_path, "r", encoding="utf-8", newline="") as src, \
+                    open(self.path, "w", encoding="cp932", errors="replace", newline="") as dst:
+                reader = csv.reader(src)
+                writer = csv.writer(dst, lineterminator="\r\n", quoting=csv.QUOTE_ALL)
+                writer.writerow(self._columns)
+                for columns, rows in self._parts:
+                    targets = [position[col] for col in columns]
+                    for _ in range(rows):
+                        values = next(reader)
+                        out = [""] * len(self._columns)
+                        for target, value in zip(targets, values):
+                            out[target] = value
+                        writer.writerow(out)
+        finally:
+            self._part_path.unlink(missing_ok=True)
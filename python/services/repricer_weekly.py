@@ -1,15 +1,18 @@
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Any, Tuple, NamedTuple, Optional
+from typing import Callable, List, Dict, Any, Tuple, NamedTuple, Optional
 import json
+import logging
 import re
 import math
 import sqlite3
 from pathlib import Path
 from core.config import CONFIG_PATH
 from core.csv_utils import normalize_dataframe_for_cp932
+from core.metrics import stage_span
 
 from utils.repricer_ladder_core import band_start_day_for_period_end
+from utils.sku_listing_date import days_since_listed as _days_since_listed_from_sku, days_since_listed_series
 from utils.repricer_tp_target import (
     base_tp_tier,
     format_tp_target_label,
@@ -48,47 +51,71 @@ def format_trace_value(trace_value):
     except (ValueError, TypeError):
         return str(trace_value) if trace_value is not None else "維持"
 
-def preprocess_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+# 前処理の診断ログ。既定では出さない（DEBUG 扱い）。リクエストの debug=true で INFO として出力する
+# ハンドラー・レベルはアプリ側（app.py の configure_logging）で設定する
+preprocess_logger = logging.getLogger(__name__)
+
+# Excel数式記法 ="..." の除去。従来の2段の置換
+#   1. ^="(.*)"$      （. は改行に一致しない）
+#   2. ^="([^"]*)"$   （1 の結果に適用）
+# を1回の照合で行う。次の順に試し、一致した分岐のグループで置き換える。
+#   - 入れ子 ="="X""（X は引用符・改行なし）: 1 で ="X" になり、2 で X になる
+#   - ="X"（X は改行なし）: 1 だけが当たる
+#   - ="X"（X は引用符なし・改行あり）: 2 だけが当たる
+_EXCEL_FORMULA = re.compile(r'^="(?:="([^"\n]*)"|([^\n]*)|([^"]*))"$')
+
+PREPROCESS_NUMERIC_COLUMNS = ('price', 'cost', 'akaji', 'takane', 'number', 'priceTrace',
+                              'leadtime', 'amazon-fee', 'shipping-price', 'profit')
+
+
+def _excel_formula_inner(match: "re.Match[str]") -> str:
+    return match.group(match.lastindex)
+
+
+def _strip_excel_formula_text(value: str) -> str:
+    return _EXCEL_FORMULA.sub(_excel_formula_inner, value, count=1)
+
+
+def _strip_excel_formula_column(values: List[str]) -> List[str]:
+    """="..." で始まる値だけ正規表現で除去する（他の値はそのまま）。"""
+    return [_strip_excel_formula_text(v) if v.startswith('="') else v for v in values]
+
+
+def _first_value(df: pd.DataFrame, col: str) -> Any:
+    return df[col].iloc[0] if col in df.columns else 'N/A'
+
+
+def preprocess_dataframe(df: pd.DataFrame, debug: bool = False) -> pd.DataFrame:
     """
-    DataFrameの前処理: Excel数式記法の完全除去
+    DataFrameの前処理: Excel数式記法の完全除去と数値列の変換
+    文字列列は1列につき1回だけ走査し、数値列は1回だけ変換する。
+    debug=True の場合のみ先頭行のサンプルを診断ログへ出す。
     """
-    print(f"[DEBUG preprocess] Called with shape: {df.shape}")
-    
-    # 処理前のサンプルを出力
-    if len(df) > 0:
-        print(f"[DEBUG preprocess] BEFORE - First row price (raw): {df['price'].iloc[0] if 'price' in df.columns else 'N/A'}")
-        print(f"[DEBUG preprocess] BEFORE - First row conditionNote (raw): {df['conditionNote'].iloc[0] if 'conditionNote' in df.columns else 'N/A'}")
-    
-    # すべての列でExcel数式記法を除去（文字列列・数値列両方）
+    log_level = logging.INFO if debug else logging.DEBUG
+    log_enabled = preprocess_logger.isEnabledFor(log_level) and len(df) > 0
+    if log_enabled:
+        preprocess_logger.log(log_level, "Called with shape: %s", df.shape)
+        preprocess_logger.log(log_level, "BEFORE - First row price (raw): %s", _first_value(df, 'price'))
+        preprocess_logger.log(log_level, "BEFORE - First row conditionNote (raw): %s", _first_value(df, 'conditionNote'))
+
+    numeric_cols = [col for col in PREPROCESS_NUMERIC_COLUMNS if col in df.columns]
     for col in df.columns:
-        # 文字列型またはオブジェクト型の列に対してのみ処理
-        if df[col].dtype == 'object':
-            # より確実な数式記法削除
-            df[col] = df[col].astype(str).str.replace(r'^="(.*)"$', r'\1', regex=True)
-            # 念のため、より広範囲なパターンも削除
-            df[col] = df[col].str.replace(r'^="([^"]*)"$', r'\1', regex=True)
-            if len(df) > 0:
-                print(f"[DEBUG preprocess] AFTER Excel formula removal for {col}: {df[col].iloc[0]}")
-    
-    # 処理後のサンプルを出力
-    if len(df) > 0:
-        print(f"[DEBUG preprocess] AFTER Excel formula removal - price: {df['price'].iloc[0] if 'price' in df.columns else 'N/A'}")
-        print(f"[DEBUG preprocess] AFTER Excel formula removal - conditionNote: {df['conditionNote'].iloc[0] if 'conditionNote' in df.columns else 'N/A'}")
-        print(f"[DEBUG preprocess] AFTER Excel formula removal - SKU: {df['SKU'].iloc[0] if 'SKU' in df.columns else 'N/A'}")
-    
-    # 数値列を明示的に変換
-    numeric_cols = ['price', 'cost', 'akaji', 'takane', 'number', 'priceTrace', 
-                    'leadtime', 'amazon-fee', 'shipping-price', 'profit']
-    for col in numeric_cols:
-        if col in df.columns:
-            # 数値変換前に、念のため再度Excel数式記法を除去
-            df[col] = df[col].astype(str).str.replace(r'^="(.*)"$', r'\1', regex=True)
-            df[col] = df[col].str.replace(r'^="([^"]*)"$', r'\1', regex=True)
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-            if len(df) > 0:
-                print(f"[DEBUG preprocess] {col} after numeric conversion: {df[col].iloc[0]}")
-    
-    print(f"[DEBUG preprocess] Completed. Final shape: {df.shape}")
+        is_object = df[col].dtype == 'object'
+        if not is_object and col not in numeric_cols:
+            continue
+        values = _strip_excel_formula_column(df[col].astype(str).tolist())
+        if is_object and col in numeric_cols:
+            # 従来は数値変換前にもう一度除去していた（入れ子の ="="..."" に対応）
+            values = _strip_excel_formula_column(values)
+        if col in numeric_cols:
+            df[col] = pd.to_numeric(pd.Series(values, index=df.index, dtype=object), errors='coerce').fillna(0)
+        else:
+            df[col] = pd.Series(values, index=df.index, dtype=object)
+
+    if log_enabled:
+        for col in ('price', 'conditionNote', 'SKU'):
+            preprocess_logger.log(log_level, "AFTER Excel formula removal - %s: %s", col, _first_value(df, col))
+        preprocess_logger.log(log_level, "Completed. Final shape: %s", df.shape)
     return df
 
 
@@ -98,6 +125,42 @@ class RepriceOutputs(NamedTuple):
     excluded_df: pd.DataFrame
     items: List[Dict[str, Any]]
 
+
+class RepriceRows(NamedTuple):
+    """
+    改定結果の行（入力行ごとに1件・入力順）。チャンク・差分・並列で改定した結果は
+    この形で連結してから outputs_from_rows で DataFrame にする（一括改定と同じ組み立てになる）。
+    """
+    log_rows: List[Dict[str, Any]]
+    inventory_rows: List[Dict[str, Any]]
+    excluded: List[bool]  # True: excluded_df / False: updated_df
+
+
+def concat_reprice_rows(parts: List[RepriceRows]) -> RepriceRows:
+    """入力行の順に並んだ RepriceRows を連結する。"""
+    return RepriceRows(
+        log_rows=[row for part in parts for row in part.log_rows],
+        inventory_rows=[row for part in parts for row in part.inventory_rows],
+        excluded=[flag for part in parts for flag in part.excluded],
+    )
+
+
+def outputs_from_rows(rows: RepriceRows) -> RepriceOutputs:
+    """行の dict リストから RepriceOutputs を作る（一括改定の pd.DataFrame(list_of_dicts) と同じ経路）。"""
+    log_df = pd.DataFrame(rows.log_rows)
+    updated_df = pd.DataFrame([row for row, excluded in zip(rows.inventory_rows, rows.excluded) if not excluded])
+    excluded_df = pd.DataFrame([row for row, excluded in zip(rows.inventory_rows, rows.excluded) if excluded])
+
+    # CSV出力前の正規化を無効化（元ファイルのフォーマットを完全保持するため）
+    # 元のバイト列ベースの処理に切り替えたため、ここでの文字列変換は不要
+    # log_df = normalize_dataframe_for_cp932(log_df)
+    # updated_df = normalize_dataframe_for_cp932(updated_df)
+    # excluded_df = normalize_dataframe_for_cp932(excluded_df)
+
+    items_list = log_df.to_dict(orient='records')
+    return RepriceOutputs(log_df=log_df, updated_df=updated_df, excluded_df=excluded_df, items=items_list)
+
+
 def load_config(mode: str = "standard"):
     """設定ファイルを読み込む"""
     import os
@@ -165,47 +228,13 @@ def load_config(mode: str = "standard"):
 
 def get_days_since_listed(sku: str, today: datetime) -> int:
     """
-    SKUから正規表現パターンのリストを使用して日付を抽出 し、今日までの経過日数を計算する。
+    SKUから出品日を抽出し、今日までの経過日数を計算する。
     日付が抽出できない場合は-1を返す。
-    """
-    # Excel数式記法を削除
-    if isinstance(sku, str) and sku.startswith('="') and sku.endswith('"'):
-        sku = sku[2:-1]  # =" と " を除去
-    
-    # 将来のパターン追加を容易にするための正規表現リスト
-    # パターンは優先順位の高い順に並べる
-    patterns = [
-        # 2024_08_28 or 2024_0828
-        r"^(?P<year>\d{4})_(?P<month>\d{2})_?(?P<day>\d{2})",
-        # 20250201-... (ハイフン区切り)
-        r"^(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})-",
-        # 20251108B... (YYYYMMDD + アルファベットで始まる文字列)
-        r"^(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})(?=[A-Za-z])",
-        # hmk-20251108-... (プレフィックス-YYYYMMDD-形式)
-        r"^[a-z]+-(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})-",
-        # pr_..._20250217_...
-        r"_(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})_",
-        # 250518-... (YYMMDD形式)
-        r"^(?P<year>\d{2})(?P<month>\d{2})(?P<day>\d{2})-",
-    ]
 
-    for pattern in patterns:
-        match = re.search(pattern, sku)
-        if match:
-            try:
-                parts = match.groupdict()
-                year, month, day = int(parts["year"]), int(parts["month"]), int(parts["day"])
-                
-                # YYMMDD形式の場合、2000年代として解釈
-                if len(parts["year"]) == 2:
-                    year += 2000
-
-                listed_date = datetime(year, month, day)
-                return (today - listed_date).days
-            except (ValueError, KeyError):
-                continue
-    
-    return -1
+    抽出規則・優先順位は utils.sku_listing_date を参照（結合済み正規表現＋SKU単位のメモ）。
+    列単位でまとめて求める場合は days_since_listed_series を使う。
+    """
+    return _days_since_listed_from_sku(sku, today)
 
 def get_rule_for_days(days: int, rules: Dict[str, Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
     """
@@ -411,9 +440,66 @@ def _resolve_purchase_db_path() -> Path:
     return Path(__file__).resolve().parent.parent / "desktop" / "data" / "hirio.db"
 
 
-def _load_tp_map_from_purchase_db(sku_list: List[str]) -> Dict[str, Dict[str, float]]:
-    """仕入DBからSKU単位のTP0~TP3を読み込む。"""
-    result: Dict[str, Dict[str, float]] = {}
+def _purchase_db_version() -> Tuple[Tuple[int, int], ...]:
+    """
+    仕入DBのデータ版数（本体と -wal の (mtime_ns, サイズ)）。
+    改定結果キャッシュのキーに使い、仕入DBが更新されたら別キーになるようにする。
+    """
+    db_path = _resolve_purchase_db_path()
+    version = []
+    for path in (db_path, db_path.with_name(db_path.name + "-wal")):
+        try:
+            stat = path.stat()
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            version.append((0, 0))
+    return tuple(version)
+
+
+class PurchaseRecord(NamedTuple):
+    """仕入DB（purchases）から先読みした SKU 単位の改定用情報。"""
+    tp: Optional[Dict[str, Optional[float]]]  # TP0~TP3（TP列が無いDBでは None）
+    repricing_enabled: bool  # 価格改定フラグ（True=ON）
+    ladder_enabled: bool  # 月別運用（個別ラダー）ON/OFF
+    ladder_rules: List[Dict[str, Any]]  # 月別運用ルール（JSON 解析済み。OFF の SKU は空）
+
+
+_PURCHASE_TP_COLUMNS = ("tp0", "tp1", "tp2", "tp3")
+
+
+def _parse_ladder_rules_value(rules_raw: Any) -> List[Dict[str, Any]]:
+    """purchases.ladder_rules（JSON）をルールのリストへ。不正値は空リスト。"""
+    if not rules_raw:
+        return []
+    try:
+        parsed = json.loads(rules_raw) if isinstance(rules_raw, str) else rules_raw
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def _memoize_by_value(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """引数の値（型込み）ごとに func の結果を使い回す関数を返す。"""
+    cache: Dict[Tuple[type, Any], Any] = {}
+
+    def wrapper(value: Any) -> Any:
+        key = (type(value), value)
+        if key not in cache:
+            cache[key] = func(value)
+        return cache[key]
+
+    return wrapper
+
+
+@stage_span("repricer.purchase_db")
+def _prefetch_purchase_records(sku_list: List[str]) -> Dict[str, PurchaseRecord]:
+    """
+    仕入DBから改定に必要な SKU 単位の情報（TP0~TP3・価格改定フラグ・月別運用）を一括で読み込む。
+
+    読み取り専用の接続を1本だけ開き、SKU を一時テーブルへ投入して purchases と JOIN する。
+    古いDBで列が欠けている場合は、その項目のみ既定値（TP=None / 改定ON / 月別運用OFF）で返す。
+    """
+    result: Dict[str, PurchaseRecord] = {}
     if not sku_list:
         return result
 
@@ -421,44 +507,56 @@ def _load_tp_map_from_purchase_db(sku_list: List[str]) -> Dict[str, Dict[str, fl
     if not db_path.exists():
         return result
 
-    unique_skus = []
-    seen = set()
-    for sku in sku_list:
-        s = str(sku or "").strip()
-        if not s or s in seen:
-            continue
-        seen.add(s)
-        unique_skus.append(s)
-
+    unique_skus = list(dict.fromkeys(s for s in (str(sku or "").strip() for sku in sku_list) if s))
     if not unique_skus:
         return result
 
+    conn = None
     try:
-        conn = sqlite3.connect(str(db_path))
-        conn.row_factory = sqlite3.Row
+        conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
         cur = conn.cursor()
-        chunk_size = 900  # SQLite変数上限対策
-        for i in range(0, len(unique_skus), chunk_size):
-            chunk = unique_skus[i:i + chunk_size]
-            placeholders = ",".join(["?"] * len(chunk))
-            cur.execute(
-                f"SELECT sku, tp0, tp1, tp2, tp3 FROM purchases WHERE sku IN ({placeholders})",
-                tuple(chunk),
+        existing_cols = {row[1] for row in cur.execute("PRAGMA table_info(purchases)").fetchall()}
+        has_tp = all(col in existing_cols for col in _PURCHASE_TP_COLUMNS)
+        has_flag = "repricing_enabled" in existing_cols
+        has_ladder = "ladder_enabled" in existing_cols and "ladder_rules" in existing_cols
+
+        select_cols = ["p.sku"]
+        select_cols += [f"p.{col}" if has_tp else "NULL" for col in _PURCHASE_TP_COLUMNS]
+        select_cols.append("p.repricing_enabled" if has_flag else "NULL")
+        select_cols += ["p.ladder_enabled", "p.ladder_rules"] if has_ladder else ["NULL", "NULL"]
+
+        cur.execute("CREATE TEMP TABLE reprice_sku_keys (sku TEXT PRIMARY KEY) WITHOUT ROWID")
+        cur.executemany("INSERT INTO reprice_sku_keys (sku) VALUES (?)", ((s,) for s in unique_skus))
+        cur.execute(
+            f"SELECT {', '.join(select_cols)} FROM reprice_sku_keys k JOIN purchases p ON p.sku = k.sku"
+        )
+        # TP・フラグは取りうる値が少ないため、変換結果を値ごとに使い回す
+        tp_value = _memoize_by_value(_to_float_or_none_strict)
+        repricing_off = _memoize_by_value(_is_repricing_off)
+        ladder_on = _memoize_by_value(lambda v: str(v).strip().lower() in ("1", "true", "on", "yes"))
+
+        for sku_raw, tp0, tp1, tp2, tp3, flag, ladder_enabled, ladder_rules in cur.fetchall():
+            sku = str(sku_raw or "").strip()
+            if not sku:
+                continue
+            tp = None
+            if has_tp:
+                tp = {"tp0": tp_value(tp0), "tp1": tp_value(tp1), "tp2": tp_value(tp2), "tp3": tp_value(tp3)}
+            enabled = ladder_on(ladder_enabled)
+            result[sku] = PurchaseRecord(
+                tp=tp,
+                repricing_enabled=not repricing_off(flag),
+                ladder_enabled=enabled,
+                # 月別運用OFFのSKUはルールを参照しないため JSON 解析を省く
+                ladder_rules=_parse_ladder_rules_value(ladder_rules) if enabled else [],
             )
-            for row in cur.fetchall():
-                sku = str(row["sku"] or "").strip()
-                if not sku:
-                    continue
-                result[sku] = {
-                    "tp0": _to_float_or_none_strict(row["tp0"]),
-                    "tp1": _to_float_or_none_strict(row["tp1"]),
-                    "tp2": _to_float_or_none_strict(row["tp2"]),
-                    "tp3": _to_float_or_none_strict(row["tp3"]),
-                }
-        conn.close()
     except Exception as e:
-        # 仕入DB参照で失敗しても改定処理自体は継続（従来%計算へフォールバック）
-        print(f"[WARNING 3-6-9 TP] 仕入DBのTP読込に失敗: {e}")
+        # 仕入DB参照で失敗しても改定処理自体は継続（従来%計算・改定ONへフォールバック）
+        print(f"[WARNING PURCHASE DB] 仕入DBの改定用情報読込に失敗: {e}")
+        result = {}
+    finally:
+        if conn is not None:
+            conn.close()
     return result
 
 
@@ -472,51 +570,6 @@ def _is_repricing_off(value: Any) -> bool:
     return s in {"0", "off", "false", "無効", "いいえ", "no"}
 
 
-def _load_repricing_enabled_map_from_purchase_db(sku_list: List[str]) -> Dict[str, bool]:
-    """仕入DBからSKU単位の価格改定フラグ（True=ON）を読み込む。"""
-    result: Dict[str, bool] = {}
-    if not sku_list:
-        return result
-
-    db_path = _resolve_purchase_db_path()
-    if not db_path.exists():
-        return result
-
-    unique_skus = []
-    seen = set()
-    for sku in sku_list:
-        s = str(sku or "").strip()
-        if not s or s in seen:
-            continue
-        seen.add(s)
-        unique_skus.append(s)
-    if not unique_skus:
-        return result
-
-    try:
-        conn = sqlite3.connect(str(db_path))
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        chunk_size = 900
-        for i in range(0, len(unique_skus), chunk_size):
-            chunk = unique_skus[i:i + chunk_size]
-            placeholders = ",".join(["?"] * len(chunk))
-            cur.execute(
-                f"SELECT sku, repricing_enabled FROM purchases WHERE sku IN ({placeholders})",
-                tuple(chunk),
-            )
-            for row in cur.fetchall():
-                sku = str(row["sku"] or "").strip()
-                if not sku:
-                    continue
-                result[sku] = not _is_repricing_off(row["repricing_enabled"])
-        conn.close()
-    except Exception as e:
-        print(f"[WARNING REPRICE FLAG] 仕入DBの価格改定フラグ読込に失敗: {e}")
-
-    return result
-
-
 def _get_profile_rule_for_days(days_since_listed: int, profile_rules: List[Dict[str, Any]]) -> Tuple[int, Dict[str, Any]]:
     """profile_rules(リスト)から経過日数に対応するルールを返す。"""
     if not isinstance(profile_rules, list) or not profile_rules:
@@ -543,58 +596,6 @@ def _parse_ladder_target_price(rule: Dict[str, Any]) -> Optional[float]:
         return None
 
 
-def _load_ladder_map_from_purchase_db(sku_list: List[str]) -> Dict[str, Dict[str, Any]]:
-    """仕入DBから月別運用（個別ラダー）設定を読み込む。"""
-    result: Dict[str, Dict[str, Any]] = {}
-    if not sku_list:
-        return result
-    db_path = _resolve_purchase_db_path()
-    if not db_path.exists():
-        return result
-    unique_skus = []
-    seen = set()
-    for sku in sku_list:
-        s = str(sku or "").strip()
-        if not s or s in seen:
-            continue
-        seen.add(s)
-        unique_skus.append(s)
-    if not unique_skus:
-        return result
-    try:
-        conn = sqlite3.connect(str(db_path))
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        chunk_size = 900
-        for i in range(0, len(unique_skus), chunk_size):
-            chunk = unique_skus[i:i + chunk_size]
-            placeholders = ",".join(["?"] * len(chunk))
-            cur.execute(
-                f"SELECT sku, ladder_enabled, ladder_rules FROM purchases WHERE sku IN ({placeholders})",
-                tuple(chunk),
-            )
-            for row in cur.fetchall():
-                sku = str(row["sku"] or "").strip()
-                if not sku:
-                    continue
-                enabled_raw = row["ladder_enabled"]
-                enabled = str(enabled_raw).strip().lower() in ("1", "true", "on", "yes")
-                rules_raw = row["ladder_rules"]
-                rules: List[Dict[str, Any]] = []
-                if rules_raw:
-                    try:
-                        parsed = json.loads(rules_raw) if isinstance(rules_raw, str) else rules_raw
-                        if isinstance(parsed, list):
-                            rules = parsed
-                    except (json.JSONDecodeError, TypeError):
-                        rules = []
-                result[sku] = {"enabled": enabled, "rules": rules}
-        conn.close()
-    except Exception as e:
-        print(f"[WARNING LADDER] 仕入DBの月別運用読込に失敗: {e}")
-    return result
-
-
 def _get_ladder_merged_period_end(
     current_idx: int,
     current_rule: Dict[str, Any],
@@ -624,6 +625,11 @@ def _get_ladder_down_period_end(
     return _get_ladder_merged_period_end(current_idx, current_rule, ladder_rules, "tp_down")
 
 
+def _row_to_dict(row: Any) -> Dict[str, Any]:
+    """在庫行（pandas.Series / dict）を dict に変換する。"""
+    return row.to_dict() if hasattr(row, "to_dict") else dict(row)
+
+
 def _apply_monthly_ladder_for_row(
     row: Any,
     days_since_listed: int,
@@ -742,7 +748,7 @@ def _apply_monthly_ladder_for_row(
             "tp_floor": tp_floor if has_target else None,
             "is_tp_floor_or_below": False, "tp_reach_status": "",
         }
-        return "excluded", log_entry, row.to_dict()
+        return "excluded", log_entry, _row_to_dict(row)
     elif raw_action in ("price_down_ignore", "profit_ignore_down"):
         new_price = round(price * 0.99)
         reason_tokens.append("（利益ガード無視）")
@@ -765,7 +771,7 @@ def _apply_monthly_ladder_for_row(
         tp_reach_status = "期間外到達" if price <= tp_floor and days_since_listed < period_end else "期間到達"
 
     reason = " / ".join(reason_tokens)
-    row_dict = row.to_dict()
+    row_dict = _row_to_dict(row)
     row_dict["price"] = new_price
     row_dict["priceTrace"] = new_price_trace
     row_dict["akaji"] = final_akaji
@@ -808,7 +814,23 @@ def _get_tp_down_period_end(current_idx: int, current_rule: Dict[str, Any], prof
     return end_day
 
 
-def _apply_repricing_rules_369(df: pd.DataFrame, today: datetime, config: Dict[str, Any]) -> RepriceOutputs:
+def _apply_repricing_rules_369(
+    df: pd.DataFrame,
+    today: datetime,
+    config: Dict[str, Any],
+    compiled: Any = None,
+    purchase_records: Optional[Dict[str, PurchaseRecord]] = None,
+) -> RepriceOutputs:
+    """3-6-9 改定（列指向エンジン）。結果は _apply_repricing_rules_369_rowwise と同一。"""
+    from services.repricer_369_vectorized import apply_repricing_rules_369_vectorized
+
+    return apply_repricing_rules_369_vectorized(
+        df, today, config, compiled=compiled, purchase_records=purchase_records
+    )
+
+
+def _apply_repricing_rules_369_rowwise(df: pd.DataFrame, today: datetime, config: Dict[str, Any]) -> RepriceOutputs:
+    """3-6-9 改定の行ループ版（基準実装）。列指向エンジンの一致確認に使う。"""
     log_data = []
     updated_inventory_data = []
     excluded_inventory_data = []
@@ -827,9 +849,7 @@ def _apply_repricing_rules_369(df: pd.DataFrame, today: datetime, config: Dict[s
         if isinstance(_sku, str) and _sku.startswith('="') and _sku.endswith('"'):
             _sku = _sku[2:-1]
         sku_candidates.append(str(_sku or "").strip())
-    tp_map_by_sku = _load_tp_map_from_purchase_db(sku_candidates)
-    repricing_enabled_map_by_sku = _load_repricing_enabled_map_from_purchase_db(sku_candidates)
-    ladder_map_by_sku = _load_ladder_map_from_purchase_db(sku_candidates)
+    purchase_records = _prefetch_purchase_records(sku_candidates)
 
     for _, row in df.iterrows():
         sku = row.get("SKU", "")
@@ -841,7 +861,8 @@ def _apply_repricing_rules_369(df: pd.DataFrame, today: datetime, config: Dict[s
         asin = row.get("ASIN", "")
         title = row.get("title", "")
         row_repricing_off = _is_repricing_off(row.get("価格改定"))
-        db_repricing_enabled = repricing_enabled_map_by_sku.get(str(sku).strip(), True)
+        purchase_record = purchase_records.get(str(sku).strip())
+        db_repricing_enabled = purchase_record.repricing_enabled if purchase_record else True
         if row_repricing_off or not db_repricing_enabled:
             log_data.append({
                 "sku": sku, "asin": asin, "title": title, "days": -1, "action": "除外",
@@ -898,11 +919,9 @@ def _apply_repricing_rules_369(df: pd.DataFrame, today: datetime, config: Dict[s
             excluded_inventory_data.append(row.to_dict())
             continue
 
-        sku_key = str(sku).strip()
-        ladder_bundle = ladder_map_by_sku.get(sku_key) or {}
-        if ladder_bundle.get("enabled") and ladder_bundle.get("rules"):
+        if purchase_record and purchase_record.ladder_enabled and purchase_record.ladder_rules:
             kind, log_entry, row_payload = _apply_monthly_ladder_for_row(
-                row, days_since_listed, ladder_bundle["rules"], config
+                row, days_since_listed, purchase_record.ladder_rules, config
             )
             log_data.append(log_entry)
             if kind == "excluded":
@@ -918,9 +937,8 @@ def _apply_repricing_rules_369(df: pd.DataFrame, today: datetime, config: Dict[s
         # SKUタグ判定不可時の分岐:
         # - 仕入DBにSKUがあり、TPが1つでも入力されていれば「6ルール」
         # - 仕入DBにSKUがない or TP未入力なら「例外ルール」
-        sku_key = str(sku).strip()
-        db_tp_row = tp_map_by_sku.get(sku_key) or {}
-        has_db_sku = sku_key in tp_map_by_sku
+        has_db_sku = purchase_record is not None and purchase_record.tp is not None
+        db_tp_row = purchase_record.tp if has_db_sku else {}
         has_any_db_tp = any(
             (v is not None and float(v) > 0)
             for v in [db_tp_row.get("tp0"), db_tp_row.get("tp1"), db_tp_row.get("tp2"), db_tp_row.get("tp3")]
@@ -1128,30 +1146,83 @@ def _apply_repricing_rules_369(df: pd.DataFrame, today: datetime, config: Dict[s
     return RepriceOutputs(log_df=log_df, updated_df=updated_df, excluded_df=excluded_df, items=items_list)
 
 
-def apply_repricing_rules(df: pd.DataFrame, today: datetime, mode: str = "standard") -> RepriceOutputs:
+def apply_repricing_rules(
+    df: pd.DataFrame,
+    today: datetime,
+    mode: str = "standard",
+    compiled: Any = None,
+    purchase_records: Optional[Dict[str, PurchaseRecord]] = None,
+) -> RepriceOutputs:
     """
     30日間隔価格改定システム - 最新仕様対応
     注: preprocessは呼び出し元（repricer.py）で実行済み
+    compiled（コンパイル済み設定）・purchase_records（仕入DBの先読み結果）を渡すと、
+    設定ファイル・仕入DBを読まずにそれを使う（並列改定のワーカー用）。
     """
+    from services.repricer_config import get_compiled_config
+
     normalized_mode = "369" if str(mode) == "369" else "standard"
-    config = load_config(mode=normalized_mode)
+    # 設定はファイル更新時のみ再読込・再コンパイル（services/repricer_config）
+    if compiled is None:
+        compiled = get_compiled_config(mode=normalized_mode)
+    config = compiled.config
     if normalized_mode == "369":
-        return _apply_repricing_rules_369(df, today, config)
-    log_data = []
-    updated_inventory_data = []
-    excluded_inventory_data = []
-    excluded_skus = set(config.get("excluded_skus", []))
-    sku_candidates = []
-    for _, _row in df.iterrows():
-        _sku = _row.get("SKU", "")
-        if isinstance(_sku, str) and _sku.startswith('="') and _sku.endswith('"'):
-            _sku = _sku[2:-1]
-        sku_candidates.append(str(_sku or "").strip())
-    repricing_enabled_map_by_sku = _load_repricing_enabled_map_from_purchase_db(sku_candidates)
+        return _apply_repricing_rules_369(
+            df, today, config, compiled=compiled, purchase_records=purchase_records
+        )
+    return outputs_from_rows(_reprice_rows_standard(df, today, compiled, purchase_records))
 
-    rules = config["reprice_rules"]
 
-    for index, row in df.iterrows():
+def reprice_rows(
+    df: pd.DataFrame,
+    today: datetime,
+    mode: str = "standard",
+    compiled: Any = None,
+    purchase_records: Optional[Dict[str, PurchaseRecord]] = None,
+) -> RepriceRows:
+    """
+    apply_repricing_rules の結果を DataFrame にする前の行の形で返す。
+    outputs_from_rows(reprice_rows(df, ...)) は apply_repricing_rules(df, ...) と同じ。
+    """
+    from services.repricer_config import get_compiled_config
+    from services.repricer_369_vectorized import reprice_rows_369_vectorized
+
+    normalized_mode = "369" if str(mode) == "369" else "standard"
+    if compiled is None:
+        compiled = get_compiled_config(mode=normalized_mode)
+    if normalized_mode == "369":
+        return reprice_rows_369_vectorized(
+            df, today, compiled.config, compiled=compiled, purchase_records=purchase_records
+        )
+    return _reprice_rows_standard(df, today, compiled, purchase_records)
+
+
+def _reprice_rows_standard(
+    df: pd.DataFrame,
+    today: datetime,
+    compiled: Any,
+    purchase_records: Optional[Dict[str, PurchaseRecord]],
+) -> RepriceRows:
+    """30日間隔（標準モード）の改定を行ループで適用する。"""
+    config = compiled.config
+    log_data = []
+    inventory_rows = []
+    excluded_flags = []
+    excluded_skus = set(config.get("excluded_skus", []))
+    if purchase_records is None:
+        sku_candidates = []
+        for _, _row in df.iterrows():
+            _sku = _row.get("SKU", "")
+            if isinstance(_sku, str) and _sku.startswith('="') and _sku.endswith('"'):
+                _sku = _sku[2:-1]
+            sku_candidates.append(str(_sku or "").strip())
+        purchase_records = _prefetch_purchase_records(sku_candidates)
+
+    # 経過日数は SKU 列をまとめて算出（行ループ内での正規表現評価を避ける）
+    sku_series = df["SKU"] if "SKU" in df.columns else pd.Series([""] * len(df), index=df.index, dtype=object)
+    listed_days = days_since_listed_series(sku_series, today).tolist()
+
+    for position, (_, row) in enumerate(df.iterrows()):
         sku = row.get("SKU", "")
         # SKUからExcel数式記法を削除（念のため）
         if isinstance(sku, str) and sku.startswith('="') and sku.endswith('"'):
@@ -1172,10 +1243,11 @@ def apply_repricing_rules(df: pd.DataFrame, today: datetime, mode: str = "standa
                 "priceTraceChange": 0,
                 "priceTraceChangeDisplay": "無し"  # Traceを行わない
             })
-            excluded_inventory_data.append(row.to_dict())
+            inventory_rows.append(row.to_dict())
+            excluded_flags.append(True)
             continue
 
-        days_since_listed = get_days_since_listed(sku, today)
+        days_since_listed = listed_days[position]
 
         # 日付不明の場合は維持
         if days_since_listed == -1:
@@ -1188,8 +1260,8 @@ def apply_repricing_rules(df: pd.DataFrame, today: datetime, mode: str = "standa
                 "priceTraceChange": 0,
                 "priceTraceChangeDisplay": "無し"  # Traceを行わない
             })
-            row_dict = row.to_dict()
-            updated_inventory_data.append(row_dict)
+            inventory_rows.append(row.to_dict())
+            excluded_flags.append(False)
             continue
 
         # 365日超過の場合は対象外
@@ -1203,12 +1275,13 @@ def apply_repricing_rules(df: pd.DataFrame, today: datetime, mode: str = "standa
                 "priceTraceChange": 0,
                 "priceTraceChangeDisplay": "無し"  # Traceを行わない
             })
-            excluded_inventory_data.append(row.to_dict())
+            inventory_rows.append(row.to_dict())
+            excluded_flags.append(True)
             continue
 
         # ルール適用
         try:
-            rule_key, rule = get_rule_for_days(days_since_listed, rules)
+            rule_key, rule = compiled.standard_rule_for_days(days_since_listed)
             if not rule:
                 # ルールが見つからない場合は維持
                 rule = {"action": "maintain", "priceTrace": 0}
@@ -1227,7 +1300,8 @@ def apply_repricing_rules(df: pd.DataFrame, today: datetime, mode: str = "standa
         asin = row.get("ASIN", "")
         title = row.get("title", "")
         row_repricing_off = _is_repricing_off(row.get("価格改定"))
-        db_repricing_enabled = repricing_enabled_map_by_sku.get(str(sku).strip(), True)
+        purchase_record = purchase_records.get(str(sku).strip())
+        db_repricing_enabled = purchase_record.repricing_enabled if purchase_record else True
         if row_repricing_off or not db_repricing_enabled:
             log_data.append({
                 "sku": sku, "asin": asin, "title": title, "days": -1, "action": "除外",
@@ -1236,7 +1310,8 @@ def apply_repricing_rules(df: pd.DataFrame, today: datetime, mode: str = "standa
                 "priceTraceChange": 0,
                 "priceTraceChangeDisplay": "無し"
             })
-            excluded_inventory_data.append(row.to_dict())
+            inventory_rows.append(row.to_dict())
+            excluded_flags.append(True)
             continue
         
         # priceTraceChangeの計算と表示文字列の決定
@@ -1280,9 +1355,9 @@ def apply_repricing_rules(df: pd.DataFrame, today: datetime, mode: str = "standa
 
         # Prister形式の全列を保持したまま価格とpriceTraceのみ更新
         row_dict = row.to_dict()
-        if action == "exclude":
-            excluded_inventory_data.append(row_dict)
-        else:
+        inventory_rows.append(row_dict)
+        excluded_flags.append(action == "exclude")
+        if action != "exclude":
             # 価格とpriceTraceの更新（Prister形式の16列すべてを保持）
             row_dict['price'] = new_price
             row_dict['priceTrace'] = new_price_trace
@@ -1290,19 +1365,5 @@ def apply_repricing_rules(df: pd.DataFrame, today: datetime, mode: str = "standa
             # 利益無視（price_down_ignore）の場合はakajiを空白にする（akajiストッパー回避のため）
             if action == "price_down_ignore":
                 row_dict['akaji'] = ""  # 空白に設定
-            
-            updated_inventory_data.append(row_dict)
-
-    log_df = pd.DataFrame(log_data)
-    updated_df = pd.DataFrame(updated_inventory_data)
-    excluded_df = pd.DataFrame(excluded_inventory_data)
 
-    # CSV出力前の正規化を無効化（元ファイルのフォーマットを完全保持するため）
-    # 元のバイト列ベースの処理に切り替えたため、ここでの文字列変換は不要
-    # log_df = normalize_dataframe_for_cp932(log_df)
-    # updated_df = normalize_dataframe_for_cp932(updated_df)
-    # excluded_df = normalize_dataframe_for_cp932(excluded_df)
-
-    items_list = log_df.to_dict(orient='records')
-
-    return RepriceOutputs(log_df=log_df, updated_df=updated_df, excluded_df=excluded_df, items=items_list)
+    return RepriceRows(log_rows=log_data, inventory_rows=inventory_rows, excluded=excluded_flags)
@@ -5,18 +5,80 @@
 
 仕入リストとルートサマリー（店舗 IN/OUT）の照合。
 FastAPI およびデスクトップアプリの双方から利用する。
+
+- 店舗訪問の IN/OUT は照合の最初に1回だけ解析し、滞在時間帯を IN の昇順に並べた索引
+  （_StayWindowIndex）を作る。商品ごとの「滞在時間内の店舗」は二分探索で求める
+- 仕入成功・粗利など商品によらない値と、候補店舗（手動確認用）の順位は事前に計算する
+- 滞在時間内の店舗が無い場合のみ、IN/OUT を前後 time_tolerance_minutes 分広げた時間帯で探す
 """
 
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 
 try:
     from desktop.services.calculation_service import CalculationService
 except ImportError:
     from services.calculation_service import CalculationService
 
+# スコア配分（時間帯一致 + 粗利一致 + 仕入成功）
+TIME_SCORE = 0.5
+PROFIT_SCORE_CLOSE = 0.3
+PROFIT_SCORE_NEAR = 0.15
+SUCCESS_SCORE = 0.2
+AUTO_MATCH_THRESHOLD = 0.5
+
+
+class _Visit(NamedTuple):
+    """照合用に前処理した店舗訪問（position は store_code を持つ訪問の中での順番）"""
+    position: int
+    store_code: Any
+    in_time: Optional[datetime]
+    out_time: Optional[datetime]
+    gross_profit: Optional[float]
+    success: bool
+
+
+class _StayWindowIndex:
+    """滞在時間帯（IN〜OUT）を IN の昇順に並べ、時刻を含む訪問を二分探索で求める索引。"""
+
+    def __init__(self, visits: List[_Visit], margin: timedelta = timedelta(0)):
+        windows = sorted(
+            (v.in_time - margin, v.out_time + margin, v.position)
+            for v in visits
+            if v.in_time and v.out_time
+        )
+        self.starts = [w[0] for w in windows]
+        self.ends = [w[1] for w in windows]
+        self.positions = [w[2] for w in windows]
+        # 先頭からの OUT の最大値（これが時刻より前なら、それより前の時間帯は時刻を含まない）
+        self.max_ends: List[datetime] = []
+        for end in self.ends:
+            self.max_ends.append(end if not self.max_ends or end > self.max_ends[-1] else self.max_ends[-1])
+
+    def containing(self, moment: datetime) -> List[int]:
+        """IN <= moment <= OUT となる訪問の position"""
+        found = []
+        i = bisect_right(self.starts, moment) - 1
+        while i >= 0 and self.max_ends[i] >= moment:
+            if self.ends[i] >= moment:
+                found.append(self.positions[i])
+            i -= 1
+        return found
+
+
+def _profit_score(estimated_profit: Optional[float], store_gross_profit: Optional[float]) -> Tuple[float, str]:
+    if not (estimated_profit and store_gross_profit) or store_gross_profit <= 0:
+        return 0.0, ""
+    profit_diff_ratio = abs(estimated_profit - store_gross_profit) / store_gross_profit
+    if profit_diff_ratio <= 0.1:
+        return PROFIT_SCORE_CLOSE, "粗利一致（誤差10%以内）"
+    if profit_diff_ratio <= 0.3:
+        return PROFIT_SCORE_NEAR, f"粗利近接（誤差{profit_diff_ratio * 100:.1f}%）"
+    return 0.0, ""
+
 
 class RouteMatchingService:
     """ルート照合処理サービスクラス"""
@@ -24,137 +86,122 @@ class RouteMatchingService:
     def __init__(self):
         self.calc_service = CalculationService()
 
+    def _parse_time(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return self.calc_service.parse_datetime_string(value)
+        return value
+
+    def _prepare_visits(self, store_visits: List[Dict[str, Any]]) -> List[_Visit]:
+        """store_code を持つ訪問だけを、IN/OUT を解析して並び順のまま返す。"""
+        visits = []
+        for visit in store_visits:
+            store_code = visit.get("store_code")
+            if not store_code:
+                continue
+            visits.append(_Visit(
+                position=len(visits),
+                store_code=store_code,
+                in_time=self._parse_time(visit.get("store_in_time")),
+                out_time=self._parse_time(visit.get("store_out_time")),
+                gross_profit=self._safe_float(visit.get("store_gross_profit")),
+                success=bool(visit.get("purchase_success", False)),
+            ))
+        return visits
+
     def match_store_code_by_time_and_profit(
         self,
         purchase_items: List[Dict[str, Any]],
         store_visits: List[Dict[str, Any]],
         time_tolerance_minutes: int = 30,
+        cancel_check: Optional[Callable[[], None]] = None,
     ) -> List[Dict[str, Any]]:
-        results = []
+        """
+        仕入商品ごとに、滞在時間帯・粗利・仕入成功のスコアが最も高い店舗を選ぶ（同点は訪問順が先の店舗）。
+        スコアが AUTO_MATCH_THRESHOLD 以上なら自動照合、未満なら手動確認（候補店舗を最大3件付ける）。
+        滞在時間内の店舗が無い商品は、前後 time_tolerance_minutes 分以内の店舗を時間帯一致として扱う。
+        cancel_check を渡すと商品ごとに呼ぶ（キャンセル時に例外を送出して中断させる）
+        """
+        visits = self._prepare_visits(store_visits)
+        stay_index = _StayWindowIndex(visits)
+        tolerance = timedelta(minutes=max(0, time_tolerance_minutes or 0))
+        near_index = _StayWindowIndex(visits, margin=tolerance) if tolerance else None
+        near_reason = f"滞在時間近接（±{int(tolerance.total_seconds() // 60)}分）"
+
+        # 粗利が無い商品では仕入成功のスコアだけで決まる: 時間帯に含まれない店舗の最良は常にこれ
+        static_best = next((v for v in visits if v.success), visits[0] if visits else None)
+        # 手動確認用の候補店舗（商品によらないため、最初に必要になった時に1回だけ求める）
+        candidate_codes: Optional[List[Any]] = None
 
+        results = []
         for item in purchase_items:
+            if cancel_check is not None:
+                cancel_check()
             result_item = item.copy()
-            matched = False
-            match_confidence = 0.0
-            matched_store_code = None
-            match_reason = ""
-
-            purchase_date = item.get("仕入れ日") or item.get("purchase_date")
-            if isinstance(purchase_date, str):
-                purchase_date = self.calc_service.parse_datetime_string(purchase_date)
 
+            purchase_date = self._parse_time(item.get("仕入れ日") or item.get("purchase_date"))
             purchase_price = self._safe_float(item.get("仕入れ価格") or item.get("purchase_price", 0))
             planned_price = self._safe_float(item.get("販売予定価格") or item.get("planned_price", 0))
             estimated_profit = (
                 planned_price - purchase_price if planned_price and purchase_price else None
             )
 
-            for visit in store_visits:
-                store_code = visit.get("store_code")
-                if not store_code:
-                    continue
-
-                in_time = visit.get("store_in_time")
-                out_time = visit.get("store_out_time")
-
-                if isinstance(in_time, str):
-                    in_time = self.calc_service.parse_datetime_string(in_time)
-                if isinstance(out_time, str):
-                    out_time = self.calc_service.parse_datetime_string(out_time)
-
-                score, reason = self._calculate_match_score(
-                    purchase_date,
-                    purchase_price,
-                    planned_price,
-                    estimated_profit,
-                    in_time,
-                    out_time,
-                    visit,
-                    time_tolerance_minutes,
-                )
+            in_window: List[int] = []
+            time_reason = "滞在時間内"
+            if purchase_date:
+                in_window = stay_index.containing(purchase_date)
+                if not in_window and near_index is not None:
+                    in_window = near_index.containing(purchase_date)
+                    time_reason = near_reason
 
+            if estimated_profit:
+                candidates = visits
+            else:
+                positions = set(in_window)
+                if static_best is not None:
+                    positions.add(static_best.position)
+                candidates = [visits[p] for p in sorted(positions)]
+
+            match_confidence = 0.0
+            matched_visit: Optional[_Visit] = None
+            match_reason = ""
+            for visit in candidates:
+                in_time_window = visit.position in in_window
+                profit_score, profit_reason = _profit_score(estimated_profit, visit.gross_profit)
+                score = 0.0
+                score += TIME_SCORE if in_time_window else 0.0
+                score += profit_score
+                score += SUCCESS_SCORE if visit.success else 0.0
                 if score > match_confidence:
+                    reasons = [time_reason] if in_time_window else []
+                    if profit_reason:
+                        reasons.append(profit_reason)
+                    if visit.success:
+                        reasons.append("仕入れ成功")
                     match_confidence = score
-                    matched_store_code = store_code
-                    match_reason = reason
-                    matched = True
+                    matched_visit = visit
+                    match_reason = "; ".join(reasons) if reasons else "照合条件不足"
 
-            if matched and match_confidence >= 0.5:
-                result_item["matched_store_code"] = matched_store_code
+            if matched_visit is not None and match_confidence >= AUTO_MATCH_THRESHOLD:
+                result_item["matched_store_code"] = matched_visit.store_code
                 result_item["match_confidence"] = match_confidence
                 result_item["match_reason"] = match_reason
                 result_item["match_status"] = "auto_matched"
             else:
-                candidates = self._find_candidate_stores(
-                    purchase_items=[item],
-                    store_visits=store_visits,
-                    time_tolerance_minutes=time_tolerance_minutes,
-                )
                 result_item["matched_store_code"] = None
-                result_item["match_confidence"] = match_confidence if matched else 0.0
-                result_item["match_reason"] = match_reason if matched else "照合失敗"
+                result_item["match_confidence"] = match_confidence if matched_visit else 0.0
+                result_item["match_reason"] = match_reason if matched_visit else "照合失敗"
                 result_item["match_status"] = "manual_review_required"
-                result_item["candidate_store_codes"] = [c["store_code"] for c in candidates[:3]]
+                if candidate_codes is None:
+                    candidate_codes = [
+                        c["store_code"]
+                        for c in self._find_candidate_stores([], store_visits, time_tolerance_minutes)[:3]
+                    ]
+                result_item["candidate_store_codes"] = list(candidate_codes)
 
             results.append(result_item)
 
         return results
 
-    def _calculate_match_score(
-        self,
-        purchase_date: Optional[datetime],
-        purchase_price: Optional[float],
-        planned_price: Optional[float],
-        estimated_profit: Optional[float],
-        store_in_time: Optional[datetime],
-        store_out_time: Optional[datetime],
-        visit: Dict[str, Any],
-        time_tolerance_minutes: int,
-    ) -> Tuple[float, str]:
-        score = 0.0
-        reasons = []
-
-        if purchase_date and store_in_time and store_out_time:
-            if store_in_time <= purchase_date <= store_out_time:
-                time_score = 0.5
-                reasons.append("滞在時間内")
-            else:
-                time_score = 0.0
-        else:
-            time_score = 0.0
-
-        score += time_score
-
-        store_gross_profit = self._safe_float(visit.get("store_gross_profit"))
-        if estimated_profit and store_gross_profit:
-            if store_gross_profit > 0:
-                profit_diff_ratio = abs(estimated_profit - store_gross_profit) / store_gross_profit
-                if profit_diff_ratio <= 0.1:
-                    profit_score = 0.3
-                    reasons.append("粗利一致（誤差10%以内）")
-                elif profit_diff_ratio <= 0.3:
-                    profit_score = 0.15
-                    reasons.append(f"粗利近接（誤差{profit_diff_ratio * 100:.1f}%）")
-                else:
-                    profit_score = 0.0
-            else:
-                profit_score = 0.0
-        else:
-            profit_score = 0.0
-
-        score += profit_score
-
-        if visit.get("purchase_success", False):
-            success_score = 0.2
-            reasons.append("仕入れ成功")
-        else:
-            success_score = 0.0
-
-        score += success_score
-
-        reason_text = "; ".join(reasons) if reasons else "照合条件不足"
-        return score, reason_text
-
     def _find_candidate_stores(
         self,
         purchase_items: List[Dict[str, Any]],
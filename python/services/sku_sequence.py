@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SKU連番（テンプレートの {seq:N}）の採番。
+
+従来は一括生成のたびに seqStart から数え直していたため、同じ日に2回生成する・
+API とデスクトップから同時に生成すると同じ連番が出ていた。
+ここでは採番状況を SQLite に保存し、スコープキー（日付、または日付＋仕入先）ごとに
+連続した番号の範囲をまとめて確保する。
+
+- 確保は BEGIN IMMEDIATE のトランザクション1回で行う（複数スコープ分もまとめて1回）。
+  書き込みロックを取ってから読むため、並行して確保しても範囲は重ならない
+- 次の番号は「保存済みの次番号」と「設定の seqStart」の大きい方から始める
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from core.config import BASE_DIR
+
+# 採番DB（リポジトリ直下の data/。旧 sku_counter.json と同じ場所）
+SKU_SEQUENCE_DB_PATH = BASE_DIR / "data" / "sku_sequences.db"
+
+# 他の確保が終わるのを待つ上限（秒）
+LOCK_TIMEOUT_SEC = 30.0
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sku_sequences (
+        scope_key TEXT PRIMARY KEY,
+        next_value INTEGER NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+"""
+
+
+class SkuSequenceAllocator:
+    """スコープキーごとの連番を SQLite で確保する（プロセス・スレッドをまたいで安全）。"""
+
+    def __init__(self, db_path: Optional[Path] = None, timeout: float = LOCK_TIMEOUT_SEC):
+        self.db_path = Path(db_path or SKU_SEQUENCE_DB_PATH)
+        self.timeout = timeout
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: トランザクションは BEGIN IMMEDIATE で明示的に開始する
+        conn = sqlite3.connect(str(self.db_path), timeout=self.timeout, isolation_level=None)
+        conn.execute(_SCHEMA)
+        return conn
+
+    def reserve_many(self, counts: Dict[str, int], start: int = 1) -> Dict[str, int]:
+        """
+        {スコープキー: 件数} の範囲をまとめて確保し、{スコープキー: 先頭の番号} を返す。
+        確保した番号は 先頭 〜 先頭 + 件数 - 1。件数 0 以下のキーは確保しない。
+        """
+        counts = {key: int(n) for key, n in counts.items() if int(n) > 0}
+        if not counts:
+            return {}
+        now = datetime.now().isoformat(timespec="seconds")
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                firsts: Dict[str, int] = {}
+                for key, n in counts.items():
+                    row = conn.execute(
+                        "SELECT next_value FROM sku_sequences WHERE scope_key = ?", (key,)
+                    ).fetchone()
+                    first = max(int(start), row[0] if row else int(start))
+                    conn.execute(
+                        "INSERT INTO sku_sequences (scope_key, next_value, updated_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(scope_key) DO UPDATE SET next_value = excluded.next_value, "
+                        "updated_at = excluded.updated_at",
+                        (key, first + n, now),
+                    )
+                    firsts[key] = first
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return firsts
+
+    def reserve(self, scope_key: str, count: int, start: int = 1) -> int:
+        """scope_key の連番を count 件確保し、先頭の番号を返す。"""
+        return self.reserve_many({scope_key: count}, start=start).get(scope_key, int(start))
+
+    def peek(self, scope_key: str) -> Optional[int]:
+        """scope_key で次に確保される番号（未使用なら None。seqStart は考慮しない）。"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT next_value FROM sku_sequences WHERE scope_key = ?", (scope_key,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+
+# API で共有する採番
+sku_sequence_allocator = SkuSequenceAllocator()
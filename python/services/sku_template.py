@@ -1,9 +1,33 @@
+"""
+SKUテンプレート（config/inventory_settings.json の skuTemplate）のレンダラ。
+
+テンプレートは1回だけトークン列（固定文字列・日付・連番・商品項目の取り出し関数）に
+コンパイルし、一括生成では商品ごとにトークン列を順に評価して連結するだけにする。
+
+- コンパイル結果はテンプレート文字列ごとにキャッシュする
+- 設定ファイルは mtime・サイズが変わるまで読み直さない（load_sku_settings）。
+  POST /api/inventory/sku-template 書き込み時は invalidate_sku_settings() で明示的に破棄する
+- 日付トークンは一括生成ごとに1回だけ書式化する
+- 生成した SKU の重複（同じ一括生成内での衝突）は find_duplicate_skus で検出する
+- 連番は採番器（services.sku_sequence）を渡すと、スコープ（seqScope）ごとに一括生成分の
+  範囲をまとめて確保する。渡さない場合は従来どおり seqStart から数える
+"""
+
 from __future__ import annotations
 
 import re
 import json
+import os
+import threading
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from core.config import BASE_DIR
+
+if TYPE_CHECKING:
+    from services.sku_sequence import SkuSequenceAllocator
 
 # SKU の「今日」は日本のカレンダー日を基準にする（サーバーが UTC でも前日にならないようにする）
 # 日本は夏時間がないため UTC+9 固定でよい（Windows でも zoneinfo 用 tzdata 不要）
@@ -29,201 +53,366 @@ COND_CODE_MAP = {
 }
 
 
-class SKUTemplateRenderer:
-    def __init__(self, settings: Dict[str, Any], sku_date: Optional[str] = None):
-        self.settings = settings or {}
-        self.template: str = self.settings.get(
-            "skuTemplate",
-            "{date:YYYYMMDD}-{ASIN|JAN}-{supplier}-{seq:3}-{condNum}",
-        )
-        self.seq_scope: str = self.settings.get("seqScope", "day")
-        self.seq_start: int = int(self.settings.get("seqStart", 1))
-        self.date_cache: Optional[str] = None
+# SKU設定ファイル（リポジトリ直下の config/）
+INVENTORY_SETTINGS_PATH = BASE_DIR / "config" / "inventory_settings.json"
 
-        # SKU日付の上書き指定（UIからの任意日付指定用）
-        self._override_date: Optional[datetime] = None
-        if sku_date:
-            # "YYYYMMDD" 形式を優先して解釈し、失敗した場合は他のよく使う形式も試す
-            for fmt in ("%Y%m%d", "%Y-%m-%d", "%Y/%m/%d"):
-                try:
-                    self._override_date = datetime.strptime(sku_date, fmt)
-                    break
-                except Exception:
-                    continue
+DEFAULT_SKU_TEMPLATE = "{date:YYYYMMDD}-{ASIN|JAN}-{supplier}-{seq:3}-{condNum}"
+# 連番のスコープ（seqScope）: day は日付ごと、day_supplier は日付・仕入先ごとに連番を振る
+SEQ_SCOPES = ("day", "day_supplier")
 
-    def _today(self) -> str:
-        base = self._override_date or datetime.now(_JST)
-        return base.strftime("%Y%m%d")
-
-    def _format_date(self, fmt_py: str) -> str:
-        """UIで指定されたSKU日付があればそれを、なければ現在日付を指定フォーマットで返す。"""
-        base = self._override_date or datetime.now(_JST)
-        return base.strftime(fmt_py)
-
-    def _get_cond_num(self, condition: str) -> Optional[int]:
-        return COND_NUM_MAP.get(condition)
-
-    def _get_cond_code(self, condition: str) -> Optional[str]:
-        return COND_CODE_MAP.get(condition)
-
-    def _choose_asin_jan(self, p: Dict[str, Any]) -> str:
-        asin = p.get("asin") or p.get("ASIN") or ""
-        jan = p.get("jan") or p.get("JAN") or ""
-        return asin or jan
-
-    def _sanitize(self, s: str) -> str:
-        # 許可: 英数・ハイフン・アンダースコア
-        s = re.sub(r"[^0-9A-Za-z\-_]", "-", s)
-        s = re.sub(r"-+", "-", s)
-        s = s.strip("-")
-        return s[:60]
-
-    def _resolve_token(self, token: str, p: Dict[str, Any], seq_value: int) -> str:
-        # {date[:FMT]}
-        if token.startswith("date"):
-            parts = token.split(":")
-            fmt = parts[1] if len(parts) > 1 else "YYYYMMDD"
-            fmt_py = fmt.replace("YYYY", "%Y").replace("MM", "%m").replace("DD", "%d")
-            return self._format_date(fmt_py)
-
-        # {ASIN|JAN} or {asin}/{jan}
-        if token in ("ASIN|JAN", "ASIN_JAN"):
-            return self._choose_asin_jan(p)
-        if token.lower() == "asin":
-            return str(p.get("asin") or p.get("ASIN") or "")
-        if token.lower() == "jan":
-            return str(p.get("jan") or p.get("JAN") or "")
-
-        # {condNum} / {condCode}
-        if token == "condNum":
-            c = p.get("condition") or p.get("コンディション", "")
-            v = self._get_cond_num(c)
-            return str(v) if v is not None else ""
-        if token == "condCode":
-            c = p.get("condition") or p.get("コンディション", "")
-            v = self._get_cond_code(c)
-            return v or ""
-
-        # {rule369} - コメント列から 3P/3N/6P/6N/9P/9N を判定
-        if token == "rule369":
-            comment = p.get("comment") or p.get("コメント") or ""
-            return self._get_rule369_code(comment)
-
-        # {purchasePrice} / {price} - 仕入れ価格
-        if token in ("purchasePrice", "price", "purchase_price"):
-            val = (
-                p.get("purchase_price")
-                or p.get("仕入れ価格")
-                or p.get("仕入価格")
-                or p.get("cost")
-            )
-            if val is None:
-                return ""
-            try:
-                # 数値の場合は整数化してから文字列に
-                num = float(val)
-                if num.is_integer():
-                    return str(int(num))
-                return str(num)
-            except Exception:
-                # 数値変換できない場合はそのまま文字列化
-                return str(val)
+DEFAULT_SKU_SETTINGS: Dict[str, Any] = {
+    "skuTemplate": DEFAULT_SKU_TEMPLATE,
+    "seqScope": "day",
+    "seqStart": 1,
+}
+
+_TOKEN_PATTERN = re.compile(r"\{([^{}]+)\}")
+# 許可: 英数・アンダースコア。それ以外の文字とハイフンの連続は1つのハイフンにまとめる
+_SKU_INVALID_RUN = re.compile(r"[^0-9A-Za-z_]+")
+_RULE369_PATTERN = re.compile(r"^(3n|3p|6n|6p|9n|9p|10|3|4|6|7|9)\b")
+_RULE369_CODES = {
+    "3": "3P", "3p": "3P",
+    "4": "3N", "3n": "3N",
+    "6": "6P", "6p": "6P",
+    "7": "6N", "6n": "6N",
+    "9": "9P", "9p": "9P",
+    "10": "9N", "9n": "9N",
+}
 
-        # {ship}
-        if token == "ship":
-            return str(p.get("shippingMethod") or p.get("発送方法") or "")
+# トークンの評価関数: (商品, 連番) -> 文字列
+TokenFunc = Callable[[Dict[str, Any], int], str]
+
+
+def sanitize_sku(s: str) -> str:
+    """英数・ハイフン・アンダースコア以外をハイフンにし、ハイフンの連続をまとめて前後を除き60文字に切る。"""
+    return _SKU_INVALID_RUN.sub("-", s).strip("-")[:60]
+
+
+def rule369_code(comment: Any) -> str:
+    """
+    コメント列から 3-6-9 コードを判定して返す。
+
+    ルール:
+    - 3          → 3P
+    - 4, 3n      → 3N
+    - 6          → 6P
+    - 7, 6n      → 6N
+    - 9          → 9P
+    - 10, 9n     → 9N
+    - 空欄や上記以外（11,12...などの連番を含む）→ 6P
+    """
+    try:
+        s = "" if comment is None else str(comment).strip().lower()
+    except Exception:
+        s = ""
+    if not s:
+        return "6P"
+    # 先頭トークン（数字・pnコード）だけを見る
+    # 例: "3", "4", "3n", "6p", "9n", "10", "3n-テスト" など
+    m = _RULE369_PATTERN.match(s)
+    return _RULE369_CODES[m.group(1)] if m else "6P"
 
-        # {supplier}
-        if token == "supplier":
-            return str(p.get("supplier_code") or p.get("仕入先") or p.get("supplier") or "")
 
-        # {seq[:digits][:scope]}
-        if token.startswith("seq"):
-            # seq:3 or seq:4:day
-            parts = token.split(":")
-            width = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 3
-            return str(seq_value).zfill(width)
+def _condition(p: Dict[str, Any]) -> Any:
+    return p.get("condition") or p.get("コンディション", "")
 
-        # {custom:XXX} / {text:XXX}
-        if token.startswith("custom:") or token.startswith("text:"):
-            return token.split(":", 1)[1]
 
-        return ""
+def _asin_jan(p: Dict[str, Any], seq: int) -> str:
+    return str(p.get("asin") or p.get("ASIN") or p.get("jan") or p.get("JAN") or "")
 
-    def _get_rule369_code(self, comment: Any) -> str:
-        """
-        コメント列から 3-6-9 コードを判定して返す。
-
-        ルール:
-        - 3          → 3P
-        - 4, 3n      → 3N
-        - 6          → 6P
-        - 7, 6n      → 6N
-        - 9          → 9P
-        - 10, 9n     → 9N
-        - 空欄や上記以外（11,12...などの連番を含む）→ 6P
-        """
+
+def _asin(p: Dict[str, Any], seq: int) -> str:
+    return str(p.get("asin") or p.get("ASIN") or "")
+
+
+def _jan(p: Dict[str, Any], seq: int) -> str:
+    return str(p.get("jan") or p.get("JAN") or "")
+
+
+def _cond_num(p: Dict[str, Any], seq: int) -> str:
+    v = COND_NUM_MAP.get(_condition(p))
+    return str(v) if v is not None else ""
+
+
+def _cond_code(p: Dict[str, Any], seq: int) -> str:
+    return COND_CODE_MAP.get(_condition(p)) or ""
+
+
+def _rule369(p: Dict[str, Any], seq: int) -> str:
+    return rule369_code(p.get("comment") or p.get("コメント") or "")
+
+
+def _purchase_price(p: Dict[str, Any], seq: int) -> str:
+    val = p.get("purchase_price") or p.get("仕入れ価格") or p.get("仕入価格") or p.get("cost")
+    if val is None:
+        return ""
+    try:
+        # 数値の場合は整数化してから文字列に
+        num = float(val)
+        if num.is_integer():
+            return str(int(num))
+        return str(num)
+    except Exception:
+        # 数値変換できない場合はそのまま文字列化
+        return str(val)
+
+
+def _ship(p: Dict[str, Any], seq: int) -> str:
+    return str(p.get("shippingMethod") or p.get("発送方法") or "")
+
+
+def _supplier(p: Dict[str, Any], seq: int) -> str:
+    return str(p.get("supplier_code") or p.get("仕入先") or p.get("supplier") or "")
+
+
+def _constant(text: str) -> TokenFunc:
+    return lambda p, seq: text
+
+
+class _SeqFormatter:
+    """{seq:N} の評価関数（テンプレートが連番を使うかの判定にも使う）"""
+    __slots__ = ("width",)
+
+    def __init__(self, width: int):
+        self.width = width
+
+    def __call__(self, p: Dict[str, Any], seq: int) -> str:
+        return str(seq).zfill(self.width)
+
+
+# トークン種別: ("text", 文字列) / ("date", strftime書式) / ("func", 評価関数)
+TokenStep = Tuple[str, Any]
+
+
+def _compile_token(token: str) -> TokenStep:
+    """テンプレートの {token} 1つを評価手順にする（判定順は従来の _resolve_token と同じ）。"""
+    # {date[:FMT]}
+    if token.startswith("date"):
+        parts = token.split(":")
+        fmt = parts[1] if len(parts) > 1 else "YYYYMMDD"
+        return ("date", fmt.replace("YYYY", "%Y").replace("MM", "%m").replace("DD", "%d"))
+    # {ASIN|JAN} or {asin}/{jan}
+    if token in ("ASIN|JAN", "ASIN_JAN"):
+        return ("func", _asin_jan)
+    if token.lower() == "asin":
+        return ("func", _asin)
+    if token.lower() == "jan":
+        return ("func", _jan)
+    # {condNum} / {condCode}
+    if token == "condNum":
+        return ("func", _cond_num)
+    if token == "condCode":
+        return ("func", _cond_code)
+    # {rule369} - コメント列から 3P/3N/6P/6N/9P/9N を判定
+    if token == "rule369":
+        return ("func", _rule369)
+    # {purchasePrice} / {price} - 仕入れ価格
+    if token in ("purchasePrice", "price", "purchase_price"):
+        return ("func", _purchase_price)
+    if token == "ship":
+        return ("func", _ship)
+    if token == "supplier":
+        return ("func", _supplier)
+    # {seq[:digits][:scope]}
+    if token.startswith("seq"):
+        parts = token.split(":")
+        width = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 3
+        return ("func", _SeqFormatter(width))
+    # {custom:XXX} / {text:XXX}
+    if token.startswith("custom:") or token.startswith("text:"):
+        return ("text", token.split(":", 1)[1])
+    return ("text", "")
+
+
+def parse_sku_date(sku_date: Optional[str]) -> Optional[datetime]:
+    """UIから指定されたSKU日付（"YYYYMMDD" を優先し、"YYYY-MM-DD" / "YYYY/MM/DD" も可）。解釈できなければ None"""
+    if not sku_date:
+        return None
+    for fmt in ("%Y%m%d", "%Y-%m-%d", "%Y/%m/%d"):
         try:
-            s = "" if comment is None else str(comment).strip().lower()
+            return datetime.strptime(sku_date, fmt)
         except Exception:
-            s = ""
-
-        if not s:
-            return "6P"
-
-        # 先頭トークン（数字・pnコード）だけを見る
-        # 例: "3", "4", "3n", "6p", "9n", "10", "3n-テスト" など
-        m = re.match(r"^(3n|3p|6n|6p|9n|9p|10|3|4|6|7|9)\b", s)
-        if not m:
-            return "6P"
-
-        code = m.group(1)
-
-        if code in ("3", "3p"):
-            return "3P"
-        if code in ("4", "3n"):
-            return "3N"
-        if code in ("6", "6p"):
-            return "6P"
-        if code in ("7", "6n"):
-            return "6N"
-        if code in ("9", "9p"):
-            return "9P"
-        if code in ("10", "9n"):
-            return "9N"
-
-        # 想定外はすべて 6P 扱い
-        return "6P"
+            continue
+    return None
 
-    def render_sku(self, product: Dict[str, Any], seq_offset: int = 0) -> str:
-        # 連番（スコープdayのみサポート。seqStart + offset）
-        base = int(self.seq_start)
-        seq_value = base + seq_offset
 
-        # {ASIN|JAN} の短縮表記に対応: {ASIN|JAN} or {asin} {jan}
-        tpl = self.template.replace("{ASIN|JAN}", "{ASIN|JAN}")
+class CompiledSkuTemplate:
+    """コンパイル済みのSKUテンプレート（トークン列）。"""
 
-        tokens = re.findall(r"\{([^{}]+)\}", tpl)
-        out_parts = []
+    def __init__(self, template: str):
+        self.template = template
+        self.steps: List[TokenStep] = []
         last_idx = 0
-        for m in re.finditer(r"\{([^{}]+)\}", tpl):
-            out_parts.append(tpl[last_idx:m.start()])
-            token_inner = m.group(1)
-            out = self._resolve_token(token_inner, product, seq_value)
-            if out:
-                out_parts.append(out)
+        for m in _TOKEN_PATTERN.finditer(template):
+            self.steps.append(("text", template[last_idx:m.start()]))
+            self.steps.append(_compile_token(m.group(1)))
             last_idx = m.end()
-        out_parts.append(tpl[last_idx:])
+        self.steps.append(("text", template[last_idx:]))
+        self.uses_seq = any(isinstance(value, _SeqFormatter) for _, value in self.steps)
+
+    def bind(self, base_date: datetime) -> List[TokenFunc]:
+        """日付を base_date で書式化し、隣り合う固定文字列をまとめた評価関数の列を返す。"""
+        funcs: List[TokenFunc] = []
+        pending_text: List[str] = []
+        for kind, value in self.steps:
+            if kind == "text":
+                pending_text.append(value)
+            elif kind == "date":
+                pending_text.append(base_date.strftime(value))
+            else:
+                if any(pending_text):
+                    funcs.append(_constant("".join(pending_text)))
+                pending_text = []
+                funcs.append(value)
+        if any(pending_text):
+            funcs.append(_constant("".join(pending_text)))
+        return funcs
+
+    def render_many(
+        self,
+        products: List[Dict[str, Any]],
+        seq_start: int = 1,
+        base_date: Optional[datetime] = None,
+        seqs: Optional[List[int]] = None,
+    ) -> List[str]:
+        """
+        products の SKU を順に生成する（連番は seqs[添字]、未指定なら seq_start + 添字）。
+        1件の生成に失敗した場合、その商品の SKU は空文字にする。
+        """
+        funcs = self.bind(base_date or datetime.now(_JST))
+        skus: List[str] = []
+        append = skus.append
+        for idx, product in enumerate(products):
+            seq = seqs[idx] if seqs is not None else seq_start + idx
+            try:
+                append(sanitize_sku("".join([f(product, seq) for f in funcs])))
+            except Exception:
+                append("")
+        return skus
+
+
+@lru_cache(maxsize=64)
+def compile_sku_template(template: str) -> CompiledSkuTemplate:
+    """テンプレート文字列をコンパイルする（同じ文字列はキャッシュを返す）。"""
+    return CompiledSkuTemplate(template)
+
+
+def find_duplicate_skus(skus: List[str]) -> Dict[str, List[int]]:
+    """同じ SKU が複数回現れたものを {SKU: 添字のリスト}（出現順）で返す。空の SKU は対象外"""
+    positions: Dict[str, List[int]] = {}
+    for idx, sku in enumerate(skus):
+        if sku:
+            positions.setdefault(sku, []).append(idx)
+    return {sku: idxs for sku, idxs in positions.items() if len(idxs) > 1}
+
+
+class SkuSettings(NamedTuple):
+    settings: Dict[str, Any]
+    template: CompiledSkuTemplate
+
+
+_settings_cache: Dict[str, Tuple[Tuple[int, int], SkuSettings]] = {}
+_settings_lock = threading.Lock()
+
+
+def _settings_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
 
-        sku_raw = "".join(out_parts)
-        return self._sanitize(sku_raw)
 
+def load_sku_settings(path: Optional[Path] = None) -> SkuSettings:
+    """
+    SKU設定とコンパイル済みテンプレートを返す（ファイルが無い・読めない場合は初期値）。
+    ファイルの mtime・サイズが前回と同じならキャッシュを返す。
+    """
+    path = Path(path or INVENTORY_SETTINGS_PATH)
+    stamp = _settings_stamp(path)
+    key = str(path)
+    with _settings_lock:
+        cached = _settings_cache.get(key)
+        if stamp is not None and cached is not None and cached[0] == stamp:
+            return cached[1]
 
+    settings = DEFAULT_SKU_SETTINGS
+    if stamp is not None:
+        try:
+            settings = json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"[WARNING] SKU設定ファイルを読み込めないため初期値を使います ({path}): {str(e)}")
+    loaded = SkuSettings(settings, compile_sku_template(settings.get("skuTemplate", DEFAULT_SKU_TEMPLATE)))
+    if stamp is not None:
+        with _settings_lock:
+            _settings_cache[key] = (stamp, loaded)
+    return loaded
 
 
+def invalidate_sku_settings() -> None:
+    """SKU設定のキャッシュを破棄する（設定ファイル書き込み後に呼ぶ）。"""
+    with _settings_lock:
+        _settings_cache.clear()
 
 
+class SKUTemplateRenderer:
+    def __init__(self, settings: Dict[str, Any], sku_date: Optional[str] = None):
+        self.settings = settings or {}
+        self.template: str = self.settings.get("skuTemplate", DEFAULT_SKU_TEMPLATE)
+        self.seq_scope: str = self.settings.get("seqScope", "day")
+        self.seq_start: int = int(self.settings.get("seqStart", 1))
+        self.compiled = compile_sku_template(self.template)
 
+        # SKU日付の上書き指定（UIからの任意日付指定用）
+        self._override_date: Optional[datetime] = parse_sku_date(sku_date)
 
+    def _base_date(self) -> datetime:
+        return self._override_date or datetime.now(_JST)
 
+    def _today(self) -> str:
+        return self._base_date().strftime("%Y%m%d")
 
+    def _get_rule369_code(self, comment: Any) -> str:
+        return rule369_code(comment)
+
+    def seq_scope_key(self, product: Dict[str, Any]) -> str:
+        """採番のスコープキー（seqScope=day_supplier なら日付＋仕入先、それ以外は日付）"""
+        if self.seq_scope == "day_supplier":
+            try:
+                supplier = _supplier(product, 0)
+            except Exception:
+                supplier = ""
+            return f"day_supplier:{self._today()}:{supplier}"
+        return f"day:{self._today()}"
+
+    def allocate_seqs(self, products: List[Dict[str, Any]], allocator: "SkuSequenceAllocator") -> List[int]:
+        """スコープごとに必要な件数をまとめて確保し、商品の順に連番を割り当てる。"""
+        keys = [self.seq_scope_key(p) for p in products]
+        counts: Dict[str, int] = {}
+        for key in keys:
+            counts[key] = counts.get(key, 0) + 1
+        next_seq = allocator.reserve_many(counts, start=self.seq_start)
+        seqs = []
+        for key in keys:
+            seqs.append(next_seq[key])
+            next_seq[key] += 1
+        return seqs
+
+    def render_many(
+        self,
+        products: List[Dict[str, Any]],
+        allocator: Optional["SkuSequenceAllocator"] = None,
+    ) -> List[str]:
+        """
+        products の SKU を一括生成する。
+        allocator を渡すとスコープごとに未使用の連番範囲を確保して振る（テンプレートが連番を使う場合のみ）。
+        渡さない場合は seqStart から商品の順に振る。
+        """
+        seqs = self.allocate_seqs(products, allocator) if allocator is not None and self.compiled.uses_seq else None
+        return self.compiled.render_many(products, seq_start=self.seq_start, base_date=self._base_date(), seqs=seqs)
+
+    def render_sku(self, product: Dict[str, Any], seq_offset: int = 0) -> str:
+        # 連番（スコープdayのみサポート。seqStart + offset）
+        funcs = self.compiled.bind(self._base_date())
+        seq_value = int(self.seq_start) + seq_offset
+        return sanitize_sku("".join([f(product, seq_value) for f in funcs]))
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""テスト共通のフィクスチャ。"""
+from __future__ import annotations
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from repricer_cases import build_case, write_config  # noqa: E402
+from services import repricer_config, repricer_weekly  # noqa: E402
+from services.repricer_weekly import preprocess_dataframe  # noqa: E402
+
+
+@pytest.fixture
+def case(tmp_path, monkeypatch):
+    """seed から在庫・仕入DB・設定ファイルを作り、価格改定がそれらを読むようにする。"""
+    def build(seed: int):
+        rng = random.Random(seed)
+        df, db_path = build_case(rng, tmp_path, rows=300)
+        config_path = tmp_path / "reprice_rules.json"
+        write_config(config_path, rng)
+        monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: db_path)
+        monkeypatch.setattr(repricer_weekly, "CONFIG_PATH", config_path)
+        monkeypatch.setattr(repricer_config, "CONFIG_PATH", config_path)
+        repricer_config.invalidate_compiled_config()
+        return preprocess_dataframe(df), db_path, config_path
+
+    yield build
+    repricer_config.invalidate_compiled_config()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""価格改定テストで共有するデータ生成・比較ヘルパー（テストモジュールではない）。"""
+from __future__ import annotations
+
+import json
+import math
+import random
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+TODAY = datetime(2025, 12, 1)
+
+ACTIONS = [
+    "maintain", "priceTrace", "priceTrace", "priceTrace", "tp_down", "tp_down", "price_down_1", "price_down_2", "price_down_3",
+    "price_down_4", "price_down_ignore", "profit_ignore_down", "exclude",
+]
+TP_TARGETS = ["tp0", "tp0_follow", "tp0_follow", "tp0_maintain", "tp1", "tp2", "tp3", None]
+LADDER_ACTIONS = ["maintain", "instant_reprice", "priceTrace", "tp_down", "price_down_2", "exclude", "price_down_ignore"]
+
+
+def random_rules(rng: random.Random) -> list:
+    rules = []
+    for days_from in (30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330, 360, 999):
+        rule = {
+            "days_from": days_from,
+            "action": rng.choice(ACTIONS),
+            "value": rng.choice([0, 1, 2.0, 4, None]),
+            "akaji_drop_percent": rng.choice([1, 3, 5, 10, 0, 15]),
+            "takane_rise_percent": rng.choice([0, 1, 5, 12]),
+        }
+        tp_target = rng.choice(TP_TARGETS)
+        if tp_target is not None:
+            rule["tp_target"] = tp_target
+        rules.append(rule)
+    rng.shuffle(rules)
+    return rules
+
+
+def random_config(rng: random.Random) -> dict:
+    config = {
+        "excluded_skus": ["20250101-6-EXCL"],
+        "rule_profiles": {
+            p: {
+                "tp_rates": {"tp0": rng.choice([95, 90.0]), "tp1": 70, "tp2": 55.5, "tp3": rng.choice([0, 5])},
+                "reprice_rules": random_rules(rng),
+            }
+            for p in ("3", "6", "9")
+        },
+        "exception_reprice_rules": rng.choice([[], random_rules(rng)]),
+        "default_profile": rng.choice(["6", "3"]),
+        "interval_days": rng.choice([7, 3]),
+        "alerts": {"enabled": rng.choice([True, False]), "reason_prefix": "ALERT"},
+        "tp0_floor_guard": rng.choice([True, False]),
+    }
+    if rng.random() < 0.7:
+        config["tp0_gradual_follow"] = rng.choice([True, False])
+    return config
+
+
+def random_sku(rng: random.Random, i: int) -> str:
+    y, m, d = 2025, rng.randint(1, 12), rng.randint(1, 28)
+    if rng.random() < 0.1:
+        y = rng.choice([2023, 2024])
+    tag = rng.choice(["3", "6", "9", "3P", "6N", "9P", "X", ""])
+    form = rng.randrange(8)
+    if form == 0:
+        sku = f"{y}_{m:02d}_{d:02d}-{tag}-{i}"
+    elif form == 1:
+        sku = f"{y}{m:02d}{d:02d}-{tag}-{i}"
+    elif form == 2:
+        sku = f"{y}{m:02d}{d:02d}B{tag}{i}"
+    elif form == 3:
+        sku = f"hmk-{y}{m:02d}{d:02d}-{tag}{i}"
+    elif form == 4:
+        sku = f"pr_{tag}_{y}{m:02d}{d:02d}_{i}"
+    elif form == 5:
+        sku = f"{y % 100:02d}{m:02d}{d:02d}-{tag}-{i}"
+    elif form == 6:
+        sku = f"nodate-{tag}-{i}"
+    else:
+        sku = f"{y}{13:02d}{d:02d}-{tag}-{i}"
+    if rng.random() < 0.2:
+        sku = f'="{sku}"'
+    return sku
+
+
+def build_case(rng: random.Random, tmp_path: Path, rows: int = 400):
+    skus = [random_sku(rng, i) for i in range(rows)]
+    skus[0] = "20250101-6-EXCL"
+    data = []
+    for sku in skus:
+        price = rng.choice([0, 500, 1200, 3980, 9999, rng.randint(100, 20000)])
+        data.append({
+            "SKU": sku,
+            "ASIN": f"B0{rng.randint(10**7, 10**8 - 1)}",
+            "title": rng.choice(["商品A", "商品B　テスト", ""]),
+            "number": "1",
+            "price": str(price),
+            "cost": rng.choice(["", str(rng.randint(100, 5000))]),
+            "akaji": rng.choice(["0", "", str(rng.randint(50, 15000))]),
+            "takane": "0",
+            "priceTrace": rng.choice(["0", "1", "3", ""]),
+            "amazon-fee": rng.choice(["", "300"]),
+            "shipping-price": rng.choice(["", "0", "120"]),
+            "profit": rng.choice(["", "0", "250"]),
+            "keepa_min_same_condition": rng.choice([None, "", "abc", str(rng.randint(100, 15000)), str(rng.randint(10, 800))]),
+            "価格改定": rng.choice([None, "", "1", None, "", "1", None, "", "1", "OFF", "無効"]),
+        })
+    df = pd.DataFrame(data)
+
+    db_path = tmp_path / "hirio.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE purchases (sku TEXT UNIQUE NOT NULL, tp0 TEXT, tp1 TEXT, tp2 TEXT, tp3 TEXT,"
+        " repricing_enabled TEXT, ladder_enabled TEXT, ladder_rules TEXT)"
+    )
+    for sku in skus:
+        if rng.random() < 0.25:
+            continue
+        key = sku[2:-1] if sku.startswith('="') else sku
+        tp = [rng.choice([None, "", "0", str(rng.randint(100, 12000)), str(rng.randint(100, 3000))]) for _ in range(4)]
+        ladder_rules = None
+        ladder_enabled = None
+        if rng.random() < 0.15:
+            ladder_enabled = rng.choice(["1", "0", "true"])
+            ladder_rules = json.dumps([
+                {
+                    "days_from": days_from,
+                    "action": rng.choice(LADDER_ACTIONS),
+                    "value": rng.choice([0, 1]),
+                    "target_price": rng.choice([None, "", 0, rng.randint(100, 9000)]),
+                    "akaji_drop_percent": rng.choice([1, 5]),
+                    "takane_rise_percent": rng.choice([0, 2]),
+                }
+                for days_from in (30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330, 360, 999)
+            ])
+        conn.execute(
+            "INSERT INTO purchases VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, *tp, rng.choice([None, "1", "1", "1", "1", "1", "0", "off"]), ladder_enabled, ladder_rules),
+        )
+    conn.commit()
+    conn.close()
+    return df, db_path
+
+
+def normalize_items(items):
+    def norm(v):
+        if isinstance(v, float) and math.isnan(v):
+            return "<nan>"
+        return v
+
+    return [{k: norm(v) for k, v in item.items()} for item in items]
+
+
+def assert_same_outputs(expected, actual):
+    pd.testing.assert_frame_equal(actual.log_df, expected.log_df)
+    pd.testing.assert_frame_equal(actual.updated_df, expected.updated_df)
+    pd.testing.assert_frame_equal(actual.excluded_df, expected.excluded_df)
+    assert normalize_items(actual.items) == normalize_items(expected.items)
+
+
+STANDARD_ACTIONS = ["maintain", "priceTrace", "price_down_1", "price_down_2", "price_down_ignore", "exclude"]
+
+
+def write_config(path: Path, rng: random.Random) -> None:
+    config = random_config(rng)
+    config["reprice_rules"] = [
+        {"days_from": days_from, "action": rng.choice(STANDARD_ACTIONS), "value": rng.choice([0, 1, 3])}
+        for days_from in (30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330, 360)
+    ]
+    path.write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+
+
+# 価格改定 API・ジョブのテストで送る在庫 CSV
+HEADER = "SKU,ASIN,title,number,price,cost,akaji,takane,condition,conditionNote,priceTrace\n"
+ROWS = [
+    f"2025{month:02d}01-{profile}-{i:03d},B{i:09d},商品{i},1,{3000 + i * 10},1000,0,0,1,,{i % 2}\n"
+    for i, (month, profile) in enumerate(
+        [(1, 3), (3, 6), (5, 9), (7, 3), (9, 6), (10, 9), (11, 3)], start=1
+    )
+]
+CSV_BYTES = (HEADER + "".join(ROWS)).encode("utf-8")
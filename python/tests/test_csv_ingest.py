@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""CSV 取り込み（エンコーディング判定・1回解析・読み飛ばし行の報告）のテスト。"""
+from __future__ import annotations
+
+import codecs
+import sys
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core import csv_utils  # noqa: E402
+from core.csv_utils import (  # noqa: E402
+    CSV_FALLBACK_ENCODINGS,
+    detect_csv_encoding,
+    ingest_csv_bytes,
+    iter_csv_chunks,
+    read_csv_with_fallback,
+    sniff_csv_encoding,
+)
+from routers import csv as csv_router  # noqa: E402
+
+CSV_TEXT = "SKU,title,price\n20250901-3-001,ポケモンカード ＢＯＸ,5000\n20250901-3-002,限定版,3000\n"
+
+
+def _legacy_read_csv(content: bytes) -> pd.DataFrame:
+    """従来の読込（エンコーディングごとに全体を解析し直す）。"""
+    for encoding in CSV_FALLBACK_ENCODINGS:
+        try:
+            return pd.read_csv(BytesIO(content), encoding=encoding, dtype=str, on_bad_lines='skip')
+        except (UnicodeDecodeError, pd.errors.ParserError):
+            continue
+    raise AssertionError("unreachable")
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        (CSV_TEXT.encode("cp932"), ("cp932", False)),
+        ("SKU,title\n1,商品名テスト\n".encode("utf-8"), ("utf-8", False)),
+        (codecs.BOM_UTF8 + CSV_TEXT.encode("utf-8"), ("utf-8", True)),
+        ("SKU,title\n1,caf\xe9 \x81\n".encode("latin1"), ("latin1", False)),
+    ],
+)
+def test_sniff_csv_encoding(content, expected):
+    assert sniff_csv_encoding(content) == expected
+
+
+def test_sniff_ignores_multibyte_char_cut_at_sample_end():
+    content = ("a" * 9 + "ポケモン").encode("cp932")
+    assert sniff_csv_encoding(content, sample_size=10) == ("cp932", False)
+
+
+@pytest.mark.parametrize("encoding", ["cp932", "utf-8"])
+def test_ingest_matches_legacy_reader(encoding):
+    content = CSV_TEXT.encode(encoding)
+    result = ingest_csv_bytes(content)
+    assert result.encoding == encoding
+    assert result.bad_lines == []
+    pd.testing.assert_frame_equal(result.df, _legacy_read_csv(content))
+
+
+def test_ingest_strips_utf8_bom():
+    result = ingest_csv_bytes(codecs.BOM_UTF8 + CSV_TEXT.encode("utf-8"))
+    assert result.bom is True
+    assert list(result.df.columns) == ["SKU", "title", "price"]
+    assert result.df["title"].tolist() == ["ポケモンカード ＢＯＸ", "限定版"]
+
+
+def test_ingest_falls_back_when_decode_fails_after_sample():
+    # 先頭サンプルは ASCII のみ（cp932 と判定）、サンプル以降に cp932 で読めない UTF-8 がある
+    header = "SKU,title\n" + "".join(f"{i},item\n" for i in range(csv_utils.CSV_SNIFF_BYTES // 6))
+    content = (header + "9999,価格改定\n").encode("utf-8")
+    assert sniff_csv_encoding(content) == ("cp932", False)
+
+    result = ingest_csv_bytes(content)
+    assert result.encoding == "utf-8"
+    assert result.df["title"].iloc[-1] == "価格改定"
+    pd.testing.assert_frame_equal(result.df, _legacy_read_csv(content))
+
+
+def test_ingest_reports_bad_lines():
+    content = "SKU,price\n001,100\n002,200,extra\n003,300\n004,400,x,y\n".encode("cp932")
+    result = ingest_csv_bytes(content)
+    assert result.df["SKU"].tolist() == ["001", "003"]
+    assert [(b.line, b.expected_fields, b.actual_fields) for b in result.bad_lines] == [(3, 2, 3), (5, 2, 4)]
+    pd.testing.assert_frame_equal(read_csv_with_fallback(content), result.df)
+
+
+def test_ingest_raises_http_400_when_no_encoding_parses(monkeypatch):
+    monkeypatch.setattr(csv_utils, "CSV_FALLBACK_ENCODINGS", ["utf-8"])
+    with pytest.raises(HTTPException) as exc_info:
+        ingest_csv_bytes("SKU\n価格\n".encode("cp932"))
+    assert exc_info.value.status_code == 400
+
+
+
+class _CountingReader(BytesIO):
+    """読んだバイト数を数える BytesIO。"""
+
+    def __init__(self, content: bytes):
+        super().__init__(content)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def test_detect_reads_only_the_sniff_sample():
+    content = CSV_TEXT.encode("cp932") * (csv_utils.CSV_SNIFF_BYTES // 50)
+    source = _CountingReader(content)
+    assert detect_csv_encoding(source) == ("cp932", False)
+    assert source.bytes_read <= csv_utils.CSV_SNIFF_BYTES + 1
+    assert source.tell() == 0
+
+
+def test_iter_csv_chunks_matches_ingest():
+    content = codecs.BOM_UTF8 + CSV_TEXT.encode("utf-8")
+    chunks = list(iter_csv_chunks(BytesIO(content), chunk_size=1))
+    assert [len(c) for c in chunks] == [1, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), ingest_csv_bytes(content).df)
+
+
+def test_iter_csv_chunks_retries_when_decode_fails_before_first_chunk():
+    header = "SKU,title\n" + "".join(f"{i},item\n" for i in range(csv_utils.CSV_SNIFF_BYTES // 6))
+    content = (header + "9999,価格改定\n").encode("utf-8")
+    chunks = list(iter_csv_chunks(BytesIO(content), chunk_size=10 ** 6))
+    assert chunks[-1]["title"].iloc[-1] == "価格改定"
+
+
+def test_ingest_uses_c_engine_when_pyarrow_parse_fails(monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("pyarrow failure")
+
+    monkeypatch.setattr(csv_utils, "_HAS_PYARROW", True)
+    monkeypatch.setattr(csv_utils, "_parse_csv_pyarrow", broken)
+    result = ingest_csv_bytes(CSV_TEXT.encode("cp932"))
+    assert result.engine == "c"
+    assert result.df["title"].tolist() == ["ポケモンカード ＢＯＸ", "限定版"]
+
+
+def test_parse_csv_pyarrow_reports_bad_lines_and_arrow_strings():
+    pytest.importorskip("pyarrow")
+    content = "SKU,price\n001,100\n002,200,extra\n003,300\n".encode("cp932")
+    df, bad_lines = csv_utils._parse_csv_pyarrow(content, "cp932", arrow_strings=False)
+    assert df["SKU"].tolist() == ["001", "003"]
+    assert [(b.expected_fields, b.actual_fields) for b in bad_lines] == [(2, 3)]
+    assert df["price"].dtype == object
+
+    df, _ = csv_utils._parse_csv_pyarrow(CSV_TEXT.encode("utf-8"), "utf-8", arrow_strings=True)
+    assert df["title"].tolist() == ["ポケモンカード ＢＯＸ", "限定版"]
+    assert isinstance(df["title"].dtype, pd.StringDtype)
+
+
+@pytest.mark.parametrize("use_pyarrow", [False, True])
+def test_ingest_keeps_leading_zeros_and_blank_cells(monkeypatch, use_pyarrow):
+    if use_pyarrow:
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(csv_utils, "_HAS_PYARROW", use_pyarrow)
+    content = "SKU,JAN,price\n0012,4901234567890,100\n0034,,\n".encode("cp932")
+
+    result = ingest_csv_bytes(content)
+
+    assert result.engine == ("pyarrow" if use_pyarrow else "c")
+    assert result.df["SKU"].tolist() == ["0012", "0034"]
+    assert result.df["JAN"].iloc[0] == "4901234567890"
+    assert pd.isna(result.df["JAN"].iloc[1]) and pd.isna(result.df["price"].iloc[1])
+    pd.testing.assert_frame_equal(result.df, _legacy_read_csv(content))
+
+
+@pytest.mark.parametrize("use_pyarrow", [False, True])
+def test_ingest_keeps_short_rows_and_pandas_null_tokens(monkeypatch, use_pyarrow):
+    if use_pyarrow:
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(csv_utils, "_HAS_PYARROW", use_pyarrow)
+    content = (
+        "SKU,ASIN,title,price,akaji\n"
+        "20250101-3-1,B0001,x,1000,500\n"
+        "20250101-3-2,B0002,y,2000\n"
+        "20250101-3-3,None,<NA>,NA,n/a\n"
+    ).encode("cp932")
+
+    result = ingest_csv_bytes(content)
+
+    assert result.df["SKU"].tolist() == ["20250101-3-1", "20250101-3-2", "20250101-3-3"]
+    assert pd.isna(result.df.loc[1, "akaji"])
+    assert result.df.iloc[2, 1:].isna().all()
+    assert result.bad_lines == []
+    pd.testing.assert_frame_equal(result.df, _legacy_read_csv(content))
+
+
+def test_pyarrow_null_values_match_pandas_defaults():
+    parsers = pytest.importorskip("pandas._libs.parsers")
+    assert set(csv_utils._PANDAS_NA_VALUES) == parsers.STR_NA_VALUES
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 1000])
+def test_iter_csv_chunks_matches_ingest_with_bad_rows_at_chunk_edges(chunk_size):
+    content = (
+        'SKU,title,price\n1,a,100\n2,b\n3,c,300,extra\n\n4,"two\nlines",400\n'
+        "5,None,NA\n6,f,600,x,y\n7,g,700\n"
+    ).encode("cp932")
+    chunks = list(iter_csv_chunks(BytesIO(content), chunk_size=chunk_size))
+    expected = ingest_csv_bytes(content).df
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+    assert expected["SKU"].tolist() == ["1", "2", "4", "5", "7"]
+
+
+def test_parse_csv_pyarrow_counts_physical_lines_for_bad_lines():
+    pytest.importorskip("pyarrow")
+    content = 'SKU,title\n001,a\n\n002,"two\nlines"\n003,b,extra\n'.encode("utf-8")
+    df, bad_lines = csv_utils._parse_csv_pyarrow(content, "utf-8", arrow_strings=False)
+    assert df["SKU"].tolist() == ["001", "002"]
+    assert bad_lines == [csv_utils.CsvBadLine(6, 2, 3, "003,b,extra")]
+
+
+def test_inspect_endpoint_reports_encoding_and_bad_lines():
+    app = FastAPI()
+    app.include_router(csv_router.router)
+    content = "SKU,price\n001,100\n002,200,extra\n".encode("cp932")
+
+    response = TestClient(app).post("/csv/inspect", files={"file": ("inventory.csv", content, "text/csv")})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["columns"] == ["SKU", "price"]
+    assert body["rows"] == 1
+    assert body["encoding"] == "cp932"
+    assert body["bom"] is False
+    assert body["bad_lines"][0]["line"] == 3
+    assert body["bad_lines"][0]["actual_fields"] == 3
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""cp932 正規化（置換表・ユニーク値キャッシュ）と従来のセル単位実装の一致テスト。"""
+from __future__ import annotations
+
+import itertools
+import random
+import re
+import sys
+import unicodedata
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.csv_utils import (  # noqa: E402
+    normalize_dataframe_for_cp932,
+    normalize_string_for_cp932,
+    remove_excel_formula_prefix,
+)
+
+# 従来実装の置換 dict（定義順）。2番目のクォート行は ''' が三重引用符として解釈され、
+# 複数文字のキーになっていた（'ー' を含み、先に 'ー' が置換されるため一致することはない）
+_LEGACY_REPLACEMENTS = [
+    ('—', '-'), ('–', '-'), ('―', '-'), ('‐', '-'), ('−', '-'), ('ー', '-'),
+    (': "\'",  # 左シングルクォート\n        ', "'"), ('"', '"'), ('‛', "'"), ('‟', '"'),
+    ('′', "'"), ('″', '"'), ('…', '...'), ('⋯', '...'), ('～', '~'), ('∼', '~'), ('〜', '~'),
+    ('⁓', '~'), ('•', '*'), ('·', '*'), ('※', '*'), ('°', 'deg'), ('℃', 'C'), ('℉', 'F'),
+    ('×', 'x'), ('÷', '/'), ('±', '+/-'), ('≒', '='), ('≠', '!='), ('≦', '<='), ('≧', '>='),
+    ('∞', 'inf'), ('♪', '(music)'), ('♡', '(heart)'), ('★', '*'), ('☆', '*'), ('→', '->'),
+    ('←', '<-'), ('↑', '^'), ('↓', 'v'), ('【', '['), ('】', ']'), ('《', '<<'), ('》', '>>'),
+    ('〈', '<'), ('〉', '>'),
+]
+
+
+def _legacy_normalize(s):
+    if not isinstance(s, str):
+        return str(s) if s is not None else ""
+    s = unicodedata.normalize('NFKC', s)
+    for old, new in _LEGACY_REPLACEMENTS:
+        if old in s:
+            s = s.replace(old, new)
+    s = re.sub(r'[\r\n\t]', ' ', s)
+    try:
+        s.encode('cp932')
+    except UnicodeEncodeError:
+        chars = []
+        for char in s:
+            try:
+                char.encode('cp932')
+                chars.append(char)
+            except UnicodeEncodeError:
+                chars.append('?')
+        s = ''.join(chars)
+    return s
+
+
+def _legacy_remove_prefix(s):
+    if not isinstance(s, str):
+        return str(s) if s is not None else ""
+    s = re.sub(r'^="(.*)"$', r'\1', s)
+    s = re.sub(r'^="', '', s)
+    s = re.sub(r'"$', '', s)
+    return s
+
+
+def _legacy_normalize_dataframe(df):
+    df = df.fillna("")
+    for col in df.columns:
+        df[col] = df[col].apply(_legacy_remove_prefix)
+    for col in df.columns:
+        if col not in ['price', 'akaji', 'priceTrace', 'leadtime']:
+            df[col] = df[col].astype(str)
+        df[col] = df[col].apply(_legacy_normalize)
+    for col in ['price', 'akaji', 'priceTrace', 'leadtime']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+
+_ALPHABET = (
+    [old for old, _ in _LEGACY_REPLACEMENTS if len(old) == 1]
+    + list("abcXYZ019 =\"'\r\n\t,.-~")
+    + list("‘’“”ｱｶﾞＡＢ１２㈱①ⅱ＝＂（）　丁目髙﨑")
+    + ["🍣", "ß", "é", "゙", " ", "﻿", "ヴ"]
+)
+
+
+def _random_text(rng: random.Random) -> str:
+    text = "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, 12)))
+    wrap = rng.random()
+    if wrap < 0.2:
+        text = f'="{text}"'
+    elif wrap < 0.3:
+        text = f'="{text}'
+    elif wrap < 0.35:
+        text = f'{text}"\n'
+    return text
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_string_functions_match_legacy(seed):
+    rng = random.Random(seed)
+    for _ in range(3000):
+        text = _random_text(rng)
+        assert normalize_string_for_cp932(text) == _legacy_normalize(text)
+        assert remove_excel_formula_prefix(text) == _legacy_remove_prefix(text)
+    for value in (None, 12, 3.5, True):
+        assert normalize_string_for_cp932(value) == _legacy_normalize(value)
+        assert remove_excel_formula_prefix(value) == _legacy_remove_prefix(value)
+
+
+def test_excel_prefix_matches_legacy_exhaustively():
+    # =・"・改行の組み合わせ（改行を含む場合だけ正規表現の経路になる）
+    for length in range(7):
+        for chars in itertools.product('="a\n', repeat=length):
+            text = "".join(chars)
+            assert remove_excel_formula_prefix(text) == _legacy_remove_prefix(text), repr(text)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_dataframe_output_is_byte_identical(seed):
+    rng = random.Random(seed)
+    titles = [_random_text(rng) for _ in range(30)]
+    rows = 400
+    df = pd.DataFrame({
+        "SKU": [f'="2025{i:04d}-{rng.choice("369")}"' if i % 3 else f"SKU{i}" for i in range(rows)],
+        "title": [rng.choice(titles) for _ in range(rows)],
+        "price": [rng.choice(["1200", "", None, "=\"980\"", "abc"]) for _ in range(rows)],
+        "akaji": [rng.choice([100, 1.5, float("nan")]) for _ in range(rows)],
+        "number": [1] * rows,
+        "mixed": [rng.choice([1, 1.0, "1", True, None]) for _ in range(rows)],
+        "conditionNote": [rng.choice(titles + [None]) for _ in range(rows)],
+    })
+
+    expected = _legacy_normalize_dataframe(df.copy())
+    actual = normalize_dataframe_for_cp932(df.copy())
+    pd.testing.assert_frame_equal(actual, expected)
+    assert actual.to_csv(index=False).encode("cp932") == expected.to_csv(index=False).encode("cp932")
+
+
+def test_empty_frame_matches_legacy():
+    empty = pd.DataFrame({"SKU": pd.Series([], dtype=object), "price": pd.Series([], dtype=float)})
+    pd.testing.assert_frame_equal(normalize_dataframe_for_cp932(empty.copy()), _legacy_normalize_dataframe(empty.copy()))
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""バックグラウンドジョブ（種類ごとの同時実行数・キャンセル・TTL・/jobs API・async=true）のテスト。"""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from routers import inventory as inventory_router  # noqa: E402
+from routers import jobs as jobs_router  # noqa: E402
+from routers import repricer as repricer_router  # noqa: E402
+from services import job_queue as job_queue_module  # noqa: E402
+from services import repricer_config, repricer_jobs, repricer_weekly  # noqa: E402
+from services.job_queue import Job, JobQueue  # noqa: E402
+from services.repricer_artifacts import RepricerArtifactStore  # noqa: E402
+from services.repricer_result_cache import result_cache  # noqa: E402
+from services.route_matching_service import RouteMatchingService  # noqa: E402
+from repricer_cases import CSV_BYTES  # noqa: E402
+
+
+def _wait(predicate, timeout: float = 5.0) -> None:
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _blocking_work(release: threading.Event, started: list):
+    def work(job):
+        started.append(job.job_id)
+        while not release.wait(0.01):
+            job.check_cancelled()
+        return {"job": job.job_id}
+    return work
+
+
+def test_type_limit_queues_same_type_but_not_others():
+    queue = JobQueue(max_workers=3, type_limits={"slow": 1, "other": 2})
+    release, started = threading.Event(), []
+    first = queue.submit(Job("slow"), _blocking_work(release, started))
+    second = queue.submit(Job("slow"), _blocking_work(release, started))
+    other = queue.submit(Job("other"), _blocking_work(release, started))
+
+    _wait(lambda: first.status == "running" and other.status == "running")
+    assert second.status == "queued"
+
+    release.set()
+    _wait(lambda: all(job.status == "done" for job in (first, second, other)))
+    assert started.index(second.job_id) > started.index(first.job_id)
+    assert second.result == {"job": second.job_id}
+
+
+def test_worker_pool_bounds_total_concurrency():
+    queue = JobQueue(max_workers=1, default_type_limit=4)
+    release, started = threading.Event(), []
+    jobs = [queue.submit(Job(f"type{i}"), _blocking_work(release, started)) for i in range(3)]
+
+    _wait(lambda: jobs[0].status == "running")
+    assert [job.status for job in jobs[1:]] == ["queued", "queued"]
+    release.set()
+    _wait(lambda: all(job.status == "done" for job in jobs))
+    assert started == [job.job_id for job in jobs]
+
+
+def test_cancel_queued_and_running_jobs():
+    queue = JobQueue(max_workers=1)
+    release, started = threading.Event(), []
+    running = queue.submit(Job("a"), _blocking_work(release, started))
+    queued = queue.submit(Job("a"), _blocking_work(release, started))
+    _wait(lambda: running.status == "running")
+
+    assert queue.cancel(queued.job_id).status == "cancelled"
+    queue.cancel(running.job_id)
+    _wait(lambda: running.finished)
+
+    assert running.status == "cancelled"
+    assert started == [running.job_id]
+
+
+def test_finished_results_expire_after_ttl():
+    queue = JobQueue(result_ttl_sec=0.05)
+    job = queue.submit(Job("a"), lambda j: {"ok": True})
+    _wait(lambda: job.finished)
+    assert queue.get(job.job_id) is job
+    time.sleep(0.1)
+    assert queue.get(job.job_id) is None
+    assert queue.list_jobs() == []
+
+
+def test_matching_loop_checks_cancellation():
+    calls = []
+
+    def cancel_check():
+        calls.append(1)
+        if len(calls) == 2:
+            raise job_queue_module.JobCancelled()
+
+    with pytest.raises(job_queue_module.JobCancelled):
+        RouteMatchingService().match_store_code_by_time_and_profit(
+            [{"仕入れ日": "2025-01-01 10:00:00"}] * 5, [], cancel_check=cancel_check
+        )
+    assert len(calls) == 2
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    config_path = tmp_path / "reprice_rules.json"
+    config_path.write_text(json.dumps({"reprice_rules": [
+        {"days_from": 60, "action": "maintain", "value": 0},
+        {"days_from": 999, "action": "price_down_1", "value": 0},
+    ]}), encoding="utf-8")
+    monkeypatch.setattr(repricer_weekly, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_config, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: tmp_path / "hirio.db")
+    monkeypatch.setattr(repricer_router, "artifact_store", RepricerArtifactStore(tmp_path / "artifacts"))
+    queue = JobQueue()
+    for module in (job_queue_module, jobs_router, inventory_router):
+        monkeypatch.setattr(module, "job_queue", queue)
+    monkeypatch.setattr(repricer_router, "job_manager", repricer_jobs.RepricerJobManager(queue=queue))
+    repricer_config.invalidate_compiled_config()
+    result_cache.clear()
+    app = FastAPI()
+    for router in (repricer_router.router, inventory_router.router, jobs_router.router):
+        app.include_router(router)
+    yield TestClient(app)
+    result_cache.clear()
+    repricer_config.invalidate_compiled_config()
+
+
+def _wait_job(client, job_id: str) -> dict:
+    for _ in range(500):
+        snapshot = client.get(f"/jobs/{job_id}").json()
+        if snapshot["status"] in ("done", "error", "cancelled"):
+            return snapshot
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_async_preview_matches_sync_preview(client):
+    files = {"file": ("inventory.csv", CSV_BYTES, "text/csv")}
+    sync = client.post("/repricer/preview", files=files).json()
+    result_cache.clear()
+
+    accepted = client.post("/repricer/preview", params={"async": "true"}, files=files)
+    assert accepted.status_code == 202
+    body = accepted.json()
+    assert body["job_type"] == "repricer.preview"
+    assert _wait_job(client, body["job_id"])["status"] == "done"
+    assert client.get(body["result_url"]).json() == sync
+
+    listed = client.get("/jobs", params={"job_type": "repricer"}).json()["jobs"]
+    assert [job["job_id"] for job in listed] == [body["job_id"]]
+
+
+def test_async_listing_export_returns_csv(client):
+    payload = {"products": [{"sku": "S1", "asin": "B000000001", "title": "商品", "price": 1000}]}
+    sync = client.post("/api/inventory/export-listing-csv", json=payload)
+
+    accepted = client.post("/api/inventory/export-listing-csv", params={"async": "true"}, json=payload)
+    assert accepted.status_code == 202
+    job_id = accepted.json()["job_id"]
+    assert _wait_job(client, job_id)["status"] == "done"
+    result = client.get(f"/jobs/{job_id}/result")
+    assert result.headers["content-type"].startswith("text/csv")
+    assert result.content == sync.content
+
+
+def test_jobs_api_errors(client):
+    assert client.get("/jobs/unknown").status_code == 404
+    assert client.delete("/jobs/unknown").status_code == 404
+    accepted = client.post(
+        "/api/inventory/match-stores-from-data",
+        params={"async": "true"},
+        json={"purchase_data": [{"商品名": "x"}], "route_summary_id": 1},
+    ).json()
+    assert _wait_job(client, accepted["job_id"])["status"] == "error"
+    # 同期版と同じく入力エラーは 400
+    assert client.get(f"/jobs/{accepted['job_id']}/result").status_code == 400
+
+    failing = jobs_router.job_queue.submit(Job("test.fail"), lambda job: 1 / 0)
+    assert _wait_job(client, failing.job_id)["error_status"] == 500
+    assert client.get(f"/jobs/{failing.job_id}/result").status_code == 500
+
+
+def test_async_match_stores_keeps_missing_column_status(client):
+    files = {"file": ("purchase.csv", "SKU,商品名\nS1,商品\n".encode("utf-8"), "text/csv")}
+    data = {"route_summary_id": "1"}
+    sync = client.post("/api/inventory/match-stores", files=files, data=data)
+    assert sync.status_code == 400
+
+    accepted = client.post("/api/inventory/match-stores", params={"async": "true"}, files=files, data=data)
+    assert accepted.status_code == 202
+    job_id = accepted.json()["job_id"]
+    snapshot = _wait_job(client, job_id)
+    assert (snapshot["status"], snapshot["error_status"]) == ("error", 400)
+    result = client.get(f"/jobs/{job_id}/result")
+    assert result.status_code == 400
+    assert result.json()["detail"] == sync.json()["detail"]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""大きなレスポンス向け JSON 出力（FastJSONResponse・DataFrame の直接 JSON 化・gzip）のテスト。"""
+from __future__ import annotations
+
+import gzip
+import json
+import math
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app  # noqa: E402
+from core import json_response  # noqa: E402
+from core.json_response import JsonFragment, dataframe_records_json, dumps_json  # noqa: E402
+from routers import repricer as repricer_router  # noqa: E402
+from services import repricer_config, repricer_weekly  # noqa: E402
+from services.repricer_result_cache import result_cache  # noqa: E402
+from repricer_cases import TODAY, build_case, random_config  # noqa: E402
+
+
+def _legacy_items_json(items) -> bytes:
+    """従来の items（_clean_item_for_json → jsonable_encoder → JSONResponse）の JSON。"""
+    cleaned = [repricer_router._clean_item_for_json(item) for item in items]
+    return json.dumps(
+        jsonable_encoder(cleaned), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("mode", ["369", "standard"])
+def test_records_json_matches_legacy_items(seed, mode, tmp_path, monkeypatch, capsys):
+    rng = random.Random(seed)
+    df, db_path = build_case(rng, tmp_path, rows=300)
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: db_path)
+    config = {"reprice_rules": [], **random_config(rng)}
+    config_path = tmp_path / "reprice_rules.json"
+    config_path.write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+    monkeypatch.setattr(repricer_weekly, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_config, "CONFIG_PATH", config_path)
+    repricer_config.invalidate_compiled_config()
+    try:
+        outputs = repricer_weekly.apply_repricing_rules(
+            repricer_weekly.preprocess_dataframe(df), today=TODAY, mode=mode
+        )
+    finally:
+        repricer_config.invalidate_compiled_config()
+
+    assert dataframe_records_json(outputs.log_df, non_finite=0).data == _legacy_items_json(outputs.items)
+
+
+def test_records_json_handles_mixed_cells():
+    df = pd.DataFrame({
+        "f": [1.5, np.nan, np.inf, -0.0, 0.1 + 0.2],
+        "i": np.array([1, -2, 3, 4, 5], dtype=np.int64),
+        "b": [True, False, True, True, False],
+        "o": ["商品\n\"A\"", None, np.nan, {"x": float("nan"), "y": [1, float("inf")]}, 7],
+    })
+    fragment = dataframe_records_json(df, non_finite=0)
+    assert fragment.data == _legacy_items_json(df.to_dict(orient="records"))
+    assert dataframe_records_json(df.iloc[:0]).data == b"[]"
+
+
+@pytest.mark.parametrize("use_orjson", [True, False], ids=["orjson", "stdlib"])
+def test_dumps_json_maps_non_finite_and_embeds_fragments(use_orjson, monkeypatch):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    # orjson がある環境でも標準 json の経路を確認する
+    monkeypatch.setattr(json_response, "_HAS_ORJSON", use_orjson)
+    body = dumps_json({
+        "a": float("nan"),
+        "b": [np.int64(3), np.float64(2.5), float("-inf")],
+        "items": JsonFragment(b'[{"k":1}]'),
+        "text": "価格",
+    })
+    assert json.loads(body) == {"a": None, "b": [3, 2.5, None], "items": [{"k": 1}], "text": "価格"}
+
+
+def test_preview_is_unchanged_and_gzipped_on_request(tmp_path, monkeypatch, capsys):
+    rng = random.Random(5)
+    df, db_path = build_case(rng, tmp_path, rows=200)
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: db_path)
+    config_path = tmp_path / "reprice_rules.json"
+    config_path.write_text(json.dumps({"reprice_rules": [], **random_config(rng)}), encoding="utf-8")
+    monkeypatch.setattr(repricer_weekly, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_config, "CONFIG_PATH", config_path)
+    repricer_config.invalidate_compiled_config()
+    result_cache.clear()
+    csv_bytes = df.to_csv(index=False).encode("utf-8")
+    client = TestClient(create_app())
+    try:
+        plain = client.post(
+            "/repricer/preview", params={"mode": "369"},
+            files={"file": ("inventory.csv", csv_bytes, "text/csv")},
+            headers={"Accept-Encoding": "identity"},
+        )
+        compressed = client.post(
+            "/repricer/preview", params={"mode": "369"},
+            files={"file": ("inventory.csv", csv_bytes, "text/csv")},
+            headers={"Accept-Encoding": "gzip"},
+        )
+        outputs = result_cache.get(next(iter(result_cache._entries)))
+    finally:
+        result_cache.clear()
+        repricer_config.invalidate_compiled_config()
+
+    assert plain.status_code == 200
+    assert "content-encoding" not in plain.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.json() == plain.json()
+    assert len(gzip.compress(plain.content)) < len(plain.content)
+    assert plain.json()["items"] == json.loads(_legacy_items_json(outputs.items))
+    assert plain.json()["summary"]["log_rows"] == 200
+    assert not any(isinstance(v, float) and math.isnan(v) for item in plain.json()["items"] for v in item.values())
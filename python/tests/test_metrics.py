@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""API 計測（タイミングミドルウェア・処理段階・/metrics）のテスト。"""
+from __future__ import annotations
+
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app import create_app  # noqa: E402
+from core.metrics import (  # noqa: E402
+    HTTP_DURATION,
+    STAGE_DURATION,
+    Histogram,
+    MetricsRegistry,
+    metrics,
+    stage_span,
+)
+from services import repricer_config, repricer_weekly  # noqa: E402
+from services.repricer_result_cache import result_cache  # noqa: E402
+from repricer_cases import build_case, random_config  # noqa: E402
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    h = Histogram((1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0, 10.0):
+        h.observe(value)
+    assert h.counts == [1, 2, 1, 1]
+    assert h.quantile(0.2) == pytest.approx(1.0)
+    assert h.quantile(0.5) == pytest.approx(1.75)
+    assert h.quantile(1.0) == pytest.approx(10.0)
+    assert Histogram((1.0,)).quantile(0.5) is None
+
+
+def test_prometheus_text_has_cumulative_buckets_and_escaped_labels():
+    registry = MetricsRegistry()
+    registry.observe("x_seconds", 0.02, {"route": 'a"b'}, buckets=(0.01, 0.1))
+    registry.observe("x_seconds", 0.5, {"route": 'a"b'}, buckets=(0.01, 0.1))
+    registry.inc("x_total", {"status": "200"})
+    text = registry.render_prometheus()
+    assert '# TYPE x_seconds histogram' in text
+    assert 'x_seconds_bucket{route="a\\"b",le="0.01"} 0' in text
+    assert 'x_seconds_bucket{route="a\\"b",le="0.1"} 1' in text
+    assert 'x_seconds_bucket{route="a\\"b",le="+Inf"} 2' in text
+    assert 'x_seconds_count{route="a\\"b"} 2' in text
+    assert 'x_total{status="200"} 1' in text
+
+
+def test_stage_span_records_on_error_and_as_decorator():
+    registry = MetricsRegistry()
+    with pytest.raises(ValueError):
+        with stage_span("failing", registry):
+            raise ValueError()
+
+    @stage_span("decorated", registry)
+    def work():
+        return 1
+
+    assert work() == 1 and work() == 1
+    stages = {row["stage"]: row["count"] for row in registry.summary()["stages"]}
+    assert stages == {"failing": 1, "decorated": 2}
+
+
+def test_middleware_records_routes_sizes_and_stages(tmp_path, monkeypatch, capsys):
+    rng = random.Random(2)
+    df, db_path = build_case(rng, tmp_path, rows=50)
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: db_path)
+    config_path = tmp_path / "reprice_rules.json"
+    config_path.write_text(json.dumps({"reprice_rules": [], **random_config(rng)}), encoding="utf-8")
+    monkeypatch.setattr(repricer_weekly, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_config, "CONFIG_PATH", config_path)
+    repricer_config.invalidate_compiled_config()
+    result_cache.clear()
+    csv_bytes = df.to_csv(index=False).encode("utf-8")
+    client = TestClient(create_app())
+    metrics.reset()
+    try:
+        preview = client.post(
+            "/repricer/preview", params={"mode": "369"},
+            files={"file": ("inventory.csv", csv_bytes, "text/csv")},
+            headers={"Accept-Encoding": "identity"},
+        )
+        client.get("/health")
+        client.get("/no-such-path")
+        summary = client.get("/metrics/summary").json()
+        text = client.get("/metrics").text
+    finally:
+        result_cache.clear()
+        repricer_config.invalidate_compiled_config()
+        metrics.reset()
+
+    routes = {(r["method"], r["route"]): r for r in summary["routes"]}
+    row = routes[("POST", "/repricer/preview")]
+    assert row["count"] == 1 and row["statuses"] == {"200": 1}
+    assert row["request_bytes_avg"] > len(csv_bytes)
+    assert row["response_bytes_avg"] == len(preview.content)
+    assert routes[("GET", "<unmatched>")]["statuses"] == {"404": 1}
+
+    stages = {r["stage"] for r in summary["stages"]}
+    assert {"repricer.read_csv", "repricer.preprocess", "repricer.rules",
+            "repricer.config", "repricer.purchase_db", "repricer.serialize"} <= stages
+    assert f'{HTTP_DURATION}_count{{method="POST",route="/repricer/preview"}} 1' in text
+    assert f'{STAGE_DURATION}_bucket{{stage="repricer.rules",le="+Inf"}} 1' in text
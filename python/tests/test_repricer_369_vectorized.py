@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""3-6-9 改定の列指向エンジンと行ループ版の一致テスト。"""
+from __future__ import annotations
+
+import random
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import repricer_weekly  # noqa: E402
+from services.repricer_369_vectorized import (  # noqa: E402
+    apply_repricing_rules_369_vectorized,
+    reprice_rows_369_vectorized,
+)
+from repricer_cases import TODAY, assert_same_outputs, build_case, random_config  # noqa: E402
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_vectorized_matches_rowwise(seed, tmp_path, monkeypatch, capsys):
+    rng = random.Random(seed)
+    df, db_path = build_case(rng, tmp_path)
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: db_path)
+    config = random_config(rng)
+    df = repricer_weekly.preprocess_dataframe(df)
+
+    expected = repricer_weekly._apply_repricing_rules_369_rowwise(df.copy(), TODAY, config)
+    actual = apply_repricing_rules_369_vectorized(df.copy(), TODAY, config)
+    assert_same_outputs(expected, actual)
+    rows = reprice_rows_369_vectorized(df.copy(), TODAY, config)
+    assert_same_outputs(expected, repricer_weekly.outputs_from_rows(rows))
+
+
+def test_vectorized_matches_rowwise_without_optional_columns(tmp_path, monkeypatch, capsys):
+    rng = random.Random(99)
+    df, db_path = build_case(rng, tmp_path, rows=120)
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: db_path)
+    config = random_config(rng)
+    df = repricer_weekly.preprocess_dataframe(
+        df.drop(columns=["keepa_min_same_condition", "価格改定", "takane", "profit"])
+    )
+
+    expected = repricer_weekly._apply_repricing_rules_369_rowwise(df.copy(), TODAY, config)
+    actual = apply_repricing_rules_369_vectorized(df.copy(), TODAY, config)
+    assert_same_outputs(expected, actual)
+
+
+def test_vectorized_empty_frame(tmp_path, monkeypatch):
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: tmp_path / "missing.db")
+    empty = pd.DataFrame(columns=["SKU", "price"])
+    expected = repricer_weekly._apply_repricing_rules_369_rowwise(empty, TODAY, {})
+    actual = apply_repricing_rules_369_vectorized(empty, TODAY, {})
+    assert_same_outputs(expected, actual)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""価格改定の出力保管庫（内容ハッシュでの重複排除・保持ポリシー・run 単位のダウンロード）のテスト。"""
+from __future__ import annotations
+
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from routers import repricer as repricer_router  # noqa: E402
+from services.repricer_artifacts import RepricerArtifactStore, RetentionPolicy  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RepricerArtifactStore(tmp_path / "artifacts")
+
+
+def _objects(store: RepricerArtifactStore):
+    return sorted(p.name for p in (store.root / "objects").glob("*/*.csv"))
+
+
+def _set_created_at(store: RepricerArtifactStore, run_id: str, created_at: str) -> None:
+    conn = sqlite3.connect(str(store.root / "index.db"))
+    with conn:
+        conn.execute("UPDATE artifact_runs SET created_at = ? WHERE run_id = ?", (created_at, run_id))
+    conn.close()
+
+
+def test_identical_content_is_stored_once(store):
+    store.save_run("r1", "standard", {"updated": b"a,b\r\n", "log": b"log1"})
+    store.save_run("r2", "standard", {"updated": b"a,b\r\n", "log": b"log2"})
+
+    assert len(_objects(store)) == 3
+    first, second = store.get_run("r1"), store.get_run("r2")
+    assert first.files["updated"].path == second.files["updated"].path
+    assert first.files["log"].path.read_bytes() == b"log1"
+    assert second.files["log"].size == 4
+
+
+def test_keep_runs_prunes_oldest_and_unreferenced_files(store):
+    store.set_retention(RetentionPolicy(keep_runs=2, keep_days=None))
+    for i in range(4):
+        store.save_run(f"r{i}", "369", {"updated": b"shared", "log": f"log{i}".encode()})
+        _set_created_at(store, f"r{i}", f"2026-01-0{i + 1}T00:00:00")
+    store.save_run("r4", "369", {"updated": b"shared", "log": b"log4"})
+
+    assert [run.run_id for run in store.list_runs()] == ["r4", "r3"]
+    assert store.get_run("r0") is None
+    assert len(_objects(store)) == 3  # shared + log3 + log4
+
+
+def test_keep_days_prunes_old_runs(store):
+    store.save_run("old", "standard", {"log": b"old"})
+    _set_created_at(store, "old", "2000-01-01T00:00:00")
+    store.save_run("new", "standard", {"log": b"new"})
+
+    assert store.get_retention() == RetentionPolicy()
+    assert [run.run_id for run in store.list_runs()] == ["new"]
+    assert _objects(store) == [store.get_run("new").files["log"].path.name]
+
+
+def test_moves_staged_files_into_store(store, tmp_path):
+    staged = tmp_path / "report.csv"
+    staged.write_bytes(b"report")
+    store.save_run("r1", "standard", {"report": staged})
+
+    assert not staged.exists()
+    assert store.get_run("r1").files["report"].path.read_bytes() == b"report"
+
+
+def test_submitted_run_is_available_after_write(store):
+    release = threading.Event()
+
+    def render():
+        release.wait(5)
+        return {"updated": b"late"}
+
+    store.submit_run("pending", "standard", render, {"updated_rows": 1})
+    threading.Timer(0.05, release.set).start()
+    run = store.get_run("pending")
+    assert run.summary == {"updated_rows": 1}
+    assert run.files["updated"].path.read_bytes() == b"late"
+
+
+def test_submit_failure_is_logged(store, capsys):
+    def render():
+        raise RuntimeError("boom")
+
+    store.submit_run("broken", "standard", render)
+    store.flush(timeout=5)
+    assert store.get_run("broken") is None
+    assert "boom" in capsys.readouterr().out
+
+
+def test_run_endpoints(store, monkeypatch):
+    monkeypatch.setattr(repricer_router, "artifact_store", store)
+    app = FastAPI()
+    app.include_router(repricer_router.router)
+    client = TestClient(app)
+    store.save_run("r1", "369", {"updated": "SKU\r\n商品".encode("cp932")}, {"updated_rows": 1})
+
+    runs = client.get("/repricer/runs").json()["runs"]
+    assert [run["run_id"] for run in runs] == ["r1"]
+    detail = client.get("/repricer/runs/r1").json()
+    assert detail["download"]["updated"] == "/repricer/runs/r1/files/updated"
+
+    response = client.get("/repricer/runs/r1/files/updated")
+    assert response.status_code == 200
+    assert response.content == "SKU\r\n商品".encode("cp932")
+    assert "updated_r1.csv" in response.headers["content-disposition"]
+    assert client.get("/repricer/runs/r1/files/log").status_code == 404
+    assert client.get("/repricer/runs/missing").status_code == 404
+
+    assert client.get("/repricer/runs/retention").json() == {"keep_runs": 30, "keep_days": 30}
+    updated = client.put("/repricer/runs/retention", json={"keep_runs": 5, "keep_days": None})
+    assert updated.json() == {"keep_runs": 5, "keep_days": None}
+    assert store.get_retention() == RetentionPolicy(5, None)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""価格改定設定のコンパイル済み表と mtime キャッシュのテスト。"""
+from __future__ import annotations
+
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import repricer_config, repricer_weekly  # noqa: E402
+from services.repricer_config import (  # noqa: E402
+    RuleTable,
+    compile_repricer_config,
+    get_compiled_config,
+    invalidate_compiled_config,
+)
+from services.repricer_weekly import (  # noqa: E402
+    _get_profile_rule_for_days,
+    _get_tp_down_period_end,
+    get_rule_for_days,
+)
+
+ACTIONS = ["maintain", "priceTrace", "tp_down", "tp_down", "price_down_1", "exclude"]
+
+
+def _random_profile_rules(rng: random.Random) -> list:
+    ends = sorted(rng.sample([30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330, 360, 999], rng.randint(1, 13)))
+    rules = [
+        {"days_from": end, "action": rng.choice(ACTIONS), "tp_target": rng.choice(["tp0", "tp1", "tp1_follow"])}
+        for end in ends
+    ]
+    rng.shuffle(rules)
+    return rules
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_rule_table_matches_linear_lookup(seed):
+    rng = random.Random(seed)
+    rules = _random_profile_rules(rng) if seed else []
+    table = RuleTable(rules)
+    for days in range(-20, 1200):
+        assert table.rule_for_days(days) == _get_profile_rule_for_days(days, rules)
+        idx, rule = _get_profile_rule_for_days(days, rules)
+        assert table.indices([days])[0] == idx
+        if rule.get("action") == "tp_down":
+            assert table.tp_down_period_end[idx] == _get_tp_down_period_end(idx, rule, rules)
+
+
+def test_standard_table_matches_get_rule_for_days():
+    rules = {
+        "60": {"action": "priceTrace", "priceTrace": 1},
+        "90": {"action": "price_down_1", "priceTrace": 0},
+        "300": {"action": "exclude", "priceTrace": 0},
+    }
+    compiled = compile_repricer_config({"reprice_rules": rules})
+    for days in range(-10, 500):
+        assert compiled.standard_rule_for_days(days) == get_rule_for_days(days, rules)
+
+
+def test_compiled_config_is_cached_by_mtime(tmp_path, monkeypatch):
+    config_path = tmp_path / "reprice_rules.json"
+    config_path.write_text(json.dumps({"reprice_rules": [{"days_from": 30, "action": "maintain"}]}), encoding="utf-8")
+    monkeypatch.setattr(repricer_weekly, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_config, "CONFIG_PATH", config_path)
+    invalidate_compiled_config()
+
+    first = get_compiled_config("standard")
+    assert get_compiled_config("standard") is first
+    assert get_compiled_config("369") is not first
+
+    config_path.write_text(
+        json.dumps({"reprice_rules": [{"days_from": 30, "action": "price_down_1", "value": 0}]}), encoding="utf-8"
+    )
+    second = get_compiled_config("standard")
+    assert second is not first
+    assert second.standard_rule_for_days(10)[1]["action"] == "price_down_1"
+
+    invalidate_compiled_config()
+    assert get_compiled_config("standard") is not second
+    invalidate_compiled_config()
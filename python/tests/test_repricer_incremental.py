@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""差分価格改定（前回結果の再利用）と一括改定の一致テスト。"""
+from __future__ import annotations
+
+import random
+import sqlite3
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from routers import repricer as repricer_router  # noqa: E402
+from services import repricer_incremental  # noqa: E402
+from services.repricer_result_cache import result_cache  # noqa: E402
+from services.repricer_incremental import apply_repricing_rules_incremental  # noqa: E402
+from services.repricer_weekly import apply_repricing_rules  # noqa: E402
+from repricer_cases import TODAY, assert_same_outputs, write_config  # noqa: E402
+
+
+@pytest.mark.parametrize("mode", ["standard", "369"])
+@pytest.mark.parametrize("seed", range(8))
+def test_incremental_matches_full_run_across_weeks(case, tmp_path, mode, seed, capsys):
+    df, _, _ = case(seed)
+    state = tmp_path / "state.db"
+    for week in range(4):
+        today = TODAY + timedelta(days=7 * week)
+        expected = apply_repricing_rules(df.copy(), today=today, mode=mode)
+        actual = apply_repricing_rules_incremental(df.copy(), today, mode=mode, state_path=state)
+        assert_same_outputs(expected, actual)
+
+    out = capsys.readouterr().out
+    assert "前回結果を再利用" in out
+
+
+def test_changed_inputs_are_reevaluated(case, tmp_path, capsys):
+    df, db_path, config_path = case(7)
+    state = tmp_path / "state.db"
+    apply_repricing_rules_incremental(df.copy(), TODAY, mode="369", state_path=state)
+
+    # CSV の値・仕入DB・設定のいずれを変えても一括改定と一致する
+    df.loc[5, "price"] = df.loc[5, "price"] + 100
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE purchases SET tp0 = '777', repricing_enabled = '1'")
+    conn.commit()
+    conn.close()
+    for _ in range(2):
+        expected = apply_repricing_rules(df.copy(), today=TODAY, mode="369")
+        actual = apply_repricing_rules_incremental(df.copy(), TODAY, mode="369", state_path=state)
+        assert_same_outputs(expected, actual)
+        write_config(config_path, random.Random(8))
+
+    with sqlite3.connect(state) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM repricer_state WHERE mode = '369'").fetchone()[0] == len(df)
+
+
+def test_removed_skus_are_pruned_and_duplicates_fall_back(case, tmp_path, capsys):
+    df, _, _ = case(3)
+    state = tmp_path / "state.db"
+    apply_repricing_rules_incremental(df.copy(), TODAY, mode="standard", state_path=state)
+    apply_repricing_rules_incremental(df.iloc[:50].copy(), TODAY, mode="standard", state_path=state)
+    with sqlite3.connect(state) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM repricer_state").fetchone()[0] == 50
+
+    doubled = df.iloc[[1, 1, 2]].reset_index(drop=True)
+    expected = apply_repricing_rules(doubled.copy(), today=TODAY, mode="standard")
+    actual = apply_repricing_rules_incremental(doubled.copy(), TODAY, mode="standard", state_path=state)
+    assert_same_outputs(expected, actual)
+
+
+def test_router_incremental_flag_uses_state(case, tmp_path, monkeypatch, capsys):
+    df, _, _ = case(5)
+    state = tmp_path / "router_state.db"
+    monkeypatch.setattr(repricer_incremental, "STATE_DB_PATH", state)
+    content = df.to_csv(index=False).encode("utf-8")
+    result_cache.clear()
+    try:
+        expected = repricer_router._apply_repricing_from_csv_bytes(content, "standard")
+        assert not state.exists()
+        result_cache.clear()
+        actual = repricer_router._apply_repricing_from_csv_bytes(content, "standard", incremental=True)
+    finally:
+        result_cache.clear()
+
+    assert state.exists()
+    assert "[DEBUG INCREMENTAL]" in capsys.readouterr().out
+    assert_same_outputs(expected, actual)
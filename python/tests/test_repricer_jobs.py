@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""価格改定のサーバー側ジョブ（進捗・SSE・キャンセル）のテスト。"""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.csv_utils import read_csv_with_fallback  # noqa: E402
+from routers import repricer as repricer_router  # noqa: E402
+from services import repricer_config, repricer_weekly  # noqa: E402
+from services.job_queue import JobCancelled  # noqa: E402
+from services.repricer_jobs import (  # noqa: E402
+    RepricerJob,
+    RepricerJobManager,
+    run_chunked_repricing,
+)
+from services.repricer_artifacts import RepricerArtifactStore  # noqa: E402
+from services.repricer_result_cache import result_cache  # noqa: E402
+from services.repricer_weekly import apply_repricing_rules, preprocess_dataframe  # noqa: E402
+from repricer_cases import CSV_BYTES, ROWS, TODAY, assert_same_outputs  # noqa: E402
+
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    config_path = tmp_path / "reprice_rules.json"
+    config_path.write_text(
+        json.dumps({"reprice_rules": [
+            {"days_from": 60, "action": "maintain", "value": 0},
+            {"days_from": 999, "action": "price_down_1", "value": 0},
+        ]}),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(repricer_weekly, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_config, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: tmp_path / "hirio.db")
+    (tmp_path / "out").mkdir()
+    monkeypatch.setattr(repricer_router, "BASE_DIR_TMP", tmp_path / "out")
+    monkeypatch.setattr(repricer_router, "artifact_store", RepricerArtifactStore(tmp_path / "artifacts"))
+    repricer_config.invalidate_compiled_config()
+    result_cache.clear()
+    app = FastAPI()
+    app.include_router(repricer_router.router)
+    yield TestClient(app)
+    result_cache.clear()
+    repricer_config.invalidate_compiled_config()
+
+
+def _start_job(client, kind: str, **params) -> dict:
+    response = client.post(
+        "/repricer/jobs",
+        params={"kind": kind, **params},
+        files={"file": ("inventory.csv", CSV_BYTES, "text/csv")},
+    )
+    assert response.status_code == 202
+    return response.json()
+
+
+def _wait_done(client, job_id: str) -> dict:
+    for _ in range(200):
+        snapshot = client.get(f"/repricer/jobs/{job_id}").json()
+        if snapshot["status"] in ("done", "error", "cancelled"):
+            return snapshot
+        time.sleep(0.02)
+    raise AssertionError("job did not finish")
+
+
+@pytest.mark.parametrize("mode", ["standard", "369"])
+def test_chunked_repricing_matches_single_pass(client, mode):
+    df = read_csv_with_fallback(CSV_BYTES)
+    today = datetime(2025, 12, 1)
+    job = RepricerJob("preview", mode)
+    merged = run_chunked_repricing(job, df, mode, today, chunk_size=3)
+    single = apply_repricing_rules(preprocess_dataframe(df.copy()), today=today, mode=mode)
+
+    assert_same_outputs(single, merged)
+    assert (job.processed_rows, job.total_rows) == (len(ROWS), len(ROWS))
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_chunked_repricing_matches_single_pass_across_seeds(case, seed, capsys):
+    df, _, _ = case(seed)
+    job = RepricerJob("preview", "standard")
+    merged = run_chunked_repricing(job, df.copy(), "standard", TODAY, chunk_size=37)
+    single = apply_repricing_rules(preprocess_dataframe(df.copy()), today=TODAY, mode="standard")
+
+    assert_same_outputs(single, merged)
+    assert any(item.get("akaji", 0) is None for item in merged.items)
+
+
+def test_chunked_repricing_stops_on_cancel(client):
+    job = RepricerJob("preview", "standard")
+    job.request_cancel()
+    with pytest.raises(JobCancelled):
+        run_chunked_repricing(job, read_csv_with_fallback(CSV_BYTES), "standard", datetime.now(), chunk_size=2)
+    assert job.processed_rows == 0
+
+
+def test_preview_job_result_matches_preview_endpoint(client):
+    batch = client.post(
+        "/repricer/preview", files={"file": ("inventory.csv", CSV_BYTES, "text/csv")}
+    ).json()
+    result_cache.clear()
+
+    job = _start_job(client, "preview", chunk_size=2)
+    snapshot = _wait_done(client, job["job_id"])
+    assert snapshot["status"] == "done" and snapshot["progress"] == 100
+    assert snapshot["processed_rows"] == snapshot["total_rows"] == len(ROWS)
+    assert client.get(f"/repricer/jobs/{job['job_id']}/result").json() == batch
+
+    events = client.get(f"/repricer/jobs/{job['job_id']}/events").text
+    assert "event: done" in events
+
+
+def test_apply_job_writes_files(client):
+    job = _start_job(client, "apply")
+    assert _wait_done(client, job["job_id"])["status"] == "done"
+    result = client.get(f"/repricer/jobs/{job['job_id']}/result").json()
+    assert result["ok"] is True
+    updated = client.get(result["files"]["updated"])
+    assert updated.status_code == 200
+    assert updated.content.startswith(b'"SKU"')
+    assert len(result["items"]) == len(ROWS)
+
+
+def test_manager_cancel_and_unknown_job(client):
+    release = threading.Event()
+    manager = RepricerJobManager(max_workers=1)
+
+    def work(job):
+        while not release.wait(0.01):
+            job.check_cancelled()
+        return {}
+
+    job = manager.submit("preview", "standard", work)
+    manager.cancel(job.job_id)
+    deadline = time.time() + 5
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.status == "cancelled"
+
+    assert client.get("/repricer/jobs/unknown").status_code == 404
+    assert client.delete("/repricer/jobs/unknown").status_code == 404
+
+
+def test_debug_endpoint_parses_listing_dates(client):
+    response = client.post("/repricer/debug", files={"file": ("rows.csv", CSV_BYTES, "text/csv")})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["total_rows"] == len(ROWS)
+    first = body["debug_sample"][0]
+    assert first["sku"] == "20250101-3-001"
+    assert first["parsed_date"] == "2025-01-01"
+    assert first["category"] != "invalid"
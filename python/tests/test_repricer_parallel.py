@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""プロセス並列の価格改定と一括改定の一致テスト。"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import repricer_parallel  # noqa: E402
+from services.repricer_parallel import _row_ranges, apply_repricing_rules_parallel  # noqa: E402
+from services.repricer_weekly import apply_repricing_rules  # noqa: E402
+from repricer_cases import TODAY, assert_same_outputs  # noqa: E402
+
+
+def test_row_ranges_cover_all_rows_in_order():
+    ranges = _row_ranges(10, 3)
+    assert [(r.start, r.stop) for r in ranges] == [(0, 4), (4, 7), (7, 10)]
+
+
+@pytest.mark.parametrize("mode", ["standard", "369"])
+@pytest.mark.parametrize("seed", range(6))
+def test_parallel_matches_serial(case, mode, seed, capsys):
+    df, _, _ = case(seed)
+    expected = apply_repricing_rules(df.copy(), today=TODAY, mode=mode)
+    actual = apply_repricing_rules_parallel(df.copy(), TODAY, mode=mode, workers=8, min_rows_per_worker=30)
+
+    assert "8プロセスで改定" in capsys.readouterr().out
+    assert_same_outputs(expected, actual)
+
+
+def test_small_input_runs_serially(case, monkeypatch, capsys):
+    df, _, _ = case(1)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("プロセスプールを起動しない")
+
+    monkeypatch.setattr(repricer_parallel, "ProcessPoolExecutor", fail)
+    expected = apply_repricing_rules(df.copy(), today=TODAY, mode="369")
+    actual = apply_repricing_rules_parallel(df.copy(), TODAY, mode="369", workers=8)
+    assert_same_outputs(expected, actual)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""preprocess_dataframe（Excel数式記法の除去・数値変換・診断ログ）のテスト。"""
+from __future__ import annotations
+
+import itertools
+import logging
+import random
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services.repricer_weekly import (  # noqa: E402
+    _strip_excel_formula_text,
+    preprocess_dataframe,
+    preprocess_logger,
+)
+
+NUMERIC_COLUMNS = ['price', 'cost', 'akaji', 'takane', 'number', 'priceTrace',
+                   'leadtime', 'amazon-fee', 'shipping-price', 'profit']
+
+VALUE_PARTS = ['="', '"', '=', '5000', '12.5', 'abc', '商品', '\n', ' ', '', '-3', 'nan']
+
+
+def _legacy_preprocess(df: pd.DataFrame) -> pd.DataFrame:
+    """従来の前処理（正規表現2段を全列、数値列はもう一度）から診断出力を除いたもの。"""
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            df[col] = df[col].astype(str).str.replace(r'^="(.*)"$', r'\1', regex=True)
+            df[col] = df[col].str.replace(r'^="([^"]*)"$', r'\1', regex=True)
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.replace(r'^="(.*)"$', r'\1', regex=True)
+            df[col] = df[col].str.replace(r'^="([^"]*)"$', r'\1', regex=True)
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+
+def _random_value(rng: random.Random):
+    roll = rng.random()
+    if roll < 0.05:
+        return None
+    if roll < 0.1:
+        return np.nan
+    text = "".join(rng.choice(VALUE_PARTS) for _ in range(rng.randint(0, 5)))
+    if rng.random() < 0.4:
+        text = '="' + text + '"'
+    if rng.random() < 0.1:
+        text = '="' + text + '"'
+    return text
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_preprocess_matches_legacy(seed):
+    rng = random.Random(seed)
+    rows = 200
+    data = {col: [_random_value(rng) for _ in range(rows)] for col in ['SKU', 'title', 'conditionNote', *NUMERIC_COLUMNS[:6]]}
+    data['leadtime'] = [rng.randint(0, 10) for _ in range(rows)]
+    data['amazon-fee'] = [rng.choice([1.5, np.nan, 300.0]) for _ in range(rows)]
+    df = pd.DataFrame(data)
+
+    expected = _legacy_preprocess(df.copy())
+    actual = preprocess_dataframe(df.copy())
+
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.NOTSET)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def preprocess_records():
+    # アプリのログ設定（app.configure_logging）と同じく INFO 以上を有効にする
+    handler = _Records()
+    previous = preprocess_logger.level
+    preprocess_logger.addHandler(handler)
+    preprocess_logger.setLevel(logging.INFO)
+    try:
+        yield handler.messages
+    finally:
+        preprocess_logger.removeHandler(handler)
+        preprocess_logger.setLevel(previous)
+
+
+def test_preprocess_logs_only_when_requested(preprocess_records):
+    df = pd.DataFrame({'SKU': ['="20250901-3-001"'], 'price': ['="5000"'], 'conditionNote': ['良品']})
+
+    preprocess_dataframe(df.copy())
+    assert preprocess_records == []
+
+    result = preprocess_dataframe(df.copy(), debug=True)
+    assert "Called with shape: (1, 3)" in preprocess_records
+    assert "AFTER Excel formula removal - SKU: 20250901-3-001" in preprocess_records
+    assert result['price'].tolist() == [5000]
+
+
+def test_preprocess_logger_level_enables_diagnostics(preprocess_records):
+    previous = preprocess_logger.level
+    preprocess_logger.setLevel(logging.DEBUG)
+    try:
+        preprocess_dataframe(pd.DataFrame({'price': ['100']}))
+    finally:
+        preprocess_logger.setLevel(previous)
+    assert "BEFORE - First row price (raw): 100" in preprocess_records
+
+
+def test_single_pass_strip_matches_legacy_two_passes():
+    # 従来の2段の置換と、短い文字列をすべて比較する（改行・入れ子・引用符の組み合わせ）
+    first = re.compile(r'^="(.*)"$')
+    second = re.compile(r'^="([^"]*)"$')
+    for length in range(8):
+        for parts in itertools.product(['=', '"', 'a', '\n'], repeat=length):
+            value = ''.join(parts)
+            expected = second.sub(r'\1', first.sub(r'\1', value))
+            assert _strip_excel_formula_text(value) == expected, repr(value)
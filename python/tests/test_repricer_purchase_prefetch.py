@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""仕入DBの一括先読み（_prefetch_purchase_records）のテスト。"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import repricer_weekly  # noqa: E402
+from services.repricer_weekly import PurchaseRecord, _prefetch_purchase_records  # noqa: E402
+
+LADDER_RULES = [{"days_from": 30, "action": "maintain", "value": 0}]
+
+
+def _create_db(path: Path, columns: str, rows: list) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE purchases (sku TEXT UNIQUE NOT NULL, {columns})")
+    placeholders = ",".join(["?"] * len(rows[0]))
+    conn.executemany(f"INSERT INTO purchases VALUES ({placeholders})", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_prefetch_returns_typed_records(tmp_path, monkeypatch):
+    db_path = tmp_path / "hirio.db"
+    _create_db(
+        db_path,
+        "tp0 TEXT, tp1 TEXT, tp2 TEXT, tp3 TEXT, repricing_enabled TEXT, ladder_enabled TEXT, ladder_rules TEXT",
+        [
+            ("A-1", "1,200", "900", "", None, "1", "1", json.dumps(LADDER_RULES)),
+            ("B-2", "abc", None, "0", "500", "off", "0", "not json"),
+            ("C-3", None, None, None, None, None, None, None),
+        ],
+    )
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: db_path)
+
+    records = _prefetch_purchase_records([" A-1 ", "B-2", "A-1", "", None, "ZZZ", "C-3"])
+
+    assert set(records) == {"A-1", "B-2", "C-3"}
+    assert records["A-1"] == PurchaseRecord(
+        tp={"tp0": 1200.0, "tp1": 900.0, "tp2": None, "tp3": None},
+        repricing_enabled=True,
+        ladder_enabled=True,
+        ladder_rules=LADDER_RULES,
+    )
+    assert records["B-2"].tp == {"tp0": None, "tp1": None, "tp2": 0.0, "tp3": 500.0}
+    assert records["B-2"].repricing_enabled is False
+    assert records["B-2"].ladder_rules == []
+    assert records["C-3"].repricing_enabled is True
+    assert records["C-3"].ladder_enabled is False
+
+
+def test_prefetch_tolerates_missing_columns(tmp_path, monkeypatch):
+    # 月別運用・TP列追加前の古い仕入DB
+    db_path = tmp_path / "hirio.db"
+    _create_db(db_path, "repricing_enabled TEXT", [("A-1", "0")])
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: db_path)
+
+    records = _prefetch_purchase_records(["A-1"])
+
+    assert records == {"A-1": PurchaseRecord(tp=None, repricing_enabled=False, ladder_enabled=False, ladder_rules=[])}
+
+
+def test_prefetch_missing_db_or_table(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: tmp_path / "missing.db")
+    assert _prefetch_purchase_records(["A-1"]) == {}
+
+    db_path = tmp_path / "empty.db"
+    sqlite3.connect(db_path).close()
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: db_path)
+    assert _prefetch_purchase_records(["A-1"]) == {}
+    assert "[WARNING PURCHASE DB]" in capsys.readouterr().out
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""preview/apply 共有の改定結果キャッシュのテスト。"""
+from __future__ import annotations
+
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from routers import repricer as repricer_router  # noqa: E402
+from services import repricer_config, repricer_weekly  # noqa: E402
+from services.repricer_result_cache import RepriceResultCache, build_cache_key, result_cache  # noqa: E402
+from services.repricer_weekly import RepriceOutputs  # noqa: E402
+
+CSV_BYTES = (
+    "SKU,ASIN,title,number,price,cost,akaji,takane,condition,conditionNote,priceTrace\n"
+    "20250101-6-001,B000000001,商品A,1,3000,1000,0,0,1,,0\n"
+    "20250801-3-002,B000000002,商品B,1,5000,2000,0,0,1,,1\n"
+).encode("utf-8")
+
+
+def _outputs(rows: int) -> RepriceOutputs:
+    log_df = pd.DataFrame({"sku": [f"S{i}" for i in range(rows)], "action": ["維持"] * rows})
+    return RepriceOutputs(
+        log_df=log_df, updated_df=log_df.copy(), excluded_df=pd.DataFrame([]), items=log_df.to_dict("records")
+    )
+
+
+@pytest.fixture
+def isolated(tmp_path, monkeypatch):
+    config_path = tmp_path / "reprice_rules.json"
+    config_path.write_text(
+        json.dumps({"reprice_rules": [{"days_from": 30, "action": "maintain", "value": 0}]}), encoding="utf-8"
+    )
+    db_path = tmp_path / "hirio.db"
+    monkeypatch.setattr(repricer_weekly, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_config, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: db_path)
+    repricer_config.invalidate_compiled_config()
+    result_cache.clear()
+    yield config_path, db_path
+    result_cache.clear()
+    repricer_config.invalidate_compiled_config()
+
+
+def test_lru_eviction_and_counters():
+    cache = RepriceResultCache(max_entries=2)
+    cache.put(("a",), _outputs(1))
+    cache.put(("b",), _outputs(2))
+    assert cache.get(("a",)) is not None  # a を最近使用に
+    cache.put(("c",), _outputs(3))
+
+    assert cache.get(("b",)) is None
+    assert len(cache.get(("c",)).items) == 3
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1, 1)
+
+
+def test_byte_limit_evicts_and_rejects_oversized():
+    cache = RepriceResultCache(max_entries=10, max_bytes=1)
+    cache.put(("big",), _outputs(50))
+    assert cache.stats()["entries"] == 0
+
+
+def test_cached_outputs_are_isolated_from_caller_mutation():
+    cache = RepriceResultCache()
+    original = _outputs(2)
+    cache.put(("k",), original)
+    original.items[0]["action"] = "changed"
+    original.log_df.loc[0, "action"] = "changed"
+
+    first = cache.get(("k",))
+    first.items[1]["action"] = "changed"
+    second = cache.get(("k",))
+    assert [it["action"] for it in second.items] == ["維持", "維持"]
+    assert second.log_df["action"].tolist() == ["維持", "維持"]
+
+
+def test_key_tracks_config_db_and_date(isolated):
+    config_path, db_path = isolated
+    today = datetime(2025, 12, 1, 9, 0)
+    key = build_cache_key(CSV_BYTES, "standard", today)
+    assert build_cache_key(CSV_BYTES, "standard", datetime(2025, 12, 1, 23, 0)) == key
+    assert build_cache_key(CSV_BYTES, "369", today) != key
+    assert build_cache_key(CSV_BYTES + b" ", "standard", today) != key
+    assert build_cache_key(CSV_BYTES, "standard", datetime(2025, 12, 2)) != key
+
+    config_path.write_text(json.dumps({"reprice_rules": []}), encoding="utf-8")
+    assert build_cache_key(CSV_BYTES, "standard", today) != key
+    key = build_cache_key(CSV_BYTES, "standard", today)
+    db_path.write_bytes(b"")
+    assert build_cache_key(CSV_BYTES, "standard", today) != key
+
+
+def test_preview_then_apply_reuses_result(isolated, capsys):
+    before = result_cache.stats()
+    first = repricer_router._apply_repricing_from_csv_bytes(CSV_BYTES, "standard")
+    first.items[0]["action"] = "mutated by caller"
+    second = repricer_router._apply_repricing_from_csv_bytes(CSV_BYTES, "standard")
+
+    after = result_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    assert second.items[0]["action"] != "mutated by caller"
+    pd.testing.assert_frame_equal(second.updated_df, first.updated_df)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""3-6-9 価格推移シミュレーションと、改定を日付ごとに連続実行した結果の一致テスト。"""
+from __future__ import annotations
+
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from routers import repricer as repricer_router  # noqa: E402
+from services import repricer_config, repricer_weekly  # noqa: E402
+from services.repricer_369_vectorized import apply_repricing_rules_369_vectorized  # noqa: E402
+from services.repricer_config import compile_repricer_config  # noqa: E402
+from services.repricer_simulate import simulate_price_trajectories  # noqa: E402
+from repricer_cases import build_case, random_config  # noqa: E402
+
+TODAY = datetime(2025, 12, 1)
+
+
+def _next_inventory(outputs) -> pd.DataFrame:
+    """改定結果（updated / excluded）を元の行順に並べ直し、次回改定の入力CSVにする。"""
+    updated = iter(outputs.updated_df.to_dict("records"))
+    excluded = iter(outputs.excluded_df.to_dict("records"))
+    rows = [next(excluded) if action == "除外" else next(updated) for action in outputs.log_df["action"]]
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_simulation_matches_repeated_weekly_runs(seed, tmp_path, monkeypatch, capsys):
+    rng = random.Random(seed)
+    df, db_path = build_case(rng, tmp_path, rows=300)
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: db_path)
+    config = random_config(rng)
+    compiled = compile_repricer_config(config, mode="369")
+    df = repricer_weekly.preprocess_dataframe(df)
+    dates = [TODAY + timedelta(days=7 * week) for week in range(40)]
+
+    simulated = simulate_price_trajectories(df.copy(), dates, compiled=compiled)
+
+    inventory = df.copy()
+    for j, today in enumerate(dates):
+        outputs = apply_repricing_rules_369_vectorized(inventory, today, config, compiled=compiled)
+        expected = pd.to_numeric(outputs.log_df["new_price"], errors="coerce").to_numpy(dtype=float)
+        np.testing.assert_array_equal(simulated.prices[:, j], expected, err_msg=f"{today:%Y-%m-%d}")
+        inventory = _next_inventory(outputs)
+
+    assert simulated.dates == [d.date() for d in dates]
+    assert len(simulated.skus) == len(df)
+
+
+def test_simulate_endpoint_returns_price_matrix(tmp_path, monkeypatch):
+    config_path = tmp_path / "reprice_rules.json"
+    config = {"reprice_rules": [], **random_config(random.Random(3))}
+    config_path.write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+    monkeypatch.setattr(repricer_weekly, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_config, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: tmp_path / "hirio.db")
+    repricer_config.invalidate_compiled_config()
+    app = FastAPI()
+    app.include_router(repricer_router.router)
+    csv_bytes = (
+        "SKU,ASIN,title,number,price,cost,akaji,takane,condition,conditionNote,priceTrace\n"
+        "20250901-3-001,B000000001,商品A,1,5000,1000,0,0,1,,0\n"
+        "不明SKU,B000000002,商品B,1,3000,1000,0,0,1,,0\n"
+    ).encode("utf-8")
+
+    try:
+        response = TestClient(app).post(
+            "/repricer/simulate",
+            params={"horizon_days": 28, "step_days": 7},
+            files={"file": ("inventory.csv", csv_bytes, "text/csv")},
+        )
+    finally:
+        repricer_config.invalidate_compiled_config()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["dates"]) == 5
+    assert body["skus"] == ["20250901-3-001", "不明SKU"]
+    assert body["current_prices"] == [5000, 3000]
+    assert body["prices"][1] == [3000] * 5
+    assert all(isinstance(v, int) for v in body["prices"][0])
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""価格改定のストリーミング（チャンク・NDJSON）モードのテスト。"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from routers import repricer as repricer_router  # noqa: E402
+from services import repricer_config, repricer_weekly  # noqa: E402
+from services.repricer_artifacts import RepricerArtifactStore  # noqa: E402
+from services.repricer_result_cache import result_cache  # noqa: E402
+from services.repricer_stream import UnionColumnCsvWriter  # noqa: E402
+
+HEADER = "SKU,ASIN,title,number,price,cost,akaji,takane,condition,conditionNote,priceTrace\n"
+ROWS = [
+    f"2025{month:02d}01-{profile}-{i:03d},B{i:09d},商品{i},1,{3000 + i * 10},1000,0,0,1,,{i % 2}\n"
+    for i, (month, profile) in enumerate(
+        [(1, 3), (3, 6), (5, 9), (7, 3), (9, 6), (10, 9), (11, 3)], start=1
+    )
+]
+CSV_BYTES = (HEADER + "".join(ROWS)).encode("utf-8")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    config_path = tmp_path / "reprice_rules.json"
+    config_path.write_text(
+        json.dumps({"reprice_rules": [
+            {"days_from": 60, "action": "maintain", "value": 0},
+            {"days_from": 999, "action": "price_down_1", "value": 0},
+        ]}),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(repricer_weekly, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_config, "CONFIG_PATH", config_path)
+    monkeypatch.setattr(repricer_weekly, "_resolve_purchase_db_path", lambda: tmp_path / "hirio.db")
+    (tmp_path / "out").mkdir()
+    monkeypatch.setattr(repricer_router, "BASE_DIR_TMP", tmp_path / "out")
+    monkeypatch.setattr(repricer_router, "artifact_store", RepricerArtifactStore(tmp_path / "artifacts"))
+    repricer_config.invalidate_compiled_config()
+    result_cache.clear()
+    app = FastAPI()
+    app.include_router(repricer_router.router)
+    yield TestClient(app)
+    result_cache.clear()
+    repricer_config.invalidate_compiled_config()
+
+
+def _post(client, path: str, content: bytes, **params):
+    return client.post(path, params=params, files={"file": ("inventory.csv", content, "text/csv")})
+
+
+def _ndjson(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def _assert_same_items(streamed: list, batch: list) -> None:
+    # items は log_df のレコード。一括処理では他行にしか無い数値列が NaN→0 になるが、
+    # ストリーミングではチャンク内に無い列はキー自体が無いか None になる
+    assert len(streamed) == len(batch)
+    for got, expected in zip(streamed, batch):
+        for key, value in expected.items():
+            if got.get(key) is None and value == 0:
+                continue
+            assert got[key] == value, key
+        assert set(got) <= set(expected)
+
+
+def test_union_writer_orders_columns_by_first_appearance(tmp_path):
+    path = tmp_path / "log.csv"
+    writer = UnionColumnCsvWriter(path)
+    writer.write(pd.DataFrame({"sku": ["A"], "action": ["維持"]}))
+    writer.write(pd.DataFrame([]))
+    writer.write(pd.DataFrame({"sku": ["B"], "reason": ["除外"], "action": ["値下げ"]}))
+    writer.close()
+
+    with open(path, encoding="cp932", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [["sku", "action", "reason"], ["A", "維持", ""], ["B", "値下げ", "除外"]]
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_stream_preview_matches_batch_items(client):
+    batch = _post(client, "/repricer/preview", CSV_BYTES).json()
+    response = _post(client, "/repricer/preview", CSV_BYTES, stream="true", chunk_size=3)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    events = _ndjson(response)
+    assert events[0]["type"] == "start" and events[-1]["type"] == "summary"
+    assert [e["chunk"] for e in events if e["type"] == "progress"] == [1, 2, 3]
+    _assert_same_items([e["item"] for e in events if e["type"] == "item"], batch["items"])
+    assert events[-1]["summary"]["updated_rows"] == batch["summary"]["updated_rows"]
+
+
+def test_stream_apply_writes_files_incrementally(client):
+    batch = _post(client, "/repricer/apply", CSV_BYTES).json()
+    events = _ndjson(_post(client, "/repricer/apply", CSV_BYTES, stream="true", chunk_size=2))
+
+    summary = events[-1]
+    assert summary["type"] == "summary" and summary["ok"] is True
+    _assert_same_items([e["item"] for e in events if e["type"] == "item"], batch["items"])
+
+    def download(kind: str) -> pd.DataFrame:
+        response = client.get(summary["files"][kind])
+        assert response.status_code == 200
+        return pd.read_csv(io.BytesIO(response.content), encoding="cp932", dtype=str)
+
+    updated = download("updated")
+    assert len(updated) == summary["summary"]["updated_rows"] == batch["summary"]["updated_rows"]
+    report = download("report")
+    assert len(report) == len(ROWS)
+    log = download("log")
+    assert len(log) == len(ROWS)
+    assert not list(repricer_router.BASE_DIR_TMP.glob("*.csv"))
+
+
+def test_stream_rejects_empty_csv(client):
+    assert _post(client, "/repricer/preview", b"", stream="true").status_code == 400
+    assert _post(client, "/repricer/apply", HEADER.encode("utf-8"), stream="true").status_code == 400
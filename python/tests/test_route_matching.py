@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""仕入商品と店舗訪問の照合（滞在時間帯の索引・スコア・候補店舗）のテスト。"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services.route_matching_service import RouteMatchingService  # noqa: E402
+
+DAY = datetime(2025, 3, 1, 9, 0)
+
+
+def _legacy_match(service, purchase_items, store_visits):
+    """従来の照合（商品ごとに全訪問の IN/OUT を解析してスコアを計算）。"""
+    parse = service.calc_service.parse_datetime_string
+    candidates = sorted(
+        [
+            {"store_code": v["store_code"],
+             "score": (0.5 if v.get("purchase_success", False) else 0.0) + (v["store_rating"] * 0.1 if v.get("store_rating") else 0.0)}
+            for v in store_visits if v.get("store_code")
+        ],
+        key=lambda c: c["score"], reverse=True,
+    )
+    results = []
+    for item in purchase_items:
+        result_item = item.copy()
+        matched, conf, code, reason = False, 0.0, None, ""
+        pd_ = item.get("仕入れ日") or item.get("purchase_date")
+        if isinstance(pd_, str):
+            pd_ = parse(pd_)
+        pp = service._safe_float(item.get("仕入れ価格") or item.get("purchase_price", 0))
+        plan = service._safe_float(item.get("販売予定価格") or item.get("planned_price", 0))
+        est = plan - pp if plan and pp else None
+        for visit in store_visits:
+            if not visit.get("store_code"):
+                continue
+            in_t, out_t = visit.get("store_in_time"), visit.get("store_out_time")
+            in_t = parse(in_t) if isinstance(in_t, str) else in_t
+            out_t = parse(out_t) if isinstance(out_t, str) else out_t
+            score, reasons = 0.0, []
+            if pd_ and in_t and out_t and in_t <= pd_ <= out_t:
+                score += 0.5
+                reasons.append("滞在時間内")
+            else:
+                score += 0.0
+            g = service._safe_float(visit.get("store_gross_profit"))
+            p = 0.0
+            if est and g and g > 0:
+                ratio = abs(est - g) / g
+                if ratio <= 0.1:
+                    p = 0.3
+                    reasons.append("粗利一致（誤差10%以内）")
+                elif ratio <= 0.3:
+                    p = 0.15
+                    reasons.append(f"粗利近接（誤差{ratio * 100:.1f}%）")
+            score += p
+            if visit.get("purchase_success", False):
+                score += 0.2
+                reasons.append("仕入れ成功")
+            else:
+                score += 0.0
+            if score > conf:
+                conf, code, matched = score, visit["store_code"], True
+                reason = "; ".join(reasons) if reasons else "照合条件不足"
+        if matched and conf >= 0.5:
+            result_item.update(matched_store_code=code, match_confidence=conf,
+                               match_reason=reason, match_status="auto_matched")
+        else:
+            result_item.update(matched_store_code=None, match_confidence=conf if matched else 0.0,
+                               match_reason=reason if matched else "照合失敗",
+                               match_status="manual_review_required",
+                               candidate_store_codes=[c["store_code"] for c in candidates[:3]])
+        results.append(result_item)
+    return results
+
+
+def _fmt(dt: datetime, rng: random.Random) -> str:
+    return dt.strftime(rng.choice(["%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M", "%Y-%m-%dT%H:%M"]))
+
+
+def _build_day(rng: random.Random, visits: int, items: int):
+    store_visits, cursor = [], DAY
+    for i in range(visits):
+        cursor += timedelta(minutes=rng.randint(0, 40))
+        stay = timedelta(minutes=rng.randint(5, 50))
+        store_visits.append({
+            "store_code": rng.choice([f"S{i:02d}", f"S{i:02d}", "", None]),
+            "store_in_time": _fmt(cursor, rng) if rng.random() > 0.05 else None,
+            # 一部は重なり・逆転した時間帯にする
+            "store_out_time": _fmt(cursor + stay * rng.choice([1, 1, 1, 3, -1]), rng),
+            "store_gross_profit": rng.choice([None, 0, 1500, "2,000", 3200, -50]),
+            "purchase_success": rng.random() < 0.6,
+            "store_rating": rng.choice([None, 3, 5]),
+        })
+        cursor += stay
+    span = int((cursor - DAY).total_seconds() // 60) + 60
+    purchase_items = []
+    for j in range(items):
+        moment = DAY + timedelta(minutes=rng.randint(-30, span))
+        purchase_items.append({
+            "商品名": f"item{j}",
+            "仕入れ日": rng.choice([_fmt(moment, rng), _fmt(moment, rng), moment, "", None]),
+            "仕入れ価格": rng.choice([None, 500, "1,000", 0]),
+            "販売予定価格": rng.choice([None, 2000, 3000, 2200]),
+        })
+    return purchase_items, store_visits
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_matches_legacy_without_tolerance(seed):
+    rng = random.Random(seed)
+    items, visits = _build_day(rng, visits=rng.randint(0, 25), items=200)
+    service = RouteMatchingService()
+    assert service.match_store_code_by_time_and_profit(items, visits, time_tolerance_minutes=0) == \
+        _legacy_match(service, items, visits)
+
+
+def test_tolerance_applies_only_outside_every_stay_window():
+    visits = [
+        {"store_code": "A", "store_in_time": "2025-03-01 10:00", "store_out_time": "2025-03-01 10:30"},
+        {"store_code": "B", "store_in_time": "2025-03-01 10:40", "store_out_time": "2025-03-01 11:00"},
+    ]
+    items = [
+        {"仕入れ日": "2025-03-01 10:45"},  # B の滞在時間内（A の許容範囲内でもある）
+        {"仕入れ日": "2025-03-01 10:35"},  # どちらの滞在時間外 → 許容範囲で先の A
+        {"仕入れ日": "2025-03-01 12:00"},  # 許容範囲外
+    ]
+    results = RouteMatchingService().match_store_code_by_time_and_profit(items, visits, time_tolerance_minutes=30)
+    assert [r["matched_store_code"] for r in results] == ["B", "A", None]
+    assert results[0]["match_reason"] == "滞在時間内"
+    assert results[1]["match_reason"] == "滞在時間近接（±30分）"
+    assert results[2]["candidate_store_codes"] == ["A", "B"]
+
+
+def test_full_day_matches_in_milliseconds():
+    rng = random.Random(1)
+    items, visits = _build_day(rng, visits=40, items=2000)
+    service = RouteMatchingService()
+    started = time.perf_counter()
+    results = service.match_store_code_by_time_and_profit(items, visits)
+    assert len(results) == 2000
+    assert time.perf_counter() - started < 0.5
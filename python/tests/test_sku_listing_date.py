@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""SKU 出品日抽出（結合正規表現・列一括版・メモ）のテスト。"""
+from __future__ import annotations
+
+import random
+import re
+import sys
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services.repricer_weekly import get_days_since_listed  # noqa: E402
+from utils import sku_listing_date  # noqa: E402
+from utils.sku_listing_date import (  # noqa: E402
+    days_since_listed_series,
+    parse_listing_date_from_sku,
+)
+
+TODAY = datetime(2025, 12, 1, 15, 30)
+
+# 変更前の get_days_since_listed（6パターンを順に re.search）
+_LEGACY_PATTERNS = [
+    r"^(?P<year>\d{4})_(?P<month>\d{2})_?(?P<day>\d{2})",
+    r"^(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})-",
+    r"^(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})(?=[A-Za-z])",
+    r"^[a-z]+-(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})-",
+    r"_(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})_",
+    r"^(?P<year>\d{2})(?P<month>\d{2})(?P<day>\d{2})-",
+]
+
+
+def _legacy_days(sku: str, today: datetime) -> int:
+    if isinstance(sku, str) and sku.startswith('="') and sku.endswith('"'):
+        sku = sku[2:-1]
+    for pattern in _LEGACY_PATTERNS:
+        match = re.search(pattern, sku)
+        if match:
+            try:
+                parts = match.groupdict()
+                year, month, day = int(parts["year"]), int(parts["month"]), int(parts["day"])
+                if len(parts["year"]) == 2:
+                    year += 2000
+                return (today - datetime(year, month, day)).days
+            except (ValueError, KeyError):
+                continue
+    return -1
+
+
+EDGE_SKUS = [
+    "2024_08_28-6-001",
+    "2024_0828-6-001",
+    "20250201-3P-01",
+    "20251108B01AUKUZ3G337065780003F",
+    "hmk-20251108-new-047",
+    "HMK-20251108-new-047",
+    "pr_9_20250217_12",
+    "250518-6-01",
+    '="20250201-3P-01"',
+    # 先に一致した規則が不正日付 → 後続規則へフォールバック
+    "20251301-x_20250301_y",
+    "2025_13_01_20250301_",
+    "20250230B_20240229_z",
+    # 5番目（任意位置）は 6番目（YYMMDD）より優先
+    "250518-x_20250101_y",
+    "250230-x",
+    "abc_20250101_def_20240101_",
+    "nodate-6-1",
+    "",
+    "２０２５０１０１-全角",
+]
+
+
+def _random_sku(rng: random.Random) -> str:
+    y = rng.choice([2023, 2024, 2025, 2026])
+    m = rng.randint(0, 13)
+    d = rng.randint(0, 32)
+    body = rng.choice(["", "-", "B", "_", "x", "-6P-"]) + str(rng.randint(0, 999))
+    prefix = rng.choice(["", "", "hmk-", "pr_", "X_", "_"])
+    date_text = rng.choice([f"{y}{m:02d}{d:02d}", f"{y}_{m:02d}_{d:02d}", f"{y % 100:02d}{m:02d}{d:02d}"])
+    sku = f"{prefix}{date_text}{body}"
+    if rng.random() < 0.3:
+        sku += f"_{y}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}_"
+    if rng.random() < 0.2:
+        sku = f'="{sku}"'
+    return sku
+
+
+@pytest.fixture(autouse=True)
+def _clear_memo():
+    sku_listing_date.clear_listing_date_memo()
+    yield
+    sku_listing_date.clear_listing_date_memo()
+
+
+@pytest.mark.parametrize("sku", EDGE_SKUS)
+def test_scalar_matches_legacy(sku):
+    assert get_days_since_listed(sku, TODAY) == _legacy_days(sku, TODAY)
+
+
+def test_series_matches_legacy_random():
+    rng = random.Random(7)
+    skus = [_random_sku(rng) for _ in range(3000)] + EDGE_SKUS
+    expected = [_legacy_days(s, TODAY) for s in skus]
+
+    index = pd.RangeIndex(10, 10 + len(skus))
+    actual = days_since_listed_series(pd.Series(skus, index=index, dtype=object), TODAY)
+    assert actual.dtype == "int64"
+    assert actual.index.equals(index)
+    assert actual.tolist() == expected
+
+    # 2回目はメモから返る（結果は同じ）
+    size = sku_listing_date.listing_date_memo_size()
+    assert days_since_listed_series(skus, TODAY).tolist() == expected
+    assert sku_listing_date.listing_date_memo_size() == size
+
+
+def test_series_handles_non_string_and_empty():
+    values = pd.Series(["20250201-3P-01", None, float("nan"), 20250201], dtype=object)
+    assert days_since_listed_series(values, TODAY).tolist() == [303, -1, -1, -1]
+    assert days_since_listed_series(pd.Series([], dtype=object), TODAY).tolist() == []
+
+
+def test_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(sku_listing_date, "_MEMO_MAXSIZE", 3)
+    days_since_listed_series([f"2025010{i}-a" for i in range(1, 6)], TODAY)
+    assert sku_listing_date.listing_date_memo_size() == 3
+
+
+
+def test_memo_is_safe_across_threads(monkeypatch):
+    # 上限を小さくして追い出しを頻発させ、並行に参照・登録しても壊れないことを確認する
+    monkeypatch.setattr(sku_listing_date, "_MEMO_MAXSIZE", 8)
+    skus = [f"202501{d:02d}-a" for d in range(1, 29)]
+    errors = []
+
+    def worker(offset: int) -> None:
+        try:
+            for n in range(300):
+                sku = skus[(offset + n) % len(skus)]
+                assert parse_listing_date_from_sku(sku) == datetime.strptime(sku[:8], "%Y%m%d")
+        except Exception as e:  # pragma: no cover - 失敗時の報告用
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert sku_listing_date.listing_date_memo_size() <= 8
+
+def test_parse_listing_date_accepts_date_today():
+    assert parse_listing_date_from_sku('="hmk-20251108-new-047"') == datetime(2025, 11, 8)
+    assert parse_listing_date_from_sku("nodate") is None
+    assert sku_listing_date.days_since_listed("20251108B01", date(2025, 12, 1)) == 23
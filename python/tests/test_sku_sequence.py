@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""SKU連番の採番（SQLite・範囲確保・並行実行）のテスト。"""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import inventory_service, sku_template  # noqa: E402
+from services.inventory_service import InventoryService  # noqa: E402
+from services.sku_sequence import SkuSequenceAllocator  # noqa: E402
+from services.sku_template import SKUTemplateRenderer  # noqa: E402
+
+
+def _reserve_in_process(db_path: str, count: int, rounds: int):
+    allocator = SkuSequenceAllocator(db_path)
+    return [allocator.reserve("day:20250301", count) for _ in range(rounds)]
+
+
+def test_reserve_returns_contiguous_ranges_and_honours_seq_start(tmp_path):
+    allocator = SkuSequenceAllocator(tmp_path / "seq.db")
+    assert allocator.peek("day:20250301") is None
+    assert allocator.reserve("day:20250301", 3) == 1
+    assert allocator.reserve("day:20250301", 2) == 4
+    assert allocator.reserve_many({"day:20250301": 1, "day:20250302": 4, "empty": 0}) == {
+        "day:20250301": 6, "day:20250302": 1,
+    }
+    # seqStart を上げた場合はそこから、下げた場合は続きから
+    assert allocator.reserve("day:20250302", 1, start=100) == 100
+    assert allocator.reserve("day:20250302", 1, start=1) == 101
+    assert allocator.peek("day:20250302") == 102
+
+
+def test_concurrent_reservations_never_overlap(tmp_path):
+    db_path = str(tmp_path / "seq.db")
+    SkuSequenceAllocator(db_path).reserve("warmup", 1)
+    firsts = []
+    lock = threading.Lock()
+
+    def worker():
+        got = _reserve_in_process(db_path, 5, 20)
+        with lock:
+            firsts.extend(got)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        for got in executor.map(_reserve_in_process, [db_path] * 2, [5] * 2, [10] * 2):
+            firsts.extend(got)
+
+    assert len(firsts) == 100
+    assert sorted(firsts) == list(range(1, 500, 5))
+
+
+def test_renderer_allocates_per_scope(tmp_path):
+    allocator = SkuSequenceAllocator(tmp_path / "seq.db")
+    products = [{"supplier_code": s} for s in ("A", "B", "A", "A", "B")]
+    day = SKUTemplateRenderer({"skuTemplate": "{supplier}-{seq:3}", "seqStart": 1}, sku_date="20250301")
+    assert day.render_many(products, allocator=allocator) == ["A-001", "B-002", "A-003", "A-004", "B-005"]
+    assert day.render_many(products[:1], allocator=allocator) == ["A-006"]
+
+    by_supplier = SKUTemplateRenderer(
+        {"skuTemplate": "{supplier}-{seq:3}", "seqScope": "day_supplier", "seqStart": 1}, sku_date="20250301"
+    )
+    assert by_supplier.render_many(products, allocator=allocator) == ["A-001", "B-001", "A-002", "A-003", "B-002"]
+
+    # 連番を使わないテンプレートは採番しない
+    no_seq = SKUTemplateRenderer({"skuTemplate": "{supplier}"}, sku_date="20250302")
+    no_seq.render_many(products, allocator=allocator)
+    assert allocator.peek("day:20250302") is None
+
+
+def test_generate_sku_bulk_continues_sequence_across_requests(tmp_path, monkeypatch):
+    settings_path = tmp_path / "inventory_settings.json"
+    settings_path.write_text(json.dumps({"skuTemplate": "{date:YYYYMMDD}-{seq:3}", "seqStart": 1}), encoding="utf-8")
+    monkeypatch.setattr(sku_template, "INVENTORY_SETTINGS_PATH", settings_path)
+    monkeypatch.setattr(inventory_service, "sku_sequence_allocator", SkuSequenceAllocator(tmp_path / "seq.db"))
+
+    first = InventoryService.generate_sku_bulk([{}, {}], sku_date="20250301")
+    second = InventoryService.generate_sku_bulk([{}], sku_date="20250301")
+
+    assert [r["sku"] for r in first["results"]] == ["20250301-001", "20250301-002"]
+    assert [r["sku"] for r in second["results"]] == ["20250301-003"]
+    assert first["duplicates"] == []
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""SKUテンプレート（コンパイル済みトークン列・設定キャッシュ・重複検出・一括生成）のテスト。"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from services import sku_template  # noqa: E402
+from services.inventory_service import InventoryService  # noqa: E402
+from services.sku_template import (  # noqa: E402
+    COND_CODE_MAP,
+    COND_NUM_MAP,
+    SKUTemplateRenderer,
+    find_duplicate_skus,
+    load_sku_settings,
+    rule369_code,
+)
+
+BASE_DATE = datetime(2025, 3, 1)
+
+TEMPLATES = [
+    "{date:YYYYMMDD}-{ASIN|JAN}-{supplier}-{seq:3}-{condNum}",
+    "{date:YYYYMMDD}-{supplier}-{purchasePrice}-{rule369}-{seq:3}",
+    "{date:YYMMDD}_{asin}_{jan}_{condCode}_{ship}_{seq}_{seq:5:day}",
+    "pre {custom:ABC}/{text:x y}{unknown}{price}--{dateX}{ASIN_JAN}",
+    "固定のみ",
+]
+
+
+def _legacy_token(token, p, seq, base):
+    """従来の SKUTemplateRenderer._resolve_token（判定順・戻り値をそのまま再現）。"""
+    if token.startswith("date"):
+        parts = token.split(":")
+        fmt = parts[1] if len(parts) > 1 else "YYYYMMDD"
+        return base.strftime(fmt.replace("YYYY", "%Y").replace("MM", "%m").replace("DD", "%d"))
+    if token in ("ASIN|JAN", "ASIN_JAN"):
+        return (p.get("asin") or p.get("ASIN") or "") or (p.get("jan") or p.get("JAN") or "")
+    if token.lower() == "asin":
+        return str(p.get("asin") or p.get("ASIN") or "")
+    if token.lower() == "jan":
+        return str(p.get("jan") or p.get("JAN") or "")
+    c = p.get("condition") or p.get("コンディション", "")
+    if token == "condNum":
+        v = COND_NUM_MAP.get(c)
+        return str(v) if v is not None else ""
+    if token == "condCode":
+        return COND_CODE_MAP.get(c) or ""
+    if token == "rule369":
+        return rule369_code(p.get("comment") or p.get("コメント") or "")
+    if token in ("purchasePrice", "price", "purchase_price"):
+        val = p.get("purchase_price") or p.get("仕入れ価格") or p.get("仕入価格") or p.get("cost")
+        if val is None:
+            return ""
+        try:
+            num = float(val)
+            return str(int(num)) if num.is_integer() else str(num)
+        except Exception:
+            return str(val)
+    if token == "ship":
+        return str(p.get("shippingMethod") or p.get("発送方法") or "")
+    if token == "supplier":
+        return str(p.get("supplier_code") or p.get("仕入先") or p.get("supplier") or "")
+    if token.startswith("seq"):
+        parts = token.split(":")
+        width = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 3
+        return str(seq).zfill(width)
+    if token.startswith("custom:") or token.startswith("text:"):
+        return token.split(":", 1)[1]
+    return ""
+
+
+def _legacy_render(template, p, seq, base):
+    out, last = [], 0
+    for m in re.finditer(r"\{([^{}]+)\}", template):
+        out.append(template[last:m.start()])
+        out.append(_legacy_token(m.group(1), p, seq, base))
+        last = m.end()
+    out.append(template[last:])
+    s = re.sub(r"[^0-9A-Za-z\-_]", "-", "".join(out))
+    return re.sub(r"-+", "-", s).strip("-")[:60]
+
+
+def _random_product(rng: random.Random) -> dict:
+    keys = {
+        "asin": lambda: rng.choice(["B0" + str(rng.randint(10**7, 10**8)), "", None]),
+        "JAN": lambda: rng.choice(["4901234567890", ""]),
+        "condition": lambda: rng.choice(list(COND_NUM_MAP) + ["", "その他"]),
+        "コンディション": lambda: rng.choice(["中古(良い)", ""]),
+        "comment": lambda: rng.choice(["3", "4", "3n-テスト", "10", "11", " 9P ", "", None, 7]),
+        "purchase_price": lambda: rng.choice([500, 500.0, 12.5, "1,200", "", 0, None]),
+        "cost": lambda: rng.choice([300, None]),
+        "supplier_code": lambda: rng.choice(["BO01", "ﾌﾞｯｸｵﾌ", "a--b", ""]),
+        "発送方法": lambda: rng.choice(["FBA", "自己発送", ""]),
+    }
+    return {k: make() for k, make in keys.items() if rng.random() < 0.7}
+
+
+@pytest.mark.parametrize("template", TEMPLATES)
+def test_render_many_matches_legacy(template):
+    rng = random.Random(hash(template) & 0xFFFF)
+    products = [_random_product(rng) for _ in range(300)]
+    renderer = SKUTemplateRenderer({"skuTemplate": template, "seqStart": 7}, sku_date="2025-03-01")
+
+    skus = renderer.render_many(products)
+
+    assert skus == [_legacy_render(template, p, 7 + i, BASE_DATE) for i, p in enumerate(products)]
+    assert [renderer.render_sku(p, seq_offset=i) for i, p in enumerate(products)] == skus
+
+
+def test_numeric_asin_jan_no_longer_blanks_the_sku():
+    renderer = SKUTemplateRenderer({"skuTemplate": "{ASIN|JAN}-{seq:2}"})
+    assert renderer.render_many([{"jan": 4901234567890}, "not-a-dict"]) == ["4901234567890-01", ""]
+
+
+def test_find_duplicate_skus():
+    assert find_duplicate_skus(["A", "B", "A", "", "", "C", "A"]) == {"A": [0, 2, 6]}
+
+
+def test_settings_are_cached_until_file_changes(tmp_path, capsys):
+    path = tmp_path / "inventory_settings.json"
+    path.write_text(json.dumps({"skuTemplate": "{seq:2}"}), encoding="utf-8")
+    first = load_sku_settings(path)
+    assert load_sku_settings(path) is first
+
+    path.write_text(json.dumps({"skuTemplate": "X{seq:4}"}), encoding="utf-8")
+    os.utime(path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    second = load_sku_settings(path)
+    assert second.template.template == "X{seq:4}"
+
+    path.write_text("{broken", encoding="utf-8")
+    sku_template.invalidate_sku_settings()
+    assert load_sku_settings(path).settings == sku_template.DEFAULT_SKU_SETTINGS
+    assert load_sku_settings(tmp_path / "missing.json").template.template == sku_template.DEFAULT_SKU_TEMPLATE
+
+
+def test_generate_sku_bulk_reports_duplicates(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "inventory_settings.json"
+    path.write_text(json.dumps({"skuTemplate": "{date:YYYYMMDD}-{supplier}", "seqStart": 1}), encoding="utf-8")
+    monkeypatch.setattr(sku_template, "INVENTORY_SETTINGS_PATH", path)
+
+    result = InventoryService.generate_sku_bulk(
+        [{"supplier_code": "A"}, {"supplier_code": "B"}, {"supplier_code": "A"}], sku_date="20250301"
+    )
+
+    assert [r["sku"] for r in result["results"]] == ["20250301-A", "20250301-B", "20250301-A"]
+    assert result["duplicates"] == [{"sku": "20250301-A", "indexes": [0, 2]}]
+    assert "SKUが重複" in capsys.readouterr().out
+
+
+def test_bulk_render_is_fast():
+    rng = random.Random(0)
+    products = [_random_product(rng) for _ in range(50_000)]
+    renderer = SKUTemplateRenderer({"skuTemplate": TEMPLATES[1]}, sku_date="20250301")
+    started = time.perf_counter()
+    skus = renderer.render_many(products)
+    assert len(skus) == 50_000
+    assert time.perf_counter() - started < 2.0
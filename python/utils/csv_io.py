@@ -137,13 +137,14 @@ def write_listing_csv_from_dataframe(df, columns: List[str], excel_formula_cols:
         records.append(rec)
     return write_listing_csv(records, columns, excel_formula_cols)
 
-def write_repricer_csv(df, columns: List[str], excel_formula_cols: List[str] = None) -> bytes:
+def write_repricer_csv(df, columns: List[str], excel_formula_cols: List[str] = None, include_header: bool = True) -> bytes:
     """
     Repricing用CSV生成（説明行なし、ヘッダー+データのみ）。
     - 全列QUOTE_ALL
     - CRLF
     - cp932（errors='replace'）
     - 先頭の説明行や ="..." の付与は行わない
+    - include_header=False でデータ行のみ（チャンク単位で追記する場合の2チャンク目以降）
     """
     # records 構築
     records: List[Dict] = []
@@ -157,7 +158,8 @@ def write_repricer_csv(df, columns: List[str], excel_formula_cols: List[str] = N
     # CSV生成（ヘッダー+データのみ）
     output = io.StringIO()
     writer = csv.writer(output, lineterminator='\r\n', quoting=csv.QUOTE_ALL, doublequote=True)
-    writer.writerow(columns)
+    if include_header:
+        writer.writerow(columns)
     for row_dict in records:
         row = []
         for col in columns:
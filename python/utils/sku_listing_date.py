@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SKU からの出品日（仕入日）抽出ロジック（PySide6 非依存）。
+
+FastAPI（repricer_weekly / 3-6-9 列指向エンジン）とデスクトップの RepricerWidget の
+日数フィルタで共通に使う。
+
+- 対応する SKU 規則（優先順位の高い順）
+    1. 2024_08_28-... / 2024_0828-...
+    2. 20250201-...（YYYYMMDD + ハイフン）
+    3. 20251108B...（YYYYMMDD + 英字）
+    4. hmk-20251108-...（英小文字プレフィックス-YYYYMMDD-）
+    5. pr_..._20250217_...（任意位置の _YYYYMMDD_）
+    6. 250518-...（YYMMDD + ハイフン、2000年代として解釈）
+- 6規則は1本の結合済み正規表現にまとめ、Series は str.extract で一括抽出する
+- 抽出結果（日付の序数）は SKU 単位で LRU メモ化する。日付は実行日に依存しないため、
+  同じ在庫 CSV を何度プレビューしてもメモから返る
+- 先に一致した規則の日付が暦上不正（例: 13月）の場合は、従来通り次の規則へフォールバックする
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# 規則ごとの正規表現（優先順位の高い順）。フォールバック判定でのみ個別に使う。
+_SKU_DATE_PATTERNS = (
+    re.compile(r"^(?P<year>\d{4})_(?P<month>\d{2})_?(?P<day>\d{2})"),
+    re.compile(r"^(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})-"),
+    re.compile(r"^(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})(?=[A-Za-z])"),
+    re.compile(r"^[a-z]+-(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})-"),
+    re.compile(r"_(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})_"),
+    re.compile(r"^(?P<year>\d{2})(?P<month>\d{2})(?P<day>\d{2})-"),
+)
+
+# 6規則を先頭アンカーの選択肢として結合したもの。
+# 5番目（任意位置）は ".*?" で最左一致を再現し、6番目より先に評価されるようにしている。
+SKU_LISTING_DATE_PATTERN = re.compile(
+    r"^(?:"
+    r"(?P<y1>\d{4})_(?P<m1>\d{2})_?(?P<d1>\d{2})"
+    r"|(?P<y2>\d{4})(?P<m2>\d{2})(?P<d2>\d{2})-"
+    r"|(?P<y3>\d{4})(?P<m3>\d{2})(?P<d3>\d{2})(?=[A-Za-z])"
+    r"|[a-z]+-(?P<y4>\d{4})(?P<m4>\d{2})(?P<d4>\d{2})-"
+    r"|.*?_(?P<y5>\d{4})(?P<m5>\d{2})(?P<d5>\d{2})_"
+    r"|(?P<y6>\d{2})(?P<m6>\d{2})(?P<d6>\d{2})-"
+    r")",
+    re.DOTALL,
+)
+
+_PATTERN_COUNT = len(_SKU_DATE_PATTERNS)
+
+# 抽出できなかった場合の経過日数
+UNKNOWN_DAYS = -1
+
+# SKU -> 出品日の序数（抽出不可は None）の LRU メモ
+# API のスレッドプールとジョブのスレッドから同時に使われるため、_memo_lock で守る
+_MEMO_MAXSIZE = 65536
+_MISSING = object()
+_memo: "OrderedDict[str, Optional[int]]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def strip_excel_formula(sku: Any) -> Any:
+    """="..." 形式（Excel 数式記法）の外側を剥がす。文字列以外はそのまま返す。"""
+    if isinstance(sku, str) and sku.startswith('="') and sku.endswith('"'):
+        return sku[2:-1]
+    return sku
+
+
+def _to_ordinal(year: str, month: str, day: str) -> Optional[int]:
+    """抽出した年月日文字列を日付の序数へ。暦上不正なら None。"""
+    y = int(year)
+    if len(year) == 2:
+        y += 2000
+    try:
+        return date(y, int(month), int(day)).toordinal()
+    except ValueError:
+        return None
+
+
+def _ordinal_by_patterns(sku: str) -> Optional[int]:
+    """規則を優先順に個別評価する（不正日付のフォールバック用）。"""
+    for pattern in _SKU_DATE_PATTERNS:
+        match = pattern.search(sku)
+        if match:
+            ordinal = _to_ordinal(match.group("year"), match.group("month"), match.group("day"))
+            if ordinal is not None:
+                return ordinal
+    return None
+
+
+def _ordinal_from_groups(groups: Iterable[Optional[str]], sku: str) -> Optional[int]:
+    """結合正規表現のグループ値（y1,m1,d1,...,y6,m6,d6）から序数を得る。"""
+    values = list(groups)
+    for k in range(_PATTERN_COUNT):
+        year = values[3 * k]
+        if isinstance(year, str):
+            ordinal = _to_ordinal(year, values[3 * k + 1], values[3 * k + 2])
+            if ordinal is None:
+                return _ordinal_by_patterns(sku)
+            return ordinal
+    return None
+
+
+def _memo_get(sku: str) -> Any:
+    """メモを参照する。未登録なら _MISSING。"""
+    with _memo_lock:
+        ordinal = _memo.get(sku, _MISSING)
+        if ordinal is not _MISSING:
+            _memo.move_to_end(sku)
+    return ordinal
+
+
+def _memo_put(sku: str, ordinal: Optional[int]) -> None:
+    """メモへ登録し、上限を超えた分は古い順に捨てる。"""
+    with _memo_lock:
+        _memo[sku] = ordinal
+        _memo.move_to_end(sku)
+        while len(_memo) > _MEMO_MAXSIZE:
+            _memo.popitem(last=False)
+
+
+def clear_listing_date_memo() -> None:
+    """メモを空にする（テスト・設定変更時用）。"""
+    with _memo_lock:
+        _memo.clear()
+
+
+def listing_date_memo_size() -> int:
+    """メモの登録件数。"""
+    return len(_memo)
+
+
+def _listing_ordinal(sku: str) -> Optional[int]:
+    """SKU（Excel 数式記法除去済み）から出品日の序数を返す。LRU メモ付き。"""
+    ordinal = _memo_get(sku)
+    if ordinal is not _MISSING:
+        return ordinal
+    match = SKU_LISTING_DATE_PATTERN.match(sku)
+    ordinal = _ordinal_from_groups(match.groups(), sku) if match else None
+    _memo_put(sku, ordinal)
+    return ordinal
+
+
+def _today_ordinal(today: Union[datetime, date]) -> int:
+    """(today - datetime(y, m, d)).days と同じ結果になる基準序数。"""
+    if isinstance(today, datetime):
+        return today.date().toordinal()
+    return today.toordinal()
+
+
+def parse_listing_date_from_sku(sku: Any) -> Optional[datetime]:
+    """SKU から出品日を datetime（0時0分）で返す。抽出できない場合は None。"""
+    sku = strip_excel_formula(sku)
+    if not isinstance(sku, str):
+        return None
+    ordinal = _listing_ordinal(sku)
+    if ordinal is None:
+        return None
+    return datetime.fromordinal(ordinal)
+
+
+def days_since_listed(sku: Any, today: Union[datetime, date]) -> int:
+    """SKU から出品日を抽出し、today までの経過日数を返す。抽出できない場合は -1。"""
+    sku = strip_excel_formula(sku)
+    if not isinstance(sku, str):
+        return UNKNOWN_DAYS
+    ordinal = _listing_ordinal(sku)
+    if ordinal is None:
+        return UNKNOWN_DAYS
+    return _today_ordinal(today) - ordinal
+
+
+def days_since_listed_series(skus: Union[pd.Series, Iterable[Any]], today: Union[datetime, date]) -> pd.Series:
+    """
+    SKU 列をまとめて経過日数（int64、抽出不可は -1）へ変換する。
+
+    ユニーク SKU のうちメモ未登録のものだけを str.extract で一括抽出し、結果をメモへ登録する。
+    戻り値の index は入力 Series と同じ。
+    """
+    if not isinstance(skus, pd.Series):
+        skus = pd.Series(list(skus), dtype=object)
+    if skus.empty:
+        return pd.Series(np.zeros(0, dtype=np.int64), index=skus.index)
+
+    values = skus.to_numpy(dtype=object)
+    keys = [strip_excel_formula(v) if isinstance(v, str) else None for v in values]
+    unique_keys = list(dict.fromkeys(k for k in keys if k is not None))
+
+    ordinals: Dict[str, Optional[int]] = {}
+    misses: List[str] = []
+    for key in unique_keys:
+        ordinal = _memo_get(key)
+        if ordinal is _MISSING:
+            misses.append(key)
+        else:
+            ordinals[key] = ordinal
+
+    if misses:
+        extracted = pd.Series(misses, dtype=object).str.extract(SKU_LISTING_DATE_PATTERN)
+        for key, groups in zip(misses, extracted.itertuples(index=False, name=None)):
+            ordinal = _ordinal_from_groups(groups, key)
+            _memo_put(key, ordinal)
+            ordinals[key] = ordinal
+
+    base = _today_ordinal(today)
+    days = np.fromiter(
+        (UNKNOWN_DAYS if k is None or ordinals[k] is None else base - ordinals[k] for k in keys),
+        dtype=np.int64,
+        count=len(keys),
+    )
+    return pd.Series(days, index=skus.index)